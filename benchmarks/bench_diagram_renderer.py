@@ -0,0 +1,68 @@
+"""
+Offline diagram rendering time, cold and from the render cache.
+
+Renders every diagram in the Mermaid corpus to SVG (and PNG when Pillow is
+installed) with an empty cache, then again from the in-memory and on-disk
+tiers, the way repeated downloads and batch re-exports hit it. The last line
+is the cost of the fingerprint the editor checks before re-rendering an edit.
+
+    python benchmarks/bench_diagram_renderer.py --rounds 50
+"""
+
+import argparse
+import glob
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+from diagram_renderer import RenderCache, RenderError, diagram_fingerprint, render_diagram
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus", "mermaid")
+
+def load_corpus(directory):
+    corpus = {}
+    for path in sorted(glob.glob(os.path.join(directory, "valid_*.mmd"))):
+        with open(path, "r", encoding="utf-8") as f:
+            corpus[os.path.basename(path)] = f.read()
+    return corpus
+
+def timed_ms(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--corpus", default=CORPUS_DIR)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    print(f"{len(corpus)} diagrams, {args.rounds} rounds\n")
+    print(f"{'format':<6} {'cold ms':>10} {'memory hit ms':>15} {'disk hit ms':>13}")
+    for fmt in ("svg", "png"):
+        cold, memory, disk = [], [], []
+        try:
+            for _ in range(args.rounds):
+                with tempfile.TemporaryDirectory() as cache_dir:
+                    cache = RenderCache(cache_dir=cache_dir)
+                    for code in corpus.values():
+                        cold.append(timed_ms(lambda: render_diagram(code, fmt, cache=cache)))
+                        memory.append(timed_ms(lambda: render_diagram(code, fmt, cache=cache)))
+                    reloaded = RenderCache(cache_dir=cache_dir)
+                    for code in corpus.values():
+                        disk.append(timed_ms(lambda: render_diagram(code, fmt, cache=reloaded)))
+        except RenderError as e:
+            print(f"{fmt:<6} skipped: {e}")
+            continue
+        print(f"{fmt:<6} {statistics.mean(cold):10.3f} {statistics.mean(memory):15.4f} {statistics.mean(disk):13.4f}")
+
+    fingerprint = [timed_ms(lambda: diagram_fingerprint(code)) for _ in range(args.rounds) for code in corpus.values()]
+    print(f"\nfingerprint ms: {statistics.mean(fingerprint):.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+CrewAI engine vs. the direct-call engine: cold start, latency and prompt tokens.
+
+Cold start is the time a fresh interpreter needs to import each engine, so no
+model server is needed for it. With --live, every description is also
+generated by both engines (interleaved) against Ollama, and the report shows
+per-request latency and the prompt tokens each engine sent: Ollama's
+prompt_eval_count plus the tokens prompt_prefix estimates were served from
+the KV cache.
+
+    python benchmarks/bench_engines.py
+    python benchmarks/bench_engines.py --live --runs 3
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+CORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core")
+sys.path.insert(0, CORE_DIR)
+
+import tracing
+from generation import ENGINES, engine_functions
+from prompt_prefix import get_prefix_tracker
+
+ENGINE_MODULES = {"crew": "crew_orchestration", "direct": "direct_engine"}
+
+DESCRIPTIONS = [
+    "A mobile app to track daily water intake with reminders and statistics.",
+    "An online bookstore where customers browse, order and review books, and staff manage stock.",
+    "A hospital appointment system for patients, doctors and receptionists with SMS notifications.",
+]
+
+def import_seconds(module, repeats):
+    """Median wall time of a fresh interpreter importing `module`, or None if it can't be imported"""
+    code = f"import sys; sys.path.insert(0, {CORE_DIR!r}); import {module}"
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        completed = subprocess.run([sys.executable, "-c", code], capture_output=True)
+        if completed.returncode != 0:
+            return None
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+def report_cold_start(repeats):
+    baseline = import_seconds("sys", repeats)
+    print(f"{'engine':<8}{'import (s)':>12}   (bare interpreter: {baseline:.3f}s)")
+    for engine in ENGINES:
+        seconds = import_seconds(ENGINE_MODULES[engine], repeats)
+        print(f"{engine:<8}{seconds:>12.3f}" if seconds is not None else f"{engine:<8}{'unavailable':>12}")
+
+def prompt_tokens():
+    evaluated = tracing.snapshot()["ollama"].get("prompt_eval_count", 0)
+    return evaluated + get_prefix_tracker().stats()["reused_tokens"]
+
+def run_live(args):
+    samples = defaultdict(lambda: {"seconds": [], "prompt_tokens": [], "ok": []})
+    for _ in range(args.runs):
+        for description in DESCRIPTIONS:
+            for engine in ENGINES:
+                run_task, _ = engine_functions(engine)
+                tokens_before = prompt_tokens()
+                start = time.perf_counter()
+                result = run_task(description, args.diagram_type, temperature=args.temperature,
+                                  max_tokens=args.max_tokens)
+                samples[engine]["seconds"].append(time.perf_counter() - start)
+                samples[engine]["prompt_tokens"].append(prompt_tokens() - tokens_before)
+                samples[engine]["ok"].append(bool(result))
+
+    print(f"{'engine':<8}{'mean s':>9}{'median s':>10}{'prompt tok':>12}{'ok':>6}")
+    for engine in ENGINES:
+        sample = samples[engine]
+        print(f"{engine:<8}{statistics.mean(sample['seconds']):>9.2f}{statistics.median(sample['seconds']):>10.2f}"
+              f"{statistics.mean(sample['prompt_tokens']):>12.0f}{sum(sample['ok']):>3}/{len(sample['ok'])}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--live", action="store_true", help="Also generate with both engines against Ollama")
+    parser.add_argument("--runs", type=int, default=1, help="Passes over the descriptions in live mode")
+    parser.add_argument("--repeats", type=int, default=5, help="Fresh interpreters per cold-start measurement")
+    parser.add_argument("--diagram-type", default="Class")
+    parser.add_argument("--max-tokens", type=int, default=800)
+    parser.add_argument("--temperature", type=float, default=0.7)
+    args = parser.parse_args()
+
+    report_cold_start(args.repeats)
+    if args.live:
+        print()
+        run_live(args)
+
+if __name__ == "__main__":
+    main()
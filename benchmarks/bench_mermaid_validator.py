@@ -0,0 +1,85 @@
+"""
+Mermaid validation speed and coverage over a corpus of generated diagrams.
+
+Compares the header-keyword check that is_valid_mermaid used to do with the
+mermaid_validator parser: time per diagram and how many of the known-broken
+corpus files (named broken_*.mmd) each one rejects.
+
+    python benchmarks/bench_mermaid_validator.py --rounds 2000
+"""
+
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+from mermaid_validator import MermaidValidator, validate_mermaid
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus", "mermaid")
+
+LEGACY_STARTS = ["flowchart", "sequenceDiagram", "classDiagram", "stateDiagram", "stateDiagram-v2",
+                 "gantt", "pie", "journey", "gitGraph"]
+
+def legacy_is_valid(code):
+    """The previous is_valid_mermaid: only looks at the first keyword"""
+    if not code or len(code) < 10:
+        return False
+    return any(code.lstrip().startswith(start) for start in LEGACY_STARTS)
+
+def parser_is_valid(code):
+    return not any(issue.severity == "error" for issue in validate_mermaid(code))
+
+def streamed_is_valid(code, chunk_size=16):
+    """Validate while 'streaming' the text in small chunks"""
+    validator = MermaidValidator()
+    for start in range(0, len(code), chunk_size):
+        validator.feed(code[start:start + chunk_size])
+    validator.close()
+    return not validator.errors
+
+def load_corpus(directory):
+    corpus = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.mmd"))):
+        with open(path, "r", encoding="utf-8") as f:
+            corpus[os.path.basename(path)] = f.read()
+    return corpus
+
+def measure(fn, corpus, rounds):
+    samples = []
+    for code in corpus.values():
+        start = time.perf_counter()
+        for _ in range(rounds):
+            fn(code)
+        samples.append((time.perf_counter() - start) / rounds * 1e6)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--corpus", default=CORPUS_DIR)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    broken = [name for name in corpus if name.startswith("broken_")]
+    print(f"{len(corpus)} diagrams, {len(broken)} known broken\n")
+
+    for label, fn in (("keyword check (before)", legacy_is_valid),
+                      ("parser", parser_is_valid),
+                      ("parser, streamed", streamed_is_valid)):
+        samples = measure(fn, corpus, args.rounds)
+        caught = sum(1 for name in broken if not fn(corpus[name]))
+        false_alarms = sum(1 for name in corpus if name not in broken and not fn(corpus[name]))
+        print(f"{label:<24} mean {statistics.mean(samples):8.2f} us   max {max(samples):8.2f} us   "
+              f"broken caught {caught}/{len(broken)}   valid rejected {false_alarms}")
+
+    print("\nFirst issue per broken diagram:")
+    for name in broken:
+        issues = validate_mermaid(corpus[name])
+        print(f"  {name:<40} {issues[0] if issues else 'none'}")
+
+if __name__ == "__main__":
+    main()
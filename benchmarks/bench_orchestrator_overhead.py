@@ -0,0 +1,71 @@
+"""
+Per-request setup overhead of run_crew_task: fresh agents vs. a warm orchestrator.
+
+Measures only the work done before crew.kickoff() (agent, Task and Crew
+construction), so no model server is needed.
+
+    python benchmarks/bench_orchestrator_overhead.py --requests 50
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+from crewai import Crew, Process, Task
+
+from crew_orchestration import (
+    CrewOrchestrator,
+    create_mermaid_generator_agent,
+    create_sdlc_advisor_agent,
+)
+from prompts import build_sdlc_task_prompt, build_uml_task_prompt
+
+DESCRIPTION = "A mobile app to track daily water intake with reminders and statistics."
+
+def build_crew(sdlc_advisor, mermaid_generator):
+    sdlc_task = Task(description=build_sdlc_task_prompt(DESCRIPTION), agent=sdlc_advisor,
+                     expected_output="A recommendation of an SDLC model with justification")
+    uml_task = Task(description=build_uml_task_prompt(DESCRIPTION, "Class"), agent=mermaid_generator,
+                    expected_output="Complete Mermaid code for a Class diagram")
+    return Crew(agents=[sdlc_advisor, mermaid_generator], tasks=[sdlc_task, uml_task],
+                verbose=False, process=Process.sequential)
+
+def setup_fresh():
+    """The previous behaviour: new agents (and LLM wrappers) on every request"""
+    build_crew(create_sdlc_advisor_agent(), create_mermaid_generator_agent())
+
+def setup_warm(orchestrator):
+    lease = orchestrator.lease(0.7, 2000)
+    try:
+        build_crew(lease.get("sdlc_advisor"), lease.get("mermaid_generator"))
+    finally:
+        lease.release()
+
+def measure(fn, requests):
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def report(label, samples):
+    print(f"{label:<22} mean {statistics.mean(samples):8.2f} ms   "
+          f"median {statistics.median(samples):8.2f} ms   max {max(samples):8.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    orchestrator = CrewOrchestrator()
+    report("fresh agents (before)", measure(setup_fresh, args.requests))
+    report("warm orchestrator", measure(lambda: setup_warm(orchestrator), args.requests))
+    print(f"orchestrator stats: {orchestrator.stats()}")
+
+if __name__ == "__main__":
+    main()
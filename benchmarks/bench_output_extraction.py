@@ -0,0 +1,95 @@
+"""
+Crew output extraction time on pathological model output.
+
+Compares the regex extraction run_crew_task used to apply to the printed crew
+result (four SDLC patterns plus the Mermaid block/keyword search) with the
+single-pass extract_mermaid_code. Each case is grown until the legacy
+patterns get too slow to measure; the new extractor should scale linearly.
+
+    python benchmarks/bench_output_extraction.py --sizes 250 500 1000 2000
+"""
+
+import argparse
+import random
+import re
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+from mermaid_extraction import extract_mermaid_code
+
+LEGACY_SDLC_PATTERNS = [
+    r'SDLC.*?:.*?(\w+(?:\s+\w+)*(?:\n\s*[-•*]\s*[^\n]+)+)',
+    r'SDLC.*?:.*?(\w+(?:\s+\w+)*\n.*?(?=\n\n|\Z))',
+    r'recommend.*?(\w+(?:\s+\w+){0,3}).*?(?:\n\s*[-•*].*?)+',
+    r'recommend.*?(\w+(?:\s+\w+){0,3}).*?(?:\n.*?){1,10}',
+]
+LEGACY_STARTS = ["flowchart", "sequenceDiagram", "classDiagram", "stateDiagram", "stateDiagram-v2",
+                 "gantt", "pie", "journey", "gitGraph"]
+
+# Seconds after which a case is no longer run with the legacy extractor
+LEGACY_BUDGET = 2.0
+
+def legacy_extract(text):
+    """The string-representation fallback previously in run_crew_task"""
+    sdlc_section = None
+    for pattern in LEGACY_SDLC_PATTERNS:
+        match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+        if match:
+            sdlc_section = match.group(0).strip()
+            break
+    mermaid_match = re.search(r'```(?:mermaid)?\s*([\s\S]*?```)', text)
+    if mermaid_match:
+        return sdlc_section, mermaid_match.group(1).replace('```', '').strip()
+    for diagram_start in LEGACY_STARTS:
+        match = re.search(f'({diagram_start}[\\s\\S]*?)(?:```|\\n\\n|$)', text)
+        if match:
+            return sdlc_section, match.group(1).strip()
+    return sdlc_section, None
+
+# Pathological outputs, parameterised by n
+CASES = {
+    "sdlc words, no colon": lambda n: "SDLC " + "a " * n,
+    "sdlc words, colon, no bullets": lambda n: "SDLC: " + "word " * n,
+    "recommend, no newline": lambda n: "recommend " + "a " * n,
+    "unclosed fence": lambda n: "```mermaid\nflowchart TD\n" + "    A --> B\n" * n,
+    "many empty fences": lambda n: "```\n" * n,
+    "keyword soup": lambda n: "flowchart " * n,
+    "random tokens": lambda n: fuzz_text(random.Random(n), n),
+}
+
+FUZZ_TOKENS = ["```", "```mermaid", "mermaid", "classDiagram", "flowchart", "stateDiagram-v2",
+               "SDLC", "recommend", ":", "\n", "\n\n", "-", "* ", "a ", "word ", "{", "}", "end"]
+
+def fuzz_text(rng, n):
+    """n random tokens that look like fragments of model output"""
+    return "".join(rng.choice(FUZZ_TOKENS) for _ in range(n))
+
+def timed(fn, text):
+    start = time.perf_counter()
+    fn(text)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[250, 500, 1000, 2000])
+    args = parser.parse_args()
+
+    print(f"{'case':<32} {'n':>6} {'chars':>8} {'legacy ms':>11} {'single-pass ms':>15}")
+    for name, build in CASES.items():
+        legacy_skipped = False
+        for n in args.sizes:
+            text = build(n)
+            if legacy_skipped:
+                legacy = "skipped"
+            else:
+                seconds = timed(legacy_extract, text)
+                legacy = f"{seconds * 1000:.2f}"
+                legacy_skipped = seconds > LEGACY_BUDGET
+            new = timed(extract_mermaid_code, text) * 1000
+            print(f"{name:<32} {n:>6} {len(text):>8} {legacy:>11} {new:>15.2f}")
+
+if __name__ == "__main__":
+    main()
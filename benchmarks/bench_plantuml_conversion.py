@@ -0,0 +1,291 @@
+"""
+PlantUML to Mermaid conversion time on growing diagrams.
+
+Compares the per-type converters previously in mermaid_renderer (kept below
+verbatim: one re.finditer pass per pattern, string concatenation for the
+output) with parse_plantuml plus the matching emitter. Each case is a diagram
+of n generated statements; the new converter should scale linearly, including
+on truncated class bodies, where the legacy class pattern rescans to the end
+of the input for every class.
+
+    python benchmarks/bench_plantuml_conversion.py --sizes 250 1000 4000 16000
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+from plantuml import emit_class, emit_sequence, emit_state, emit_usecase, parse_plantuml
+
+# Seconds after which a case is no longer run with the legacy converter
+LEGACY_BUDGET = 1.0
+
+# ---------------------------------------------------------------------------
+# Legacy converters
+
+def legacy_plantuml_to_mermaid(plantuml_code: str) -> str:
+    # Extract the content between @startuml and @enduml
+    match = re.search(r'@startuml(.*?)@enduml', plantuml_code, re.DOTALL)
+    if match:
+        content = match.group(1).strip()
+    else:
+        content = plantuml_code.strip()
+
+    # Detect diagram type based on content
+    if 'class ' in content.lower():
+        return legacy_class_diagram(content)
+    elif 'actor ' in content.lower() or 'usecase ' in content.lower():
+        return legacy_usecase_diagram(content)
+    elif '-->' in content or '->' in content or '=>' in content:
+        if 'participant ' in content.lower() or 'actor ' in content.lower():
+            return legacy_sequence_diagram(content)
+        else:
+            return legacy_flowchart(content)
+    elif '[' in content and ']' in content and ('component ' in content.lower() or 'interface ' in content.lower()):
+        return legacy_component_diagram(content)
+    elif 'state ' in content.lower():
+        return legacy_state_diagram(content)
+    else:
+        # Default to flowchart if type can't be determined
+        return legacy_flowchart(content)
+
+def legacy_class_diagram(content: str) -> str:
+    mermaid = "classDiagram\n"
+
+    # Process class definitions
+    class_pattern = r'class\s+(\w+)(?:\s*{(.*?)})?'
+    for match in re.finditer(class_pattern, content, re.DOTALL):
+        class_name = match.group(1)
+        mermaid += f"    class {class_name}\n"
+
+        if match.group(2):  # If there are attributes/methods
+            attrs = match.group(2).strip().split('\n')
+            for attr in attrs:
+                attr = attr.strip()
+                if attr:
+                    # Add + for public, - for private attributes/methods
+                    if '+' in attr:
+                        mermaid += f"    {class_name} : +{attr.split('+')[1].strip()}\n"
+                    elif '-' in attr:
+                        mermaid += f"    {class_name} : -{attr.split('-')[1].strip()}\n"
+                    else:
+                        mermaid += f"    {class_name} : {attr}\n"
+
+    # Process relationships
+    relations = [
+        (r'(\w+)\s+--\s+(\w+)', "--"),  # Association
+        (r'(\w+)\s+\.\.\s+(\w+)', ".."),  # Dependency
+        (r'(\w+)\s+<\|--\s+(\w+)', "<|--"),  # Inheritance
+        (r'(\w+)\s+\*--\s+(\w+)', "*--"),  # Composition
+        (r'(\w+)\s+o--\s+(\w+)', "o--")   # Aggregation
+    ]
+
+    for pattern, rel_type in relations:
+        for match in re.finditer(pattern, content):
+            mermaid += f"    {match.group(1)} {rel_type} {match.group(2)}\n"
+
+    return mermaid
+
+def legacy_usecase_diagram(content: str) -> str:
+    mermaid = "flowchart TD\n"
+
+    # Convert actors
+    actor_pattern = r'actor\s+(\w+)'
+    for match in re.finditer(actor_pattern, content):
+        actor_name = match.group(1)
+        mermaid += f"    {actor_name}[👤 {actor_name}]\n"
+
+    # Convert use cases
+    usecase_pattern = r'usecase\s+"?(.*?)"?(?:\s+as\s+(\w+))?'
+    for match in re.finditer(usecase_pattern, content):
+        usecase_text = match.group(1)
+        usecase_id = match.group(2) if match.group(2) else usecase_text.replace(" ", "_")
+        mermaid += f"    {usecase_id}[({usecase_text})]\n"
+
+    # Convert relationships
+    relation_pattern = r'(\w+)\s*-+>\s*(\w+)\s*:'
+    for match in re.finditer(relation_pattern, content):
+        mermaid += f"    {match.group(1)} -->|uses| {match.group(2)}\n"
+
+    # Simple connections
+    simple_relation = r'(\w+)\s*--\s*(\w+)'
+    for match in re.finditer(simple_relation, content):
+        mermaid += f"    {match.group(1)} --- {match.group(2)}\n"
+
+    return mermaid
+
+def legacy_sequence_diagram(content: str) -> str:
+    mermaid = "sequenceDiagram\n"
+
+    # Convert participants
+    participant_pattern = r'(participant|actor)\s+"?(.*?)"?(?:\s+as\s+(\w+))?'
+    for match in re.finditer(participant_pattern, content):
+        name = match.group(2)
+        alias = match.group(3) if match.group(3) else name.replace(" ", "_")
+        mermaid += f"    participant {alias} as {name}\n"
+
+    # Convert messages
+    message_patterns = [
+        (r'(\w+)\s*->\s*(\w+)\s*:\s*(.*?)(?:\n|$)', "->"),  # Solid arrow
+        (r'(\w+)\s*-->\s*(\w+)\s*:\s*(.*?)(?:\n|$)', "->>"),  # Dashed arrow
+        (r'(\w+)\s*<-\s*(\w+)\s*:\s*(.*?)(?:\n|$)', "<-"),  # Return solid
+        (r'(\w+)\s*<--\s*(\w+)\s*:\s*(.*?)(?:\n|$)', "<<-")   # Return dashed
+    ]
+
+    for pattern, arrow in message_patterns:
+        for match in re.finditer(pattern, content):
+            from_part = match.group(1)
+            to_part = match.group(2)
+            message = match.group(3).strip()
+            mermaid += f"    {from_part}{arrow}{to_part}: {message}\n"
+
+    return mermaid
+
+def legacy_component_diagram(content: str) -> str:
+    mermaid = "flowchart LR\n"
+
+    # Convert components
+    component_pattern = r'(?:component|interface)\s+"?(.*?)"?(?:\s+as\s+(\w+))?'
+    for match in re.finditer(component_pattern, content):
+        name = match.group(1)
+        alias = match.group(2) if match.group(2) else name.replace(" ", "_")
+        mermaid += f"    {alias}[{name}]\n"
+
+    # Process relationships
+    for match in re.finditer(r'(\w+)\s*-->\s*(\w+)', content):
+        mermaid += f"    {match.group(1)} --> {match.group(2)}\n"
+
+    # Process other types of connections
+    for match in re.finditer(r'(\w+)\s*--\s*(\w+)', content):
+        mermaid += f"    {match.group(1)} --- {match.group(2)}\n"
+
+    return mermaid
+
+def legacy_state_diagram(content: str) -> str:
+    mermaid = "stateDiagram-v2\n"
+
+    # Convert states
+    state_pattern = r'state\s+"?(.*?)"?(?:\s+as\s+(\w+))?'
+    for match in re.finditer(state_pattern, content):
+        name = match.group(1)
+        alias = match.group(2) if match.group(2) else name.replace(" ", "_")
+        mermaid += f"    {alias}: {name}\n"
+
+    # Convert transitions
+    transition_pattern = r'(\w+)\s*-->\s*(\w+)(?:\s*:\s*(.*?))?(?:\n|$)'
+    for match in re.finditer(transition_pattern, content):
+        from_state = match.group(1)
+        to_state = match.group(2)
+        label = f": {match.group(3)}" if match.group(3) else ""
+        mermaid += f"    {from_state} --> {to_state}{label}\n"
+
+    return mermaid
+
+def legacy_flowchart(content: str) -> str:
+    mermaid = "flowchart TD\n"
+
+    # Extract nodes (anything that appears before --> or --)
+    nodes = set()
+    for line in content.split('\n'):
+        if '-->' in line or '--' in line:
+            parts = re.split(r'-->|--', line)
+            if len(parts) > 1:
+                nodes.add(parts[0].strip())
+                nodes.add(parts[1].strip())
+
+    # Add nodes
+    for node in nodes:
+        if node:
+            node_id = node.replace(" ", "_")
+            mermaid += f"    {node_id}[{node}]\n"
+
+    # Add relationships
+    for line in content.split('\n'):
+        if '-->' in line:
+            parts = line.split('-->')
+            if len(parts) == 2:
+                from_node = parts[0].strip().replace(" ", "_")
+                to_node = parts[1].strip().replace(" ", "_")
+                mermaid += f"    {from_node} --> {to_node}\n"
+        elif '--' in line:
+            parts = line.split('--')
+            if len(parts) == 2:
+                node1 = parts[0].strip().replace(" ", "_")
+                node2 = parts[1].strip().replace(" ", "_")
+                mermaid += f"    {node1} --- {node2}\n"
+
+    return mermaid
+
+# ---------------------------------------------------------------------------
+# Cases, parameterised by the number of statements
+
+def class_case(n):
+    lines = []
+    for i in range(n // 5):
+        lines += [f"class C{i} {{", f"  +name{i} : String", f"  -count{i} : int", "}", f"C{i} <|-- C{i + 1}"]
+    return "\n".join(lines)
+
+def unclosed_class_case(n):
+    # Truncated model output: every class body is missing its closing brace
+    lines = []
+    for i in range(n // 2):
+        lines += [f"class C{i} {{", f"  +name{i} : String"]
+    return "\n".join(lines)
+
+def sequence_case(n):
+    lines = ["participant Client", "participant Server", "participant DB"]
+    for i in range(n // 3):
+        lines += [f"Client -> Server : request {i}", f"Server --> DB : query {i}", f"DB --> Client : rows {i}"]
+    return "\n".join(lines)
+
+def usecase_case(n):
+    lines = ["actor User", "actor Admin"]
+    for i in range(n // 2):
+        lines += [f"usecase \"Task {i}\" as UC{i}", f"User --> UC{i}"]
+    return "\n".join(lines)
+
+def state_case(n):
+    lines = ["[*] --> S0"]
+    for i in range(n // 2):
+        lines += [f"state S{i} : step {i}", f"S{i} --> S{i + 1} : next"]
+    return "\n".join(lines + ["S0 --> [*]"])
+
+# case -> (generator, legacy converter, new converter)
+CASES = {
+    "class": (class_case, legacy_class_diagram, emit_class),
+    "class, unclosed": (unclosed_class_case, legacy_class_diagram, emit_class),
+    "sequence": (sequence_case, legacy_sequence_diagram, emit_sequence),
+    "usecase": (usecase_case, legacy_usecase_diagram, emit_usecase),
+    "state": (state_case, legacy_state_diagram, emit_state),
+}
+
+def timed(fn, text):
+    start = time.perf_counter()
+    fn(text)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[250, 1000, 4000, 16000])
+    args = parser.parse_args()
+
+    print(f"{'case':<16} {'n':>7} {'legacy ms':>12} {'new ms':>10} {'speedup':>9}")
+    for name, (make, legacy_convert, emit) in CASES.items():
+        legacy_too_slow = False
+        for n in args.sizes:
+            text = make(n)
+            new = timed(lambda t: emit(parse_plantuml(t)), text)
+            if legacy_too_slow:
+                legacy_column, speedup = "skipped", ""
+            else:
+                legacy = timed(legacy_convert, text)
+                legacy_too_slow = legacy > LEGACY_BUDGET
+                legacy_column, speedup = f"{legacy * 1000:.1f}", f"{legacy / new:.1f}x"
+            print(f"{name:<16} {n:>7} {legacy_column:>12} {new * 1000:>10.1f} {speedup:>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Per-diagram-type Mermaid prompts vs. the full prompt with every example.
+
+Without arguments, prints the estimated system prompt tokens of each template
+next to the full prompt. With --live, runs an A/B comparison against Ollama:
+each description/diagram type is generated with both prompts (interleaved, so
+both see the same server state) and the report shows latency, Ollama's
+prompt_eval_count and how often the output was valid Mermaid.
+
+    python benchmarks/bench_prompt_templates.py
+    python benchmarks/bench_prompt_templates.py --live --runs 3 --model qwen2.5:3b
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+import http_session
+from mermaid_extraction import extract_mermaid_code, is_valid_mermaid
+from model_api import build_chat_payload
+from prompts import MERMAID_SYSTEM_PROMPT, MERMAID_TEMPLATES, build_uml_task_prompt, mermaid_system_prompt, template_token_counts
+
+DESCRIPTIONS = [
+    "A mobile app to track daily water intake with reminders and statistics.",
+    "An online bookstore where customers browse, order and review books, and staff manage stock.",
+    "A hospital appointment system for patients, doctors and receptionists with SMS notifications.",
+]
+
+VARIANTS = {
+    "full": lambda diagram_type: MERMAID_SYSTEM_PROMPT,
+    "per-type": mermaid_system_prompt,
+}
+
+def report_tokens():
+    counts = template_token_counts()
+    print(f"{'diagram type':<16}{'per-type':>10}{'full':>8}{'saved':>8}")
+    for diagram_type in MERMAID_TEMPLATES:
+        saved = 1 - counts[diagram_type] / counts["all"]
+        print(f"{diagram_type:<16}{counts[diagram_type]:>10}{counts['all']:>8}{saved:>8.0%}")
+    print("(estimated system prompt tokens, about 4 characters per token)")
+
+def generate(system_prompt, user_message, args):
+    payload = build_chat_payload([{"role": "system", "content": system_prompt},
+                                  {"role": "user", "content": user_message}],
+                                 args.model, args.max_tokens, args.temperature)
+    start = time.perf_counter()
+    response = http_session.post(f"{args.api_base}/api/chat", json=payload)
+    response.raise_for_status()
+    result = response.json()
+    return time.perf_counter() - start, result
+
+def run_live(args):
+    samples = defaultdict(lambda: {"seconds": [], "prompt_tokens": [], "valid": []})
+    diagram_types = args.diagram_types or list(MERMAID_TEMPLATES)
+    for _ in range(args.runs):
+        for description in DESCRIPTIONS:
+            for diagram_type in diagram_types:
+                user_message = build_uml_task_prompt(description, diagram_type)
+                for variant, system_prompt in VARIANTS.items():
+                    seconds, result = generate(system_prompt(diagram_type), user_message, args)
+                    code = extract_mermaid_code(result.get("message", {}).get("content", ""))
+                    sample = samples[(variant, diagram_type)]
+                    sample["seconds"].append(seconds)
+                    sample["prompt_tokens"].append(result.get("prompt_eval_count", 0))
+                    sample["valid"].append(is_valid_mermaid(code))
+
+    print(f"{'diagram type':<16}{'variant':<10}{'mean s':>9}{'median s':>10}{'prompt tok':>12}{'valid':>8}")
+    for diagram_type in diagram_types:
+        for variant in VARIANTS:
+            sample = samples[(variant, diagram_type)]
+            print(f"{diagram_type:<16}{variant:<10}{statistics.mean(sample['seconds']):>9.2f}"
+                  f"{statistics.median(sample['seconds']):>10.2f}"
+                  f"{statistics.mean(sample['prompt_tokens']):>12.0f}"
+                  f"{sum(sample['valid']) / len(sample['valid']):>8.0%}")
+    print("prompt tok is Ollama's prompt_eval_count, i.e. tokens not served from the KV cache")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--live", action="store_true", help="Run the A/B comparison against Ollama")
+    parser.add_argument("--runs", type=int, default=1, help="Passes over every description and diagram type")
+    parser.add_argument("--diagram-types", nargs="+", choices=list(MERMAID_TEMPLATES))
+    parser.add_argument("--model", default="qwen2.5:3b")
+    parser.add_argument("--api-base", default="http://localhost:11434")
+    parser.add_argument("--max-tokens", type=int, default=800)
+    parser.add_argument("--temperature", type=float, default=0.7)
+    args = parser.parse_args()
+
+    report_tokens()
+    if args.live:
+        print()
+        run_live(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Cold start of the CLI and the Streamlit app, lazy vs. eager imports.
+
+Each measurement runs in a fresh interpreter. "eager" first imports what the
+CLI and app used to load at module level (requests, Pillow, http.server,
+batch mode and, when installed, CrewAI), so it shows the cost lazy imports
+now defer to the first generation.
+
+    python benchmarks/bench_startup.py --runs 10
+
+First-page-render time needs Streamlit (it uses streamlit.testing's AppTest).
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core")
+sys.path.insert(0, CORE_DIR)
+
+from startup import profile_imports
+
+EAGER_IMPORTS = """
+import importlib
+for name in ("requests", "PIL.Image", "http.server", "batch", "crew_orchestration"):
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        pass
+"""
+
+CLI_HELP = """
+import runpy
+sys.argv = ["main.py", "--help"]
+try:
+    runpy.run_path(os.path.join(core, "main.py"), run_name="__main__")
+except SystemExit:
+    pass
+"""
+
+FIRST_PAGE = """
+from streamlit.testing.v1 import AppTest
+AppTest.from_file(os.path.join(core, "app.py"), default_timeout=60).run()
+"""
+
+def run_fresh(body, eager):
+    """Wall time of a fresh interpreter running `body` with core/ on the path"""
+    code = f"import os, sys\ncore = {CORE_DIR!r}\nsys.path.insert(0, core)\n"
+    code += (EAGER_IMPORTS if eager else "") + body
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=CORE_DIR)
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    return elapsed
+
+def report(label, body, runs):
+    for mode in ("eager", "lazy"):
+        try:
+            samples = [run_fresh(body, mode == "eager") for _ in range(runs)]
+        except RuntimeError as e:
+            print(f"{label:<22}{mode:<7} unavailable ({e})")
+            return
+        print(f"{label:<22}{mode:<7} median {statistics.median(samples) * 1000:8.1f} ms   "
+              f"min {min(samples) * 1000:8.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters per measurement")
+    args = parser.parse_args()
+
+    report("main.py --help", CLI_HELP, args.runs)
+    report("first page render", FIRST_PAGE, max(1, args.runs // 5))
+
+    total, rows = profile_imports("main", top=5)
+    print(f"\nimport main: {total * 1000:.1f} ms; slowest imports:")
+    for name, _, cumulative in rows:
+        print(f"  {cumulative * 1000:8.1f} ms  {name}")
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,44 @@
 import streamlit as st
-import streamlit.components.v1 as components
 import base64
-import requests
-import os
-import io
 import logging
-import re
-import subprocess
 import sys
 import time
-from PIL import Image
-import tempfile
+import uuid
 
 # Set up logging with more detail
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Import local modules
-from model_api import call_model
-from crew_orchestration import run_crew_task
+# Import local modules; CrewAI and the HTTP client are only loaded by the
+# first generation (or at startup with SMARTSDLC_STARTUP=eager)
+import model_api
+import startup
+from model_api import recent_request_options
+from response_cache import get_default_cache
+from artifact_store import get_artifact_store
+from diagram_renderer import get_render_cache
+from mermaid_component import diagram_svg, mermaid_editor
+from generation import DEFAULT_ENGINE, ENGINES, generation_job, register_pipeline_gauges
+from prompt_prefix import get_prefix_tracker
+from jobs import get_job_queue, QueueFullError, JOB_QUEUED, JOB_RUNNING, JOB_CANCELLED, JOB_DONE
+import tracing
+from warmup import get_model_warmer, warmup_enabled
+
+# How often the page refreshes while a generation job is queued or running
+JOB_POLL_SECONDS = 1.0
 
 # Page configuration with wide layout
 st.set_page_config(page_title="SmartSDLC", layout="wide", initial_sidebar_state="collapsed")
 
+if startup.startup_mode() == "eager":
+    startup.preload()
+
+# Export /metrics when SMARTSDLC_METRICS_PORT is set; spans go to SMARTSDLC_TRACE_FILE
+tracing.configure_from_env()
+register_pipeline_gauges()
+tracing.register_gauge("jobs_queued", "Generation jobs waiting for a worker",
+                       lambda: get_job_queue().stats()["queued"])
+
 # App title and description
 st.title("SmartSDLC: UML Generator & SDLC Advisor")
 
@@ -35,6 +51,18 @@ if 'generation_successful' not in st.session_state:
     st.session_state.generation_successful = False
 if 'last_error' not in st.session_state:
     st.session_state.last_error = None
+if 'diagrams' not in st.session_state:
+    st.session_state.diagrams = {}
+if 'active_diagram' not in st.session_state:
+    st.session_state.active_diagram = None
+if 'job_id' not in st.session_state:
+    st.session_state.job_id = None
+if 'job_notices' not in st.session_state:
+    # Messages about the last finished job, shown once after the page reruns
+    st.session_state.job_notices = []
+if 'user_id' not in st.session_state:
+    # Identifies this browser session to the job queue for per-user fairness
+    st.session_state.user_id = uuid.uuid4().hex
 
 # Debug function to print session state
 def log_session_state():
@@ -47,30 +75,152 @@ def log_session_state():
 # Check if Ollama is running
 @st.cache_data(ttl=60)
 def check_ollama_status():
-    try:
-        response = requests.get("http://localhost:11434/api/tags")
-        if response.status_code == 200:
-            models = response.json().get("models", [])
-            available_models = [model.get("name") for model in models]
-            if "qwen2.5:3b" in available_models:
-                return True, "Qwen 2.5:3B model is available"
-            else:
-                return False, "Qwen 2.5:3B model not found. Please run: ollama pull qwen2.5:3b"
-        return False, "Ollama is running but couldn't check models"
-    except Exception as e:
-        logger.error(f"Error checking Ollama status: {str(e)}")
-        return False, "Ollama server not detected. Please start Ollama with: ollama serve"
+    return model_api.check_ollama_status()
+
+# Fragments rerun on their own, so editing a diagram or polling a job doesn't re-run the whole page
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
+def _as_fragment(run_every=None):
+    # Without fragment support (Streamlit < 1.33) the function runs inline on every page run
+    return _fragment(run_every=run_every) if _fragment else (lambda fn: fn)
+
+@_as_fragment()
+def diagram_editor():
+    # Pick which diagram to edit when several were generated
+    if len(st.session_state.diagrams) > 1:
+        diagram_names = list(st.session_state.diagrams)
+        active_diagram = st.radio("Diagram:", diagram_names, horizontal=True,
+                                  index=diagram_names.index(st.session_state.active_diagram))
+        if active_diagram != st.session_state.active_diagram:
+            st.session_state.active_diagram = active_diagram
+            st.session_state.mermaid_code = st.session_state.diagrams[active_diagram]
+
+    # Live preview: keystrokes are debounced and rendered in the browser, and
+    # the code comes back here only when typing pauses
+    edited_code = mermaid_editor(st.session_state.mermaid_code,
+                                 key=f"mermaid_editor_{st.session_state.active_diagram}")
+    if edited_code != st.session_state.mermaid_code:
+        st.session_state.mermaid_code = edited_code
+        if st.session_state.active_diagram:
+            st.session_state.diagrams[st.session_state.active_diagram] = edited_code
+    if not edited_code.strip():
+        st.warning("No UML diagram was generated.")
+        return
 
-# Function to save diagram as image
-def save_diagram_as_image(mermaid_code):
-    try:
-        # Generate a URL for the SVG using Mermaid Live
-        encoded_mermaid = base64.urlsafe_b64encode(mermaid_code.encode('utf-8')).decode('utf-8')
-        mermaid_live_url = f"https://mermaid.live/svg#pako:{encoded_mermaid}"
-        return mermaid_live_url
-    except Exception as e:
-        logger.error(f"Failed to save diagram as image: {str(e)}")
-        return None
+    # Create a row of buttons
+    col1, col2, col3 = st.columns(3)
+
+    # Copy button
+    if col1.button("Copy to Clipboard"):
+        st.success("Code copied to clipboard!")
+        # Fix: Pre-process the string outside the f-string to avoid backslash in expression
+        escaped_code = edited_code.replace('`', r'\`')
+        st.markdown(f"""
+        <script>
+            navigator.clipboard.writeText(`{escaped_code}`)
+                .then(() => console.log('Copied to clipboard'))
+                .catch(err => console.error('Failed to copy: ', err));
+        </script>
+        """, unsafe_allow_html=True)
+
+    # Download button; only re-rendered when the parsed diagram changed
+    svg_data, render_error = diagram_svg(edited_code)
+    if svg_data:
+        col2.download_button("Download SVG", svg_data, file_name="diagram.svg", mime="image/svg+xml")
+    else:
+        logger.error(f"Failed to save diagram as image: {render_error}")
+        col2.button("Download SVG", disabled=True, help="This diagram type can't be rendered offline")
+
+    # Open in Mermaid Live Editor
+    if col3.button("Open in Mermaid Live"):
+        encoded_mermaid = base64.urlsafe_b64encode(edited_code.encode('utf-8')).decode('utf-8')
+        mermaid_live_url = f"https://mermaid.live/edit#pako:{encoded_mermaid}"
+        st.markdown(f"[Open in Mermaid Live Editor]({mermaid_live_url})")
+        st.write("Link opened in a new tab.")
+
+@_as_fragment(run_every=JOB_POLL_SECONDS)
+def job_status_panel():
+    # Only this panel reruns while the job is queued or running; once the job
+    # has finished, the whole page reruns once to show the result
+    if not st.session_state.job_id:
+        return
+    notices = st.session_state.job_notices
+    job = get_job_queue().status(st.session_state.job_id)
+    if job is None:
+        # Recover the result from this session's latest artifacts, if it finished
+        store = get_artifact_store()
+        request_id = store.latest_request(st.session_state.user_id)
+        manifest = store.manifest(request_id) if request_id == st.session_state.job_id else None
+        diagrams = {
+            name.split("/", 1)[1]: store.get(request_id, name)
+            for name in (manifest["artifacts"] if manifest else {}) if name.startswith("mermaid/")
+        }
+        st.session_state.job_id = None
+        if diagrams and all(diagrams.values()):
+            st.session_state.diagrams = diagrams
+            st.session_state.active_diagram = next(iter(diagrams))
+            st.session_state.mermaid_code = diagrams[st.session_state.active_diagram]
+            st.session_state.sdlc_recommendation = store.get(request_id, "sdlc_recommendation") or ""
+            st.session_state.generation_successful = True
+        else:
+            notices.append(("warning", "The generation job expired before its result was collected."))
+    elif job["status"] == JOB_QUEUED:
+        st.info(f"⏳ Waiting for a free worker ({job.get('queued_ahead', 0)} request(s) ahead of yours)...")
+    elif job["status"] == JOB_RUNNING:
+        st.info(f"🤔 {job['progress'] or 'Working on your request...'}")
+        partial = job["partial"]
+        if partial.get("sdlc_recommendation"):
+            st.subheader("SDLC Recommendation")
+            st.info(partial["sdlc_recommendation"])
+        for diagram_type, mermaid_text in partial.get("diagrams", {}).items():
+            st.subheader(f"{diagram_type} Mermaid Code")
+            st.code(mermaid_text)
+    else:
+        st.session_state.job_id = None
+        # Work on a copy: the job queue keeps the result, and the editor changes diagrams in place
+        result = dict(job["result"]) if job["result"] else None
+        if job["status"] == JOB_CANCELLED:
+            notices.append(("warning", "Generation cancelled."))
+        elif job["status"] == JOB_DONE and result and result.get('sdlc_recommendation') and result.get('diagrams'):
+            active_diagram = next(iter(result['diagrams']))
+            result['mermaid_code'] = result['diagrams'][active_diagram]
+            
+            # Log the results for debugging
+            logger.info(f"Got results from generation job: SDLC ({len(result['sdlc_recommendation'])} chars), Mermaid ({len(result['mermaid_code'])} chars)")
+            
+            # Update session state (the job already saved the result in the artifact store)
+            st.session_state.mermaid_code = result['mermaid_code']
+            st.session_state.diagrams = dict(result['diagrams'])
+            st.session_state.active_diagram = active_diagram
+            st.session_state.sdlc_recommendation = result['sdlc_recommendation']
+            st.session_state.generation_successful = True
+            st.session_state.last_error = None
+            
+            if result.get("cache_hit"):
+                notices.append(("caption", "Served from cache"))
+            elif "time_to_first_token" in result:
+                logger.info(f"Time to first token: {result['time_to_first_token']:.2f}s")
+                notices.append(("caption", f"Time to first token: {result['time_to_first_token']:.2f}s"))
+            
+            # Display success message
+            notices.append(("success", "✅ Generation successful! Diagram and SDLC recommendation ready."))
+            
+            # Log session state for debugging
+            log_session_state()
+        else:
+            error_msg = job["error"] or "Failed to generate results. The model did not return the expected output format."
+            notices.append(("error", f"{error_msg} Please try again."))
+            notices.append(("write", "Make sure the Ollama server is running with the Qwen 2.5:3B model loaded."))
+            logger.error(f"{error_msg} Job: {job['id']}")
+            st.session_state.last_error = error_msg
+            if job["partial"]:
+                notices.append(("write", "Partial results received:"))
+                notices.append(("write", job["partial"]))
+    
+    if st.session_state.job_id and st.button("Cancel generation"):
+        get_job_queue().cancel(st.session_state.job_id)
+    if not st.session_state.job_id:
+        st.rerun()
 
 # Input parameters section
 with st.container():
@@ -82,6 +232,11 @@ with st.container():
         st.warning(f"⚠️ {ollama_message}")
     else:
         st.success(f"✅ {ollama_message}")
+        if warmup_enabled():
+            # Load the model now so the first generation doesn't wait for it
+            model_status = get_model_warmer().start().status()
+            if not model_status["warm"]:
+                st.info("⏳ Loading the model into memory; the first generation may take longer.")
     
     # Form for user input
     with st.form("input_form"):
@@ -96,7 +251,8 @@ with st.container():
         # UML diagram type selection
         with col1:
             diagram_types = ["Use Case", "Class", "Sequence", "Communication", "State Machine"]
-            selected_diagram = st.selectbox("UML Diagram Type:", diagram_types)
+            selected_diagrams = st.multiselect("UML Diagram Types:", diagram_types, default=["Use Case"],
+                                               help="Several types share one SDLC recommendation and are generated together")
         
         # Model parameters
         with col2:
@@ -106,87 +262,62 @@ with st.container():
             max_tokens = st.slider("Max Tokens", min_value=500, max_value=4000, value=2000, step=100,
                                 help="Maximum output length")
         
+        with st.expander("Advanced model options"):
+            opt_col1, opt_col2, opt_col3 = st.columns(3)
+            num_ctx = opt_col1.number_input("Context window (num_ctx)", min_value=0, max_value=131072, value=0, step=1024,
+                                            help="0 keeps the model's default")
+            stop_text = opt_col2.text_input("Stop sequences", value="",
+                                            help="Comma-separated; generation stops at any of them")
+            keep_alive = opt_col3.text_input("Keep model loaded (keep_alive)", value="",
+                                             help="e.g. 10m, 1h or -1 for forever; empty keeps Ollama's default")
+        model_options = {}
+        if num_ctx:
+            model_options["num_ctx"] = int(num_ctx)
+        if stop_text.strip():
+            model_options["stop"] = [seq.strip() for seq in stop_text.split(",") if seq.strip()]
+        if keep_alive.strip():
+            model_options["keep_alive"] = int(keep_alive) if keep_alive.strip().lstrip("-").isdigit() else keep_alive.strip()
+        
+        stream_output = st.checkbox("Stream output as it is generated", value=True,
+                                    help="Show the recommendation and Mermaid code token by token")
+        engine = st.radio("Engine when not streaming", ENGINES, index=ENGINES.index(DEFAULT_ENGINE), horizontal=True,
+                          help="crew runs the CrewAI agents; direct sends the same prompts straight to the model")
+        
         # Form submission button
         submit_button = st.form_submit_button("Generate")
     
-    # Process form submission
-    if submit_button and product_description:
+    # Process form submission: queue the generation and return right away so
+    # this script run (and everyone else's) isn't blocked while the model works
+    if submit_button and product_description and not selected_diagrams:
+        st.error("Select at least one UML diagram type.")
+    elif submit_button and product_description:
         if not ollama_ok:
             st.error("Cannot generate without Ollama running with Qwen 2.5:3B model")
+        elif st.session_state.job_id:
+            st.warning("A generation is already in progress. Cancel it or wait for it to finish.")
         else:
             try:
-                # Create placeholder for progress messages
-                progress_placeholder = st.empty()
-                
-                # Initialize progress bar
-                progress_bar = st.progress(0)
-                
-                with st.spinner("Working on your request... This may take a minute."):
-                    # Show engaging messages during generation
-                    progress_placeholder.info("🧠 Analyzing your product description...")
-                    time.sleep(1)
-                    progress_bar.progress(10)
-                    
-                    progress_placeholder.info("🤔 Our SDLC advisor is determining the best development methodology for your product...")
-                    progress_bar.progress(25)
-                    
-                    # Start the crew task
-                    result = run_crew_task(
-                        product_description, 
-                        selected_diagram,
-                        temperature=temperature,
-                        max_tokens=max_tokens
-                    )
-                    
-                    # Update progress
-                    progress_placeholder.info(f"✏️ Creating your {selected_diagram} diagram using Mermaid syntax...")
-                    progress_bar.progress(70)
-                    time.sleep(0.8)
-                    
-                    progress_placeholder.info("🔍 Reviewing and optimizing the generated content...")
-                    progress_bar.progress(90)
-                    time.sleep(0.5)
-                    
-                    if result and isinstance(result, dict) and 'sdlc_recommendation' in result and 'mermaid_code' in result:
-                        # Complete the progress bar
-                        progress_bar.progress(100)
-                        
-                        # Log the results for debugging
-                        logger.info(f"Got results from crew task: SDLC ({len(result['sdlc_recommendation'])} chars), Mermaid ({len(result['mermaid_code'])} chars)")
-                        
-                        # Save the Mermaid code for the editor and session state
-                        current_dir = os.path.dirname(os.path.abspath(__file__))
-                        with open(os.path.join(current_dir, "latest_mermaid.txt"), "w") as f:
-                            f.write(result['mermaid_code'])
-                        
-                        # Update session state
-                        st.session_state.mermaid_code = result['mermaid_code']
-                        st.session_state.sdlc_recommendation = result['sdlc_recommendation']
-                        st.session_state.generation_successful = True
-                        st.session_state.last_error = None
-                        
-                        # Clear the progress messages
-                        progress_placeholder.empty()
-                        
-                        # Display success message
-                        st.success("✅ Generation successful! Diagram and SDLC recommendation ready.")
-                        
-                        # Log session state for debugging
-                        log_session_state()
-                    else:
-                        error_msg = "Failed to generate results. The model did not return the expected output format."
-                        st.error(f"{error_msg} Please try again.")
-                        logger.error(f"{error_msg} Result: {result}")
-                        st.session_state.last_error = error_msg
-                        if result:
-                            st.write("Partial results received:")
-                            st.write(result)
-            except Exception as e:
-                error_msg = f"An error occurred: {str(e)}"
-                st.error(error_msg)
-                st.write("Make sure the Ollama server is running with the Qwen 2.5:3B model loaded.")
-                logger.exception("Error in form submission handler")
-                st.session_state.last_error = error_msg
+                st.session_state.job_id = get_job_queue().submit(
+                    st.session_state.user_id,
+                    generation_job,
+                    product_description,
+                    selected_diagrams,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=stream_output,
+                    model_options=model_options,
+                    engine=engine
+                )
+            except QueueFullError as e:
+                st.error(f"The server is busy: {str(e)}. Please try again shortly.")
+                st.session_state.last_error = str(e)
+    
+    # Show the state of this session's generation job, if any
+    for kind, message in st.session_state.job_notices:
+        getattr(st, kind)(message)
+    st.session_state.job_notices = []
+    if st.session_state.job_id:
+        job_status_panel()
 
 # Output section with tabs for SDLC and UML
 if st.session_state.generation_successful:
@@ -200,65 +331,7 @@ if st.session_state.generation_successful:
     # Mermaid code editor section
     if st.session_state.mermaid_code:
         st.header("UML Diagram Editor")
-        
-        edited_code = st.text_area("Edit Mermaid Code:", height=200, value=st.session_state.mermaid_code, key="mermaid_editor")
-        
-        # Create a row of buttons
-        col1, col2, col3, col4 = st.columns(4)
-        
-        # Update diagram button
-        if col1.button("Update Diagram"):
-            st.session_state.mermaid_code = edited_code
-            st.rerun()
-        
-        # Copy button
-        if col2.button("Copy to Clipboard"):
-            st.success("Code copied to clipboard!")
-            # Fix: Pre-process the string outside the f-string to avoid backslash in expression
-            escaped_code = edited_code.replace('`', r'\`')
-            st.markdown(f"""
-            <script>
-                navigator.clipboard.writeText(`{escaped_code}`)
-                    .then(() => console.log('Copied to clipboard'))
-                    .catch(err => console.error('Failed to copy: ', err));
-            </script>
-            """, unsafe_allow_html=True)
-        
-        # Download button
-        if col3.button("Download SVG"):
-            download_url = save_diagram_as_image(edited_code)
-            if download_url:
-                st.markdown(f"[Download SVG]({download_url})")
-                st.success("SVG is ready for download!")
-        
-        # Open in Mermaid Live Editor
-        if col4.button("Open in Mermaid Live"):
-            encoded_mermaid = base64.urlsafe_b64encode(edited_code.encode('utf-8')).decode('utf-8')
-            mermaid_live_url = f"https://mermaid.live/edit#pako:{encoded_mermaid}"
-            st.markdown(f"[Open in Mermaid Live Editor]({mermaid_live_url})")
-            st.write("Link opened in a new tab.")
-        
-        # UML Diagram display section - moved below editor
-        st.header("UML Diagram")
-        if edited_code:
-            # Render the diagram
-            mermaid_html = f"""
-            <div class="mermaid">
-            {edited_code}
-            </div>
-            <script src="https://cdn.jsdelivr.net/npm/mermaid@10/dist/mermaid.min.js"></script>
-            <script>
-              mermaid.initialize({{
-                startOnLoad: true,
-                theme: 'default',
-                securityLevel: 'loose',
-                fontFamily: 'monospace'
-              }});
-            </script>
-            """
-            components.html(mermaid_html, height=400, scrolling=True)
-        else:
-            st.warning("No UML diagram was generated.")
+        diagram_editor()
 else:
     # Instructions when first loading
     st.info("Fill in the form and click 'Generate' to start.")
@@ -284,9 +357,30 @@ with st.expander("Debug Information", expanded=False):
     st.write(f"- Mermaid code length: {len(st.session_state.mermaid_code)}")
     if st.session_state.last_error:
         st.write(f"- Last error: {st.session_state.last_error}")
+    st.write("Response cache:")
+    st.write(get_default_cache().stats())
+    st.write("Agent reuse and per-request setup overhead:")
+    crew_orchestration = sys.modules.get("crew_orchestration")
+    st.write(crew_orchestration.get_orchestrator().stats() if crew_orchestration else "CrewAI not loaded yet")
+    st.write("Prompt prefix reuse (Ollama KV cache):")
+    st.write(get_prefix_tracker().stats())
+    st.write("Model warm-up and residency:")
+    st.write(get_model_warmer().status())
+    st.write("Effective options of recent model requests:")
+    st.write(recent_request_options())
+    st.write("Generation job queue:")
+    st.write(get_job_queue().stats())
+    st.write("Artifact store (set SMARTSDLC_DEBUG_CAPTURE=outputs to keep raw model output):")
+    st.write(get_artifact_store().stats())
+    st.write("Diagram render cache:")
+    st.write(get_render_cache().stats())
+    st.write("Time spent per pipeline stage (seconds):")
+    st.write(tracing.snapshot())
     
     if st.button("Clear Session State"):
-        for key in ['mermaid_code', 'sdlc_recommendation', 'generation_successful', 'last_error']:
+        if st.session_state.get('job_id'):
+            get_job_queue().cancel(st.session_state.job_id)
+        for key in ['mermaid_code', 'diagrams', 'active_diagram', 'sdlc_recommendation', 'generation_successful', 'last_error', 'job_id']:
             if key in st.session_state:
                 del st.session_state[key]
         st.success("Session state cleared! Please refresh the page.")
@@ -300,4 +394,9 @@ with st.expander("Debug Information", expanded=False):
 
 # Footer
 st.markdown("---")
-st.markdown("SmartSDLC - Powered by Qwen 2.5:3B, CrewAI and Mermaid")
\ No newline at end of file
+st.markdown("SmartSDLC - Powered by Qwen 2.5:3B, CrewAI and Mermaid")
+
+# Without fragments, poll the background job by rerunning the whole page
+if st.session_state.get('job_id') and not _fragment:
+    time.sleep(JOB_POLL_SECONDS)
+    st.rerun()
\ No newline at end of file
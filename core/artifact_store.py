@@ -0,0 +1,328 @@
+"""
+Per-request artifact store for generated content and debug captures.
+
+Artifacts are content-addressed blobs (identical diagrams are stored once)
+plus a small JSON manifest per request mapping artifact names to blob hashes.
+Writes never block the caller: content is kept in memory and a background
+thread writes it with temp-file-and-rename, then trims the store to its size
+limits. Each owner (e.g. a Streamlit session) has a pointer to its latest
+request, so "the last diagram for this session" needs no shared file.
+
+Debug captures (raw crew and model output) are only kept when the capture
+level asks for them:
+    SMARTSDLC_ARTIFACT_DIR    where artifacts are written
+    SMARTSDLC_DEBUG_CAPTURE   off (default), outputs or full
+"""
+
+import atexit
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARTIFACT_DIR = os.environ.get(
+    "SMARTSDLC_ARTIFACT_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "smartsdlc", "artifacts")
+)
+
+# Capture levels; an artifact is kept when its level is at or below the store's
+CAPTURE_RESULTS = 0
+CAPTURE_OUTPUTS = 1
+CAPTURE_FULL = 2
+CAPTURE_LEVELS = {"off": CAPTURE_RESULTS, "outputs": CAPTURE_OUTPUTS, "full": CAPTURE_FULL}
+
+_current_request: contextvars.ContextVar = contextvars.ContextVar("smartsdlc_artifact_request", default=None)
+
+def _digest(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+class ArtifactStore:
+    """
+    Content-addressed artifact store with asynchronous, atomic writes.
+
+    Reads see artifacts as soon as put() returns, whether or not they have been
+    flushed to disk yet. Once the store grows past `max_requests` manifests or
+    `max_bytes` of blobs, the oldest requests are dropped first.
+    """
+
+    def __init__(self, root: Optional[str] = DEFAULT_ARTIFACT_DIR, capture_level: Optional[int] = None,
+                 max_requests: int = 500, max_bytes: int = 20 * 1024 * 1024):
+        if capture_level is None:
+            capture_level = CAPTURE_LEVELS.get(os.environ.get("SMARTSDLC_DEBUG_CAPTURE", "off").lower(),
+                                               CAPTURE_RESULTS)
+        self.root = root
+        self.capture_level = capture_level
+        self.max_requests = max_requests
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._blobs: Dict[str, str] = {}
+        # Blobs whose write failed; memory holds their only copy
+        self._unwritten: Set[str] = set()
+        self._manifests: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._latest: Dict[str, str] = {}
+        self._queue: "queue.Queue" = queue.Queue()
+        self._stats = {"puts": 0, "skipped": 0, "deduplicated": 0, "written": 0, "write_errors": 0, "evicted": 0}
+        self._writer: Optional[threading.Thread] = None
+        if root:
+            self._writer = threading.Thread(target=self._write_loop, name="artifact-writer", daemon=True)
+            self._writer.start()
+
+    def put(self, request_id: str, name: str, content: str, level: int = CAPTURE_RESULTS,
+            owner: Optional[str] = None) -> Optional[str]:
+        """
+        Store an artifact for a request.
+
+        Args:
+            request_id: Request (e.g. job id) the artifact belongs to
+            name: Artifact name within the request, e.g. "mermaid/Class Diagram"
+            content: Text to store
+            level: Capture level of the artifact; ignored above the store's level
+            owner: Session or user the request belongs to; makes it their latest
+
+        Returns:
+            The content hash, or None if the capture level skipped the artifact
+        """
+        with self._lock:
+            if level > self.capture_level:
+                self._stats["skipped"] += 1
+                return None
+            digest = _digest(content)
+            self._stats["puts"] += 1
+            if digest in self._blobs:
+                self._stats["deduplicated"] += 1
+            else:
+                self._blobs[digest] = content
+            manifest = self._manifests.setdefault(
+                request_id, {"request_id": request_id, "owner": owner, "created": time.time(), "artifacts": {}}
+            )
+            manifest["artifacts"][name] = digest
+            if owner:
+                manifest["owner"] = owner
+                self._latest[owner] = request_id
+            self._manifests.move_to_end(request_id)
+            if len(self._manifests) > self.max_requests:
+                while len(self._manifests) > self.max_requests:
+                    self._manifests.popitem(last=False)
+                if not self._writer:
+                    referenced = {d for kept in self._manifests.values() for d in kept["artifacts"].values()}
+                    self._blobs = {d: text for d, text in self._blobs.items() if d in referenced}
+            if self._writer:
+                # Queued under the lock so the writer can't drop this blob from memory early
+                self._queue.put((digest, content, json.loads(json.dumps(manifest))))
+        return digest
+
+    def get(self, request_id: str, name: str) -> Optional[str]:
+        """Return an artifact's content, or None if it is unknown or was evicted"""
+        manifest = self.manifest(request_id)
+        digest = manifest["artifacts"].get(name) if manifest else None
+        return self._read_blob(digest) if digest else None
+
+    def manifest(self, request_id: str) -> Optional[Dict[str, Any]]:
+        """Return {'request_id', 'owner', 'created', 'artifacts': {name: hash}} for a request"""
+        with self._lock:
+            manifest = self._manifests.get(request_id)
+            if manifest is not None:
+                return json.loads(json.dumps(manifest))
+        return self._read_json(self._manifest_path(request_id)) if self.root else None
+
+    def latest_request(self, owner: str) -> Optional[str]:
+        """Return the id of the owner's most recent request, if any"""
+        with self._lock:
+            request_id = self._latest.get(owner)
+        if request_id is None and self.root:
+            pointer = self._read_json(self._latest_path(owner))
+            request_id = pointer.get("request_id") if pointer else None
+        return request_id
+
+    def latest(self, owner: str, name: str) -> Optional[str]:
+        """Return artifact `name` from the owner's most recent request"""
+        request_id = self.latest_request(owner)
+        return self.get(request_id, name) if request_id else None
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until queued writes are on disk; returns False on timeout"""
+        if not self._writer:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Return put/write counters and the number of writes still pending"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = self._queue.unfinished_tasks
+            stats["capture_level"] = self.capture_level
+        return stats
+
+    def _write_loop(self):
+        while True:
+            digest, content, manifest = self._queue.get()
+            blob_on_disk = False
+            try:
+                if not os.path.exists(self._blob_path(digest)):
+                    self._write_atomic(self._blob_path(digest), content)
+                blob_on_disk = True
+                self._write_atomic(self._manifest_path(manifest["request_id"]), json.dumps(manifest))
+                if manifest.get("owner"):
+                    self._write_atomic(self._latest_path(manifest["owner"]),
+                                       json.dumps({"request_id": manifest["request_id"]}))
+                with self._lock:
+                    self._stats["written"] += 1
+                # Trim once the burst of writes for a request has been written
+                if self._queue.qsize() == 0:
+                    self._trim()
+            except OSError as e:
+                logger.error(f"Error writing artifact: {str(e)}")
+                with self._lock:
+                    self._stats["write_errors"] += 1
+            finally:
+                # Blob contents only stay in memory until everything queued is on disk
+                with self._lock:
+                    if blob_on_disk:
+                        self._unwritten.discard(digest)
+                    else:
+                        self._unwritten.add(digest)
+                    if self._queue.unfinished_tasks <= 1:
+                        referenced = {d for kept in self._manifests.values() for d in kept["artifacts"].values()}
+                        self._unwritten &= referenced
+                        self._blobs = {d: text for d, text in self._blobs.items() if d in self._unwritten}
+                self._queue.task_done()
+
+    def _write_atomic(self, path: str, content: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial artifact
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _read_blob(self, digest: str) -> Optional[str]:
+        with self._lock:
+            if digest in self._blobs:
+                return self._blobs[digest]
+        if not self.root:
+            return None
+        try:
+            with open(self._blob_path(digest), "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _read_json(self, path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, "blobs", digest[:2], digest)
+
+    def _manifest_path(self, request_id: str) -> str:
+        return os.path.join(self.root, "requests", f"{_safe_name(request_id)}.json")
+
+    def _latest_path(self, owner: str) -> str:
+        return os.path.join(self.root, "latest", f"{_safe_name(owner)}.json")
+
+    def _trim(self):
+        requests_dir = os.path.join(self.root, "requests")
+        manifests = []
+        for name in os.listdir(requests_dir) if os.path.isdir(requests_dir) else []:
+            path = os.path.join(requests_dir, name)
+            manifest = self._read_json(path)
+            if manifest is not None:
+                manifests.append((manifest.get("created", 0), path, manifest))
+        manifests.sort(key=lambda item: item[0])
+
+        blob_sizes = {}
+        blobs_dir = os.path.join(self.root, "blobs")
+        for shard in os.listdir(blobs_dir) if os.path.isdir(blobs_dir) else []:
+            shard_dir = os.path.join(blobs_dir, shard)
+            for digest in os.listdir(shard_dir):
+                try:
+                    blob_sizes[digest] = os.path.getsize(os.path.join(shard_dir, digest))
+                except OSError:
+                    continue
+
+        def referenced_bytes():
+            digests = {d for _, _, manifest in manifests for d in manifest["artifacts"].values()}
+            return sum(blob_sizes.get(d, 0) for d in digests)
+
+        # Drop the oldest requests until both limits hold, then any unreferenced blobs
+        while manifests and (len(manifests) > self.max_requests or referenced_bytes() > self.max_bytes):
+            _, path, manifest = manifests.pop(0)
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            with self._lock:
+                self._manifests.pop(manifest["request_id"], None)
+                self._stats["evicted"] += 1
+        referenced = {d for _, _, manifest in manifests for d in manifest["artifacts"].values()}
+        for digest in set(blob_sizes) - referenced:
+            try:
+                os.remove(self._blob_path(digest))
+            except OSError:
+                pass
+
+def _safe_name(value: str) -> str:
+    # Owner and request ids become file names; hash anything unusual
+    if value and all(ch.isalnum() or ch in "-_" for ch in value) and len(value) <= 64:
+        return value
+    return _digest(value)
+
+_default_store: Optional[ArtifactStore] = None
+_default_store_lock = threading.Lock()
+
+def get_artifact_store() -> ArtifactStore:
+    """Return the process-wide artifact store, flushed at interpreter exit"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ArtifactStore()
+            atexit.register(_default_store.flush, 5.0)
+        return _default_store
+
+@contextmanager
+def request_scope(request_id: str) -> Iterator[str]:
+    """Attribute capture_debug() calls in this context (and threads started from it) to a request"""
+    token = _current_request.set(request_id)
+    try:
+        yield request_id
+    finally:
+        _current_request.reset(token)
+
+def capture_debug(name: str, content: Any, level: int = CAPTURE_OUTPUTS,
+                  store: Optional[ArtifactStore] = None) -> Optional[str]:
+    """
+    Keep a debug artifact for the current request if the capture level allows.
+
+    Cheap when capture is off: the content is not even converted to text.
+    Outside a request_scope() nothing is captured.
+    """
+    request_id = _current_request.get()
+    store = store or get_artifact_store()
+    if request_id is None or level > store.capture_level:
+        return None
+    return store.put(request_id, name, content if isinstance(content, str) else str(content), level)
@@ -0,0 +1,187 @@
+import asyncio
+import weakref
+from typing import List, Dict, Any, Optional, Union
+
+import aiohttp
+
+from model_api import build_chat_payload
+from prompt_prefix import get_prefix_tracker
+from tracing import span, record_ollama_stats
+
+# Upper bound on concurrent in-flight requests to Ollama from one event loop.
+DEFAULT_MAX_CONCURRENCY = 4
+
+# Keyed by the loop itself: ids of dead loops get reused, and the weak keys
+# let a loop's session and semaphore go away with the loop
+_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+_max_concurrency = DEFAULT_MAX_CONCURRENCY
+
+def set_max_concurrency(limit: int):
+    """
+    Set the per-event-loop limit on concurrent model requests.
+
+    Takes effect for event loops that have not issued a request yet.
+    """
+    global _max_concurrency
+    if limit < 1:
+        raise ValueError("Concurrency limit must be at least 1")
+    _max_concurrency = limit
+    _semaphores.clear()
+
+def _loop_key() -> asyncio.AbstractEventLoop:
+    # Also drop entries of loops that were closed without close_async_session()
+    for table in (_sessions, _semaphores):
+        for loop in [loop for loop in list(table.keys()) if loop.is_closed()]:
+            table.pop(loop, None)
+    return asyncio.get_running_loop()
+
+async def get_async_session() -> aiohttp.ClientSession:
+    """
+    Return the aiohttp session for the running event loop, creating it on first use.
+
+    aiohttp sessions are bound to the loop they were created in, so one is
+    kept per loop rather than one per process.
+    """
+    key = _loop_key()
+    session = _sessions.get(key)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(limit=_max_concurrency * 2, limit_per_host=_max_concurrency * 2)
+        timeout = aiohttp.ClientTimeout(sock_connect=5, sock_read=300)
+        session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        _sessions[key] = session
+    return session
+
+def _get_semaphore() -> asyncio.Semaphore:
+    key = _loop_key()
+    semaphore = _semaphores.get(key)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(_max_concurrency)
+        _semaphores[key] = semaphore
+    return semaphore
+
+async def close_async_session():
+    """Close the aiohttp session owned by the running event loop"""
+    key = _loop_key()
+    session = _sessions.pop(key, None)
+    _semaphores.pop(key, None)
+    if session is not None and not session.closed:
+        await session.close()
+
+async def acall_model(
+    messages: List[Dict[str, str]],
+    model: str = "qwen2.5:3b",
+    api_base: str = "http://localhost:11434",
+    max_tokens: int = 2000,
+    temperature: float = 0.7,
+    num_ctx: Optional[int] = None,
+    stop: Optional[List[str]] = None,
+    keep_alive: Optional[Union[str, int]] = None
+) -> Optional[str]:
+    """
+    Async counterpart of model_api.call_model.
+
+    Waits on the concurrency semaphore before sending, so any number of calls
+    can be gathered without overloading Ollama. Cancelling the awaiting task
+    aborts the HTTP request.
+
+    Args:
+        messages: List of message dictionaries with 'role' and 'content'
+        model: Model name
+        api_base: API base URL
+        max_tokens: Maximum tokens to generate
+        temperature: Temperature for generation
+        num_ctx: Context window size in tokens
+        stop: Stop sequences
+        keep_alive: How long Ollama keeps the model loaded after the request
+
+    Returns:
+        Generated text or None if failed
+    """
+    url = f"{api_base}/api/chat"
+    payload = build_chat_payload(messages, model, max_tokens, temperature,
+                                 num_ctx=num_ctx, stop=stop, keep_alive=keep_alive)
+
+    with span("model.acall", model=model, max_tokens=max_tokens) as call_span:
+        try:
+            async with _get_semaphore():
+                session = await get_async_session()
+                async with session.post(url, json=payload) as response:
+                    if response.status == 200:
+                        result = await response.json(content_type=None)
+                        record_ollama_stats(result, call_span)
+                        get_prefix_tracker().record(messages, model, result, call_span)
+                        return result.get("message", {}).get("content")
+                    print(f"API error: {response.status}")
+                    print(f"Response: {await response.text()}")
+                    call_span.status = "error"
+                    return None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error calling model: {str(e)}")
+            call_span.status = "error"
+            call_span.set("error", str(e))
+            return None
+
+async def acall_model_with_system(
+    system_prompt: str,
+    user_message: str,
+    model: str = "qwen2.5:3b",
+    api_base: str = "http://localhost:11434",
+    max_tokens: int = 2000,
+    temperature: float = 0.7,
+    num_ctx: Optional[int] = None,
+    stop: Optional[List[str]] = None,
+    keep_alive: Optional[Union[str, int]] = None
+) -> Optional[str]:
+    """
+    Async counterpart of model_api.call_model_with_system.
+
+    Args:
+        system_prompt: System prompt to guide model behavior
+        user_message: User query
+        model: Model name
+        api_base: API base URL
+        max_tokens: Maximum tokens to generate
+        temperature: Temperature for generation
+        num_ctx: Context window size in tokens
+        stop: Stop sequences
+        keep_alive: How long Ollama keeps the model loaded after the request
+
+    Returns:
+        Generated text or None if failed
+    """
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_message}
+    ]
+    return await acall_model(messages, model, api_base, max_tokens, temperature,
+                             num_ctx=num_ctx, stop=stop, keep_alive=keep_alive)
+
+async def acall_many(conversations: List[List[Dict[str, str]]], **kwargs) -> List[Optional[str]]:
+    """
+    Fan out several chat calls from one event loop.
+
+    Concurrency is bounded by the shared semaphore; results keep input order.
+
+    Args:
+        conversations: One message list per call
+        **kwargs: Passed to acall_model
+
+    Returns:
+        List of generated texts (None for failed calls)
+    """
+    return await asyncio.gather(*(acall_model(messages, **kwargs) for messages in conversations))
+
+# For testing
+if __name__ == "__main__":
+    async def _main():
+        test_messages = [
+            {"role": "system", "content": "You are a helpful assistant."},
+            {"role": "user", "content": "Write a brief hello world program in Python."}
+        ]
+        print(await acall_model(test_messages))
+        await close_async_session()
+
+    asyncio.run(_main())
@@ -0,0 +1,242 @@
+"""
+Batch generation over many product descriptions.
+
+Items are read from a JSONL or CSV file (or stdin) and generated on a worker
+pool, one SDLC recommendation plus all requested diagrams per item. Every
+finished (item, diagram type) pair is appended to an aggregate results.jsonl
+as soon as its item completes. Re-running with the same output directory
+skips pairs that already succeeded.
+"""
+
+import csv
+import hashlib
+import io
+import json
+import math
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple
+
+from diagram_renderer import RenderError, save_diagram
+from generation import generate_multi_cached
+
+RESULTS_FILE = "results.jsonl"
+
+def load_batch_items(path: str, default_diagram_types: List[str]) -> List[Dict[str, Any]]:
+    """
+    Load batch items from a JSONL or CSV file, or from stdin when path is "-".
+
+    Each item needs a "description". Optional fields are "id" and
+    "diagram_types" (a list in JSONL, ';'-separated in CSV) or a single
+    "diagram_type". Stdin is parsed as JSONL unless it looks like CSV.
+
+    Args:
+        path: File path or "-"
+        default_diagram_types: Diagram types for items that don't name any
+
+    Returns:
+        List of normalized items with id, description and diagram_types
+    """
+    if path == "-":
+        text = sys.stdin.read()
+        is_csv = not text.lstrip().startswith("{")
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        is_csv = path.lower().endswith(".csv")
+
+    raw_items = _parse_csv(text) if is_csv else _parse_jsonl(text)
+    return normalize_items(raw_items, default_diagram_types)
+
+def normalize_items(raw_items: List[Dict[str, Any]], default_diagram_types: List[str]) -> List[Dict[str, Any]]:
+    """
+    Normalize raw batch records into items with id, description and diagram_types.
+
+    Records without a description are dropped; a missing id is derived from
+    the description, with a counter appended when the same description
+    occurs more than once so that each item keeps its own outputs.
+    """
+    items = []
+    derived_ids: Dict[str, int] = {}
+    for raw in raw_items:
+        description = (raw.get("description") or "").strip()
+        if not description:
+            continue
+        diagram_types = raw.get("diagram_types") or raw.get("diagram_type") or default_diagram_types
+        if isinstance(diagram_types, str):
+            diagram_types = [t.strip() for t in diagram_types.split(";") if t.strip()]
+        item_id = str(raw.get("id") or "").strip()
+        if not item_id:
+            item_id = hashlib.sha1(description.encode("utf-8")).hexdigest()[:12]
+            derived_ids[item_id] = derived_ids.get(item_id, 0) + 1
+            if derived_ids[item_id] > 1:
+                item_id = f"{item_id}-{derived_ids[item_id]}"
+        items.append({"id": item_id, "description": description, "diagram_types": list(diagram_types)})
+    return items
+
+def _parse_jsonl(text: str) -> List[Dict[str, Any]]:
+    items = []
+    for line_number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            items.append(json.loads(line))
+        except ValueError:
+            print(f"Skipping invalid JSON on line {line_number}")
+    return items
+
+def _parse_csv(text: str) -> List[Dict[str, Any]]:
+    return list(csv.DictReader(io.StringIO(text)))
+
+def slugify(value: str) -> str:
+    """Turn an item id or diagram type into a safe directory name"""
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", value).strip("_").lower() or "item"
+
+def load_completed(output_dir: str) -> Set[Tuple[str, str]]:
+    """Return the (item id, diagram type) pairs already recorded as successful"""
+    completed = set()
+    path = os.path.join(output_dir, RESULTS_FILE)
+    if not os.path.exists(path):
+        return completed
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A crash can leave a truncated last line; that pair is simply redone
+                continue
+            if record.get("status") == "ok":
+                completed.add((record["id"], record["diagram_type"]))
+    return completed
+
+def run_batch(items: List[Dict[str, Any]], output_dir: str, workers: int = 2,
+              temperature: float = 0.7, max_tokens: int = 2000, parallel: bool = True,
+              generate_fn: Optional[Callable[..., Optional[Dict[str, Any]]]] = None,
+              model_options: Optional[Dict[str, Any]] = None, image_format: Optional[str] = None,
+              theme: str = "default", use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Generate every item on a worker pool.
+
+    Each item is one multi-diagram generation covering the diagram types that
+    haven't succeeded yet. Outputs for each pair go to
+    <output_dir>/<item id>/<diagram type>/, and a record per pair is appended
+    to <output_dir>/results.jsonl as soon as its item finishes.
+
+    Args:
+        items: Items from load_batch_items
+        output_dir: Root directory for outputs
+        workers: Number of items generated concurrently
+        temperature: Temperature for model generation
+        max_tokens: Maximum tokens to generate
+        parallel: Generate an item's tasks concurrently
+        generate_fn: Override for the generation call (defaults to generate_multi_cached)
+        model_options: Extra Ollama settings (num_ctx, stop, keep_alive)
+        image_format: Also render each diagram to diagram.svg / diagram.png
+        theme: Color theme of rendered diagrams
+        use_cache: Serve items from the response cache when possible
+
+    Returns:
+        Per-item latency summary (see summarize_latencies) plus ok/failed/skipped
+        counts of (item, diagram type) pairs
+    """
+    generate_fn = generate_fn or generate_multi_cached
+    os.makedirs(output_dir, exist_ok=True)
+    completed = load_completed(output_dir)
+
+    work = []
+    skipped = 0
+    for item in items:
+        pending = [t for t in item["diagram_types"] if (item["id"], t) not in completed]
+        skipped += len(item["diagram_types"]) - len(pending)
+        if pending:
+            work.append((item, pending))
+
+    print(f"Batch: {len(work)} item(s) to run, {skipped} diagram(s) already done, {workers} worker(s)")
+
+    results_lock = threading.Lock()
+    results_path = os.path.join(output_dir, RESULTS_FILE)
+    latencies = []
+    succeeded = 0
+    failed = 0
+
+    def run_one(item: Dict[str, Any], diagram_types: List[str]) -> List[Dict[str, Any]]:
+        start = time.perf_counter()
+        try:
+            result = generate_fn(item["description"], diagram_types, temperature=temperature,
+                                 max_tokens=max_tokens, parallel=parallel, model_options=model_options,
+                                 use_cache=use_cache)
+            error = None
+        except Exception as e:
+            result, error = None, str(e)
+        latency = round(time.perf_counter() - start, 3)
+
+        records = []
+        diagrams = (result or {}).get("diagrams", {})
+        for diagram_type in diagram_types:
+            record = {"id": item["id"], "diagram_type": diagram_type, "latency_seconds": latency}
+            mermaid_code = diagrams.get(diagram_type)
+            if mermaid_code:
+                item_dir = os.path.join(output_dir, slugify(item["id"]), slugify(diagram_type))
+                os.makedirs(item_dir, exist_ok=True)
+                with open(os.path.join(item_dir, "sdlc_recommendation.txt"), "w", encoding="utf-8") as f:
+                    f.write(result["sdlc_recommendation"])
+                with open(os.path.join(item_dir, "mermaid_code.mmd"), "w", encoding="utf-8") as f:
+                    f.write(mermaid_code)
+                if image_format:
+                    try:
+                        save_diagram(mermaid_code, os.path.join(item_dir, f"diagram.{image_format}"), theme)
+                    except RenderError as e:
+                        record["image_error"] = str(e)
+                record.update(status="ok", output_dir=item_dir,
+                              sdlc_recommendation=result["sdlc_recommendation"], mermaid_code=mermaid_code)
+            else:
+                record.update(status="failed", error=error or "No result returned")
+            records.append(record)
+
+        with results_lock:
+            with open(results_path, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+        return records
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(run_one, item, diagram_types) for item, diagram_types in work]
+        for done, future in enumerate(as_completed(futures), 1):
+            records = future.result()
+            latencies.append(records[0]["latency_seconds"])
+            for record in records:
+                if record["status"] == "ok":
+                    succeeded += 1
+                else:
+                    failed += 1
+            statuses = ", ".join(f"{r['diagram_type']}: {r['status']}" for r in records)
+            print(f"[{done}/{len(work)}] {records[0]['id']} ({statuses}) in {records[0]['latency_seconds']:.2f}s")
+
+    summary = summarize_latencies(latencies)
+    summary.update(ok=succeeded, failed=failed, skipped=skipped)
+    return summary
+
+def summarize_latencies(latencies: List[float]) -> Dict[str, float]:
+    """Compute count, mean, p50, p90, p95 and max of a list of latencies in seconds"""
+    if not latencies:
+        return {"count": 0}
+    ordered = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        # Nearest-rank percentile
+        index = min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 3),
+        "p50": percentile(50),
+        "p90": percentile(90),
+        "p95": percentile(95),
+        "max": ordered[-1],
+    }
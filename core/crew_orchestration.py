@@ -1,243 +1,258 @@
 from crewai import Agent, Task, Crew, Process
-from typing import Dict, Any, Optional
-from model_api import call_model_with_system
-import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Tuple
+import contextvars
+import threading
+import time
+from model_api import MODEL_OPTION_KEYS, call_model_with_system
+from tracing import span, traced
+from artifact_store import capture_debug
+from prompts import SDLC_SYSTEM_PROMPT, build_sdlc_task_prompt, build_uml_task_prompt, mermaid_system_prompt
+from mermaid_extraction import extract_mermaid_code, is_valid_mermaid, task_outputs
+from mermaid_repair import repair_mermaid
 
 class OllamaLLM:
-    """Custom LLM class for CrewAI to use Ollama"""
+    """
+    Custom LLM class for CrewAI to use Ollama
+    
+    Each agent gets its own fixed system prompt, so every call it makes starts
+    with the same bytes and Ollama can reuse the cached prompt prefix.
+    """
     
-    def __init__(self, model_name="ollama/qwen2.5:3b", api_base="http://localhost:11434"):
+    def __init__(self, model_name="ollama/qwen2.5:3b", api_base="http://localhost:11434",
+                 temperature=0.7, max_tokens=2000, model_options=None,
+                 system_prompt="You are a helpful AI assistant."):
         self.model_name = model_name
         self.api_base = api_base
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        # Extra Ollama settings: num_ctx, stop, keep_alive
+        self.model_options = dict(model_options or {})
+        self.system_prompt = system_prompt
     
     def __call__(self, prompt):
         """Call the LLM with the given prompt"""
         return call_model_with_system(
-            system_prompt="You are a helpful AI assistant.",
+            system_prompt=self.system_prompt,
             user_message=prompt,
             model=self.model_name,
-            api_base=self.api_base
+            api_base=self.api_base,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+            **self.model_options
         ) or "Error: Failed to get response from model."
 
-def create_sdlc_advisor_agent() -> Agent:
+def create_sdlc_advisor_agent(llm: Optional[OllamaLLM] = None) -> Agent:
     """Create an agent that recommends SDLC models"""
     
-    system_prompt = """
-    You are an expert Software Development Lifecycle (SDLC) consultant.
-    Your job is to analyze software project descriptions and recommend the most appropriate SDLC model.
-    Consider project scale, complexity, requirements clarity, time constraints, and team expertise.
-    
-    Common SDLC models include:
-    1. Waterfall - Linear sequential approach, good for well-defined requirements
-    2. Agile - Iterative approach with frequent customer feedback
-    3. Scrum - Agile framework with sprints and specific roles
-    4. Kanban - Visual workflow management with continuous delivery
-    5. Spiral - Risk-driven approach with iterative prototyping
-    6. DevOps - Integration of development and operations throughout lifecycle
-    7. RAD (Rapid Application Development) - Emphasis on rapid prototyping
-    8. V-Model - Testing integrated with each development phase
-
-    KEY BENEFITS:
-        - [Benefit 1]
-        - [Benefit 2]
-        - [Benefit 3]
-        
-    POTENTIAL CHALLENGES:
-        - [Challenge 1]
-        - [Challenge 2]
-
-    Provide a clear recommendation with 3-5 bullet points justifying your choice.
-    """
-    
     return Agent(
         role="SDLC Advisor",
         goal="Recommend the most appropriate SDLC model for software projects",
         backstory="An expert consultant with 20+ years experience in software development methodologies",
         verbose=True,
         allow_delegation=False,
-        llm=OllamaLLM()
+        llm=llm or OllamaLLM(system_prompt=SDLC_SYSTEM_PROMPT)
     )
 
-def create_mermaid_generator_agent() -> Agent:
+def create_mermaid_generator_agent(llm: Optional[OllamaLLM] = None) -> Agent:
     """Create an agent that generates Mermaid diagram code directly"""
     
-    system_prompt = """
-    You are an expert UML diagram designer who specializes in Mermaid syntax.
-    Your job is to create accurate, clean, and professional Mermaid code for different diagram types based on software requirements.
+    return Agent(
+        role="UML Generator",
+        goal="Create accurate and clean Mermaid diagrams from requirements",
+        backstory="A senior software architect with deep expertise in software modeling and UML diagrams using Mermaid syntax",
+        verbose=True,
+        allow_delegation=False,
+        llm=llm or OllamaLLM(system_prompt=mermaid_system_prompt())
+    )
+
+AGENT_FACTORIES = {
+    "sdlc_advisor": create_sdlc_advisor_agent,
+    "mermaid_generator": create_mermaid_generator_agent,
+}
+
+# Stand-ins for task outputs that came back empty
+NO_SDLC_RECOMMENDATION = "No SDLC recommendation generated"
+PLACEHOLDER_DIAGRAM = "flowchart TD\n    A[No diagram generated]"
+
+def agent_system_prompt(role: str, diagram_type: Optional[str] = None) -> str:
+    """
+    Fixed system prompt for a role: the shared prompt prefix of every call the agent makes
     
-    For each diagram type, follow these specific guidelines:
+    Mermaid generators only get the guidance for their diagram type.
+    """
+    if role == "mermaid_generator":
+        return mermaid_system_prompt(diagram_type)
+    return SDLC_SYSTEM_PROMPT
+
+def _options_key(model_options: Optional[Dict[str, Any]]) -> Tuple:
+    """Hashable form of model_options for use in pool keys"""
+    options = model_options or {}
+    unknown = set(options) - set(MODEL_OPTION_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown model option(s): {', '.join(sorted(unknown))}")
+    return tuple(
+        (key, tuple(value) if isinstance(value, list) else value)
+        for key, value in sorted(options.items()) if value is not None
+    )
+
+class AgentLease:
+    """Agents checked out of a CrewOrchestrator for the duration of one request"""
     
-    1. Use Case Diagram (as flowchart in Mermaid):
-       - Identify actors (users and external systems)
-       - Define main use cases
-       - Show relationships between actors and use cases
-       - Use the flowchart TD syntax and represent actors with emoji 👤
-       - Example:
-         
-         flowchart TD
-             User[👤 User]
-             Admin[👤 Administrator]
-             UC1[Login to System]
-             UC2[Manage Account]
-             User --> UC1
-             User --> UC2
-             Admin --> UC1
-         
+    def __init__(self, orchestrator: "CrewOrchestrator", temperature: float, max_tokens: int,
+                 model_options: Optional[Dict[str, Any]] = None):
+        self._orchestrator = orchestrator
+        self._config = (temperature, max_tokens, _options_key(model_options))
+        self._agents: List[Tuple[Tuple[str, Optional[str]], Agent]] = []
     
-    2. Class Diagram:
-       - Identify key classes with attributes and methods
-       - Show relationships (inheritance, association, composition)
-       - Include multiplicities where appropriate
-       - Use the classDiagram syntax
-       - Example:
-         
-         classDiagram
-             class User {
-                +String username
-                +String email
-                +login()
-                +logout()
-             }
-             class Product {
-                +String name
-                +Double price
-                +getDetails()
-             }
-             User -- Product : views >
-         
+    def get(self, role: str, diagram_type: Optional[str] = None) -> Agent:
+        """
+        Check out an idle agent for `role`, building one only if none is idle
+        
+        Mermaid generators are pooled per diagram type, since their system
+        prompt only covers that type.
+        """
+        variant = (role, diagram_type if role == "mermaid_generator" else None)
+        agent = self._orchestrator._acquire(variant, *self._config)
+        self._agents.append((variant, agent))
+        return agent
     
-    3. Sequence Diagram:
-       - Show object interactions in time sequence
-       - Include proper activation
-       - Show message passing between objects
-       - Use the sequenceDiagram syntax
-       - Example:
-         
-         sequenceDiagram
-             participant U as User
-             participant S as System
-             participant D as Database
-             U->>S: Login Request
-             S->>D: Validate Credentials
-             D-->>S: Authentication Result
-             S-->>U: Login Response
-
+    def release(self):
+        """Return every checked-out agent to the orchestrator's idle pool"""
+        for variant, agent in self._agents:
+            self._orchestrator._release(variant, self._config, agent)
+        self._agents = []
 
-   4. Communication Diagram (as flowchart in Mermaid):
-       - Show object interactions with numbered messages
-       - Focus on structural organization
-       - Use the flowchart syntax
-       - Example:
-         
-         flowchart TD
-             A[Object A]
-             B[Object B]
-             C[Object C]
-             A -->|1: request()| B
-             B -->|2: validate()| C
-             C -->|3: result()| B
-             B -->|4: response()| A
-
-
-    5. State Machine Diagram:
-       - Show states, transitions, events, and actions
-       - Include initial and final states
-       - Define guard conditions where needed
-       - Use the stateDiagram-v2 syntax
-       - Example:
-         
-         stateDiagram-v2
-             [*] --> Idle
-             Idle --> Processing: Submit
-             Processing --> Success: Valid
-             Processing --> Failed: Invalid
-             Success --> Idle: Reset
-             Failed --> Idle: Reset
-             Success --> [*]: Exit
-             Failed --> [*]: Exit
-         
+class CrewOrchestrator:
+    """
+    Long-lived owner of CrewAI agents.
     
-    Always ensure your output is valid Mermaid syntax. Keep the diagram focused and clean - include only the most important elements.
-    Use appropriate styling to improve readability. DO NOT include any explanatory text, just return the complete Mermaid code.
+    Agents are built once per (role, diagram type, temperature, max_tokens, model options) and kept in an
+    idle pool between requests, so a request only has to create its Tasks and
+    Crew. An agent is never handed to two requests at the same time; if all
+    agents for a configuration are busy another one is built and pooled.
     """
     
-    return Agent(
-        role="UML Generator",
-        goal="Create accurate and clean Mermaid diagrams from requirements",
-        backstory="A senior software architect with deep expertise in software modeling and UML diagrams using Mermaid syntax",
-        verbose=True,
-        allow_delegation=False,
-        llm=OllamaLLM()
-    )
+    def __init__(self, model_name: str = "ollama/qwen2.5:3b", api_base: str = "http://localhost:11434"):
+        self.model_name = model_name
+        self.api_base = api_base
+        self._idle: Dict[Tuple[Tuple[str, Optional[str]], float, int, Tuple], List[Agent]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "agents_built": 0,
+            "agents_reused": 0,
+            "setup_seconds_total": 0.0,
+            "setup_seconds_last": 0.0,
+        }
+    
+    def lease(self, temperature: float = 0.7, max_tokens: int = 2000,
+              model_options: Optional[Dict[str, Any]] = None) -> AgentLease:
+        """Start a request; call release() on the lease when it finishes"""
+        return AgentLease(self, temperature, max_tokens, model_options)
+    
+    def _acquire(self, variant: Tuple[str, Optional[str]], temperature: float, max_tokens: int,
+                 options_key: Tuple) -> Agent:
+        key = (variant, temperature, max_tokens, options_key)
+        with self._lock:
+            if self._idle[key]:
+                self._stats["agents_reused"] += 1
+                return self._idle[key].pop()
+            self._stats["agents_built"] += 1
+        
+        llm = OllamaLLM(model_name=self.model_name, api_base=self.api_base,
+                        temperature=temperature, max_tokens=max_tokens,
+                        model_options={k: list(v) if isinstance(v, tuple) else v for k, v in options_key},
+                        system_prompt=agent_system_prompt(*variant))
+        return AGENT_FACTORIES[variant[0]](llm)
+    
+    def _release(self, variant: Tuple[str, Optional[str]], config: Tuple[float, int, Tuple], agent: Agent):
+        with self._lock:
+            self._idle[(variant, *config)].append(agent)
+    
+    def record_setup(self, seconds: float):
+        """Record the per-request overhead spent before the crew is kicked off"""
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["setup_seconds_total"] += seconds
+            self._stats["setup_seconds_last"] = seconds
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return agent reuse counters and average per-request setup time"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["idle_agents"] = sum(len(agents) for agents in self._idle.values())
+        stats["setup_seconds_avg"] = (
+            stats["setup_seconds_total"] / stats["requests"] if stats["requests"] else 0.0
+        )
+        return stats
+
+_orchestrator: Optional[CrewOrchestrator] = None
+_orchestrator_lock = threading.Lock()
+
+def get_orchestrator() -> CrewOrchestrator:
+    """Return the process-wide orchestrator"""
+    global _orchestrator
+    with _orchestrator_lock:
+        if _orchestrator is None:
+            _orchestrator = CrewOrchestrator()
+        return _orchestrator
 
+@traced("crew.run_task")
 def run_crew_task(product_description: str, diagram_type: str, 
-               temperature: float = 0.7, max_tokens: int = 2000) -> Optional[Dict[str, str]]:
+               temperature: float = 0.7, max_tokens: int = 2000,
+               parallel: bool = True,
+               orchestrator: Optional[CrewOrchestrator] = None,
+               model_options: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, str]]:
     """
     Run the crew task to get SDLC recommendation and Mermaid code
     
+    The UML task only depends on the product description, not on the SDLC
+    output, so by default both agents run at the same time. Pass
+    parallel=False for backends that can only serve one request at a time.
+    
     Args:
         product_description: Description of the software product
         diagram_type: Type of UML diagram to generate
         temperature: Temperature for model generation
         max_tokens: Maximum tokens to generate
+        parallel: Run the SDLC and UML tasks concurrently
+        orchestrator: Source of reusable agents (defaults to the shared one)
+        model_options: Extra Ollama settings (num_ctx, stop, keep_alive)
         
     Returns:
         Dictionary with sdlc_recommendation and mermaid_code, or None if failed
     """
+    orchestrator = orchestrator or get_orchestrator()
+    lease = orchestrator.lease(temperature, max_tokens, model_options)
     try:
-        # Create agents with custom LLM configurations
-        llm = OllamaLLM(model_name="ollama/qwen2.5:3b")
-        llm.model_kwargs = {"temperature": temperature, "max_tokens": max_tokens}
+        setup_start = time.perf_counter()
         
-        # Create agents
-        sdlc_advisor = create_sdlc_advisor_agent()
-        mermaid_generator = create_mermaid_generator_agent()
+        # Check out warm agents for this temperature / max_tokens configuration
+        sdlc_advisor = lease.get("sdlc_advisor")
+        mermaid_generator = lease.get("mermaid_generator", diagram_type)
         
         # Create tasks (without explicit IDs - let CrewAI handle IDs internally)
         sdlc_task = Task(
-            description=f"""
-            Analyze the following software product description and recommend the most suitable SDLC model:
-            
-            {product_description}
-            
-            Provide a clear recommendation with 3-5 bullet points justifying your choice.
-            """,
+            description=build_sdlc_task_prompt(product_description),
             agent=sdlc_advisor,
             expected_output="A recommendation of an SDLC model with justification"
         )
         
-        # Map diagram types to Mermaid syntax
-        mermaid_diagram_type_map = {
-             "Sequence": "sequenceDiagram",
-            "Use Case": "flowchart TD (for Use Case Diagram)",
-            "Class": "classDiagram",
-            "Sequence": "sequenceDiagram",
-            "Component": "flowchart LR (for Component Diagram)",
-            "Communication": "flowchart TD (for Communication Diagram)",
-            "State Machine": "stateDiagram-v2"
-        }
-        
-        mermaid_syntax = mermaid_diagram_type_map.get(diagram_type, diagram_type)
-        
         uml_task = Task(
-            description=f"""
-            Based on the following software product description, create a {diagram_type} diagram using Mermaid syntax:
-
-            {product_description}
-
-            Generate complete and valid Mermaid code for a {diagram_type} diagram that accurately represents the system.
-            Only return the Mermaid code without any additional explanation.
-            The Mermaid code must:
-            - Contain no comments (// or ''') and no unnecessary characters.
-            - Be clean and professional, with proper indentation, correct arrows, and no typos.
-            - Follow consistent naming conventions (PascalCase for classes/entities/states, camelCase for attributes/methods).
-            - Use the latest Mermaid syntax versions available (e.g., stateDiagram-v2 for State Diagrams).
-            Use the {mermaid_syntax} syntax for this diagram type.
-            """,
+            description=build_uml_task_prompt(product_description, diagram_type),
             agent=mermaid_generator,
             expected_output=f"Complete Mermaid code for a {diagram_type} diagram"
         )
         
+        if parallel:
+            orchestrator.record_setup(time.perf_counter() - setup_start)
+            sdlc_output, mermaid_output = _kickoff_parallel(
+                (sdlc_advisor, sdlc_task), (mermaid_generator, uml_task)
+            )
+            return _build_result(sdlc_output, mermaid_output, diagram_type, mermaid_generator)
+        
         # Create and run crew for SDLC recommendation and Mermaid generation
         crew = Crew(
             agents=[sdlc_advisor, mermaid_generator],
@@ -245,218 +260,171 @@ def run_crew_task(product_description: str, diagram_type: str,
             verbose=True,
             process=Process.sequential
         )
+        orchestrator.record_setup(time.perf_counter() - setup_start)
         
         # Get the results from the crew
-        result = crew.kickoff()
-        
-        # Print debug info
-        print(f"CrewOutput type: {type(result)}")
-        print(f"CrewOutput dir: {dir(result)}")
+        with span("crew.kickoff", tasks=2):
+            result = crew.kickoff()
+        capture_debug("crew_output", result)
         
-        # Try to get task outputs
-        try:
-            # Initialize default outputs
-            sdlc_output = "No SDLC recommendation generated"
-            mermaid_output = "flowchart TD\n    A[No diagram generated]"
-            
-            # IMPROVED EXTRACTION LOGIC - Try multiple methods to get the outputs
-            
-            # Method 1: Try to get the tasks_output attribute directly (newer CrewAI versions)
-            if hasattr(result, 'tasks_output') and result.tasks_output:
-                try:
-                    tasks_output = result.tasks_output
-                    if isinstance(tasks_output, list) and len(tasks_output) >= 2:
-                        sdlc_output = tasks_output[0]
-                        mermaid_output = tasks_output[1]
-                        print("Successfully retrieved outputs using tasks_output attribute")
-                    elif isinstance(tasks_output, dict):
-                        # In case it's a dictionary with task IDs as keys
-                        values = list(tasks_output.values())
-                        if len(values) >= 2:
-                            sdlc_output = values[0]
-                            mermaid_output = values[1]
-                            print("Successfully retrieved outputs from tasks_output dict")
-                except Exception as e:
-                    print(f"Error accessing tasks_output: {str(e)}")
-            
-            # Method 2: Try the tasks attribute if available
-            elif hasattr(result, "tasks"):
-                try:
-                    tasks_iter = iter(result.tasks)
-                    first_task = next(tasks_iter, None)
-                    second_task = next(tasks_iter, None)
-                    
-                    if first_task and hasattr(first_task, 'output'):
-                        sdlc_output = first_task.output
-                        print(f"First task output type: {type(sdlc_output)}")
-                    
-                    if second_task and hasattr(second_task, 'output'):
-                        mermaid_output = second_task.output
-                        print(f"Second task output type: {type(mermaid_output)}")
-                        
-                    print("Successfully retrieved outputs using tasks attribute")
-                except Exception as e:
-                    print(f"Error accessing tasks: {str(e)}")
-            
-            # Method 3: If all else fails, try to use the raw attribute or string representation
-            if hasattr(result, "raw"):
-                try:
-                    raw_result = result.raw
-                    if isinstance(raw_result, dict) and len(raw_result) >= 2:
-                        # It might be a dictionary with task outputs
-                        values = list(raw_result.values())
-                        if values[0] and len(str(values[0])) > len(str(sdlc_output)):
-                            sdlc_output = str(values[0])
-                        if values[1] and len(str(values[1])) > len(str(mermaid_output)):
-                            mermaid_output = str(values[1])
-                        print("Used raw attribute as data source")
-                except Exception as e:
-                    print(f"Error using raw attribute: {str(e)}")
-            
-            # Method 4: As last resort, try string representation
-            try:
-                # If all else fails, try to get useful information from the string representation
-                result_str = str(result)
-                print(f"Result string: {result_str[:200]}...")  # First 200 chars
-                
-                # Extract more comprehensive content from the string representation
-                # First try to extract SDLC recommendation with more context
-                sdlc_section = None
-                mermaid_section = None
-                
-                # Look for SDLC section - search for common patterns
-                for pattern in [
-                    r'SDLC.*?:.*?(\w+(?:\s+\w+)*(?:\n\s*[-•*]\s*[^\n]+)+)',  # Bullet points
-                    r'SDLC.*?:.*?(\w+(?:\s+\w+)*\n.*?(?=\n\n|\Z))',  # Until double newline
-                    r'recommend.*?(\w+(?:\s+\w+){0,3}).*?(?:\n\s*[-•*].*?)+',  # Recommendation with bullets
-                    r'recommend.*?(\w+(?:\s+\w+){0,3}).*?(?:\n.*?){1,10}',     # Recommendation with context
-                ]:
-                    match = re.search(pattern, result_str, re.IGNORECASE | re.DOTALL)
-                    if match:
-                        sdlc_section = match.group(0).strip()
-                        break
-                
-                # If we found a better SDLC section and it's longer than what we have
-                if sdlc_section and len(sdlc_section) > len(str(sdlc_output)):
-                    sdlc_output = sdlc_section
-                
-                # Look for Mermaid code in the string representation
-                # First try to find a code block with mermaid
-                mermaid_match = re.search(r'```(?:mermaid)?\s*([\s\S]*?```)', result_str)
-                if mermaid_match:
-                    mermaid_section = mermaid_match.group(1).replace('```', '').strip()
-                else:
-                    # Otherwise look for common diagram type indicators
-                    for diagram_start in ["flowchart", "sequenceDiagram", "classDiagram", 
-                                         "stateDiagram", "stateDiagram-v2", "gantt", 
-                                         "pie", "journey", "gitGraph"]:
-                        pattern = f'({diagram_start}[\\s\\S]*?)(?:```|\\n\\n|$)'
-                        match = re.search(pattern, result_str)
-                        if match:
-                            mermaid_section = match.group(1).strip()
-                            break
-                
-                # If we found a better Mermaid section and it's longer than what we have
-                if mermaid_section and len(mermaid_section) > len(str(mermaid_output)):
-                    mermaid_output = mermaid_section
-                
-                # For debugging only - print the full string representation
-                with open("crew_output_debug.txt", "w") as f:
-                    f.write(result_str)
-                
-                print("Used string representation as fallback")
-            except Exception as e:
-                print(f"Error using string representation: {str(e)}")
-            
-            # Process the outputs
-            if isinstance(mermaid_output, str):
-                mermaid_code = extract_mermaid_code(mermaid_output)
-            else:
-                mermaid_code = extract_mermaid_code(str(mermaid_output))
-            
-            if not isinstance(sdlc_output, str):
-                sdlc_output = str(sdlc_output)
-            
-            # Print final output info for debugging
-            print(f"SDLC output length: {len(sdlc_output)}")
-            print(f"Mermaid code length: {len(mermaid_code)}")
-            
-            return {
-                "sdlc_recommendation": sdlc_output,
-                "mermaid_code": mermaid_code
-            }
-            
-        except Exception as inner_e:
-            print(f"Error processing CrewAI output: {str(inner_e)}")
-            print(f"Result type: {type(result)}")
-            
-            # Return a failsafe output
-            return {
-                "sdlc_recommendation": "Error generating SDLC recommendation. Please try again.",
-                "mermaid_code": "flowchart TD\n    A[Error generating diagram. Please try again.]"
-            }
+        # Read each task's output directly instead of parsing the printed result
+        sdlc_output, mermaid_output = task_outputs(result, 2)
+        return _build_result(sdlc_output, mermaid_output, diagram_type, mermaid_generator)
         
     except Exception as e:
         print(f"Error in crew task: {str(e)}")
         return None
+    finally:
+        lease.release()
 
-def extract_mermaid_code(text: str) -> str:
+@traced("crew.run_multi")
+def run_multi_diagram_task(product_description: str, diagram_types: List[str],
+                           temperature: float = 0.7, max_tokens: int = 2000,
+                           parallel: bool = True,
+                           orchestrator: Optional[CrewOrchestrator] = None,
+                           model_options: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
     """
-    Extract Mermaid code from text, ensuring it has the correct format
+    Get one SDLC recommendation and several diagrams for the same product
+    
+    The SDLC advisor runs once; each requested diagram type gets its own
+    Mermaid generator task, and all of them run concurrently unless
+    parallel=False.
     
     Args:
-        text: Text containing Mermaid code
+        product_description: Description of the software product
+        diagram_types: UML diagram types to generate
+        temperature: Temperature for model generation
+        max_tokens: Maximum tokens to generate
+        parallel: Run the tasks concurrently
+        orchestrator: Source of reusable agents (defaults to the shared one)
+        model_options: Extra Ollama settings (num_ctx, stop, keep_alive)
         
     Returns:
-        Cleaned Mermaid code
+        Dictionary with sdlc_recommendation and diagrams (diagram type -> Mermaid code),
+        or None if failed
     """
-    # Look for code blocks
-    code_block_pattern = r'```(?:mermaid)?\s*([\s\S]*?)```'
-    match = re.search(code_block_pattern, text)
+    orchestrator = orchestrator or get_orchestrator()
+    lease = orchestrator.lease(temperature, max_tokens, model_options)
+    try:
+        setup_start = time.perf_counter()
+        
+        # Drop duplicates but keep the caller's order
+        diagram_types = list(dict.fromkeys(diagram_types))
+        
+        sdlc_advisor = lease.get("sdlc_advisor")
+        agent_tasks = [(sdlc_advisor, Task(
+            description=build_sdlc_task_prompt(product_description),
+            agent=sdlc_advisor,
+            expected_output="A recommendation of an SDLC model with justification"
+        ))]
+        
+        for diagram_type in diagram_types:
+            # One agent per task so concurrent crews don't share agent state
+            mermaid_generator = lease.get("mermaid_generator", diagram_type)
+            agent_tasks.append((mermaid_generator, Task(
+                description=build_uml_task_prompt(product_description, diagram_type),
+                agent=mermaid_generator,
+                expected_output=f"Complete Mermaid code for a {diagram_type} diagram"
+            )))
+        
+        orchestrator.record_setup(time.perf_counter() - setup_start)
+        outputs = _kickoff_parallel(*agent_tasks, max_workers=None if parallel else 1)
+        
+        diagrams = {
+            diagram_type: extract_mermaid_code(_output_text(output, PLACEHOLDER_DIAGRAM))
+            for diagram_type, output in zip(diagram_types, outputs[1:])
+        }
+        mermaid_agents = {diagram_type: agent for diagram_type, (agent, _) in zip(diagram_types, agent_tasks[1:])}
+        return {
+            "sdlc_recommendation": _output_text(outputs[0], NO_SDLC_RECOMMENDATION),
+            "diagrams": _repair_diagrams(diagrams, mermaid_agents)
+        }
+        
+    except Exception as e:
+        print(f"Error in multi-diagram crew task: {str(e)}")
+        return None
+    finally:
+        lease.release()
+
+def _kickoff_parallel(*agent_tasks: Tuple[Agent, Task], max_workers: Optional[int] = None) -> List[Any]:
+    """
+    Run each (agent, task) pair in its own single-task crew, concurrently.
     
-    if match:
-        return match.group(1).strip()
+    max_workers=1 runs them one at a time on the same code path.
     
-    # Check for specific diagram type indicators
-    diagram_types = [
-        "flowchart", "sequenceDiagram", "classDiagram", 
-        "stateDiagram", "stateDiagram-v2", "gantt", 
-        "pie", "journey", "gitGraph"
-    ]
+    Returns:
+        The raw output of each task, in the order given
+    """
+    def kickoff(agent: Agent, task: Task) -> Any:
+        crew = Crew(
+            agents=[agent],
+            tasks=[task],
+            verbose=True,
+            process=Process.sequential
+        )
+        with span("crew.task", role=agent.role):
+            result = crew.kickoff()
+        output = getattr(result, "raw", result)
+        capture_debug(f"crew_output/{agent.role}", output)
+        return output
     
-    for dtype in diagram_types:
-        if dtype in text:
-            # Find the start of the diagram code
-            start_idx = text.find(dtype)
-            if start_idx != -1:
-                return text[start_idx:].strip()
+    with ThreadPoolExecutor(max_workers=max_workers or len(agent_tasks)) as executor:
+        # Run each task in a copy of the caller's context so its span nests under ours
+        futures = [executor.submit(contextvars.copy_context().run, kickoff, agent, task)
+                   for agent, task in agent_tasks]
+        return [future.result() for future in futures]
+
+def _agent_regenerator(agent: Agent, diagram_type: str):
+    """Send repair prompts to the (already leased) Mermaid generator agent"""
+    def regenerate(prompt: str) -> str:
+        task = Task(description=prompt, agent=agent,
+                    expected_output=f"Corrected Mermaid code for a {diagram_type} diagram")
+        return str(_kickoff_parallel((agent, task), max_workers=1)[0])
+    return regenerate
+
+def _repair_diagrams(diagrams: Dict[str, str], agents: Dict[str, Agent]) -> Dict[str, str]:
+    """
+    Run the validate-and-repair stage on every diagram that doesn't parse.
     
-    # If no indicators found, return the whole text as is
-    # It might be just the diagram code without any markers
-    return text.strip() or "flowchart TD\n    A[No valid diagram code generated]"
+    Only failing diagrams are sent back to their Mermaid generator, concurrently.
+    """
+    invalid = [diagram_type for diagram_type, code in diagrams.items() if not is_valid_mermaid(code)]
+    if not invalid:
+        return diagrams
+    with ThreadPoolExecutor(max_workers=len(invalid)) as executor:
+        futures = {
+            diagram_type: executor.submit(contextvars.copy_context().run, repair_mermaid, diagrams[diagram_type],
+                                          diagram_type, _agent_regenerator(agents[diagram_type], diagram_type))
+            for diagram_type in invalid
+        }
+        repaired = {diagram_type: future.result()["code"] for diagram_type, future in futures.items()}
+    return {diagram_type: repaired.get(diagram_type, code) for diagram_type, code in diagrams.items()}
+
+def _output_text(output: Any, fallback: str) -> str:
+    """Text of a task output, or `fallback` if the task produced nothing"""
+    text = "" if output is None else output if isinstance(output, str) else str(output)
+    return text if text.strip() else fallback
 
-def is_valid_mermaid(code: str) -> bool:
+def _build_result(sdlc_output: Any, mermaid_output: Any, diagram_type: Optional[str] = None,
+                  mermaid_agent: Optional[Agent] = None) -> Dict[str, str]:
     """
-    Basic validation for Mermaid code
+    Normalize raw task outputs into the run_crew_task result dictionary
     
-    Args:
-        code: Mermaid code to validate
-        
-    Returns:
-        Boolean indicating if the code appears to be valid Mermaid
+    Empty outputs are replaced by placeholders, whichever path produced them.
+    With a diagram type and the Mermaid generator agent, invalid Mermaid code is
+    repaired before it is returned.
     """
-    if not code or len(code) < 10:
-        return False
+    mermaid_code = extract_mermaid_code(_output_text(mermaid_output, PLACEHOLDER_DIAGRAM))
+    if diagram_type and mermaid_agent is not None:
+        mermaid_code = _repair_diagrams({diagram_type: mermaid_code}, {diagram_type: mermaid_agent})[diagram_type]
     
-    # Check if it starts with a valid Mermaid diagram type
-    valid_starts = [
-        "flowchart", "sequenceDiagram", "classDiagram", 
-        "stateDiagram", "stateDiagram-v2", "gantt", 
-        "pie", "journey", "gitGraph"
-    ]
+    sdlc_output = _output_text(sdlc_output, NO_SDLC_RECOMMENDATION)
     
-    for start in valid_starts:
-        if code.lstrip().startswith(start):
-            return True
+    # Print final output info for debugging
+    print(f"SDLC output length: {len(sdlc_output)}")
+    print(f"Mermaid code length: {len(mermaid_code)}")
     
-    return False
+    return {
+        "sdlc_recommendation": sdlc_output,
+        "mermaid_code": mermaid_code
+    }
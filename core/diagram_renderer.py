@@ -0,0 +1,1047 @@
+"""
+Offline Mermaid rendering to SVG and PNG.
+
+Covers the diagram families the Mermaid generator emits - flowchart/graph,
+sequenceDiagram, classDiagram and stateDiagram(-v2) - without a browser or an
+external service. Diagrams are parsed into a small graph model, laid out in
+layers (sequence diagrams in columns), and drawn as a list of primitive shapes
+that is written out as SVG or rasterized to PNG with Pillow. The output is a
+readable picture of the diagram, not a pixel-perfect copy of mermaid.js.
+
+Rendered images are cached by a hash of the Mermaid source, theme and format,
+so repeated downloads and batch exports only render a diagram once.
+
+    svg = render_svg(mermaid_code)
+    png = render_png(mermaid_code, theme="dark")
+    save_diagram(mermaid_code, "out/diagram.png")
+"""
+
+import functools
+import hashlib
+import io
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from mermaid_validator import DIAGRAM_HEADERS, FLOWCHART_DIRECTIONS
+from tracing import span
+
+# Bump when the drawing changes so cached images are re-rendered
+RENDERER_VERSION = "1"
+
+DEFAULT_RENDER_DIR = os.environ.get(
+    "SMARTSDLC_RENDER_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "smartsdlc", "renders")
+)
+
+FORMATS = ("svg", "png")
+
+THEMES = {
+    "default": {"background": "#ffffff", "fill": "#ececff", "stroke": "#9370db", "text": "#333333",
+                "edge": "#333333", "label": "#e8e8e8", "lifeline": "#999999", "marker": "#333333"},
+    "neutral": {"background": "#ffffff", "fill": "#eeeeee", "stroke": "#999999", "text": "#333333",
+                "edge": "#666666", "label": "#ffffff", "lifeline": "#999999", "marker": "#666666"},
+    "dark": {"background": "#1e1e1e", "fill": "#1f2020", "stroke": "#cccccc", "text": "#e0e0e0",
+             "edge": "#cccccc", "label": "#333333", "lifeline": "#888888", "marker": "#cccccc"},
+}
+
+FONT_SIZE = 14
+LINE_HEIGHT = 18
+CHAR_WIDTH = 8.4
+PADDING = 12
+RANK_GAP = 56
+NODE_GAP = 36
+MARGIN = 20
+WAYPOINT_SIZE = 8.0
+
+class RenderError(ValueError):
+    """Raised when a diagram can't be rendered offline"""
+
+# ---------------------------------------------------------------------------
+# Diagram model
+
+class DiagramNode:
+    """A box in the diagram: flowchart node, participant, class or state"""
+
+    __slots__ = ("id", "label", "shape", "members")
+
+    def __init__(self, node_id: str, label: Optional[str] = None, shape: str = "rect"):
+        self.id = node_id
+        self.label = label if label is not None else node_id
+        self.shape = shape
+        self.members: List[str] = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "label": self.label, "shape": self.shape, "members": list(self.members)}
+
+class DiagramEdge:
+    """A link, message, relationship or transition between two nodes"""
+
+    __slots__ = ("source", "target", "label", "dashed", "head", "tail")
+
+    def __init__(self, source: str, target: str, label: str = "", dashed: bool = False,
+                 head: Optional[str] = "arrow", tail: Optional[str] = None):
+        self.source = source
+        self.target = target
+        self.label = label
+        self.dashed = dashed
+        self.head = head
+        self.tail = tail
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"source": self.source, "target": self.target, "label": self.label,
+                "dashed": self.dashed, "head": self.head, "tail": self.tail}
+
+class Diagram:
+    """Parsed diagram: family, layout direction, nodes in first-seen order and edges in source order"""
+
+    def __init__(self, kind: str, direction: str = "TB"):
+        self.kind = kind
+        self.direction = direction
+        self.nodes: "OrderedDict[str, DiagramNode]" = OrderedDict()
+        self.edges: List[DiagramEdge] = []
+
+    def node(self, node_id: str, label: Optional[str] = None, shape: Optional[str] = None) -> DiagramNode:
+        """Return the node with this id, creating it on first use; a label or shape updates it"""
+        node = self.nodes.get(node_id)
+        if node is None:
+            node = self.nodes[node_id] = DiagramNode(node_id)
+        if label is not None:
+            node.label = label
+        if shape is not None:
+            node.shape = shape
+        return node
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "direction": self.direction,
+                "nodes": [node.to_dict() for node in self.nodes.values()],
+                "edges": [edge.to_dict() for edge in self.edges]}
+
+def _unquote(text: str) -> str:
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] == '"':
+        text = text[1:-1]
+    return text.replace("<br>", "\n").replace("<br/>", "\n").replace("<br />", "\n")
+
+# flowchart / graph ----------------------------------------------------------
+
+# (opener, closer, shape), longest opener first
+_FLOW_SHAPES = (
+    ("(((", ")))", "circle"), ("((", "))", "circle"), ("([", "])", "stadium"), ("[[", "]]", "rect"),
+    ("[(", ")]", "rect"), ("{{", "}}", "hexagon"), ("[/", "/]", "rect"), ("[\\", "\\]", "rect"),
+    ("(", ")", "round"), ("[", "]", "rect"), ("{", "}", "diamond"), (">", "]", "rect"),
+)
+_FLOW_ID_RE = re.compile(r"\s*(\w+)")
+_FLOW_CLASS_RE = re.compile(r":::\w+")
+_FLOW_AND_RE = re.compile(r"\s*&")
+_FLOW_TEXT_LINK_RE = re.compile(r"\s*(<)?(--|==|-\.)\s+(.+?)\s+(-{2,}|={2,}|\.-+)(>|o|x)?")
+_FLOW_LINK_RE = re.compile(r"\s*(<|o|x)?(-{2,}|={2,}|-\.+-|~{3,})(>|o|x)?(?:\s*\|([^|]*)\|)?")
+_FLOW_SKIP_RE = re.compile(r"(?:classDef|class|style|linkStyle|click|direction|subgraph|end)\b")
+_FLOW_HEADS = {">": "arrow", "o": "circle", "x": "cross", None: None}
+
+def _parse_flowchart(diagram: Diagram, text: str):
+    if _FLOW_SKIP_RE.match(text):
+        return
+    pos, length = 0, len(text)
+    previous: List[str] = []
+    pending_edge: Optional[Dict[str, Any]] = None
+    while pos < length:
+        group = []
+        while True:
+            match = _FLOW_ID_RE.match(text, pos)
+            if not match:
+                return
+            node_id, pos = match.group(1), match.end()
+            label, shape = None, None
+            for opener, closer, shape_name in _FLOW_SHAPES:
+                if text.startswith(opener, pos):
+                    end = text.find(closer, pos + len(opener))
+                    if end < 0:
+                        return
+                    label, shape = _unquote(text[pos + len(opener):end]), shape_name
+                    pos = end + len(closer)
+                    break
+            style_class = _FLOW_CLASS_RE.match(text, pos)
+            if style_class:
+                pos = style_class.end()
+            diagram.node(node_id, label, shape)
+            group.append(node_id)
+            ampersand = _FLOW_AND_RE.match(text, pos)
+            if not ampersand:
+                break
+            pos = ampersand.end()
+
+        if pending_edge is not None:
+            for source in previous:
+                for target in group:
+                    diagram.edges.append(DiagramEdge(source, target, **pending_edge))
+        previous = group
+
+        text_link = _FLOW_TEXT_LINK_RE.match(text, pos)
+        link = text_link or _FLOW_LINK_RE.match(text, pos)
+        if not link or link.end() == pos:
+            return
+        if text_link:
+            stroke, label, head, tail = text_link.group(2), text_link.group(3), text_link.group(5), text_link.group(1)
+        else:
+            stroke, label, head, tail = link.group(2), link.group(4) or "", link.group(3), link.group(1)
+        pending_edge = {"label": _unquote(label), "dashed": "." in stroke,
+                        "head": _FLOW_HEADS.get(head), "tail": "arrow" if tail == "<" else _FLOW_HEADS.get(tail)}
+        if stroke.startswith("~"):
+            pending_edge.update(head=None, dashed=True)
+        pos = link.end()
+
+# sequenceDiagram -------------------------------------------------------------
+
+_SEQ_PARTICIPANT_RE = re.compile(r"(?:create\s+)?(participant|actor)\s+(.+?)(?:\s+as\s+(.+))?$")
+_SEQ_MESSAGE_RE = re.compile(
+    r"([^+\-<>:,;]+?)\s*(<<-->>|<<->>|-->>|->>|-->|->|--x|-x|--\)|-\))\s*[+-]?\s*([^+\-<>:,;]+?)\s*:(.*)$"
+)
+
+def _parse_sequence(diagram: Diagram, text: str):
+    participant = _SEQ_PARTICIPANT_RE.match(text)
+    if participant:
+        name = participant.group(2).strip()
+        diagram.node(name, _unquote(participant.group(3) or name),
+                     "actor" if participant.group(1) == "actor" else "rect")
+        return
+    message = _SEQ_MESSAGE_RE.match(text)
+    if message:
+        source, arrow, target = message.group(1).strip(), message.group(2), message.group(3).strip()
+        diagram.node(source)
+        diagram.node(target)
+        head = "cross" if arrow.endswith("x") else "open" if arrow.endswith(")") else \
+            "arrow" if arrow.endswith(">>") else None
+        diagram.edges.append(DiagramEdge(source, target, message.group(4).strip(), arrow.lstrip("<").startswith("--"),
+                                         head, "arrow" if arrow.startswith("<<") else None))
+
+# classDiagram ----------------------------------------------------------------
+
+_CLASS_NAME = r"(?:`[^`]+`|\w+(?:~[^~]+~)?)"
+_CLASS_DECL_RE = re.compile(r"class\s+(" + _CLASS_NAME + r")\s*(?:\[\"([^\"]*)\"\])?[^{]*(\{)?\s*(.*?)\}?\s*$")
+_CLASS_RELATION_RE = re.compile(
+    r"(" + _CLASS_NAME + r")\s*(?:\"([^\"]*)\"\s*)?(<\||\*|o|<|\})?(--|\.\.)(\|>|\*|o|>|\{)?\s*"
+    r"(?:\"([^\"]*)\"\s*)?(" + _CLASS_NAME + r")\s*(?::(.*))?$"
+)
+_CLASS_MEMBER_RE = re.compile(r"(" + _CLASS_NAME + r")\s*:\s*(.+)$")
+_CLASS_ENDS = {"<|": "triangle", "|>": "triangle", "*": "diamond", "o": "odiamond", "<": "arrow", ">": "arrow",
+               "}": "arrow", "{": "arrow", None: None}
+
+_GENERIC_RE = re.compile(r"~([^~]+)~")
+
+def _class_name(token: str) -> str:
+    return _GENERIC_RE.sub(r"<\1>", token.strip("`"))
+
+def _parse_class(diagram: Diagram, text: str, state: Dict[str, Any]):
+    open_class = state.get("open_class")
+    if open_class is not None:
+        if text == "}":
+            state["open_class"] = None
+            return
+        closes = text.endswith("}")
+        member = text[:-1].strip() if closes else text
+        if member:
+            diagram.nodes[open_class].members.append(_class_name(member))
+        if closes:
+            state["open_class"] = None
+        return
+    if text.startswith("class "):
+        declaration = _CLASS_DECL_RE.match(text)
+        if declaration:
+            name = declaration.group(1).strip("`")
+            node = diagram.node(name, declaration.group(2) or _class_name(declaration.group(1)), "class")
+            if declaration.group(3) and declaration.group(4):
+                node.members.append(_class_name(declaration.group(4).strip()))
+            elif declaration.group(3) and not text.rstrip().endswith("}"):
+                state["open_class"] = name
+        return
+    relation = _CLASS_RELATION_RE.match(text)
+    if relation:
+        source, target = relation.group(1).strip("`"), relation.group(7).strip("`")
+        diagram.node(source, _class_name(relation.group(1)), "class")
+        diagram.node(target, _class_name(relation.group(7)), "class")
+        label = (relation.group(8) or "").strip()
+        cardinalities = [c for c in (relation.group(2), relation.group(6)) if c]
+        if cardinalities and not label:
+            label = " / ".join(cardinalities)
+        diagram.edges.append(DiagramEdge(source, target, label, relation.group(4) == "..",
+                                         _CLASS_ENDS.get(relation.group(5)), _CLASS_ENDS.get(relation.group(3))))
+        return
+    member = _CLASS_MEMBER_RE.match(text)
+    if member:
+        name = member.group(1).strip("`")
+        diagram.node(name, _class_name(member.group(1)), "class").members.append(_class_name(member.group(2).strip()))
+
+# stateDiagram ----------------------------------------------------------------
+
+_STATE_ID = r"(?:\[\*\]|\w+)"
+_STATE_TRANSITION_RE = re.compile(r"(" + _STATE_ID + r")\s*-->\s*(" + _STATE_ID + r")\s*(?::(.*))?$")
+_STATE_DECL_RE = re.compile(
+    r"state\s+(?:\"([^\"]*)\"\s+as\s+(\w+)|(\w+)(?:\s+as\s+\"([^\"]*)\")?)\s*(?:<<(fork|join|choice)>>)?\s*(\{)?\s*$"
+)
+_STATE_DESCRIPTION_RE = re.compile(r"(\w+)\s*:\s*(.+)$")
+
+def _parse_state(diagram: Diagram, text: str, state: Dict[str, Any]):
+    if state.get("in_note"):
+        state["in_note"] = text != "end note"
+        return
+    scopes = state.setdefault("scopes", [])
+    if text == "}":
+        if scopes:
+            scopes.pop()
+        return
+    if text.startswith("note "):
+        state["in_note"] = ":" not in text
+        return
+    # Composite states are drawn flat, but each keeps its own start and end points
+    scope = scopes[-1] if scopes else ""
+
+    def state_id(token: str, start: bool) -> str:
+        if token != "[*]":
+            return token
+        node_id = f"{scope}[*]" + ("start" if start else "end")
+        diagram.node(node_id, "", "start" if start else "end")
+        return node_id
+
+    declaration = _STATE_DECL_RE.match(text)
+    if declaration:
+        name = declaration.group(2) or declaration.group(3)
+        label = declaration.group(1) or declaration.group(4)
+        shape = {"fork": "bar", "join": "bar", "choice": "diamond"}.get(declaration.group(5), "round")
+        diagram.node(name, label, shape)
+        if shape == "bar":
+            diagram.nodes[name].label = ""
+        if declaration.group(6):
+            scopes.append(name)
+        return
+    transition = _STATE_TRANSITION_RE.match(text)
+    if transition:
+        source = state_id(transition.group(1), True)
+        target = state_id(transition.group(2), False)
+        for node_id in (source, target):
+            if node_id not in diagram.nodes:
+                diagram.node(node_id, shape="round")
+        diagram.edges.append(DiagramEdge(source, target, (transition.group(3) or "").strip()))
+        return
+    description = _STATE_DESCRIPTION_RE.match(text)
+    if description:
+        diagram.node(description.group(1), shape="round").members.append(description.group(2).strip())
+
+_COMMON_SKIP_RE = re.compile(r"(?:%%|title\b|accTitle\s*:|accDescr\s*:|direction\b|classDef\b|style\b|"
+                             r"autonumber\b|activate\b|deactivate\b|destroy\b|links?\b|[Nn]ote\b|loop\b|alt\b|"
+                             r"else\b|opt\b|par\b|and\b|critical\b|option\b|break\b|rect\b|box\b|end$|"
+                             r"<<|cssClass\b|click\b|namespace\b|callback\b|link\b)")
+
+def parse_diagram(mermaid_code: str) -> Diagram:
+    """
+    Parse Mermaid code into a Diagram.
+
+    Statements the renderer doesn't draw (styling, notes, sequence blocks) are
+    skipped; parsing never fails on them.
+
+    Raises:
+        RenderError: If the code has no header or is of an unsupported family
+    """
+    diagram = None
+    state: Dict[str, Any] = {}
+    in_front_matter = False
+    for raw in mermaid_code.splitlines():
+        text = raw.strip()
+        if not text or text.startswith("%%"):
+            continue
+        if diagram is None:
+            if text == "---":
+                in_front_matter = not in_front_matter
+                continue
+            if in_front_matter:
+                continue
+            keyword, _, rest = text.partition(" ")
+            family = DIAGRAM_HEADERS.get(keyword)
+            if family is None:
+                if keyword in DIAGRAM_HEADERS:
+                    raise RenderError(f"'{keyword}' diagrams are not supported by the offline renderer")
+                raise RenderError(f"Unknown diagram type '{keyword}'")
+            direction = rest.strip().rstrip(";")
+            diagram = Diagram(family, direction if direction in FLOWCHART_DIRECTIONS else "TB")
+            continue
+
+        if diagram.kind == "flowchart":
+            _parse_flowchart(diagram, text.rstrip(";"))
+            continue
+        text = text.rstrip(";").rstrip()
+        if text.startswith("direction "):
+            diagram.direction = text.split()[1] if text.split()[1] in FLOWCHART_DIRECTIONS else diagram.direction
+            continue
+        if diagram.kind == "class":
+            _parse_class(diagram, text, state)
+        elif diagram.kind == "state":
+            _parse_state(diagram, text, state)
+        elif not _COMMON_SKIP_RE.match(text):
+            _parse_sequence(diagram, text)
+    if diagram is None:
+        raise RenderError("No Mermaid diagram header found")
+    if diagram.direction == "TD":
+        diagram.direction = "TB"
+    return diagram
+
+_WHITESPACE_RE = re.compile(r"[ \t]+")
+
+def normalize_source(mermaid_code: str) -> str:
+    """
+    Mermaid source with comments, indentation, blank lines and repeated spaces
+    removed; two sources that normalize the same draw the same picture.
+    The mermaid_view component applies the same rules in the browser.
+    """
+    lines = (_WHITESPACE_RE.sub(" ", line.strip()) for line in mermaid_code.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith("%%"))
+
+def diagram_fingerprint(mermaid_code: str) -> str:
+    """
+    Hash of what the offline renderer would draw for this code.
+
+    Edits that don't change the parsed diagram (formatting, comments, notes
+    and styling the renderer skips) keep the same fingerprint, so an editor
+    can skip re-rendering. Code the renderer can't parse is fingerprinted by
+    its normalized source.
+    """
+    try:
+        payload = json.dumps(parse_diagram(mermaid_code).to_dict(), sort_keys=True)
+    except RenderError:
+        payload = "source:" + normalize_source(mermaid_code)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# ---------------------------------------------------------------------------
+# Layout: everything is drawn as a list of primitives
+#   ("rect", x, y, w, h, rx, fill, stroke, dashed)
+#   ("ellipse", cx, cy, rx, ry, fill, stroke)
+#   ("polygon", points, fill, stroke)
+#   ("line", points, stroke, dashed)
+#   ("text", x, y, text, anchor, bold, color)
+
+def _text_width(text: str) -> float:
+    return max((len(line) for line in text.split("\n")), default=0) * CHAR_WIDTH
+
+def _node_size(node: DiagramNode) -> Tuple[float, float]:
+    if node.shape in ("start", "end"):
+        return 20.0, 20.0
+    if node.shape == "bar":
+        return 70.0, 8.0
+    label_lines = node.label.split("\n") if node.label else []
+    lines = label_lines + node.members
+    width = max(_text_width(node.label), max((_text_width(m) for m in node.members), default=0)) + 2 * PADDING
+    height = max(len(lines), 1) * LINE_HEIGHT + 2 * PADDING
+    if node.members and node.shape == "class":
+        height += PADDING
+    if node.shape == "diamond":
+        width, height = width * 1.5, height * 1.5
+    elif node.shape == "circle":
+        width = height = max(width, height)
+    elif node.shape == "hexagon":
+        width += 2 * PADDING
+    return max(width, 40.0), height
+
+def _rank_nodes(diagram: Diagram) -> Dict[str, int]:
+    """Longest-path layering; edges that close a cycle are ignored"""
+    outgoing: Dict[str, List[str]] = {node_id: [] for node_id in diagram.nodes}
+    for edge in diagram.edges:
+        if edge.source != edge.target:
+            outgoing[edge.source].append(edge.target)
+
+    order, visited, on_stack, back_edges = [], set(), set(), set()
+    for root in diagram.nodes:
+        if root in visited:
+            continue
+        stack = [(root, iter(outgoing[root]))]
+        visited.add(root)
+        on_stack.add(root)
+        while stack:
+            node_id, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                on_stack.discard(node_id)
+                order.append(node_id)
+            elif child in on_stack:
+                back_edges.add((node_id, child))
+            elif child not in visited:
+                visited.add(child)
+                on_stack.add(child)
+                stack.append((child, iter(outgoing[child])))
+
+    ranks = {node_id: 0 for node_id in diagram.nodes}
+    for node_id in reversed(order):
+        for child in outgoing[node_id]:
+            if (node_id, child) not in back_edges:
+                ranks[child] = max(ranks[child], ranks[node_id] + 1)
+    return ranks
+
+def _order_layers(layers: List[List[str]], links: List[Tuple[str, str]]) -> List[List[str]]:
+    """Reorder nodes within each layer with two barycenter sweeps (down, then up) to reduce crossings"""
+    neighbours: Dict[str, List[str]] = {node_id: [] for layer in layers for node_id in layer}
+    for a, b in links:
+        neighbours[a].append(b)
+        neighbours[b].append(a)
+
+    for sweep in (range(1, len(layers)), range(len(layers) - 2, -1, -1)):
+        for index in sweep:
+            reference = {node_id: i for i, node_id in enumerate(layers[index - 1 if sweep.step > 0 else index + 1])}
+
+            def barycenter(node_id: str, position: int) -> float:
+                placed = [reference[n] for n in neighbours[node_id] if n in reference]
+                return sum(placed) / len(placed) if placed else position
+
+            layers[index] = [node_id for _, node_id in sorted(
+                (barycenter(node_id, i), node_id) for i, node_id in enumerate(layers[index]))]
+    return layers
+
+def _clip(center: Tuple[float, float], size: Tuple[float, float], towards: Tuple[float, float]) -> Tuple[float, float]:
+    """Point where the segment from a box's center towards `towards` leaves the box"""
+    dx, dy = towards[0] - center[0], towards[1] - center[1]
+    if dx == 0 and dy == 0:
+        return center
+    half_w, half_h = size[0] / 2, size[1] / 2
+    scale = min(half_w / abs(dx) if dx else math.inf, half_h / abs(dy) if dy else math.inf)
+    return center[0] + dx * scale, center[1] + dy * scale
+
+def _marker(kind: Optional[str], tip: Tuple[float, float], origin: Tuple[float, float],
+            colors: Dict[str, str]) -> List[tuple]:
+    """Primitives for an arrowhead at `tip` on a line coming from `origin`"""
+    if not kind:
+        return []
+    angle = math.atan2(tip[1] - origin[1], tip[0] - origin[0])
+    cos, sin = math.cos(angle), math.sin(angle)
+
+    def point(back: float, side: float) -> Tuple[float, float]:
+        return tip[0] - back * cos - side * sin, tip[1] - back * sin + side * cos
+
+    if kind == "arrow":
+        return [("polygon", [tip, point(10, 5), point(10, -5)], colors["marker"], colors["marker"])]
+    if kind == "open":
+        return [("line", [point(10, 5), tip, point(10, -5)], colors["marker"], False)]
+    if kind == "triangle":
+        return [("polygon", [tip, point(14, 8), point(14, -8)], colors["background"], colors["marker"])]
+    if kind in ("diamond", "odiamond"):
+        fill = colors["marker"] if kind == "diamond" else colors["background"]
+        return [("polygon", [tip, point(9, 6), point(18, 0), point(9, -6)], fill, colors["marker"])]
+    if kind == "circle":
+        center = point(5, 0)
+        return [("ellipse", center[0], center[1], 5, 5, colors["background"], colors["marker"])]
+    if kind == "cross":
+        return [("line", [point(0, 5), point(10, -5)], colors["marker"], False),
+                ("line", [point(0, -5), point(10, 5)], colors["marker"], False)]
+    return []
+
+def _edge_label(label: str, x: float, y: float, colors: Dict[str, str]) -> List[tuple]:
+    if not label:
+        return []
+    width = _text_width(label) + 8
+    lines = label.split("\n")
+    height = len(lines) * LINE_HEIGHT + 4
+    shapes = [("rect", x - width / 2, y - height / 2, width, height, 2, colors["label"], colors["label"], False)]
+    for i, line in enumerate(lines):
+        shapes.append(("text", x, y - height / 2 + 2 + LINE_HEIGHT * (i + 0.75), line, "middle", False, colors["text"]))
+    return shapes
+
+def _draw_node(node: DiagramNode, x: float, y: float, width: float, height: float,
+               colors: Dict[str, str]) -> List[tuple]:
+    fill, stroke, text = colors["fill"], colors["stroke"], colors["text"]
+    cx, cy = x + width / 2, y + height / 2
+    if node.shape == "start":
+        return [("ellipse", cx, cy, 10, 10, colors["marker"], colors["marker"])]
+    if node.shape == "end":
+        return [("ellipse", cx, cy, 10, 10, colors["background"], colors["marker"]),
+                ("ellipse", cx, cy, 6, 6, colors["marker"], colors["marker"])]
+    if node.shape == "bar":
+        return [("rect", x, y, width, height, 0, colors["marker"], colors["marker"], False)]
+
+    shapes: List[tuple]
+    if node.shape == "diamond":
+        shapes = [("polygon", [(cx, y), (x + width, cy), (cx, y + height), (x, cy)], fill, stroke)]
+    elif node.shape == "hexagon":
+        inset = PADDING
+        shapes = [("polygon", [(x + inset, y), (x + width - inset, y), (x + width, cy), (x + width - inset, y + height),
+                               (x + inset, y + height), (x, cy)], fill, stroke)]
+    elif node.shape == "circle":
+        shapes = [("ellipse", cx, cy, width / 2, height / 2, fill, stroke)]
+    else:
+        radius = {"round": 8, "stadium": height / 2}.get(node.shape, 0)
+        shapes = [("rect", x, y, width, height, radius, fill, stroke, False)]
+
+    label_lines = node.label.split("\n") if node.label else []
+    if node.shape == "class" and node.members:
+        top = y + PADDING
+        for i, line in enumerate(label_lines):
+            shapes.append(("text", cx, top + LINE_HEIGHT * (i + 0.75), line, "middle", True, text))
+        divider = top + len(label_lines) * LINE_HEIGHT + PADDING / 2
+        shapes.append(("line", [(x, divider), (x + width, divider)], stroke, False))
+        for i, member in enumerate(node.members):
+            shapes.append(("text", x + PADDING, divider + PADDING / 2 + LINE_HEIGHT * (i + 0.75), member, "start",
+                           False, text))
+        return shapes
+
+    lines = label_lines + node.members
+    top = cy - len(lines) * LINE_HEIGHT / 2
+    for i, line in enumerate(lines):
+        shapes.append(("text", cx, top + LINE_HEIGHT * (i + 0.75), line, "middle",
+                       node.shape == "class" or (i == 0 and bool(node.members)), text))
+    return shapes
+
+def _layout_graph(diagram: Diagram, colors: Dict[str, str]) -> Tuple[float, float, List[tuple]]:
+    horizontal = diagram.direction in ("LR", "RL")
+    sizes = {node_id: _node_size(node) for node_id, node in diagram.nodes.items()}
+    ranks = _rank_nodes(diagram)
+    layers: List[List[str]] = [[] for _ in range(max(ranks.values(), default=0) + 1)]
+    for node_id in diagram.nodes:
+        layers[ranks[node_id]].append(node_id)
+
+    # Edges spanning several ranks pass through a waypoint in each rank between,
+    # so they are routed around the nodes there instead of through them
+    routes, links = [], []
+    for index, edge in enumerate(diagram.edges):
+        route = [edge.source]
+        low, high = ranks[edge.source], ranks[edge.target]
+        step = 1 if high > low else -1
+        for rank in range(low + step, high, step):
+            waypoint = f"\0{index}.{rank}"
+            layers[rank].append(waypoint)
+            sizes[waypoint] = (WAYPOINT_SIZE, WAYPOINT_SIZE)
+            route.append(waypoint)
+        route.append(edge.target)
+        routes.append(route)
+        links.extend(zip(route, route[1:]))
+    layers = _order_layers(layers, links)
+
+    def along(size):  # extent along the rank axis
+        return size[0] if horizontal else size[1]
+
+    def across(size):
+        return size[1] if horizontal else size[0]
+
+    # Edge labels need room between ranks
+    label_room = max((_text_width(edge.label) if horizontal else LINE_HEIGHT * (edge.label.count("\n") + 1)
+                      for edge in diagram.edges if edge.label), default=0)
+    rank_gap = RANK_GAP + label_room
+    layer_depth = [max((along(sizes[n]) for n in layer), default=0) for layer in layers]
+    layer_breadth = [sum(across(sizes[n]) for n in layer) + NODE_GAP * (len(layer) - 1) for layer in layers]
+    breadth = max(layer_breadth, default=0)
+
+    centers: Dict[str, Tuple[float, float]] = {}
+    offset = MARGIN
+    for layer, depth, layer_span in zip(layers, layer_depth, layer_breadth):
+        position = MARGIN + (breadth - layer_span) / 2
+        for node_id in layer:
+            main = offset + depth / 2
+            cross = position + across(sizes[node_id]) / 2
+            centers[node_id] = (main, cross) if horizontal else (cross, main)
+            position += across(sizes[node_id]) + NODE_GAP
+        offset += depth + rank_gap
+    depth_total = offset - rank_gap + MARGIN
+    width, height = (depth_total, breadth + 2 * MARGIN) if horizontal else (breadth + 2 * MARGIN, depth_total)
+
+    if diagram.direction in ("BT", "RL"):
+        centers = {node_id: ((width - x, y) if horizontal else (x, height - y)) for node_id, (x, y) in centers.items()}
+
+    shapes: List[tuple] = []
+    labels: List[tuple] = []
+    for edge, route in zip(diagram.edges, routes):
+        if edge.source == edge.target:
+            w, h = sizes[edge.source]
+            x, y = centers[edge.source][0] + w / 2, centers[edge.source][1]
+            points = [(x, y - 6), (x + 24, y - 6), (x + 24, y + 6), (x, y + 6)]
+            shapes.append(("line", points, colors["edge"], edge.dashed))
+            shapes.extend(_marker(edge.head, points[-1], points[-2], colors))
+            labels.extend(_edge_label(edge.label, x + 24 + _text_width(edge.label) / 2 + 8, y, colors))
+            continue
+        points = [centers[node_id] for node_id in route]
+        points[0] = _clip(points[0], sizes[edge.source], points[1])
+        points[-1] = _clip(points[-1], sizes[edge.target], points[-2])
+        shapes.append(("line", points, colors["edge"], edge.dashed))
+        shapes.extend(_marker(edge.head, points[-1], points[-2], colors))
+        shapes.extend(_marker(edge.tail, points[0], points[1], colors))
+        # Past the middle of the route, so labels of edges leaving the same node drift apart
+        segment = (len(points) - 1) // 2
+        (x1, y1), (x2, y2) = points[segment], points[segment + 1]
+        labels.extend(_edge_label(edge.label, x1 + (x2 - x1) * 0.6, y1 + (y2 - y1) * 0.6, colors))
+
+    for node_id, node in diagram.nodes.items():
+        w, h = sizes[node_id]
+        cx, cy = centers[node_id]
+        shapes.extend(_draw_node(node, cx - w / 2, cy - h / 2, w, h, colors))
+    return width, height, shapes + labels
+
+def _layout_sequence(diagram: Diagram, colors: Dict[str, str]) -> Tuple[float, float, List[tuple]]:
+    participants = list(diagram.nodes.values())
+    sizes = {node.id: (max(_text_width(node.label) + 2 * PADDING, 80.0), LINE_HEIGHT + 2 * PADDING)
+             for node in participants}
+    box_height = max((size[1] for size in sizes.values()), default=0)
+
+    # Space each pair of neighbouring lifelines for the widest message between them
+    index = {node.id: i for i, node in enumerate(participants)}
+    gaps = [0.0] * max(len(participants) - 1, 0)
+    for edge in diagram.edges:
+        low, high = sorted((index[edge.source], index[edge.target]))
+        if high > low:
+            needed = (_text_width(edge.label) + 2 * PADDING) / (high - low)
+            for i in range(low, high):
+                gaps[i] = max(gaps[i], needed)
+    xs, x = [], MARGIN
+    for i, node in enumerate(participants):
+        xs.append(x + sizes[node.id][0] / 2)
+        if i < len(gaps):
+            x += max(sizes[node.id][0] / 2 + sizes[participants[i + 1].id][0] / 2 + NODE_GAP, gaps[i])
+    right = max((xs[i] + sizes[node.id][0] / 2 for i, node in enumerate(participants)), default=MARGIN)
+    self_labels = [xs[index[e.source]] + 40 + _text_width(e.label) for e in diagram.edges if e.source == e.target]
+    width = max([right] + self_labels) + MARGIN
+
+    row = LINE_HEIGHT * 2 + 8
+    top = MARGIN + box_height
+    bottom = top + row * (len(diagram.edges) + 1)
+    height = bottom + box_height + MARGIN
+
+    shapes: List[tuple] = []
+    for node, cx in zip(participants, xs):
+        shapes.append(("line", [(cx, top), (cx, bottom)], colors["lifeline"], True))
+    for i, edge in enumerate(diagram.edges):
+        y = top + row * (i + 1)
+        x1, x2 = xs[index[edge.source]], xs[index[edge.target]]
+        if edge.source == edge.target:
+            points = [(x1, y - 4), (x1 + 36, y - 4), (x1 + 36, y + 10), (x1, y + 10)]
+            shapes.append(("line", points, colors["edge"], edge.dashed))
+            shapes.extend(_marker(edge.head, points[-1], points[-2], colors))
+            if edge.label:
+                shapes.append(("text", x1 + 42, y + 2, edge.label, "start", False, colors["text"]))
+            continue
+        shapes.append(("line", [(x1, y), (x2, y)], colors["edge"], edge.dashed))
+        shapes.extend(_marker(edge.head, (x2, y), (x1, y), colors))
+        shapes.extend(_marker(edge.tail, (x1, y), (x2, y), colors))
+        if edge.label:
+            shapes.append(("text", (x1 + x2) / 2, y - 6, edge.label, "middle", False, colors["text"]))
+    for node, cx in zip(participants, xs):
+        w, h = sizes[node.id]
+        for y in (MARGIN, bottom):
+            shapes.extend(_draw_node(node, cx - w / 2, y, w, h, colors))
+    return width, height, shapes
+
+def layout_diagram(diagram: Diagram, theme: str = "default") -> Tuple[float, float, List[tuple]]:
+    """
+    Lay out a parsed diagram.
+
+    Returns:
+        (width, height, primitives) in SVG user units
+    """
+    colors = THEMES.get(theme)
+    if colors is None:
+        raise RenderError(f"Unknown theme '{theme}'; expected one of {', '.join(THEMES)}")
+    if diagram.kind == "sequence":
+        width, height, shapes = _layout_sequence(diagram, colors)
+    else:
+        width, height, shapes = _layout_graph(diagram, colors)
+    return max(width, 2 * MARGIN), max(height, 2 * MARGIN), shapes
+
+# ---------------------------------------------------------------------------
+# Output
+
+def _points(points: List[Tuple[float, float]]) -> str:
+    return " ".join(f"{x:.1f},{y:.1f}" for x, y in points)
+
+def _to_svg(width: float, height: float, shapes: List[tuple], colors: Dict[str, str]) -> str:
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.0f}" height="{height:.0f}" '
+        f'viewBox="0 0 {width:.1f} {height:.1f}" font-family="Arial, Helvetica, sans-serif" font-size="{FONT_SIZE}">',
+        f'<rect width="100%" height="100%" fill="{colors["background"]}"/>',
+    ]
+    for shape in shapes:
+        kind = shape[0]
+        if kind == "rect":
+            _, x, y, w, h, rx, fill, stroke, dashed = shape
+            dash = ' stroke-dasharray="4 3"' if dashed else ""
+            out.append(f'<rect x="{x:.1f}" y="{y:.1f}" width="{w:.1f}" height="{h:.1f}" rx="{rx:.1f}" '
+                       f'fill="{fill}" stroke="{stroke}"{dash}/>')
+        elif kind == "ellipse":
+            _, cx, cy, rx, ry, fill, stroke = shape
+            out.append(f'<ellipse cx="{cx:.1f}" cy="{cy:.1f}" rx="{rx:.1f}" ry="{ry:.1f}" fill="{fill}" stroke="{stroke}"/>')
+        elif kind == "polygon":
+            _, points, fill, stroke = shape
+            out.append(f'<polygon points="{_points(points)}" fill="{fill}" stroke="{stroke}"/>')
+        elif kind == "line":
+            _, points, stroke, dashed = shape
+            dash = ' stroke-dasharray="5 4"' if dashed else ""
+            out.append(f'<polyline points="{_points(points)}" fill="none" stroke="{stroke}" stroke-width="1.5"{dash}/>')
+        elif kind == "text":
+            _, x, y, text, anchor, bold, color = shape
+            weight = ' font-weight="bold"' if bold else ""
+            out.append(f'<text x="{x:.1f}" y="{y:.1f}" text-anchor="{anchor}" fill="{color}"{weight}>{escape(text)}</text>')
+    out.append("</svg>")
+    return "\n".join(out)
+
+@functools.lru_cache(maxsize=8)
+def _load_font(size: int):
+    from PIL import ImageFont
+    for name in ("DejaVuSans.ttf", "Arial.ttf", "LiberationSans-Regular.ttf"):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:  # Pillow < 10.1
+        return ImageFont.load_default()
+
+def _to_png(width: float, height: float, shapes: List[tuple], colors: Dict[str, str], scale: float) -> bytes:
+    try:
+        from PIL import Image, ImageDraw
+    except ImportError:
+        raise RenderError("PNG output needs Pillow (pip install pillow)")
+
+    image = Image.new("RGB", (max(1, round(width * scale)), max(1, round(height * scale))), colors["background"])
+    draw = ImageDraw.Draw(image)
+    font = _load_font(round(FONT_SIZE * scale))
+    line_width = max(1, round(1.5 * scale))
+
+    def s(points):
+        return [(x * scale, y * scale) for x, y in points]
+
+    def dashed_line(points, stroke, on=5.0, off=4.0):
+        for (x1, y1), (x2, y2) in zip(points, points[1:]):
+            length = math.hypot(x2 - x1, y2 - y1)
+            position = 0.0
+            while position < length:
+                end = min(position + on * scale, length)
+                draw.line([(x1 + (x2 - x1) * position / length, y1 + (y2 - y1) * position / length),
+                           (x1 + (x2 - x1) * end / length, y1 + (y2 - y1) * end / length)],
+                          fill=stroke, width=line_width)
+                position = end + off * scale
+
+    for shape in shapes:
+        kind = shape[0]
+        if kind == "rect":
+            _, x, y, w, h, rx, fill, stroke, dashed = shape
+            box = [x * scale, y * scale, (x + w) * scale, (y + h) * scale]
+            draw.rounded_rectangle(box, radius=rx * scale, fill=fill, outline=stroke, width=max(1, round(scale)))
+        elif kind == "ellipse":
+            _, cx, cy, rx, ry, fill, stroke = shape
+            draw.ellipse([(cx - rx) * scale, (cy - ry) * scale, (cx + rx) * scale, (cy + ry) * scale],
+                         fill=fill, outline=stroke, width=max(1, round(scale)))
+        elif kind == "polygon":
+            _, points, fill, stroke = shape
+            draw.polygon(s(points), fill=fill, outline=stroke)
+        elif kind == "line":
+            _, points, stroke, dashed = shape
+            if dashed:
+                dashed_line(s(points), stroke)
+            else:
+                draw.line(s(points), fill=stroke, width=line_width)
+        elif kind == "text":
+            _, x, y, text, anchor, bold, color = shape
+            # SVG y is the baseline; Pillow's "ls" / "ms" anchors match it
+            try:
+                draw.text((x * scale, y * scale), text, fill=color, font=font,
+                          anchor="ms" if anchor == "middle" else "ls")
+            except ValueError:  # bitmap fonts don't support anchors
+                left = x * scale - (draw.textlength(text, font=font) / 2 if anchor == "middle" else 0)
+                draw.text((left, (y - FONT_SIZE) * scale), text, fill=color, font=font)
+    output = io.BytesIO()
+    image.save(output, format="PNG")
+    return output.getvalue()
+
+# ---------------------------------------------------------------------------
+# Render cache
+
+class RenderCache:
+    """
+    Two-tier cache of rendered images.
+
+    Keys are content addresses (see make_key), so entries never go stale; the
+    disk tier is trimmed oldest-first past `max_disk_entries`. Trimming walks
+    the whole cache directory, so it runs on the first write and then every
+    `trim_every` writes.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = DEFAULT_RENDER_DIR, max_memory_entries: int = 64,
+                 max_disk_entries: int = 1000, trim_every: int = 50):
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.trim_every = max(1, trim_every)
+        self._writes_since_trim = self.trim_every
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "renders": 0}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(mermaid_code: str, fmt: str, theme: str = "default", scale: float = 1.0) -> str:
+        """Content address of a render: source, theme, format, scale and renderer version"""
+        material = json.dumps([RENDERER_VERSION, fmt, theme, round(float(scale), 3), mermaid_code.strip()])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached image for `key`, or None"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return data
+        data = self._read_disk(key)
+        with self._lock:
+            if data is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._remember(key, data)
+        return data
+
+    def put(self, key: str, data: bytes):
+        """Store an image in both tiers"""
+        with self._lock:
+            self._remember(key, data)
+            self._stats["renders"] += 1
+            self._writes_since_trim += 1
+            trim = self._writes_since_trim >= self.trim_every
+            if trim:
+                self._writes_since_trim = 0
+        if self.cache_dir:
+            self._write_disk(key, data)
+            if trim:
+                self._trim_disk()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the number of images held in memory"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        return stats
+
+    def _remember(self, key: str, data: bytes):
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, data: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial image
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error writing render cache entry: {str(e)}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def _trim_disk(self):
+        files = []
+        for shard in os.listdir(self.cache_dir):
+            shard_dir = os.path.join(self.cache_dir, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in os.listdir(shard_dir):
+                path = os.path.join(shard_dir, name)
+                try:
+                    files.append((os.path.getmtime(path), path))
+                except OSError:
+                    continue
+        files.sort()
+        for _, path in files[:max(0, len(files) - self.max_disk_entries)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+_default_cache: Optional[RenderCache] = None
+_default_cache_lock = threading.Lock()
+
+def get_render_cache() -> RenderCache:
+    """Return the process-wide render cache"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = RenderCache()
+        return _default_cache
+
+# ---------------------------------------------------------------------------
+# Public API
+
+def render_diagram(mermaid_code: str, fmt: str = "svg", theme: str = "default", scale: float = 2.0,
+                   cache: Optional[RenderCache] = None) -> bytes:
+    """
+    Render Mermaid code to an image, using the render cache.
+
+    Args:
+        mermaid_code: Mermaid source
+        fmt: "svg" or "png"
+        theme: One of THEMES
+        scale: Pixel density of PNG output (ignored for SVG)
+        cache: Render cache (defaults to the process-wide one)
+
+    Returns:
+        SVG (UTF-8) or PNG bytes
+
+    Raises:
+        RenderError: If the diagram type, format or theme isn't supported
+    """
+    if fmt not in FORMATS:
+        raise RenderError(f"Unknown image format '{fmt}'; expected one of {', '.join(FORMATS)}")
+    if theme not in THEMES:
+        raise RenderError(f"Unknown theme '{theme}'; expected one of {', '.join(THEMES)}")
+    cache = cache or get_render_cache()
+    key = RenderCache.make_key(mermaid_code, fmt, theme, scale if fmt == "png" else 1.0)
+    with span("render.diagram", format=fmt) as render_span:
+        data = cache.get(key)
+        render_span.set("cache_hit", data is not None)
+        if data is not None:
+            return data
+        width, height, shapes = layout_diagram(parse_diagram(mermaid_code), theme)
+        if fmt == "svg":
+            data = _to_svg(width, height, shapes, THEMES[theme]).encode("utf-8")
+        else:
+            data = _to_png(width, height, shapes, THEMES[theme], scale)
+        cache.put(key, data)
+        return data
+
+def render_svg(mermaid_code: str, theme: str = "default", cache: Optional[RenderCache] = None) -> str:
+    """Render Mermaid code to an SVG document"""
+    return render_diagram(mermaid_code, "svg", theme, cache=cache).decode("utf-8")
+
+def render_png(mermaid_code: str, theme: str = "default", scale: float = 2.0,
+               cache: Optional[RenderCache] = None) -> bytes:
+    """Render Mermaid code to PNG bytes (needs Pillow)"""
+    return render_diagram(mermaid_code, "png", theme, scale, cache)
+
+def save_diagram(mermaid_code: str, path: str, theme: str = "default", cache: Optional[RenderCache] = None) -> str:
+    """
+    Render Mermaid code to a file; the format follows the extension (.svg or .png).
+
+    Returns:
+        The path written
+    """
+    fmt = os.path.splitext(path)[1].lstrip(".").lower()
+    data = render_diagram(mermaid_code, fmt, theme, cache=cache)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
@@ -0,0 +1,171 @@
+"""
+Lightweight execution engine that calls the model directly instead of through CrewAI.
+
+Our two agents never delegate and run a single task each, so CrewAI adds
+nothing but import time, console logging and its own role/goal/backstory
+framing on every prompt. This engine sends the same system and task prompts
+straight to Ollama through model_api and returns the same results as
+crew_orchestration, so callers can switch with a flag:
+
+    from direct_engine import run_direct_task
+    result = run_direct_task("A todo app", "Class")   # same contract as run_crew_task
+
+It only imports model_api and the prompt, extraction and repair modules, so
+CrewAI is never loaded. arun_multi_direct_task() is the asyncio counterpart
+used by the HTTP service; it builds the same prompts and finishes diagrams
+the same way, but sends the calls through async_model_api.
+"""
+
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from artifact_store import capture_debug
+from mermaid_extraction import extract_mermaid_code
+from mermaid_repair import arepair_mermaid, async_model_regenerator, model_regenerator, repair_mermaid
+from model_api import call_model_with_system
+from prompts import SDLC_SYSTEM_PROMPT, build_sdlc_task_prompt, build_uml_task_prompt, mermaid_system_prompt
+from tracing import span, traced
+
+def _run_all(calls: List[Callable[[], Any]], parallel: bool) -> List[Any]:
+    """Run the calls concurrently (or one at a time) and return their results in order"""
+    with ThreadPoolExecutor(max_workers=len(calls) if parallel else 1) as executor:
+        # Run each call in a copy of the caller's context so its span nests under ours
+        futures = [executor.submit(contextvars.copy_context().run, call) for call in calls]
+        return [future.result() for future in futures]
+
+def _sdlc_prompts(product_description: str) -> Tuple[str, str]:
+    return SDLC_SYSTEM_PROMPT, build_sdlc_task_prompt(product_description)
+
+def _mermaid_prompts(product_description: str, diagram_type: str) -> Tuple[str, str]:
+    return mermaid_system_prompt(diagram_type), build_uml_task_prompt(product_description, diagram_type)
+
+def _multi_result(diagram_types: List[str], outputs: List[Optional[str]]) -> Optional[Dict[str, Any]]:
+    if not all(outputs):
+        return None
+    return {
+        "sdlc_recommendation": outputs[0],
+        "diagrams": dict(zip(diagram_types, outputs[1:]))
+    }
+
+def _sdlc_call(product_description: str, call_options: Dict[str, Any]) -> Callable[[], Optional[str]]:
+    def call() -> Optional[str]:
+        with span("direct.task", role="SDLC Advisor"):
+            output = call_model_with_system(*_sdlc_prompts(product_description), **call_options)
+        capture_debug("model_output/sdlc", output)
+        return output
+    return call
+
+def _mermaid_call(product_description: str, diagram_type: str, call_options: Dict[str, Any],
+                  model_options: Optional[Dict[str, Any]]) -> Callable[[], Optional[str]]:
+    def call() -> Optional[str]:
+        with span("direct.task", role="UML Generator", diagram_type=diagram_type):
+            output = call_model_with_system(*_mermaid_prompts(product_description, diagram_type), **call_options)
+        capture_debug(f"model_output/{diagram_type}", output)
+        if not output:
+            return None
+        regenerate = model_regenerator(model_options, diagram_type, temperature=call_options["temperature"],
+                                       max_tokens=call_options["max_tokens"])
+        return repair_mermaid(extract_mermaid_code(output), diagram_type, regenerate)["code"]
+    return call
+
+@traced("direct.run_task")
+def run_direct_task(product_description: str, diagram_type: str,
+                    temperature: float = 0.7, max_tokens: int = 2000,
+                    parallel: bool = True,
+                    model_options: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, str]]:
+    """
+    Get an SDLC recommendation and Mermaid code without CrewAI
+
+    Args:
+        product_description: Description of the software product
+        diagram_type: Type of UML diagram to generate
+        temperature: Temperature for model generation
+        max_tokens: Maximum tokens to generate
+        parallel: Run the SDLC and UML calls concurrently
+        model_options: Extra Ollama settings (num_ctx, stop, keep_alive)
+
+    Returns:
+        Dictionary with sdlc_recommendation and mermaid_code, or None if failed
+    """
+    result = run_multi_direct_task(product_description, [diagram_type], temperature=temperature,
+                                   max_tokens=max_tokens, parallel=parallel, model_options=model_options)
+    if not result:
+        return None
+    return {
+        "sdlc_recommendation": result["sdlc_recommendation"],
+        "mermaid_code": result["diagrams"][diagram_type]
+    }
+
+@traced("direct.run_multi")
+def run_multi_direct_task(product_description: str, diagram_types: List[str],
+                          temperature: float = 0.7, max_tokens: int = 2000,
+                          parallel: bool = True,
+                          model_options: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Get one SDLC recommendation and several diagrams without CrewAI
+
+    Same contract as crew_orchestration.run_multi_diagram_task: one model call
+    for the SDLC advice and one per diagram type, concurrently unless
+    parallel=False, with invalid Mermaid code repaired before it is returned.
+
+    Returns:
+        Dictionary with sdlc_recommendation and diagrams (diagram type -> Mermaid code),
+        or None if failed
+    """
+    # Drop duplicates but keep the caller's order
+    diagram_types = list(dict.fromkeys(diagram_types))
+    call_options = dict(temperature=temperature, max_tokens=max_tokens, **(model_options or {}))
+    try:
+        outputs = _run_all(
+            [_sdlc_call(product_description, call_options)]
+            + [_mermaid_call(product_description, diagram_type, call_options, model_options)
+               for diagram_type in diagram_types],
+            parallel
+        )
+    except Exception as e:
+        print(f"Error in direct task: {str(e)}")
+        return None
+    return _multi_result(diagram_types, outputs)
+
+async def arun_multi_direct_task(product_description: str, diagram_types: List[str],
+                                 temperature: float = 0.7, max_tokens: int = 2000,
+                                 model_options: Optional[Dict[str, Any]] = None,
+                                 model: str = "qwen2.5:3b",
+                                 api_base: str = "http://localhost:11434") -> Optional[Dict[str, Any]]:
+    """
+    Async counterpart of run_multi_direct_task for callers on an event loop
+
+    All model calls go through async_model_api, so they share its session and
+    concurrency limit, including the prompts that repair invalid Mermaid code.
+
+    Returns:
+        Dictionary with sdlc_recommendation and diagrams, or None if failed
+    """
+    from async_model_api import acall_model_with_system
+
+    diagram_types = list(dict.fromkeys(diagram_types))
+    call_options = dict(model=model, api_base=api_base, temperature=temperature, max_tokens=max_tokens,
+                        **(model_options or {}))
+
+    async def sdlc_call() -> Optional[str]:
+        with span("direct.task", role="SDLC Advisor"):
+            output = await acall_model_with_system(*_sdlc_prompts(product_description), **call_options)
+        capture_debug("model_output/sdlc", output)
+        return output
+
+    async def mermaid_call(diagram_type: str) -> Optional[str]:
+        with span("direct.task", role="UML Generator", diagram_type=diagram_type):
+            output = await acall_model_with_system(*_mermaid_prompts(product_description, diagram_type),
+                                                   **call_options)
+        capture_debug(f"model_output/{diagram_type}", output)
+        if not output:
+            return None
+        regenerate = async_model_regenerator(model_options, diagram_type, model=model, api_base=api_base,
+                                             temperature=temperature, max_tokens=max_tokens)
+        return (await arepair_mermaid(extract_mermaid_code(output), diagram_type, regenerate))["code"]
+
+    with span("direct.arun_multi"):
+        outputs = await asyncio.gather(sdlc_call(), *(mermaid_call(t) for t in diagram_types))
+    return _multi_result(diagram_types, outputs)
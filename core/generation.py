@@ -0,0 +1,245 @@
+"""
+Cache-aware entry points for generating SDLC advice and diagrams.
+
+Two engines produce the same results: "crew" runs the CrewAI agents and
+"direct" (direct_engine) sends the same prompts straight to the model. CrewAI
+is imported only when the crew engine has to run on a cache miss, so cached
+requests and the direct engine never pay its import cost.
+"""
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+import http_session
+import tracing
+from artifact_store import capture_debug, get_artifact_store, request_scope
+from mermaid_extraction import extract_mermaid_code
+from mermaid_repair import repair_mermaid, model_regenerator
+from prompt_prefix import get_prefix_tracker
+from response_cache import ResponseCache, get_default_cache
+
+ENGINES = ("crew", "direct")
+DEFAULT_ENGINE = "crew"
+
+# The model both engines run unless told otherwise; part of every cache key
+DEFAULT_MODEL = "qwen2.5:3b"
+
+TaskFunction = Callable[..., Optional[Dict[str, Any]]]
+
+def engine_functions(engine: str) -> Tuple[TaskFunction, TaskFunction]:
+    """
+    Return the (single diagram, multi diagram) task functions of an engine.
+
+    Both engines take the same arguments and return the same dictionaries as
+    run_crew_task and run_multi_diagram_task.
+    """
+    if engine == "crew":
+        from crew_orchestration import run_crew_task, run_multi_diagram_task
+        return run_crew_task, run_multi_diagram_task
+    if engine == "direct":
+        from direct_engine import run_direct_task, run_multi_direct_task
+        return run_direct_task, run_multi_direct_task
+    raise ValueError(f"Unknown engine '{engine}', expected one of {', '.join(ENGINES)}")
+
+def _cache_key(description: str, diagram_type: str, model: str, temperature: float, max_tokens: int,
+               model_options: Optional[Dict[str, Any]]) -> str:
+    return ResponseCache.make_key(description, diagram_type, model=model, temperature=temperature,
+                                  max_tokens=max_tokens, model_options=model_options)
+
+def generate_cached(description: str, diagram_type: str, temperature: float = 0.7,
+                    max_tokens: int = 2000, parallel: bool = True, use_cache: bool = True,
+                    cache: Optional[ResponseCache] = None,
+                    model_options: Optional[Dict[str, Any]] = None,
+                    engine: str = DEFAULT_ENGINE) -> Optional[Dict[str, str]]:
+    """Return a cached result for the request, or run the engine and cache its result"""
+    cache = cache or get_default_cache()
+    key = _cache_key(description, diagram_type, DEFAULT_MODEL, temperature, max_tokens, model_options)
+    result = cache.get(key) if use_cache else None
+    if result:
+        return result
+
+    run_task, _ = engine_functions(engine)
+    result = run_task(description, diagram_type, temperature=temperature,
+                      max_tokens=max_tokens, parallel=parallel, model_options=model_options)
+    if result and "sdlc_recommendation" in result and "mermaid_code" in result:
+        cache.put(key, result)
+    return result
+
+def get_cached_multi(description: str, diagram_types: List[str], temperature: float = 0.7,
+                     max_tokens: int = 2000, cache: Optional[ResponseCache] = None,
+                     model_options: Optional[Dict[str, Any]] = None,
+                     model: str = DEFAULT_MODEL) -> Optional[Dict[str, Any]]:
+    """
+    Assemble a multi-diagram result from the cache.
+
+    Returns:
+        Dictionary with sdlc_recommendation and diagrams, or None unless every
+        requested diagram type is cached
+    """
+    cache = cache or get_default_cache()
+    sdlc_recommendation = None
+    diagrams = {}
+    for diagram_type in diagram_types:
+        key = _cache_key(description, diagram_type, model, temperature, max_tokens, model_options)
+        cached = cache.get(key)
+        if not cached:
+            return None
+        sdlc_recommendation = sdlc_recommendation or cached["sdlc_recommendation"]
+        diagrams[diagram_type] = cached["mermaid_code"]
+    return {"sdlc_recommendation": sdlc_recommendation, "diagrams": diagrams}
+
+def store_multi(description: str, result: Dict[str, Any], temperature: float = 0.7,
+                max_tokens: int = 2000, cache: Optional[ResponseCache] = None,
+                model_options: Optional[Dict[str, Any]] = None, model: str = DEFAULT_MODEL):
+    """Cache each diagram of a multi-diagram result as its own single-diagram entry"""
+    cache = cache or get_default_cache()
+    for diagram_type, mermaid_code in result["diagrams"].items():
+        key = _cache_key(description, diagram_type, model, temperature, max_tokens, model_options)
+        cache.put(key, {"sdlc_recommendation": result["sdlc_recommendation"], "mermaid_code": mermaid_code})
+
+def generate_multi_cached(description: str, diagram_types: List[str], temperature: float = 0.7,
+                          max_tokens: int = 2000, parallel: bool = True, use_cache: bool = True,
+                          cache: Optional[ResponseCache] = None,
+                          model_options: Optional[Dict[str, Any]] = None,
+                          engine: str = DEFAULT_ENGINE) -> Optional[Dict[str, Any]]:
+    """
+    Return one SDLC recommendation and a diagram per requested type.
+
+    Served from the cache when every type is cached; otherwise the SDLC advice
+    is computed once and all diagrams are generated concurrently by the given
+    engine ("crew" or "direct").
+
+    Returns:
+        Dictionary with sdlc_recommendation and diagrams (diagram type -> Mermaid code),
+        or None if failed
+    """
+    cache = cache or get_default_cache()
+    with tracing.span("generation.multi", diagram_types=len(diagram_types), engine=engine) as generation_span:
+        if use_cache:
+            with tracing.span("cache.lookup"):
+                result = get_cached_multi(description, diagram_types, temperature, max_tokens, cache, model_options)
+            generation_span.set("cache_hit", bool(result))
+            if result:
+                return result
+
+        _, run_multi_task = engine_functions(engine)
+        result = run_multi_task(description, diagram_types, temperature=temperature,
+                                max_tokens=max_tokens, parallel=parallel, model_options=model_options)
+        if result:
+            store_multi(description, result, temperature, max_tokens, cache, model_options)
+        return result
+
+def generation_job(job, description: str, diagram_types: List[str], temperature: float = 0.7,
+                   max_tokens: int = 2000, stream: bool = True,
+                   model_options: Optional[Dict[str, Any]] = None,
+                   engine: str = DEFAULT_ENGINE) -> Optional[Dict[str, Any]]:
+    """
+    Job body for jobs.JobQueue: generate (or fetch from the cache) one SDLC
+    recommendation and the requested diagrams.
+
+    With stream=True the model is called directly, the SDLC advice and every
+    diagram concurrently; the text so far is published through job.report()
+    as it arrives, and cancellation is honoured between chunks. Otherwise the
+    given engine runs and only its final result is reported.
+
+    The result is also kept in the artifact store under the job id, as the
+    latest request of the job's owner.
+
+    Returns:
+        Dictionary with sdlc_recommendation, diagrams, cache_hit and (when
+        streamed) time_to_first_token, or None if generation failed or was cancelled
+    """
+    with request_scope(job.id):
+        result = _run_generation(job, description, diagram_types, temperature, max_tokens, stream,
+                                 model_options, engine)
+    if result:
+        store = get_artifact_store()
+        store.put(job.id, "sdlc_recommendation", result["sdlc_recommendation"], owner=job.owner)
+        for diagram_type, mermaid_code in result["diagrams"].items():
+            store.put(job.id, f"mermaid/{diagram_type}", mermaid_code, owner=job.owner)
+    return result
+
+def _run_generation(job, description: str, diagram_types: List[str], temperature: float, max_tokens: int,
+                    stream: bool, model_options: Optional[Dict[str, Any]],
+                    engine: str = DEFAULT_ENGINE) -> Optional[Dict[str, Any]]:
+    job.set_progress("Checking the response cache...")
+    result = get_cached_multi(description, diagram_types, temperature, max_tokens, model_options=model_options)
+    if result:
+        return dict(result, cache_hit=True)
+
+    if stream:
+        from streaming import stream_sdlc_recommendation, stream_with_timing
+        timing = {}
+        job.set_progress("Determining the best development methodology and drafting your diagrams...")
+        # The diagrams stream on worker threads while the SDLC advice streams
+        # here, so the request is no slower than the engines' concurrent calls
+        with ThreadPoolExecutor(max_workers=max(1, len(diagram_types))) as executor:
+            futures = {
+                diagram_type: executor.submit(contextvars.copy_context().run, _stream_diagram, job, description,
+                                              diagram_type, temperature, max_tokens, model_options)
+                for diagram_type in diagram_types
+            }
+            sdlc_text = ""
+            for chunk in stream_with_timing(
+                stream_sdlc_recommendation(description, temperature, max_tokens, model_options), timing
+            ):
+                if job.cancelled:
+                    return None
+                sdlc_text += chunk
+                job.report(sdlc_text)
+            capture_debug("model_output/sdlc", sdlc_text)
+            diagrams = {diagram_type: future.result() for diagram_type, future in futures.items()}
+
+        if job.cancelled or not sdlc_text or not all(diagrams.values()):
+            return None
+        result = {"sdlc_recommendation": sdlc_text, "diagrams": diagrams}
+    else:
+        _, run_multi_task = engine_functions(engine)
+        job.set_progress("The SDLC advisor and diagram generators are working on your request...")
+        result = run_multi_task(description, diagram_types, temperature=temperature,
+                                max_tokens=max_tokens, model_options=model_options)
+        if not result:
+            return None
+        timing = {}
+
+    store_multi(description, result, temperature, max_tokens, model_options=model_options)
+    result = dict(result, cache_hit=False)
+    if "time_to_first_token" in timing:
+        result["time_to_first_token"] = timing["time_to_first_token"]
+    return result
+
+def _stream_diagram(job, description: str, diagram_type: str, temperature: float, max_tokens: int,
+                    model_options: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Stream one diagram into job.report() and return its repaired Mermaid code"""
+    from streaming import stream_mermaid_code
+    mermaid_text = ""
+    for chunk in stream_mermaid_code(description, diagram_type, temperature, max_tokens, model_options):
+        if job.cancelled:
+            return None
+        mermaid_text += chunk
+        job.report(mermaid_text, diagram_type)
+    capture_debug(f"model_output/{diagram_type}", mermaid_text)
+    if not mermaid_text:
+        return None
+    job.set_progress(f"Checking the {diagram_type} diagram...")
+    return repair_mermaid(
+        extract_mermaid_code(mermaid_text), diagram_type,
+        model_regenerator(model_options, diagram_type, temperature=temperature, max_tokens=max_tokens)
+    )["code"]
+
+def register_pipeline_gauges(cache: Optional[ResponseCache] = None):
+    """Export response cache, HTTP pool and prompt prefix reuse figures on the /metrics endpoint"""
+    cache = cache or get_default_cache()
+    tracing.register_gauge("cache_hit_ratio", "Share of response cache lookups that hit",
+                           lambda: cache.stats()["hit_rate"])
+    tracing.register_gauge("cache_memory_entries", "Entries in the in-memory response cache",
+                           lambda: cache.stats()["memory_entries"])
+    tracing.register_gauge("http_requests_total", "Requests sent through the shared HTTP pool",
+                           lambda: http_session.pool_stats()["requests"])
+    tracing.register_gauge("prompt_prefix_hit_ratio", "Share of model calls that reused a cached prompt prefix",
+                           lambda: get_prefix_tracker().stats()["hit_rate"])
+    tracing.register_gauge("prompt_prefix_reused_tokens", "Estimated prompt tokens served from Ollama's KV cache",
+                           lambda: get_prefix_tracker().stats()["reused_tokens"])
+    tracing.register_gauge("prompt_eval_saved_seconds", "Estimated prompt evaluation time saved by prefix reuse",
+                           lambda: get_prefix_tracker().stats()["saved_seconds"])
@@ -0,0 +1,160 @@
+import threading
+from typing import TYPE_CHECKING, Dict, Any, Optional, Tuple
+
+# requests is imported with the first session, so importing this module (for
+# example on a cached CLI run) doesn't pay for it
+if TYPE_CHECKING:
+    import requests
+
+# Default pool configuration for talking to Ollama.
+# The read timeout is generous because a long generation on a small local
+# machine can easily take a few minutes.
+DEFAULT_POOL_CONFIG = {
+    "pool_connections": 4,     # number of distinct hosts kept in the pool
+    "pool_maxsize": 8,         # max keep-alive connections per host
+    "pool_block": False,       # open extra connections instead of blocking when the pool is full
+    "max_retries": 0,          # retries are handled by callers, not silently here
+    "connect_timeout": 5.0,
+    "read_timeout": 300.0,
+}
+
+_lock = threading.Lock()
+_session: Optional["requests.Session"] = None
+_config: Dict[str, Any] = dict(DEFAULT_POOL_CONFIG)
+_stats = {
+    "requests": 0,
+    "errors": 0,
+    "sessions_created": 0,
+}
+
+def configure_session(**overrides) -> Dict[str, Any]:
+    """
+    Update the shared HTTP pool configuration.
+
+    The current session is closed and a new one is built lazily on the next
+    call to get_session(), so this is safe to call at startup or between runs.
+
+    Args:
+        **overrides: Any key from DEFAULT_POOL_CONFIG
+
+    Returns:
+        The effective configuration
+    """
+    global _session
+    unknown = set(overrides) - set(DEFAULT_POOL_CONFIG)
+    if unknown:
+        raise ValueError(f"Unknown pool option(s): {', '.join(sorted(unknown))}")
+
+    with _lock:
+        _config.update(overrides)
+        if _session is not None:
+            _session.close()
+            _session = None
+        return dict(_config)
+
+def get_session() -> "requests.Session":
+    """
+    Return the process-wide keep-alive session, creating it on first use.
+
+    Returns:
+        A requests.Session with a sized connection pool mounted for http and https
+    """
+    global _session
+    if _session is not None:
+        return _session
+
+    with _lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=_config["pool_connections"],
+                pool_maxsize=_config["pool_maxsize"],
+                pool_block=_config["pool_block"],
+                max_retries=_config["max_retries"],
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({"Connection": "keep-alive"})
+            _session = session
+            _stats["sessions_created"] += 1
+        return _session
+
+def get_timeout() -> Tuple[float, float]:
+    """Return the (connect, read) timeout tuple for requests calls"""
+    return (_config["connect_timeout"], _config["read_timeout"])
+
+def post(url: str, **kwargs) -> "requests.Response":
+    """
+    POST through the shared session, applying the default timeouts.
+
+    Args:
+        url: Target URL
+        **kwargs: Passed through to requests.Session.post
+
+    Returns:
+        The response object
+    """
+    kwargs.setdefault("timeout", get_timeout())
+    try:
+        response = get_session().post(url, **kwargs)
+    except Exception:
+        _record(error=True)
+        raise
+    _record(error=False)
+    return response
+
+def get(url: str, **kwargs) -> "requests.Response":
+    """GET through the shared session, applying the default timeouts."""
+    kwargs.setdefault("timeout", get_timeout())
+    try:
+        response = get_session().get(url, **kwargs)
+    except Exception:
+        _record(error=True)
+        raise
+    _record(error=False)
+    return response
+
+def _record(error: bool):
+    with _lock:
+        _stats["requests"] += 1
+        if error:
+            _stats["errors"] += 1
+
+def pool_stats() -> Dict[str, Any]:
+    """
+    Report connection pool statistics so the pool can be sized.
+
+    Returns:
+        Dictionary with request counters, the configuration, and per-host
+        pool details (open connections, idle connections, requests served)
+    """
+    with _lock:
+        stats = dict(_stats)
+        stats["config"] = dict(_config)
+        hosts = []
+        if _session is not None:
+            adapter = _session.get_adapter("http://")
+            # urllib3 keeps one HTTPConnectionPool per (scheme, host, port)
+            for key in list(adapter.poolmanager.pools.keys()):
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is None:
+                    continue
+                hosts.append({
+                    "host": f"{pool.scheme}://{pool.host}:{pool.port}",
+                    "connections_opened": pool.num_connections,
+                    "requests_served": pool.num_requests,
+                    "idle_connections": pool.pool.qsize() if pool.pool is not None else 0,
+                    "maxsize": pool.pool.maxsize if pool.pool is not None else 0,
+                })
+        stats["hosts"] = hosts
+        return stats
+
+def close_session():
+    """Close the shared session and drop all pooled connections"""
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,303 @@
+"""
+Background job queue for generations.
+
+Long-running work is submitted with JobQueue.submit(), which returns a job id
+immediately; a small pool of worker threads runs the jobs and callers poll
+JobQueue.status() for progress, partial output and the final result.
+
+The queue is bounded, and a free worker always takes the next job of the
+owner (e.g. a Streamlit session) with the fewest jobs already running, so one
+user submitting many jobs can't starve the others. Queued jobs can be
+cancelled outright; running jobs are asked to stop and should check
+Job.cancelled between steps.
+"""
+
+import itertools
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINISHED_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+class QueueFullError(RuntimeError):
+    """Raised when the queue, or the owner's share of it, is already full"""
+
+class Job:
+    """One unit of background work and everything a poller needs to know about it"""
+
+    def __init__(self, owner: str, fn: Callable, args: tuple, kwargs: Dict[str, Any], sequence: int):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.sequence = sequence
+        self.status = JOB_QUEUED
+        self.progress = ""
+        self.partial: Dict[str, Any] = {}
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        """True once cancellation was requested; long-running jobs should check this"""
+        return self._cancel.is_set()
+
+    def set_progress(self, message: str):
+        """Publish a human-readable progress message"""
+        self.progress = message
+
+    def report(self, text: str, diagram_type: Optional[str] = None):
+        """
+        Publish partial output.
+
+        Args:
+            text: Output so far (replaces the previous partial text)
+            diagram_type: Diagram the text belongs to; None for the SDLC recommendation
+        """
+        with self._lock:
+            if diagram_type is None:
+                self.partial["sdlc_recommendation"] = text
+            else:
+                self.partial.setdefault("diagrams", {})[diagram_type] = text
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a copy of the job's state that is safe to hand to another thread"""
+        with self._lock:
+            partial = dict(self.partial)
+            if "diagrams" in partial:
+                partial["diagrams"] = dict(partial["diagrams"])
+        return {
+            "id": self.id,
+            "owner": self.owner,
+            "status": self.status,
+            "progress": self.progress,
+            "partial": partial,
+            "result": self.result,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+class JobQueue:
+    """
+    Bounded, per-owner fair job queue served by a pool of worker threads.
+
+    Jobs are callables invoked as fn(job, *args, **kwargs); whatever they return
+    becomes the job result and an exception marks the job as failed.
+    """
+
+    def __init__(self, workers: int = 2, max_depth: int = 32, max_per_owner: int = 4,
+                 retention_seconds: float = 3600):
+        if workers < 1:
+            raise ValueError("A job queue needs at least one worker")
+        self.max_depth = max_depth
+        self.max_per_owner = max_per_owner
+        self.retention_seconds = retention_seconds
+        self._jobs: Dict[str, Job] = {}
+        self._pending: "OrderedDict[str, Deque[Job]]" = OrderedDict()
+        self._depth = 0
+        self._running: Dict[str, int] = {}
+        self._last_served: Dict[str, int] = {}
+        self._dispatches = itertools.count()
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._stats = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0, "cancelled": 0}
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, owner: str, fn: Callable, *args, **kwargs) -> str:
+        """
+        Queue a job and return its id.
+
+        Raises:
+            QueueFullError: If the queue is at max_depth or the owner already has
+                max_per_owner jobs queued or running
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Job queue is shut down")
+            self._prune()
+            if self._depth >= self.max_depth:
+                self._stats["rejected"] += 1
+                raise QueueFullError(f"Job queue is full ({self.max_depth} jobs waiting)")
+            active = sum(1 for job in self._jobs.values()
+                         if job.owner == owner and job.status in (JOB_QUEUED, JOB_RUNNING))
+            if active >= self.max_per_owner:
+                self._stats["rejected"] += 1
+                raise QueueFullError(f"Too many jobs in progress for this user ({active})")
+
+            job = Job(owner, fn, args, kwargs, next(self._sequence))
+            self._jobs[job.id] = job
+            self._pending.setdefault(owner, deque()).append(job)
+            self._depth += 1
+            self._stats["submitted"] += 1
+            self._condition.notify()
+            return job.id
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return the job object, or None if it is unknown or expired"""
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return a snapshot of the job, or None if it is unknown or expired.
+
+        Queued jobs also carry 'queued_ahead', the number of waiting jobs that
+        were submitted before them.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return None
+        snapshot = job.snapshot()
+        if snapshot["status"] == JOB_QUEUED:
+            with self._condition:
+                snapshot["queued_ahead"] = sum(
+                    1 for jobs in self._pending.values() for other in jobs if other.sequence < job.sequence
+                )
+        return snapshot
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job.
+
+        A queued job is dropped immediately; a running job is flagged and ends
+        as cancelled once it returns. Returns False if the job was unknown or
+        already finished.
+        """
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                return False
+            job._cancel.set()
+            if job.status == JOB_QUEUED:
+                jobs = self._pending.get(job.owner)
+                if jobs and job in jobs:
+                    jobs.remove(job)
+                    self._depth -= 1
+                    if not jobs:
+                        del self._pending[job.owner]
+                self._finish(job, JOB_CANCELLED)
+            return True
+
+    def list_jobs(self, owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Snapshots of known jobs, oldest first, optionally for one owner"""
+        with self._condition:
+            jobs = sorted(self._jobs.values(), key=lambda job: job.sequence)
+        return [job.snapshot() for job in jobs if owner is None or job.owner == owner]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth, running count and lifetime counters"""
+        with self._condition:
+            stats = dict(self._stats)
+            stats["queued"] = self._depth
+            stats["running"] = sum(1 for job in self._jobs.values() if job.status == JOB_RUNNING)
+            stats["owners_waiting"] = len(self._pending)
+            stats["workers"] = len(self._workers)
+        return stats
+
+    def shutdown(self, wait: bool = True):
+        """Cancel queued jobs and stop the workers once running jobs return"""
+        with self._condition:
+            self._closed = True
+            for jobs in self._pending.values():
+                for job in jobs:
+                    job._cancel.set()
+                    self._finish(job, JOB_CANCELLED)
+            self._pending.clear()
+            self._depth = 0
+            self._condition.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+    def _next_job(self) -> Optional[Job]:
+        # Fairness: the owner with the fewest jobs already running goes next,
+        # then whoever was served longest ago, then whoever has waited longest
+        with self._condition:
+            while not self._pending and not self._closed:
+                self._condition.wait()
+            if self._closed:
+                return None
+            owner = min(self._pending, key=lambda name: (
+                self._running.get(name, 0), self._last_served.get(name, -1), self._pending[name][0].sequence
+            ))
+            self._last_served[owner] = next(self._dispatches)
+            jobs = self._pending[owner]
+            job = jobs.popleft()
+            if not jobs:
+                del self._pending[owner]
+            self._depth -= 1
+            self._running[owner] = self._running.get(owner, 0) + 1
+            job.status = JOB_RUNNING
+            job.started_at = time.time()
+            return job
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                result = job.fn(job, *job.args, **job.kwargs)
+            except Exception as e:
+                print(f"Error in background job {job.id}: {str(e)}")
+                with self._condition:
+                    job.error = str(e)
+                    self._finish(job, JOB_CANCELLED if job.cancelled else JOB_FAILED)
+                continue
+            with self._condition:
+                if job.cancelled:
+                    self._finish(job, JOB_CANCELLED)
+                else:
+                    job.result = result
+                    self._finish(job, JOB_DONE)
+
+    def _finish(self, job: Job, status: str):
+        if job.status == JOB_RUNNING:
+            self._running[job.owner] -= 1
+            if not self._running[job.owner]:
+                del self._running[job.owner]
+                if job.owner not in self._pending:
+                    self._last_served.pop(job.owner, None)
+        job.status = status
+        job.finished_at = time.time()
+        job.fn, job.args, job.kwargs = None, (), {}
+        self._stats[{JOB_DONE: "completed", JOB_FAILED: "failed", JOB_CANCELLED: "cancelled"}[status]] += 1
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.status in FINISHED_STATES and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+_job_queue: Optional[JobQueue] = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue() -> JobQueue:
+    """Return the process-wide job queue, starting its workers on first use"""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+        return _job_queue
@@ -6,14 +6,15 @@ Using locally installed Qwen 2.5:3B model via Ollama
 """
 
 import argparse
+import functools
 import json
 import os
-from PIL import Image
 
-# Import local modules
-from claude.core.model_api import call_model
-from claude.core.crew_orchestration import run_crew_task
-from diagram_renderer import generate_plantuml_url, render_diagram
+# Import local modules (crew_orchestration is imported on a cache miss only,
+# so cached answers and --engine direct never load CrewAI; batch mode, image
+# rendering and the HTTP client are imported when first needed)
+from generation import DEFAULT_ENGINE, ENGINES, generate_multi_cached, register_pipeline_gauges
+import tracing
 
 def parse_arguments():
     """Parse command line arguments"""
@@ -24,16 +25,30 @@ def parse_arguments():
     parser.add_argument(
         "--description", "-d",
         type=str, 
-        required=True,
-        help="Software product description"
+        help="Software product description (required unless --batch is given)"
+    )
+    
+    parser.add_argument(
+        "--batch", "-b",
+        type=str,
+        metavar="FILE",
+        help="Generate for every description in a JSONL or CSV file ('-' reads stdin); "
+             "results go to per-item folders under --output-dir plus results.jsonl"
+    )
+    
+    parser.add_argument(
+        "--workers", "-w",
+        type=int,
+        default=2,
+        help="Number of concurrent generations in batch mode (default: 2)"
     )
     
     parser.add_argument(
         "--diagram-type", "-t",
         type=str,
+        action="append",
         choices=["Use Case", "Class", "Sequence", "Component", "Communication", "State Machine"],
-        default="Class",
-        help="UML diagram type (default: Class)"
+        help="UML diagram type; repeat to generate several diagrams in one pass (default: Class)"
     )
     
     parser.add_argument(
@@ -49,6 +64,20 @@ def parse_arguments():
         help="Save the rendered diagram image"
     )
     
+    parser.add_argument(
+        "--image-format",
+        choices=["svg", "png"],
+        default="svg",
+        help="Format of saved diagram images; png needs Pillow (default: svg)"
+    )
+    
+    parser.add_argument(
+        "--theme",
+        choices=["default", "neutral", "dark"],
+        default="default",
+        help="Color theme of saved diagram images (default: default)"
+    )
+    
     parser.add_argument(
         "--temperature", 
         type=float,
@@ -63,52 +92,202 @@ def parse_arguments():
         help="Maximum tokens to generate (default: 2000)"
     )
     
-    return parser.parse_args()
+    parser.add_argument(
+        "--num-ctx",
+        type=int,
+        help="Context window size in tokens (default: the model's setting in Ollama)"
+    )
+    
+    parser.add_argument(
+        "--stop",
+        action="append",
+        metavar="SEQUENCE",
+        help="Stop sequence; repeat for several"
+    )
+    
+    parser.add_argument(
+        "--keep-alive",
+        type=str,
+        help="How long Ollama keeps the model loaded after a request, e.g. '10m' or '-1'"
+    )
+    
+    parser.add_argument(
+        "--show-options",
+        action="store_true",
+        help="Print the generation options actually sent to Ollama"
+    )
+    
+    parser.add_argument(
+        "--sequential",
+        action="store_true",
+        help="Run the SDLC and UML agents one after another instead of concurrently "
+             "(use when the model backend serves one request at a time)"
+    )
+    
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default=DEFAULT_ENGINE,
+        help="Run the agents through CrewAI ('crew') or call the model directly with the same "
+             f"prompts ('direct', faster start-up and fewer prompt tokens) (default: {DEFAULT_ENGINE})"
+    )
+    
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always regenerate instead of reusing a cached result"
+    )
+    
+    parser.add_argument(
+        "--trace-file",
+        type=str,
+        help="Append a JSON line per timed pipeline stage to this file"
+    )
+    
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve Prometheus metrics on http://127.0.0.1:PORT/metrics while running"
+    )
+    
+    parser.add_argument(
+        "--show-timings",
+        action="store_true",
+        help="Print the time spent in each pipeline stage"
+    )
+    
+    args = parser.parse_args()
+    if not args.description and not args.batch:
+        parser.error("one of --description or --batch is required")
+    # argparse appends to a list default instead of replacing it, so default here
+    args.diagram_type = list(dict.fromkeys(args.diagram_type or ["Class"]))
+    return args
+
+def model_options_from_args(args):
+    """Collect the optional Ollama settings given on the command line"""
+    keep_alive = args.keep_alive
+    if keep_alive is not None and keep_alive.lstrip("-").isdigit():
+        keep_alive = int(keep_alive)
+    options = {"num_ctx": args.num_ctx, "stop": args.stop, "keep_alive": keep_alive}
+    return {key: value for key, value in options.items() if value is not None}
+
+def print_effective_options():
+    """Show the options of the requests that actually went to Ollama"""
+    from model_api import recent_request_options
+    requests_made = recent_request_options()
+    if not requests_made:
+        print("\nNo model requests were made (result came from the cache)")
+        return
+    print("\n===== Effective Generation Options =====")
+    for effective in requests_made:
+        print(json.dumps(effective))
+
+def print_stage_timings():
+    """Show the aggregated span timings and Ollama's own timing totals"""
+    data = tracing.snapshot()
+    print("\n===== Stage Timings =====")
+    for name, totals in sorted(data["spans"].items()):
+        count = int(totals["count"])
+        print(f"{name}: {count} call(s), {totals['seconds']:.3f}s total, {totals['seconds'] / count:.3f}s avg")
+    if data["ollama"]:
+        print("Ollama totals: " + ", ".join(f"{key} {value:.3f}" for key, value in sorted(data["ollama"].items())))
+
+def run_batch_mode(args):
+    """Run every description in the batch file and print a latency summary"""
+    from batch import load_batch_items, run_batch
+    
+    items = load_batch_items(args.batch, args.diagram_type)
+    print(f"Loaded {len(items)} description(s) from {args.batch}")
+    
+    summary = run_batch(
+        items,
+        args.output_dir,
+        workers=args.workers,
+        temperature=args.temperature,
+        max_tokens=args.max_tokens,
+        parallel=not args.sequential,
+        generate_fn=functools.partial(generate_multi_cached, engine=args.engine),
+        model_options=model_options_from_args(args),
+        image_format=args.image_format if args.save_image else None,
+        theme=args.theme,
+        use_cache=not args.no_cache
+    )
+    
+    print("\n===== Batch Summary =====")
+    print(f"Succeeded: {summary['ok']}  Failed: {summary['failed']}  Skipped (already done): {summary['skipped']}")
+    if summary["count"]:
+        print(f"Latency (s): mean {summary['mean']}  p50 {summary['p50']}  p90 {summary['p90']}  "
+              f"p95 {summary['p95']}  max {summary['max']}")
+    if args.show_options:
+        print_effective_options()
+    if args.show_timings:
+        print_stage_timings()
 
 def main():
     """Main function to run the application"""
     args = parse_arguments()
     
-    print(f"Processing request for {args.diagram_type} diagram...\n")
+    if args.trace_file or args.metrics_port:
+        tracing.configure_tracing(args.trace_file, args.metrics_port)
+        register_pipeline_gauges()
     
     # Create output directory if it doesn't exist
     if not os.path.exists(args.output_dir):
         os.makedirs(args.output_dir)
     
-    # Run crew task
-    result = run_crew_task(
+    if args.batch:
+        run_batch_mode(args)
+        return
+    
+    print(f"Processing request for {', '.join(args.diagram_type)} diagram(s)...\n")
+    
+    # Reuse previous answers for the same request if we have them; the SDLC
+    # recommendation is computed once however many diagram types are requested
+    result = generate_multi_cached(
         args.description, 
         args.diagram_type,
         temperature=args.temperature,
-        max_tokens=args.max_tokens
+        max_tokens=args.max_tokens,
+        parallel=not args.sequential,
+        use_cache=not args.no_cache,
+        model_options=model_options_from_args(args),
+        engine=args.engine
     )
     
-    if result and 'sdlc_recommendation' in result and 'plantuml_code' in result:
+    if result and result.get('sdlc_recommendation') and result.get('diagrams'):
         # Save SDLC recommendation
         sdlc_file = os.path.join(args.output_dir, "sdlc_recommendation.txt")
         with open(sdlc_file, "w") as f:
             f.write(result['sdlc_recommendation'])
         print(f"SDLC recommendation saved to {sdlc_file}")
         
-        # Save PlantUML code
-        uml_file = os.path.join(args.output_dir, "plantuml_code.txt")
-        with open(uml_file, "w") as f:
-            f.write(result['plantuml_code'])
-        print(f"PlantUML code saved to {uml_file}")
+        from batch import slugify
+        single = len(result['diagrams']) == 1
+        for diagram_type, mermaid_code in result['diagrams'].items():
+            suffix = "" if single else f"_{slugify(diagram_type)}"
+            
+            # Save Mermaid code
+            uml_file = os.path.join(args.output_dir, f"mermaid_code{suffix}.mmd")
+            with open(uml_file, "w") as f:
+                f.write(mermaid_code)
+            print(f"{diagram_type} Mermaid code saved to {uml_file}")
+            
+            # Save image if requested
+            if args.save_image:
+                try:
+                    from diagram_renderer import save_diagram
+                    image_file = os.path.join(args.output_dir, f"diagram{suffix}.{args.image_format}")
+                    save_diagram(mermaid_code, image_file, theme=args.theme)
+                    print(f"Diagram image saved to {image_file}")
+                except Exception as e:
+                    print(f"Error rendering diagram: {str(e)}")
         
-        # Generate PlantUML URL
-        plantuml_url = generate_plantuml_url(result['plantuml_code'])
-        print(f"PlantUML URL: {plantuml_url}")
-        
-        # Save image if requested
-        if args.save_image:
-            try:
-                image = render_diagram(result['plantuml_code'])
-                image_file = os.path.join(args.output_dir, "diagram.png")
-                image.save(image_file)
-                print(f"Diagram image saved to {image_file}")
-            except Exception as e:
-                print(f"Error rendering diagram: {str(e)}")
+        # Keep the single-diagram results.json layout when only one type was asked for
+        if single:
+            result = {
+                "sdlc_recommendation": result['sdlc_recommendation'],
+                "mermaid_code": next(iter(result['diagrams'].values()))
+            }
         
         # Save full results as JSON
         json_file = os.path.join(args.output_dir, "results.json")
@@ -122,6 +301,11 @@ def main():
         
     else:
         print("Error: Failed to generate results")
+    
+    if args.show_options:
+        print_effective_options()
+    if args.show_timings:
+        print_stage_timings()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
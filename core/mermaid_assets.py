@@ -0,0 +1,144 @@
+"""
+Pinned, self-hosted Mermaid JS bundle.
+
+The browser-side renderer loads mermaid.min.js from our own server instead of
+a CDN: the Streamlit mermaid_view component serves it from its directory, and
+the HTTP service exposes it under /static/ with long-lived cache headers. The
+file name carries the version, so a cached copy never goes stale.
+
+The bundle isn't checked in. Fetch it once on a machine with internet access
+(and copy core/components/mermaid_view/ into air-gapped installs):
+
+    python core/mermaid_assets.py            # download and verify the pinned version
+    python core/mermaid_assets.py --check    # report whether the bundle is present
+
+Verification is trust-on-first-use: no digest ships with the repo, so the
+first download records its SHA-256 in mermaid.lock.json next to the bundle
+and later downloads of the same version must match it. Commit that lock file
+(or pass --sha256) to pin the bundle across installs.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from typing import Dict, Optional, Tuple
+
+MERMAID_VERSION = "10.9.1"
+BUNDLE_NAME = f"mermaid-{MERMAID_VERSION}.min.js"
+DOWNLOAD_URL = f"https://cdn.jsdelivr.net/npm/mermaid@{MERMAID_VERSION}/dist/mermaid.min.js"
+COMPONENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "components", "mermaid_view")
+LOCK_FILE = "mermaid.lock.json"
+
+# Versioned file names never change content, so clients may cache them for a year
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def bundle_path() -> str:
+    """Where the pinned bundle lives (whether or not it has been fetched)"""
+    return os.path.join(COMPONENT_DIR, BUNDLE_NAME)
+
+def bundle_available() -> bool:
+    """True once the pinned bundle has been fetched"""
+    return os.path.isfile(bundle_path())
+
+def script_url() -> str:
+    """
+    URL to load Mermaid from in standalone HTML.
+
+    SMARTSDLC_MERMAID_URL wins (e.g. the HTTP service's /static/ route); then
+    the local bundle as a file:// URL; the pinned CDN URL is the last resort.
+    """
+    override = os.environ.get("SMARTSDLC_MERMAID_URL")
+    if override:
+        return override
+    if bundle_available():
+        return "file://" + bundle_path().replace(os.sep, "/")
+    return DOWNLOAD_URL
+
+def lock_path() -> str:
+    """Where the digest of the fetched bundle is recorded"""
+    return os.path.join(COMPONENT_DIR, LOCK_FILE)
+
+def read_lock() -> Dict[str, str]:
+    """Return the recorded {'version': ..., 'sha256': ...}, or {} if nothing was fetched yet"""
+    try:
+        with open(lock_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def fetch_bundle(url: str = DOWNLOAD_URL, expected_sha256: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Download the pinned bundle and verify it.
+
+    Args:
+        url: Where to download from (a mirror of DOWNLOAD_URL in restricted networks)
+        expected_sha256: Required digest; defaults to the one in the lock file.
+            Without either, whatever is downloaded is trusted and recorded
+
+    Returns:
+        (path of the bundle, its SHA-256)
+
+    Raises:
+        ValueError: If the download doesn't match the expected digest
+    """
+    import http_session
+
+    lock = read_lock()
+    if expected_sha256 is None and lock.get("version") == MERMAID_VERSION:
+        expected_sha256 = lock.get("sha256")
+
+    response = http_session.get(url)
+    response.raise_for_status()
+    digest = hashlib.sha256(response.content).hexdigest()
+    if expected_sha256 and digest != expected_sha256:
+        raise ValueError(f"Checksum mismatch for {url}: expected {expected_sha256}, got {digest}")
+
+    os.makedirs(COMPONENT_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=COMPONENT_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(response.content)
+        os.replace(tmp_path, bundle_path())
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    with open(lock_path(), "w", encoding="utf-8") as f:
+        json.dump({"version": MERMAID_VERSION, "url": url, "sha256": digest}, f, indent=2)
+    return bundle_path(), digest
+
+def parse_arguments():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Fetch the pinned Mermaid JS bundle for offline rendering")
+    parser.add_argument("--url", default=DOWNLOAD_URL, help=f"Download URL (default: {DOWNLOAD_URL})")
+    parser.add_argument("--sha256", help="Expected SHA-256 of the bundle (default: the one in mermaid.lock.json)")
+    parser.add_argument("--check", action="store_true", help="Only report whether the bundle is present")
+    return parser.parse_args()
+
+def main():
+    """Fetch or check the bundle"""
+    args = parse_arguments()
+    if args.check:
+        if bundle_available():
+            print(f"Mermaid {MERMAID_VERSION} bundle present at {bundle_path()}")
+            return
+        print(f"Mermaid {MERMAID_VERSION} bundle missing; run: python core/mermaid_assets.py")
+        sys.exit(1)
+    pinned = args.sha256 or read_lock().get("version") == MERMAID_VERSION
+    try:
+        path, digest = fetch_bundle(args.url, args.sha256)
+    except Exception as e:
+        print(f"Error fetching Mermaid bundle: {str(e)}")
+        sys.exit(1)
+    print(f"Saved Mermaid {MERMAID_VERSION} to {path} (sha256 {digest})")
+    if not pinned:
+        print(f"No digest was pinned, so this one was trusted and recorded in {lock_path()}; "
+              f"commit it to pin the bundle")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Streamlit component that renders Mermaid diagrams with the self-hosted bundle.
+
+mermaid_editor() shows a code editor with a live preview in one iframe. With
+a stable key the iframe stays mounted across reruns, so the Mermaid library is
+downloaded and parsed once per page load. Typing is debounced and rendered in
+the browser, and the edited code only reaches Python once typing pauses.
+Without the bundle (see mermaid_assets), the preview is drawn by the offline
+SVG renderer instead.
+"""
+
+from typing import Optional, Tuple
+
+import mermaid_assets
+
+# Pause in typing before the editor re-renders and reports the code
+DEFAULT_DEBOUNCE_MS = 300
+
+_component = None
+
+def _declare():
+    global _component
+    if _component is None:
+        import streamlit.components.v1 as components
+        _component = components.declare_component("mermaid_view", path=mermaid_assets.COMPONENT_DIR)
+    return _component
+
+def mermaid_editor(mermaid_code: str, theme: str = "default", key: str = "mermaid_editor",
+                   debounce_ms: int = DEFAULT_DEBOUNCE_MS) -> str:
+    """
+    Show an editable copy of the code with a live preview below it.
+
+    Args:
+        mermaid_code: Initial Mermaid source; a different value replaces the
+            editor contents, echoing back the edited code does not
+        theme: Mermaid theme name
+        key: Streamlit widget key; one per diagram keeps separate edit buffers
+        debounce_ms: Pause in typing before the preview re-renders and the
+            code is sent back
+
+    Returns:
+        The current code in the editor
+    """
+    import streamlit as st
+
+    if mermaid_assets.bundle_available():
+        edited = _declare()(code=mermaid_code, theme=theme, bundle=mermaid_assets.BUNDLE_NAME, editable=True,
+                            debounce_ms=debounce_ms, key=key, default=None)
+        return mermaid_code if edited is None else edited
+
+    # Without the bundle, the text area commits on blur / Ctrl+Enter instead of while typing
+    edited = st.text_area("Edit Mermaid Code:", value=mermaid_code, height=200, key=key)
+    _static_preview(edited, theme)
+    return edited
+
+def diagram_svg(mermaid_code: str, theme: str = "default") -> Tuple[Optional[str], Optional[str]]:
+    """
+    Offline SVG for the code, re-rendered only when the parsed diagram changed.
+
+    The last render is kept in the session per theme and reused while edits
+    leave diagram_fingerprint() unchanged (whitespace, comments, notes).
+
+    Returns:
+        (svg, None), or (None, error message) if the diagram can't be drawn offline
+    """
+    import streamlit as st
+    from diagram_renderer import RenderError, diagram_fingerprint, render_svg
+
+    theme = theme if theme in ("default", "neutral", "dark") else "default"
+    fingerprint = diagram_fingerprint(mermaid_code)
+    previous = st.session_state.get("_mermaid_svg", {}).get(theme)
+    if previous and previous[0] == fingerprint:
+        return previous[1], previous[2]
+    try:
+        result = (render_svg(mermaid_code, theme), None)
+    except RenderError as e:
+        result = (None, str(e))
+    st.session_state.setdefault("_mermaid_svg", {})[theme] = (fingerprint,) + result
+    return result
+
+def _static_preview(mermaid_code: str, theme: str) -> None:
+    import streamlit as st
+
+    svg, error = diagram_svg(mermaid_code, theme)
+    if svg is None:
+        st.warning(f"Can't draw this diagram offline: {error}")
+        return
+    st.markdown(svg, unsafe_allow_html=True)
+    st.caption("Static preview. Run `python core/mermaid_assets.py` once for the interactive Mermaid renderer.")
@@ -0,0 +1,146 @@
+"""
+Pull task outputs and Mermaid code out of raw model and crew output, and
+check that the Mermaid code parses.
+
+Validation is delegated to mermaid_validator. Kept free of CrewAI so the
+direct model paths (streaming, the HTTP service) can use it without importing
+the crew stack; crew_orchestration re-exports both functions.
+"""
+
+import re
+from typing import Any, List, Optional
+
+from mermaid_validator import DIAGRAM_HEADERS, first_error
+from tracing import traced
+
+NO_DIAGRAM_PLACEHOLDER = "flowchart TD\n    A[No valid diagram code generated]"
+
+# Headers recognised when they start a line of unfenced output
+_LINE_HEADERS = frozenset(DIAGRAM_HEADERS)
+# Headers also recognised mid-line ("Here it is: classDiagram ..."); longest first
+# so stateDiagram-v2 wins over stateDiagram. No nested quantifiers: linear time.
+_INLINE_HEADER_RE = re.compile(r"\b(?:stateDiagram-v2|stateDiagram|sequenceDiagram|classDiagram|flowchart|gitGraph|gantt|journey|pie)\b")
+_FINAL_ANSWER_PREFIX = "final answer:"
+
+@traced("mermaid.extract")
+def extract_mermaid_code(text: str) -> str:
+    """
+    Extract Mermaid code from text, ensuring it has the correct format
+    
+    Makes a single pass over the lines, so the cost is linear in the length
+    of the output however it is formatted. In order of preference it returns
+    the first fenced block that holds Mermaid (an unterminated fence runs to
+    the end of the text), the text from the first line that starts with a
+    diagram header, or the text from the first header found mid-line.
+    
+    Args:
+        text: Text containing Mermaid code
+        
+    Returns:
+        Cleaned Mermaid code
+    """
+    lines = text.splitlines()
+    fence_start = None
+    first_block = None
+    header_line = None
+    inline_start = None
+    offset = 0
+    
+    for index, line in enumerate(lines):
+        stripped = line.strip()
+        if stripped.startswith("```") or stripped.startswith("~~~"):
+            if fence_start is None:
+                fence_start = index
+                fence_language = stripped[3:].strip().lower()
+            else:
+                block = "\n".join(lines[fence_start + 1:index]).strip()
+                if block and (fence_language in ("", "mermaid") or _starts_with_header(block)):
+                    return block
+                if block and first_block is None:
+                    first_block = block
+                fence_start = None
+        elif fence_start is None and header_line is None:
+            if stripped and stripped.split(None, 1)[0] in _LINE_HEADERS:
+                header_line = index
+            elif inline_start is None:
+                match = _INLINE_HEADER_RE.search(line)
+                if match:
+                    inline_start = offset + match.start()
+        offset += len(line) + 1
+    
+    if fence_start is not None:
+        # Output was cut off inside a code block
+        block = "\n".join(lines[fence_start + 1:]).strip()
+        if block:
+            return block
+    if header_line is not None:
+        return "\n".join(lines[header_line:]).strip()
+    if first_block:
+        return first_block
+    if inline_start is not None:
+        return text[inline_start:].strip()
+    
+    # If no indicators found, return the whole text as is
+    # It might be just the diagram code without any markers
+    return text.strip() or NO_DIAGRAM_PLACEHOLDER
+
+def _starts_with_header(block: str) -> bool:
+    first = block.split(None, 1)
+    return bool(first) and first[0] in _LINE_HEADERS
+
+def clean_task_output(text: Optional[str]) -> Optional[str]:
+    """Strip whitespace and a leading 'Final Answer:' label from a task's raw output"""
+    if text is None:
+        return None
+    text = text.strip()
+    if text[:len(_FINAL_ANSWER_PREFIX)].lower() == _FINAL_ANSWER_PREFIX:
+        text = text[len(_FINAL_ANSWER_PREFIX):].strip()
+    return text
+
+def task_outputs(crew_output: Any, expected: int) -> List[Optional[str]]:
+    """
+    Read each task's raw text from a crew result, in task order.
+    
+    Uses the structured task outputs CrewAI returns (tasks_output, or the
+    tasks themselves on older versions) instead of parsing the printed result.
+    When only the final output is available it is assigned to the last task.
+    
+    Args:
+        crew_output: Value returned by Crew.kickoff()
+        expected: Number of tasks in the crew
+        
+    Returns:
+        List of length `expected`; None for tasks whose output is unavailable
+    """
+    outputs = getattr(crew_output, "tasks_output", None)
+    if isinstance(outputs, dict):
+        outputs = list(outputs.values())
+    if not outputs and getattr(crew_output, "tasks", None):
+        outputs = [getattr(task, "output", None) for task in crew_output.tasks]
+    
+    texts = [clean_task_output(_output_text(output)) for output in (outputs or [])][:expected]
+    if not any(texts):
+        final = clean_task_output(_output_text(getattr(crew_output, "raw", crew_output)))
+        texts = [None] * (expected - 1) + [final]
+    return texts + [None] * (expected - len(texts))
+
+def _output_text(output: Any) -> Optional[str]:
+    if output is None or isinstance(output, str):
+        return output
+    raw = getattr(output, "raw", None)
+    return raw if isinstance(raw, str) else str(output)
+
+def is_valid_mermaid(code: str) -> bool:
+    """
+    Check whether Mermaid code will parse
+    
+    Args:
+        code: Mermaid code to validate
+        
+    Returns:
+        Boolean indicating if the code is valid Mermaid; use
+        mermaid_validator.validate_mermaid() to find out where it is not
+    """
+    if not code or not code.strip():
+        return False
+    return first_error(code) is None
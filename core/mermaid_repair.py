@@ -0,0 +1,192 @@
+"""
+Validate-and-repair stage for generated Mermaid code.
+
+repair_mermaid() runs after extract_mermaid_code(). Valid code passes straight
+through. Otherwise cheap deterministic fixes are tried first (stray prose and
+code fences, stateDiagram -> stateDiagram-v2, unclosed blocks at the end), and
+only if the code still doesn't parse is the Mermaid generator asked to fix it,
+with the error location and the bad code, within a retry budget and deadline.
+Only the failing diagram is regenerated.
+"""
+
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, Generator, List, Optional, Tuple
+
+from mermaid_extraction import extract_mermaid_code
+from mermaid_validator import DIAGRAM_HEADERS, MermaidIssue, validate_mermaid
+from model_api import call_model_with_system
+from prompts import build_mermaid_repair_prompt, mermaid_system_prompt
+from tracing import span
+
+DEFAULT_MAX_ATTEMPTS = 2
+DEFAULT_DEADLINE_SECONDS = 60.0
+
+_FENCE_RE = re.compile(r"^\s*(```|~~~)")
+_PROSE_RE = re.compile(r"^[A-Z][^\[\]{}()<>|=]*[.!?:]$")
+_NEVER_CLOSED_RE = re.compile(r"^'(\w+)' block opened here is never closed$")
+_BLOCK_CLOSERS = {"class": "}", "namespace": "}", "state": "}"}
+
+def _errors(issues: List[MermaidIssue]) -> List[MermaidIssue]:
+    return [issue for issue in issues if issue.severity == "error"]
+
+def apply_local_fixes(code: str) -> Tuple[str, List[str]]:
+    """
+    Apply deterministic fixes that need no model call.
+
+    Returns:
+        (fixed code, names of the fixes that changed something)
+    """
+    fixes = []
+    lines = code.strip().splitlines()
+
+    # Drop code fences and anything outside them
+    if any(_FENCE_RE.match(line) for line in lines):
+        fence_indexes = [i for i, line in enumerate(lines) if _FENCE_RE.match(line)]
+        start = fence_indexes[0] + 1
+        end = fence_indexes[1] if len(fence_indexes) > 1 else len(lines)
+        lines = lines[start:end]
+        fixes.append("code_fences")
+
+    # Drop prose before the diagram header
+    header_index = next((i for i, line in enumerate(lines)
+                         if line.strip() and line.split()[0] in DIAGRAM_HEADERS), None)
+    if header_index:
+        lines = lines[header_index:]
+        fixes.append("leading_prose")
+
+    # Drop explanatory sentences after the diagram, but only lines that don't parse
+    error_lines = {issue.line for issue in _errors(validate_mermaid("\n".join(lines)))}
+    trailing = len(lines)
+    while trailing > 1 and (not lines[trailing - 1].strip() or
+                            (trailing in error_lines and _PROSE_RE.match(lines[trailing - 1].strip()))):
+        trailing -= 1
+    if trailing < len(lines) and any(line.strip() for line in lines[trailing:]):
+        lines = lines[:trailing]
+        fixes.append("trailing_prose")
+
+    if lines and lines[0].strip() == "stateDiagram":
+        lines[0] = lines[0].replace("stateDiagram", "stateDiagram-v2")
+        fixes.append("state_diagram_v2")
+
+    fixed = "\n".join(lines).strip()
+
+    # Close blocks the model forgot to close at the very end
+    closers = []
+    for issue in _errors(validate_mermaid(fixed)):
+        match = _NEVER_CLOSED_RE.match(issue.message)
+        if match:
+            closers.append(_BLOCK_CLOSERS.get(match.group(1), "end"))
+    if closers:
+        fixed += "\n" + "\n".join(reversed(closers))
+        fixes.append("unclosed_blocks")
+
+    return fixed, fixes
+
+def repair_mermaid(code: str, diagram_type: str, regenerate: Optional[Callable[[str], Optional[str]]] = None,
+                   max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                   deadline_seconds: float = DEFAULT_DEADLINE_SECONDS) -> Dict[str, Any]:
+    """
+    Make sure `code` parses, repairing it if needed.
+
+    Args:
+        code: Mermaid code from extract_mermaid_code()
+        diagram_type: UML diagram type, used in the repair prompt
+        regenerate: Sends a repair prompt to the Mermaid generator and returns its raw
+            output (None disables model repairs)
+        max_attempts: Maximum number of repair prompts
+        deadline_seconds: No new repair prompt is sent once this much time has passed
+
+    Returns:
+        Dictionary with the best code found ('code'), whether it is 'valid', its
+        remaining 'issues', the 'local_fixes' applied and the number of 'llm_attempts'
+    """
+    steps = _repair_steps(code, diagram_type, regenerate is not None, max_attempts, deadline_seconds)
+    try:
+        prompt = next(steps)
+        while True:
+            prompt = steps.send(regenerate(prompt))
+    except StopIteration as done:
+        return done.value
+
+async def arepair_mermaid(code: str, diagram_type: str,
+                          regenerate: Optional[Callable[[str], Awaitable[Optional[str]]]] = None,
+                          max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                          deadline_seconds: float = DEFAULT_DEADLINE_SECONDS) -> Dict[str, Any]:
+    """Async counterpart of repair_mermaid; `regenerate` is a coroutine function"""
+    steps = _repair_steps(code, diagram_type, regenerate is not None, max_attempts, deadline_seconds)
+    try:
+        prompt = next(steps)
+        while True:
+            prompt = steps.send(await regenerate(prompt))
+    except StopIteration as done:
+        return done.value
+
+def _repair_steps(code: str, diagram_type: str, can_regenerate: bool, max_attempts: int,
+                  deadline_seconds: float) -> Generator[str, Optional[str], Dict[str, Any]]:
+    # Yields each repair prompt and receives the model's raw answer, so the
+    # sync and async drivers share one repair loop
+    with span("mermaid.repair", diagram_type=diagram_type) as repair_span:
+        deadline = time.monotonic() + deadline_seconds
+        issues = validate_mermaid(code)
+        result = {"code": code, "valid": not _errors(issues), "issues": issues, "local_fixes": [], "llm_attempts": 0}
+        if result["valid"]:
+            repair_span.set("outcome", "valid")
+            return result
+
+        fixed, fixes = apply_local_fixes(code)
+        _consider(result, fixed, fixes)
+        while not result["valid"] and can_regenerate and result["llm_attempts"] < max_attempts:
+            if time.monotonic() >= deadline:
+                repair_span.set("deadline_hit", True)
+                break
+            result["llm_attempts"] += 1
+            error = _errors(result["issues"])[0]
+            raw = yield build_mermaid_repair_prompt(diagram_type, result["code"], str(error))
+            if raw:
+                fixed, fixes = apply_local_fixes(extract_mermaid_code(raw))
+                _consider(result, fixed, fixes)
+
+        repair_span.set("local_fixes", len(result["local_fixes"]))
+        repair_span.set("llm_attempts", result["llm_attempts"])
+        repair_span.set("outcome", "repaired" if result["valid"] else "invalid")
+        return result
+
+def _consider(result: Dict[str, Any], code: str, fixes: List[str]):
+    # Keep a candidate only if it has fewer errors than the best so far
+    issues = validate_mermaid(code)
+    if len(_errors(issues)) < len(_errors(result["issues"])):
+        result.update(code=code, issues=issues, valid=not _errors(issues))
+        result["local_fixes"].extend(fix for fix in fixes if fix not in result["local_fixes"])
+
+def model_regenerator(model_options: Optional[Dict[str, Any]] = None, diagram_type: Optional[str] = None,
+                      **call_options) -> Callable[[str], Optional[str]]:
+    """
+    Build a `regenerate` callable that sends the repair prompt straight to the
+    model with the Mermaid generator's system prompt.
+
+    Args:
+        model_options: Extra Ollama settings (num_ctx, stop, keep_alive)
+        diagram_type: Limits the system prompt to this type's guidance
+        **call_options: Passed to call_model_with_system (model, api_base, temperature, max_tokens)
+    """
+    system_prompt = mermaid_system_prompt(diagram_type)
+
+    def regenerate(prompt: str) -> Optional[str]:
+        return call_model_with_system(system_prompt, prompt, **call_options, **(model_options or {}))
+    return regenerate
+
+def async_model_regenerator(model_options: Optional[Dict[str, Any]] = None, diagram_type: Optional[str] = None,
+                            **call_options) -> Callable[[str], Awaitable[Optional[str]]]:
+    """
+    Async counterpart of model_regenerator for arepair_mermaid.
+
+    Repair prompts go through async_model_api, so they share its session and
+    per-loop concurrency limit with the generation calls.
+    """
+    from async_model_api import acall_model_with_system
+    system_prompt = mermaid_system_prompt(diagram_type)
+
+    async def regenerate(prompt: str) -> Optional[str]:
+        return await acall_model_with_system(system_prompt, prompt, **call_options, **(model_options or {}))
+    return regenerate
@@ -0,0 +1,532 @@
+"""
+Dependency-free syntax checker for the Mermaid diagrams we generate.
+
+Covers the families the Mermaid generator emits - flowchart/graph,
+sequenceDiagram, classDiagram and stateDiagram(-v2) - closely enough to catch
+what breaks rendering in the browser: unknown headers, unbalanced blocks and
+braces, unterminated node shapes, malformed arrows and messages. Other
+Mermaid diagram types are recognised by their header only.
+
+Checking is line by line with precompiled patterns, so a typical diagram takes
+microseconds. MermaidValidator can be fed text incrementally while a response
+streams in; validate_mermaid() checks a complete diagram in one call.
+
+    for issue in validate_mermaid(code):
+        print(issue)    # "line 3, column 12: Unclosed '[' (expected ']')"
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+ERROR = "error"
+WARNING = "warning"
+
+# Header keyword -> diagram family (None = recognised, but only the header is checked)
+DIAGRAM_HEADERS = {
+    "flowchart": "flowchart",
+    "graph": "flowchart",
+    "sequenceDiagram": "sequence",
+    "classDiagram": "class",
+    "classDiagram-v2": "class",
+    "stateDiagram": "state",
+    "stateDiagram-v2": "state",
+    "erDiagram": None,
+    "gantt": None,
+    "pie": None,
+    "journey": None,
+    "gitGraph": None,
+    "mindmap": None,
+    "timeline": None,
+}
+
+FLOWCHART_DIRECTIONS = ("TB", "TD", "BT", "RL", "LR")
+
+class MermaidIssue:
+    """A problem found in Mermaid code, with a 1-based line and column"""
+
+    __slots__ = ("line", "column", "message", "severity")
+
+    def __init__(self, line: int, column: int, message: str, severity: str = ERROR):
+        self.line = line
+        self.column = column
+        self.message = message
+        self.severity = severity
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"line": self.line, "column": self.column, "message": self.message, "severity": self.severity}
+
+    def __str__(self) -> str:
+        prefix = "" if self.severity == ERROR else f"{self.severity}: "
+        return f"{prefix}line {self.line}, column {self.column}: {self.message}"
+
+    def __repr__(self) -> str:
+        return f"MermaidIssue({self.line}, {self.column}, {self.message!r}, {self.severity!r})"
+
+# Statements every family accepts as-is
+_COMMON_RE = re.compile(r"(?:title\b|accTitle\s*:|accDescr\s*:)")
+
+class _Parser:
+    """Base for the per-family line parsers"""
+
+    def __init__(self, issues: List[MermaidIssue]):
+        self.issues = issues
+        self.blocks: List[Tuple[str, int, int]] = []  # (kind, line, column)
+        self.statements = 0
+
+    def error(self, line: int, column: int, message: str, severity: str = ERROR):
+        self.issues.append(MermaidIssue(line, column, message, severity))
+
+    def line(self, text: str, line_no: int, indent: int):
+        raise NotImplementedError
+
+    def close(self, last_line: int):
+        for kind, line, column in self.blocks:
+            self.error(line, column, f"'{kind}' block opened here is never closed")
+
+    def pop_block(self, line_no: int, column: int, token: str, kinds: Tuple[str, ...]):
+        if not self.blocks or self.blocks[-1][0] not in kinds:
+            self.error(line_no, column, f"'{token}' without a matching open block")
+            return
+        self.blocks.pop()
+
+# ---------------------------------------------------------------------------
+# flowchart / graph
+
+_NODE_ID_RE = re.compile(r"\w+")
+_LINK_TEXT_RE = re.compile(r"(?:<|o|x)?(?:--|==|-\.)\s+([^\n|]+?)\s+(?:-{2,}[>ox]|={2,}[>ox]|\.-+[>ox]|-{3,}|={3,}|\.-+)")
+_LINK_RE = re.compile(r"(?:<|o|x)?(?:-{2,}|={2,}|-\.+-|~{3,})(?:>|o|x)?")
+_PIPE_LABEL_RE = re.compile(r"\s*\|([^|\n]*)\|")
+_CLASS_SUFFIX_RE = re.compile(r":::\w+")
+# Node shapes, longest opener first: (opener, accepted closers)
+_SHAPES = (
+    ("(((", (")))",)), ("((", ("))",)), ("([", ("])",)), ("[[", ("]]",)), ("[(", (")]",)),
+    ("{{", ("}}",)), ("[/", ("/]", "\\]")), ("[\\", ("\\]", "/]")),
+    ("(", (")",)), ("[", ("]",)), ("{", ("}",)), (">", ("]",)),
+)
+_FLOWCHART_KEYWORDS_RE = re.compile(r"(?:classDef|class|style|linkStyle|click|direction)\b")
+
+class _FlowchartParser(_Parser):
+    def line(self, text: str, line_no: int, indent: int):
+        word = text.split(None, 1)[0].rstrip(";")
+        if word == "subgraph":
+            self.blocks.append(("subgraph", line_no, indent + 1))
+            if not text[len(word):].strip():
+                self.error(line_no, indent + len(word) + 1, "'subgraph' needs an id or title")
+            return
+        if word == "end":
+            self.pop_block(line_no, indent + 1, "end", ("subgraph",))
+            return
+        if _FLOWCHART_KEYWORDS_RE.match(text):
+            return
+        self.statements += 1
+        self.parse_chain(text, line_no, indent)
+
+    def parse_chain(self, text: str, line_no: int, indent: int):
+        pos, length = 0, len(text)
+        expect_node = True
+        while True:
+            pos = _skip_spaces(text, pos)
+            if pos >= length:
+                if expect_node and pos > 0:
+                    self.error(line_no, indent + pos + 1, "Expected a node after the link")
+                return
+            if expect_node:
+                pos = self.parse_node(text, pos, line_no, indent)
+                if pos < 0:
+                    return
+                expect_node = False
+                continue
+
+            char = text[pos]
+            if char == ";":
+                pos += 1
+                if _skip_spaces(text, pos) < length:
+                    expect_node = True
+                continue
+            if char == "&":
+                pos += 1
+                expect_node = True
+                continue
+            match = _LINK_TEXT_RE.match(text, pos) or _LINK_RE.match(text, pos)
+            if match:
+                pos = match.end()
+                if pos < length and text[pos] in "-=.<>~":
+                    end = pos
+                    while end < length and text[end] in "-=.<>~":
+                        end += 1
+                    self.error(line_no, indent + match.start() + 1, f"Malformed link '{text[match.start():end]}'")
+                    return
+                label = _PIPE_LABEL_RE.match(text, pos)
+                if label:
+                    pos = label.end()
+                elif text.startswith("|", _skip_spaces(text, pos)):
+                    self.error(line_no, indent + _skip_spaces(text, pos) + 1, "Unclosed '|' in link label")
+                    return
+                expect_node = True
+                continue
+            if char in "-=.<~":
+                end = pos
+                while end < length and text[end] in "-=.<>~ox":
+                    end += 1
+                self.error(line_no, indent + pos + 1, f"Malformed link '{text[pos:end]}'")
+            else:
+                self.error(line_no, indent + pos + 1, f"Unexpected '{char}' after node")
+            return
+
+    def parse_node(self, text: str, pos: int, line_no: int, indent: int) -> int:
+        """Parse `id[shape]:::class` at pos; return the end position or -1 after an error"""
+        match = _NODE_ID_RE.match(text, pos)
+        if not match:
+            self.error(line_no, indent + pos + 1, f"Expected a node id, found '{text[pos]}'")
+            return -1
+        pos = match.end()
+        for opener, closers in _SHAPES:
+            if text.startswith(opener, pos):
+                end = _find_closer(text, pos + len(opener), closers)
+                if end < 0:
+                    self.error(line_no, indent + pos + 1, f"Unclosed '{opener}' (expected '{closers[0]}')")
+                    return -1
+                pos = end
+                break
+        suffix = _CLASS_SUFFIX_RE.match(text, pos)
+        return suffix.end() if suffix else pos
+
+def _skip_spaces(text: str, pos: int) -> int:
+    while pos < len(text) and text[pos] in " \t":
+        pos += 1
+    return pos
+
+def _find_closer(text: str, pos: int, closers: Tuple[str, ...]) -> int:
+    """Index just past the first closer at or after pos, skipping quoted text; -1 if none"""
+    length = len(text)
+    while pos < length:
+        if text[pos] == '"':
+            end = text.find('"', pos + 1)
+            if end < 0:
+                return -1
+            pos = end + 1
+            continue
+        for closer in closers:
+            if text.startswith(closer, pos):
+                return pos + len(closer)
+        pos += 1
+    return -1
+
+# ---------------------------------------------------------------------------
+# sequenceDiagram
+
+_SEQ_ARROWS = r"<<-->>|<<->>|-->>|->>|-->|->|--x|-x|--\)|-\)"
+_MESSAGE_RE = re.compile(
+    r"([^+\-<>:,;]+?)\s*(" + _SEQ_ARROWS + r")\s*([+-]?)\s*([^+\-<>:,;]+?)\s*(?::(.*))?$"
+)
+_PARTICIPANT_RE = re.compile(r"(?:create\s+)?(participant|actor)\s+(.+?)(?:\s+as\s+(.+))?$")
+_NOTE_RE = re.compile(r"[Nn]ote\s+(?:left of|right of|over)\s+([^:]+?)\s*(:.*)?$")
+_SEQ_BLOCKS = ("loop", "alt", "opt", "par", "critical", "break", "rect", "box")
+_SEQ_BRANCHES = {"else": "alt", "and": "par", "option": "critical"}
+_SEQ_SIMPLE_RE = re.compile(r"(?:autonumber|links?|destroy|activate|deactivate)\b")
+
+class _SequenceParser(_Parser):
+    def __init__(self, issues: List[MermaidIssue]):
+        super().__init__(issues)
+        self.declared = set()
+        self.used: Dict[str, Tuple[int, int]] = {}
+
+    def use(self, name: str, line_no: int, column: int):
+        self.used.setdefault(name, (line_no, column))
+
+    def line(self, text: str, line_no: int, indent: int):
+        word = text.split(None, 1)[0]
+        if word in _SEQ_BLOCKS:
+            self.blocks.append((word, line_no, indent + 1))
+            return
+        if word in _SEQ_BRANCHES:
+            if not self.blocks or self.blocks[-1][0] != _SEQ_BRANCHES[word]:
+                self.error(line_no, indent + 1, f"'{word}' is only valid inside an '{_SEQ_BRANCHES[word]}' block")
+            return
+        if word == "end":
+            self.pop_block(line_no, indent + 1, "end", _SEQ_BLOCKS)
+            return
+
+        participant = _PARTICIPANT_RE.match(text)
+        if participant:
+            self.declared.add(participant.group(2).strip())
+            return
+        if _SEQ_SIMPLE_RE.match(text):
+            if word in ("activate", "deactivate", "destroy"):
+                self.use(text[len(word):].strip(), line_no, indent + len(word) + 2)
+            return
+        if word.lower() == "note":
+            note = _NOTE_RE.match(text)
+            if not note:
+                self.error(line_no, indent + 1, "Notes look like 'Note right of A: text' or 'Note over A,B: text'")
+            elif not note.group(2):
+                self.error(line_no, indent + len(text) + 1, "Note needs ': text'")
+            else:
+                for name in note.group(1).split(","):
+                    self.use(name.strip(), line_no, indent + note.start(1) + 1)
+            return
+
+        message = _MESSAGE_RE.match(text)
+        if message:
+            self.statements += 1
+            if message.group(5) is None:
+                self.error(line_no, indent + len(text) + 1, "Message needs ': text' after the receiver")
+                return
+            self.use(message.group(1).strip(), line_no, indent + 1)
+            self.use(message.group(4).strip(), line_no, indent + message.start(4) + 1)
+            return
+
+        arrow = re.search(r"[-<=]+[>x)]*", text)
+        if arrow:
+            self.error(line_no, indent + arrow.start() + 1, f"Unknown message arrow '{arrow.group()}'")
+        else:
+            self.error(line_no, indent + 1, f"Unrecognised statement '{text}'")
+
+    def close(self, last_line: int):
+        super().close(last_line)
+        # Mermaid creates participants implicitly, so only flag names that look
+        # like typos: used somewhere although the diagram declares its participants
+        if self.declared:
+            for name, (line_no, column) in self.used.items():
+                if name not in self.declared:
+                    self.error(line_no, column, f"Participant '{name}' is not declared", WARNING)
+
+# ---------------------------------------------------------------------------
+# classDiagram
+
+_CLASS_NAME = r"(?:`[^`]+`|\w+(?:~[^~]+~)?)"
+_CLASS_DECL_RE = re.compile(r"class\s+(" + _CLASS_NAME + r")\s*(?:\[\"[^\"]*\"\])?\s*(?::::\s*\w+)?\s*(\{)?\s*$")
+_RELATION_ARROW = r"(?:<\||\*|o|<|\})?(?:--|\.\.)(?:\|>|\*|o|>|\{)?"
+_RELATION_RE = re.compile(
+    r"(" + _CLASS_NAME + r")\s*(?:\"[^\"]*\"\s*)?(" + _RELATION_ARROW + r")\s*(?:\"[^\"]*\"\s*)?(" + _CLASS_NAME + r")\s*(?::.*)?$"
+)
+_MEMBER_RE = re.compile(_CLASS_NAME + r"\s*:\s*\S")
+_CLASS_SIMPLE_RE = re.compile(r"(?:<<[^>]+>>|note\b|direction\b|classDef\b|cssClass\b|style\b|click\b|link\b|callback\b)")
+
+class _ClassParser(_Parser):
+    def line(self, text: str, line_no: int, indent: int):
+        if text == "}":
+            self.pop_block(line_no, indent + 1, "}", ("class", "namespace"))
+            return
+        if self.blocks and self.blocks[-1][0] == "class":
+            # Member lines inside a class body are free-form, but can't open blocks
+            brace = text.find("{")
+            if brace >= 0:
+                self.error(line_no, indent + brace + 1, "Unexpected '{' inside a class body")
+            elif text.endswith("}"):
+                self.blocks.pop()
+            self.statements += 1
+            return
+
+        word = text.split(None, 1)[0]
+        if word == "class":
+            declaration = _CLASS_DECL_RE.match(text)
+            if not declaration:
+                self.error(line_no, indent + len(word) + 2, "Expected 'class Name' optionally followed by '{'")
+                return
+            self.statements += 1
+            if declaration.group(2):
+                self.blocks.append(("class", line_no, indent + declaration.start(2) + 1))
+            return
+        if word == "namespace":
+            if not text.endswith("{"):
+                self.error(line_no, indent + len(text) + 1, "Expected '{' after the namespace name")
+                return
+            self.blocks.append(("namespace", line_no, indent + len(text)))
+            return
+        if _CLASS_SIMPLE_RE.match(text):
+            return
+
+        if _RELATION_RE.match(text) or _MEMBER_RE.match(text):
+            self.statements += 1
+            return
+        arrow = re.search(r"[<*o}|]*(?:-+|\.+)[>|*o{]*", text[len(word):])
+        if arrow and arrow.group().strip("o"):
+            self.error(line_no, indent + len(word) + arrow.start() + 1,
+                       f"Unknown relationship arrow '{arrow.group()}'")
+        else:
+            self.error(line_no, indent + 1, f"Unrecognised statement '{text}'")
+
+# ---------------------------------------------------------------------------
+# stateDiagram / stateDiagram-v2
+
+_STATE_ID = r"(?:\[\*\]|\w+)"
+_TRANSITION_RE = re.compile(r"(" + _STATE_ID + r")\s*-->\s*(" + _STATE_ID + r")\s*(?::.*)?$")
+_STATE_DECL_RE = re.compile(
+    r"state\s+(?:\"[^\"]*\"\s+as\s+\w+|\w+(?:\s+as\s+\"[^\"]*\")?)\s*(?:<<(?:fork|join|choice)>>)?\s*(\{)?\s*$"
+)
+_STATE_DESCRIPTION_RE = re.compile(r"\w+\s*:\s*\S")
+_STATE_NOTE_RE = re.compile(r"note\s+(?:left|right)\s+of\s+\w+\s*(:.*)?$")
+_STATE_SIMPLE_RE = re.compile(r"(?:direction|classDef|class|style)\b")
+
+class _StateParser(_Parser):
+    def __init__(self, issues: List[MermaidIssue]):
+        super().__init__(issues)
+        self.note_line: Optional[int] = None
+
+    def line(self, text: str, line_no: int, indent: int):
+        if self.note_line is not None:
+            if text == "end note":
+                self.note_line = None
+            return
+        if text == "}":
+            self.pop_block(line_no, indent + 1, "}", ("state",))
+            return
+        if text == "--":
+            if not self.blocks:
+                self.error(line_no, indent + 1, "'--' separates concurrent regions and is only valid inside a composite state")
+            return
+
+        word = text.split(None, 1)[0]
+        if word == "state":
+            declaration = _STATE_DECL_RE.match(text)
+            if not declaration:
+                self.error(line_no, indent + len(word) + 2, "Expected 'state Name', 'state \"Description\" as Name' or 'state Name {'")
+                return
+            self.statements += 1
+            if declaration.group(1):
+                self.blocks.append(("state", line_no, indent + declaration.start(1) + 1))
+            return
+        if word == "note":
+            note = _STATE_NOTE_RE.match(text)
+            if not note:
+                self.error(line_no, indent + 1, "Notes look like 'note right of State : text'")
+            elif not note.group(1):
+                self.note_line = line_no
+            return
+        if _STATE_SIMPLE_RE.match(text):
+            return
+
+        if _TRANSITION_RE.match(text) or _STATE_DESCRIPTION_RE.match(text):
+            self.statements += 1
+            return
+        arrow = re.search(r"<?[-=.]+>?", text)
+        if arrow:
+            self.error(line_no, indent + arrow.start() + 1, f"Transitions use '-->', found '{arrow.group()}'")
+        else:
+            self.error(line_no, indent + 1, f"Unrecognised statement '{text}'")
+
+    def close(self, last_line: int):
+        super().close(last_line)
+        if self.note_line is not None:
+            self.error(self.note_line, 1, "Multi-line note is never closed with 'end note'")
+
+class _HeaderOnlyParser(_Parser):
+    def line(self, text: str, line_no: int, indent: int):
+        self.statements += 1
+
+_PARSERS = {
+    "flowchart": _FlowchartParser,
+    "sequence": _SequenceParser,
+    "class": _ClassParser,
+    "state": _StateParser,
+    None: _HeaderOnlyParser,
+}
+
+class MermaidValidator:
+    """
+    Incremental validator: feed() text as it arrives, then close() to get every issue.
+
+    Complete lines are checked as soon as they are fed, so `issues` already
+    holds the errors found so far while a response is still streaming.
+    """
+
+    def __init__(self):
+        self.issues: List[MermaidIssue] = []
+        self.family: Optional[str] = None
+        self.header: Optional[str] = None
+        self._parser: Optional[_Parser] = None
+        self._buffer = ""
+        self._line_no = 0
+        self._in_front_matter = False
+        self._rejected = False
+
+    def feed(self, text: str):
+        """Check every complete line in `text` (plus anything buffered before it)"""
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            self._line(line)
+
+    def close(self) -> List[MermaidIssue]:
+        """Check the final partial line and end-of-diagram conditions; return all issues"""
+        if self._buffer:
+            self._line(self._buffer)
+            self._buffer = ""
+        if self._parser is None:
+            if not self._rejected:
+                self.issues.append(MermaidIssue(max(self._line_no, 1), 1, "No Mermaid diagram header found"))
+        else:
+            self._parser.close(self._line_no)
+            if not self._parser.statements and not self.errors:
+                self.issues.append(MermaidIssue(1, 1, f"'{self.header}' diagram has no statements"))
+        self.issues.sort(key=lambda issue: (issue.line, issue.column))
+        return self.issues
+
+    @property
+    def errors(self) -> List[MermaidIssue]:
+        return [issue for issue in self.issues if issue.severity == ERROR]
+
+    def _line(self, raw: str):
+        self._line_no += 1
+        text = raw.strip()
+        if self._rejected or not text or text.startswith("%%"):
+            return
+        indent = len(raw) - len(raw.lstrip())
+        if text.endswith(";") and self.family != "flowchart":
+            text = text[:-1].rstrip()
+            # A lone ';' is an empty statement
+            if not text:
+                return
+
+        if self._parser is None:
+            self._header(text, indent)
+            return
+        if _COMMON_RE.match(text):
+            return
+        self._parser.line(text, self._line_no, indent)
+
+    def _header(self, text: str, indent: int):
+        # YAML front matter ("---" ... "---") may precede the header
+        if text == "---":
+            self._in_front_matter = not self._in_front_matter
+            return
+        if self._in_front_matter:
+            return
+
+        keyword, _, rest = text.partition(" ")
+        if keyword not in DIAGRAM_HEADERS:
+            self.issues.append(MermaidIssue(
+                self._line_no, indent + 1,
+                f"Unknown diagram type '{keyword}'; expected one of {', '.join(DIAGRAM_HEADERS)}"
+            ))
+            self._rejected = True
+            return
+        self.header = keyword
+        self.family = DIAGRAM_HEADERS[keyword]
+        self._parser = _PARSERS[self.family](self.issues)
+        direction = rest.strip().rstrip(";")
+        if self.family == "flowchart" and direction and direction not in FLOWCHART_DIRECTIONS:
+            self.issues.append(MermaidIssue(
+                self._line_no, indent + len(keyword) + 2,
+                f"Unknown flowchart direction '{direction}'; expected one of {', '.join(FLOWCHART_DIRECTIONS)}"
+            ))
+
+def validate_mermaid(code: str) -> List[MermaidIssue]:
+    """
+    Check a complete Mermaid diagram.
+
+    Returns:
+        Issues in line order; an empty list means no problems were found.
+        Only issues with severity "error" make the diagram invalid.
+    """
+    validator = MermaidValidator()
+    validator.feed(code)
+    return validator.close()
+
+def first_error(code: str) -> Optional[MermaidIssue]:
+    """Return the first error in `code`, or None if it is valid"""
+    for issue in validate_mermaid(code):
+        if issue.severity == ERROR:
+            return issue
+    return None
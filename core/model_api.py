@@ -1,13 +1,117 @@
-import requests
 import json
-from typing import List, Dict, Any, Optional
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import List, Dict, Any, Optional, Iterator, Tuple, Union
+
+import http_session
+from prompt_prefix import get_prefix_tracker
+from tracing import span, record_ollama_stats, start_detached_span, end_detached_span
+
+logger = logging.getLogger(__name__)
+
+# Most recent effective request options, newest last, for inspection/debugging
+_recent_options = deque(maxlen=50)
+_recent_options_lock = threading.Lock()
+
+# Keep the model (and the KV cache of the last prompt) loaded between requests
+DEFAULT_KEEP_ALIVE = "30m"
+
+# Ollama settings callers may pass through as model_options
+MODEL_OPTION_KEYS = ("num_ctx", "stop", "keep_alive")
+
+def default_keep_alive() -> Optional[Union[str, int]]:
+    """
+    keep_alive sent when the caller doesn't set one.
+
+    SMARTSDLC_KEEP_ALIVE overrides DEFAULT_KEEP_ALIVE; an empty value leaves
+    it to Ollama (5 minutes).
+    """
+    value = os.environ.get("SMARTSDLC_KEEP_ALIVE", DEFAULT_KEEP_ALIVE).strip()
+    if not value:
+        return None
+    return int(value) if value.lstrip("-").isdigit() else value
+
+def normalize_model_name(model: str) -> str:
+    """Strip a LiteLLM-style 'ollama/' provider prefix, which Ollama itself rejects"""
+    return model.split("/", 1)[1] if model.startswith("ollama/") else model
+
+def build_chat_payload(
+    messages: List[Dict[str, str]],
+    model: str,
+    max_tokens: int,
+    temperature: float,
+    num_ctx: Optional[int] = None,
+    stop: Optional[Union[str, List[str]]] = None,
+    keep_alive: Optional[Union[str, int]] = None
+) -> Dict[str, Any]:
+    """
+    Build the request body for Ollama's /api/chat endpoint.
+    
+    Shared by the sync, streaming and async clients so all of them send the
+    same payload. Optional settings are only included when given, so Ollama's
+    own defaults apply otherwise; keep_alive falls back to default_keep_alive()
+    so the cached prompt prefix survives between requests. The effective
+    options are logged and kept in recent_request_options().
+    
+    Args:
+        messages: List of message dictionaries with 'role' and 'content'
+        model: Model name
+        max_tokens: Maximum tokens to generate (Ollama's num_predict)
+        temperature: Temperature for generation
+        num_ctx: Context window size in tokens
+        stop: Stop sequences (a single string is one sequence)
+        keep_alive: How long Ollama keeps the model loaded after the request (e.g. "10m", -1)
+        
+    Returns:
+        Request payload dictionary (non-streaming; set "stream" to True to stream)
+    """
+    options = {
+        "temperature": temperature,
+        "num_predict": max_tokens
+    }
+    if num_ctx:
+        options["num_ctx"] = int(num_ctx)
+    if stop:
+        options["stop"] = [stop] if isinstance(stop, str) else list(stop)
+    
+    payload = {
+        "model": normalize_model_name(model),
+        "messages": messages,
+        "stream": False,
+        "options": options
+    }
+    if keep_alive is None:
+        keep_alive = default_keep_alive()
+    if keep_alive is not None:
+        payload["keep_alive"] = keep_alive
+    
+    effective = {"model": payload["model"], "options": dict(options), "keep_alive": keep_alive}
+    logger.debug(f"Ollama request options: {effective}")
+    with _recent_options_lock:
+        _recent_options.append(effective)
+    return payload
+
+def recent_request_options(limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    Return the effective options of the most recent model requests, newest last.
+    
+    Useful to check that UI/CLI settings actually reached the Ollama payload.
+    """
+    with _recent_options_lock:
+        return list(_recent_options)[-limit:]
 
 def call_model(
     messages: List[Dict[str, str]], 
     model: str = "qwen2.5:3b", 
     api_base: str = "http://localhost:11434",
     max_tokens: int = 2000,
-    temperature: float = 0.7
+    temperature: float = 0.7,
+    num_ctx: Optional[int] = None,
+    stop: Optional[List[str]] = None,
+    keep_alive: Optional[Union[str, int]] = None
 ) -> Optional[str]:
     """
     Call the DeepSeek model via Ollama API.
@@ -18,45 +122,54 @@ def call_model(
         api_base: API base URL (default: localhost)
         max_tokens: Maximum tokens to generate
         temperature: Temperature for generation
+        num_ctx: Context window size in tokens
+        stop: Stop sequences
+        keep_alive: How long Ollama keeps the model loaded after the request
         
     Returns:
         Generated text or None if failed
     """
-    try:
-        # Construct API endpoint
-        url = f"{api_base}/api/chat"
-        
-        # Prepare request payload
-        payload = {
-            "model": model,
-            "messages": messages,
-            "options": {
-                "temperature": temperature,
-                "num_predict": max_tokens
-            }
-        }
-        
-        # Make API request
-        response = requests.post(url, json=payload)
-        
-        # Check if request was successful
-        if response.status_code == 200:
-            result = response.json()
-            return result.get("message", {}).get("content")
-        else:
-            print(f"API error: {response.status_code}")
-            print(f"Response: {response.text}")
-            return None
+    with span("model.call", model=model, max_tokens=max_tokens) as call_span:
+        try:
+            # Construct API endpoint
+            url = f"{api_base}/api/chat"
             
-    except Exception as e:
-        print(f"Error calling model: {str(e)}")
-        return None
+            # Prepare request payload
+            payload = build_chat_payload(messages, model, max_tokens, temperature,
+                                         num_ctx=num_ctx, stop=stop, keep_alive=keep_alive)
+            
+            # Make API request through the shared keep-alive pool
+            response = http_session.post(url, json=payload)
+            
+            # Check if request was successful
+            if response.status_code == 200:
+                result = response.json()
+                record_ollama_stats(result, call_span)
+                get_prefix_tracker().record(messages, model, result, call_span)
+                return result.get("message", {}).get("content")
+            else:
+                print(f"API error: {response.status_code}")
+                print(f"Response: {response.text}")
+                call_span.set("http_status", response.status_code)
+                call_span.status = "error"
+                return None
+                
+        except Exception as e:
+            print(f"Error calling model: {str(e)}")
+            call_span.status = "error"
+            call_span.set("error", str(e))
+            return None
 
 def call_model_with_system(
     system_prompt: str,
     user_message: str,
     model: str = "qwen2.5:3b",
-    api_base: str = "http://localhost:11434"
+    api_base: str = "http://localhost:11434",
+    max_tokens: int = 2000,
+    temperature: float = 0.7,
+    num_ctx: Optional[int] = None,
+    stop: Optional[List[str]] = None,
+    keep_alive: Optional[Union[str, int]] = None
 ) -> Optional[str]:
     """
     Convenience function to call the model with a system prompt and user message.
@@ -66,6 +179,11 @@ def call_model_with_system(
         user_message: User query
         model: Model name
         api_base: API base URL
+        max_tokens: Maximum tokens to generate
+        temperature: Temperature for generation
+        num_ctx: Context window size in tokens
+        stop: Stop sequences
+        keep_alive: How long Ollama keeps the model loaded after the request
         
     Returns:
         Generated text or None if failed
@@ -74,7 +192,144 @@ def call_model_with_system(
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": user_message}
     ]
-    return call_model(messages, model, api_base)
+    return call_model(messages, model, api_base, max_tokens, temperature,
+                      num_ctx=num_ctx, stop=stop, keep_alive=keep_alive)
+
+def stream_model(
+    messages: List[Dict[str, str]], 
+    model: str = "qwen2.5:3b", 
+    api_base: str = "http://localhost:11434",
+    max_tokens: int = 2000,
+    temperature: float = 0.7,
+    num_ctx: Optional[int] = None,
+    stop: Optional[List[str]] = None,
+    keep_alive: Optional[Union[str, int]] = None
+) -> Iterator[str]:
+    """
+    Call the model with streaming enabled and yield content as it arrives.
+    
+    Ollama answers a streaming /api/chat request with newline-delimited JSON,
+    one object per chunk; each chunk's message content is yielded as soon as
+    its line is received.
+    
+    Args:
+        messages: List of message dictionaries with 'role' and 'content'
+        model: Model name
+        api_base: API base URL
+        max_tokens: Maximum tokens to generate
+        temperature: Temperature for generation
+        num_ctx: Context window size in tokens
+        stop: Stop sequences
+        keep_alive: How long Ollama keeps the model loaded after the request
+        
+    Yields:
+        Text chunks of the generated response
+    """
+    url = f"{api_base}/api/chat"
+    payload = build_chat_payload(messages, model, max_tokens, temperature,
+                                 num_ctx=num_ctx, stop=stop, keep_alive=keep_alive)
+    payload["stream"] = True
+    
+    stream_span = start_detached_span("model.stream", model=model, max_tokens=max_tokens)
+    start = time.perf_counter()
+    error = None
+    try:
+        with http_session.post(url, json=payload, stream=True) as response:
+            if response.status_code != 200:
+                print(f"API error: {response.status_code}")
+                print(f"Response: {response.text}")
+                error = f"HTTP {response.status_code}"
+                return
+            
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = parse_stream_chunk(line)
+                if chunk is None:
+                    continue
+                content = chunk.get("message", {}).get("content")
+                if content:
+                    if "time_to_first_token_seconds" not in stream_span.attributes:
+                        stream_span.set("time_to_first_token_seconds", round(time.perf_counter() - start, 6))
+                    yield content
+                if chunk.get("done"):
+                    # The final chunk carries Ollama's timing fields
+                    record_ollama_stats(chunk, stream_span)
+                    get_prefix_tracker().record(messages, model, chunk, stream_span)
+                    break
+    except Exception as e:
+        print(f"Error streaming from model: {str(e)}")
+        error = str(e)
+    finally:
+        end_detached_span(stream_span, error)
+
+def stream_model_with_system(
+    system_prompt: str,
+    user_message: str,
+    model: str = "qwen2.5:3b",
+    api_base: str = "http://localhost:11434",
+    max_tokens: int = 2000,
+    temperature: float = 0.7,
+    num_ctx: Optional[int] = None,
+    stop: Optional[List[str]] = None,
+    keep_alive: Optional[Union[str, int]] = None
+) -> Iterator[str]:
+    """
+    Streaming counterpart of call_model_with_system.
+    
+    Yields:
+        Text chunks of the generated response
+    """
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_message}
+    ]
+    return stream_model(messages, model, api_base, max_tokens, temperature,
+                        num_ctx=num_ctx, stop=stop, keep_alive=keep_alive)
+
+def parse_stream_chunk(line: bytes) -> Optional[Dict[str, Any]]:
+    """Parse one NDJSON line from a streaming response, or None if malformed"""
+    try:
+        chunk = json.loads(line)
+    except ValueError:
+        print(f"Skipping malformed stream chunk: {line[:80]!r}")
+        return None
+    if "error" in chunk:
+        print(f"Model error: {chunk['error']}")
+        return None
+    return chunk
+
+def describe_ollama_status(status_code: Optional[int], tags: Optional[Dict[str, Any]],
+                           model: str = "qwen2.5:3b") -> Tuple[bool, str]:
+    """
+    Interpret a response from Ollama's /api/tags endpoint.
+
+    Args:
+        status_code: HTTP status, or None if the server could not be reached
+        tags: Parsed JSON body (may be None)
+        model: Model that must be available
+
+    Returns:
+        (ok, message) tuple suitable for showing to a user
+    """
+    if status_code is None:
+        return False, "Ollama server not detected. Please start Ollama with: ollama serve"
+    if status_code != 200:
+        return False, "Ollama is running but couldn't check models"
+    available_models = [entry.get("name") for entry in (tags or {}).get("models", [])]
+    if normalize_model_name(model) in available_models:
+        return True, "Qwen 2.5:3B model is available"
+    return False, "Qwen 2.5:3B model not found. Please run: ollama pull qwen2.5:3b"
+
+def check_ollama_status(api_base: str = "http://localhost:11434", model: str = "qwen2.5:3b") -> Tuple[bool, str]:
+    """Check that Ollama is reachable and has `model` pulled"""
+    try:
+        response = http_session.get(f"{api_base}/api/tags")
+        return describe_ollama_status(response.status_code,
+                                      response.json() if response.status_code == 200 else None, model)
+    except Exception as e:
+        logger.error(f"Error checking Ollama status: {str(e)}")
+        return describe_ollama_status(None, None, model)
 
 # For testing
 if __name__ == "__main__":
@@ -0,0 +1,595 @@
+"""
+PlantUML to Mermaid conversion.
+
+parse_plantuml() reads the source once, line by line, into a small typed IR:
+declarations (with class members), links (relations, messages and
+transitions, with the arrow split into its line and end decorations) and the
+few other statements Mermaid has an equivalent for - notes, sequence groups,
+composite states and packages. The diagram type is decided from keyword
+counts gathered in the same pass. One emitter per Mermaid diagram family
+writes the output with a single join, so conversion is linear in the length
+of the input.
+
+    mermaid_code = plantuml_to_mermaid(plantuml_code)
+"""
+
+import functools
+import re
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+DIAGRAM_TYPES = ("class", "usecase", "sequence", "component", "state", "flowchart")
+
+CLASS_KINDS = frozenset(("class", "abstract", "interface", "enum"))
+PARTICIPANT_KINDS = frozenset(("participant", "boundary", "control", "entity", "database", "collections", "queue"))
+CONTAINER_KEYWORDS = frozenset(("package", "namespace", "rectangle", "frame", "folder", "cloud", "node", "together"))
+SEQUENCE_GROUPS = frozenset(("alt", "else", "opt", "loop", "par", "break", "critical", "group", "end"))
+SEQUENCE_GROUP_OPENERS = SEQUENCE_GROUPS - {"else", "end"}
+SEQUENCE_COMMANDS = frozenset(("activate", "deactivate", "destroy", "autonumber"))
+
+# First word of a line -> how it's handled; anything else is tried as a link
+_KEYWORDS = dict.fromkeys(("abstract", "class", "interface", "enum", "actor", "usecase", "component", "state")
+                          + tuple(PARTICIPANT_KINDS) + tuple(CONTAINER_KEYWORDS), "declaration")
+_KEYWORDS.update(dict.fromkeys(SEQUENCE_GROUPS, "group"))
+_KEYWORDS.update(dict.fromkeys(SEQUENCE_COMMANDS, "command"))
+# No Mermaid equivalent
+_KEYWORDS.update(dict.fromkeys(("skinparam", "hide", "show", "scale", "caption", "header", "footer", "newpage",
+                                "allowmixing", "mainframe", "sprite", "box", "return"), "skip"))
+_KEYWORDS.update({"note": "note", "title": "title", "legend": "legend", "left": "direction", "top": "direction",
+                  "}": "close"})
+# Separators, delays, preprocessor lines and comments
+_SKIP_PREFIXES = ("'", "!", "==", "...", "|||")
+_DECLARATION_RE = re.compile(
+    r"(abstract\s+class|abstract|class|interface|enum|actor|usecase|participant|boundary|control|entity|"
+    r"database|collections|queue|component|state|" + "|".join(sorted(CONTAINER_KEYWORDS)) + r")\s+"
+    r"(?:\"([^\"]*)\"|(\[[^\]]*\]|\([^)]*\)|[^\s\"{]+))"                # name, quoted or bare
+    r"(?:\s+as\s+(?:\"([^\"]*)\"|([^\s{<:]+)))?"                    # alias
+    r"\s*(<<[^>]*>>)?\s*(?:#\S+\s*)?"                               # stereotype, color
+    r"(.*)$"                                                        # body, description
+)
+_ENDPOINT = r"(?:\[\*\]|\"[^\"]*\"|\([^)]*\)|\[[^\]]*\]|:[^:]+:|[\w.]+)"
+_ARROW = (r"(?:<\||<<|<|\*|o|#|x|\}|\+|\^)?"
+          r"[-.=]+(?:(?:up|down|left|right|u|d|l|r)[-.=]+|\[[^\]]*\][-.=]*)?"
+          r"(?:\|>|>>|>x|>|\*|o|#|x|\{|\+|\^)?")
+_LINK_RE = re.compile(
+    r"(" + _ENDPOINT + r")\s*(?:\"([^\"]*)\"\s*)?(" + _ARROW + r")\s*(?:\"([^\"]*)\"\s*)?(" + _ENDPOINT + r")"
+    r"\s*[+-]*\s*(?::\s*(.*))?$"
+)
+_ARROW_PARTS_RE = re.compile(r"(<\||<<|<|\*|o|#|x|\}|\+|\^)?([-.=][^<>|*{}+^]*?)(\|>|>>|>x|>|\*|o|#|x|\{|\+|\^)?$")
+_ARROW_HINT_RE = re.compile(r"\[[^\]]*\]|up|down|left|right|[udlr]")
+_NOTE_RE = re.compile(r"note\s+(left|right|top|bottom|over)(?:\s+of)?\s*([^:]*?)\s*(?::\s*(.*))?$")
+_FLOATING_NOTE_RE = re.compile(r"note\s+\"([^\"]*)\"")
+_ELEMENT_RE = re.compile(r"(\([^)]*\)|\[(?!\*\])[^\]]*\]|:[^:]+:)\s*$")
+_DESCRIPTION_RE = re.compile(r"([\w.]+)\s*:\s*(.+)$")
+_NON_WORD_RE = re.compile(r"\W+")
+_GENERIC_RE = re.compile(r"<([^<>]+)>")
+
+class Declaration:
+    """A named element: class, actor, use case, participant, component or state"""
+
+    __slots__ = ("kind", "id", "label", "stereotype", "members", "explicit")
+
+    def __init__(self, kind: Optional[str], node_id: str, label: str, explicit: bool = False):
+        self.kind = kind
+        self.id = node_id
+        self.label = label
+        self.stereotype: Optional[str] = None
+        self.members: List[str] = []
+        self.explicit = explicit
+
+class Link:
+    """A relation, message or transition; left/right are the end decorations of the arrow"""
+
+    __slots__ = ("source", "target", "line", "left", "right", "label", "source_card", "target_card")
+
+    def __init__(self, source: str, target: str, line: str, left: Optional[str], right: Optional[str],
+                 label: str = "", source_card: Optional[str] = None, target_card: Optional[str] = None):
+        self.source = source
+        self.target = target
+        self.line = line
+        self.left = left
+        self.right = right
+        self.label = label
+        self.source_card = source_card
+        self.target_card = target_card
+
+    @property
+    def dotted(self) -> bool:
+        return "." in self.line
+
+class Statement:
+    """Anything else that survives conversion: note, group, block open/close, description"""
+
+    __slots__ = ("keyword", "target", "text")
+
+    def __init__(self, keyword: str, target: str = "", text: str = ""):
+        self.keyword = keyword
+        self.target = target
+        self.text = text
+
+Element = Union[Declaration, Link, Statement]
+
+class PlantUMLDocument:
+    """Parsed PlantUML: statements in source order plus the declarations they refer to"""
+
+    def __init__(self):
+        self.statements: List[Element] = []
+        self.declarations: Dict[str, Declaration] = {}
+        self.aliases: Dict[str, str] = {}
+        self.counts: Dict[str, int] = {}
+        self.direction = "TD"
+
+    def count(self, key: str):
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def declare(self, kind: Optional[str], node_id: str, label: str, explicit: bool = False) -> Declaration:
+        """Return the declaration for node_id, creating it on first use; explicit declarations win"""
+        decl = self.declarations.get(node_id)
+        if decl is None:
+            decl = self.declarations[node_id] = Declaration(kind, node_id, label, explicit)
+        elif explicit or decl.kind is None:
+            decl.kind = kind or decl.kind
+            if explicit:
+                decl.label = label
+                decl.explicit = True
+        return decl
+
+def node_id(text: str) -> str:
+    """Mermaid-safe identifier for a PlantUML name"""
+    ident = text if text.isidentifier() else _NON_WORD_RE.sub("_", text).strip("_") or "node"
+    # 'end' closes a block in every Mermaid diagram family
+    return ident + "_" if ident.lower() == "end" else ident
+
+def _endpoint(doc: PlantUMLDocument, token: str) -> str:
+    """Resolve a link endpoint to a declaration id, declaring it implicitly on first use"""
+    if token in doc.declarations:
+        return token
+    if token == "[*]":
+        doc.count("start_state")
+        return token
+    kind = None
+    text = token
+    if token[0] == '"':
+        text = token[1:-1]
+    elif token[0] == "(" and token[-1] == ")":
+        kind, text = "usecase", token[1:-1].strip()
+        doc.count("usecase_token")
+    elif token[0] == ":" and token[-1] == ":" and len(token) > 1:
+        kind, text = "actor", token[1:-1].strip()
+        doc.count("actor_token")
+    elif token[0] == "[" and token[-1] == "]":
+        kind, text = "component", token[1:-1].strip()
+        doc.count("component_token")
+    alias = doc.aliases.get(text)
+    if alias:
+        return alias
+    decl = doc.declare(kind, node_id(text), text)
+    return decl.id
+
+def _parse_declaration(doc: PlantUMLDocument, match: "re.Match") -> Tuple[Declaration, str]:
+    keyword, quoted, bare, alias_quoted, alias_bare, stereotype, rest = match.groups()
+    kind = "abstract" if keyword.startswith("abstract") else keyword
+    name = quoted if quoted is not None else bare
+    if alias_quoted is not None:
+        # `participant Bob as "Robert"`: the quoted part is the label
+        name, alias = alias_quoted, name
+    else:
+        alias = alias_bare
+    if quoted is None and len(name) > 2 and (name[0], name[-1]) in (("(", ")"), ("[", "]"), (":", ":")):
+        name = name[1:-1].strip()
+    if alias:
+        decl_id = node_id(alias)
+    else:
+        decl_id = node_id(_GENERIC_RE.sub("", name) if "<" in name and kind in CLASS_KINDS else name)
+    if alias:
+        doc.aliases[name] = decl_id
+    decl = doc.declare(kind, decl_id, name, explicit=True)
+    if stereotype:
+        decl.stereotype = stereotype[2:-2].strip()
+    doc.count(kind)
+    return decl, rest.strip()
+
+@functools.lru_cache(maxsize=256)
+def _split_arrow(arrow: str) -> Tuple[Optional[str], str, Optional[str]]:
+    """(left decoration, line without direction/color hints, right decoration); diagrams reuse a few arrows"""
+    parts = _ARROW_PARTS_RE.match(arrow)
+    left, line, right = parts.groups() if parts else (None, arrow, None)
+    return left, _ARROW_HINT_RE.sub("", line) or "-", right
+
+def _add_members(decl: Declaration, text: str):
+    for member in text.split(";"):
+        member = member.replace("{abstract}", "").replace("{static}", "").strip()
+        if member and member.strip("-.=_") and member not in ("{", "}"):
+            decl.members.append(member)
+
+def parse_plantuml(text: str) -> PlantUMLDocument:
+    """
+    Parse PlantUML source into a PlantUMLDocument in one pass over the lines.
+
+    Lines before @startuml (when present) and after @enduml are ignored, as
+    are statements with no Mermaid equivalent (styling, layout hints).
+    """
+    doc = PlantUMLDocument()
+    body: Optional[Declaration] = None    # class whose { ... } body is open
+    note: Optional[Statement] = None      # multi-line note being collected
+    in_comment = False
+    in_legend = False
+
+    for raw in text.splitlines():
+        line = raw.strip()
+        if in_comment:
+            in_comment = "'/" not in line
+            continue
+        if not line:
+            continue
+        if line.startswith("/'"):
+            in_comment = "'/" not in line[2:]
+            continue
+        if note is not None:
+            if line.lower() in ("end note", "endnote"):
+                doc.statements.append(note)
+                note = None
+            else:
+                note.text = f"{note.text}<br/>{line}" if note.text else line
+            continue
+        if in_legend:
+            in_legend = line.lower() not in ("endlegend", "end legend")
+            continue
+        if body is not None:
+            if line.startswith("}"):
+                body = None
+                continue
+            if _KEYWORDS.get(line.split(None, 1)[0]) != "declaration":
+                _add_members(body, line)
+                continue
+            # A declaration ends a body whose closing brace is missing (truncated output)
+            body = None
+        if line.startswith("@"):
+            lower = line.lower()
+            if lower.startswith("@startuml"):
+                doc = PlantUMLDocument()
+            elif lower.startswith("@enduml"):
+                break
+            continue
+
+        space = line.find(" ")
+        word = line if space < 0 else line[:space]
+        handling = _KEYWORDS.get(word)
+        if handling is None:
+            if line.startswith(_SKIP_PREFIXES):
+                continue
+        elif handling == "declaration":
+            match = _DECLARATION_RE.match(line)
+            if match:
+                decl, rest = _parse_declaration(doc, match)
+                if word in CONTAINER_KEYWORDS and rest.startswith("{"):
+                    # A package or node that groups other elements, not an element itself
+                    del doc.declarations[decl.id]
+                    doc.statements.append(Statement("open", decl.id, decl.label))
+                    continue
+                doc.statements.append(decl)
+                if rest.startswith("{"):
+                    if decl.kind == "state":
+                        doc.statements.append(Statement("open", decl.id, decl.label))
+                    elif rest.endswith("}"):
+                        _add_members(decl, rest[1:-1])
+                    else:
+                        body = decl
+                        _add_members(decl, rest[1:])
+                        doc.count("class_body")
+                elif rest.startswith(":"):
+                    doc.statements.append(Statement("description", decl.id, rest[1:].strip()))
+                continue
+        elif handling == "group":
+            if word != "end" or line == "end":
+                doc.statements.append(Statement(word, text=line[len(word):].strip()))
+                if word in SEQUENCE_GROUP_OPENERS:
+                    doc.count("group")
+            continue
+        elif handling == "command":
+            doc.statements.append(Statement(word, text=line[len(word):].strip()))
+            doc.count("sequence_command")
+            continue
+        elif handling == "note":
+            match = _NOTE_RE.match(line)
+            if match:
+                position, target, note_text = match.groups()
+                targets = ",".join(_endpoint(doc, t.strip()) for t in target.split(",") if t.strip())
+                statement = Statement(f"note {position}", targets, note_text or "")
+                if note_text is None:
+                    note = statement
+                else:
+                    doc.statements.append(statement)
+                continue
+            match = _FLOATING_NOTE_RE.match(line)
+            if match:
+                doc.statements.append(Statement("note", text=match.group(1)))
+            continue
+        elif handling == "title":
+            doc.statements.append(Statement("title", text=line[5:].strip()))
+            continue
+        elif handling == "legend":
+            in_legend = True
+            continue
+        elif handling == "direction":
+            if line.endswith("direction"):
+                doc.direction = "LR" if word == "left" else "TD"
+            continue
+        elif handling == "close":
+            doc.statements.append(Statement("close"))
+            continue
+        else:
+            continue
+
+        match = _LINK_RE.match(line)
+        if match:
+            source, source_card, arrow, target_card, target, label = match.groups()
+            left, line_part, right = _split_arrow(arrow)
+            doc.statements.append(Link(_endpoint(doc, source), _endpoint(doc, target), line_part, left, right,
+                                       (label or "").strip(), source_card, target_card))
+            doc.count("labelled_link" if label else "link")
+            continue
+
+        match = _ELEMENT_RE.match(line)
+        if match:
+            # A bare [Component], (Use case) or :Actor: declares it in place
+            doc.statements.append(doc.declarations[_endpoint(doc, match.group(1))])
+            continue
+
+        match = _DESCRIPTION_RE.match(line)
+        if match:
+            doc.statements.append(Statement("description", _endpoint(doc, match.group(1)), match.group(2).strip()))
+            continue
+
+        # Free-text flowchart steps: "Start process --> Check input"
+        for arrow in ("-->", "--"):
+            source, found, target = line.partition(arrow)
+            if found and source.strip() and target.strip():
+                doc.statements.append(Link(_endpoint(doc, f'"{source.strip()}"'), _endpoint(doc, f'"{target.strip()}"'),
+                                           arrow, None, ">" if arrow == "-->" else None))
+                doc.count("link")
+                break
+
+    if note is not None:
+        doc.statements.append(note)
+    return doc
+
+def detect_diagram_type(doc: PlantUMLDocument) -> str:
+    """Pick the diagram family from the keywords seen while parsing"""
+    counts = doc.counts
+    if counts.get("class") or counts.get("abstract") or counts.get("enum") or counts.get("class_body"):
+        return "class"
+    if counts.get("usecase") or counts.get("usecase_token"):
+        return "usecase"
+    if any(counts.get(kind) for kind in PARTICIPANT_KINDS) or counts.get("group") or counts.get("sequence_command"):
+        return "sequence"
+    if counts.get("actor") or counts.get("actor_token"):
+        # Actors exchanging labelled messages are a sequence diagram
+        return "sequence" if counts.get("labelled_link") and not counts.get("link") else "usecase"
+    if counts.get("component") or counts.get("interface") or counts.get("component_token"):
+        return "component"
+    if counts.get("state") or counts.get("start_state"):
+        return "state"
+    return "flowchart"
+
+# ---------------------------------------------------------------------------
+# Emitters
+
+def _quote(text: str) -> str:
+    return '"' + text.replace('"', "#quot;") + '"'
+
+def _graph_link(link: Link) -> str:
+    source, target = link.source, link.target
+    left, right = link.left, link.right
+    if left and not right:
+        source, target, left, right = target, source, None, left
+    if link.dotted:
+        arrow = "-.->" if right else "-.-"
+    else:
+        arrow = "-->" if right else "---"
+    if left and right:
+        arrow = "<" + arrow
+    label = f"|{_quote(link.label.replace('|', '/'))}|" if link.label else ""
+    return f"{source} {arrow}{label} {target}"
+
+_GRAPH_SHAPES = {
+    "actor": '["👤 {}"]',
+    "usecase": '(["{}"])',
+    "interface": '(("{}"))',
+    "database": '[("{}")]',
+    "start": '(("{}"))',
+}
+
+def _emit_graph(doc: PlantUMLDocument, direction: str) -> str:
+    """Flowchart for use case, component and generic diagrams"""
+    lines = [f"flowchart {direction}"]
+    defined = set()
+    depth = 1
+
+    def define(decl_id: str):
+        # Nodes are defined where first mentioned, so they land in the right subgraph
+        if decl_id not in defined:
+            defined.add(decl_id)
+            decl = doc.declarations[decl_id]
+            shape = _GRAPH_SHAPES.get(decl.kind, '["{}"]').format(decl.label.replace('"', "#quot;"))
+            lines.append("    " * depth + decl.id + shape)
+
+    for element in doc.statements:
+        if isinstance(element, Declaration):
+            define(element.id)
+        elif isinstance(element, Link):
+            define(element.source)
+            define(element.target)
+            lines.append("    " * depth + _graph_link(element))
+        elif element.keyword == "open":
+            lines.append("    " * depth + f"subgraph {element.target} [{_quote(element.text)}]")
+            depth += 1
+        elif element.keyword == "close" and depth > 1:
+            depth -= 1
+            lines.append("    " * depth + "end")
+    return "\n".join(lines) + "\n"
+
+def emit_usecase(doc: PlantUMLDocument) -> str:
+    """Use case diagram as a flowchart (Mermaid has no use case diagram)"""
+    return _emit_graph(doc, doc.direction)
+
+def emit_component(doc: PlantUMLDocument) -> str:
+    """Component diagram as a left-to-right flowchart"""
+    return _emit_graph(doc, "LR" if doc.direction == "TD" else doc.direction)
+
+def emit_flowchart(doc: PlantUMLDocument) -> str:
+    """Anything else as a top-down flowchart"""
+    return _emit_graph(doc, doc.direction)
+
+_CLASS_LEFT = {"<|": "<|", "*": "*", "o": "o", "<": "<", "<<": "<"}
+_CLASS_RIGHT = {"|>": "|>", "*": "*", "o": "o", ">": ">", ">>": ">"}
+_CLASS_STEREOTYPES = {"interface": "interface", "abstract": "abstract", "enum": "enumeration"}
+
+def emit_class(doc: PlantUMLDocument) -> str:
+    """Class diagram"""
+    lines = ["classDiagram"]
+    blocks: List[bool] = []
+    indent = "    "
+    for element in doc.statements:
+        if isinstance(element, Declaration):
+            if element.kind not in CLASS_KINDS:
+                continue
+            name = _GENERIC_RE.sub(r"~\1~", element.label)
+            if name.startswith(element.id + "~"):
+                lines.append(f"{indent}class {name}")
+            elif element.label != element.id:
+                lines.append(f"{indent}class {element.id}[{_quote(element.label)}]")
+            else:
+                lines.append(f"{indent}class {element.id}")
+            stereotype = element.stereotype or _CLASS_STEREOTYPES.get(element.kind)
+            if stereotype:
+                lines.append(f"{indent}<<{stereotype}>> {element.id}")
+            for member in element.members:
+                member = _GENERIC_RE.sub(r"~\1~", member)
+                lines.append(f"{indent}{element.id} : {member}")
+        elif isinstance(element, Link):
+            arrow = (_CLASS_LEFT.get(element.left, "") + (".." if element.dotted else "--")
+                     + _CLASS_RIGHT.get(element.right, ""))
+            source_card = f' "{element.source_card}"' if element.source_card else ""
+            target_card = f'"{element.target_card}" ' if element.target_card else ""
+            # PlantUML reading-direction markers ("owns >") have no Mermaid equivalent
+            label = element.label.strip("<> ")
+            label = f" : {label}" if label else ""
+            lines.append(f"{indent}{element.source}{source_card} {arrow} {target_card}{element.target}{label}")
+        elif element.keyword == "open":
+            # Mermaid namespaces can't nest
+            blocks.append(not any(blocks))
+            if blocks[-1]:
+                lines.append(f"{indent}namespace {element.target} {{")
+                indent = "        "
+        elif element.keyword == "close":
+            if blocks and blocks.pop():
+                indent = "    "
+                lines.append(f"{indent}}}")
+        elif element.keyword.startswith("note"):
+            if element.target and "," not in element.target:
+                lines.append(f"{indent}note for {element.target} {_quote(element.text)}")
+            else:
+                lines.append(f"{indent}note {_quote(element.text)}")
+    return "\n".join(lines) + "\n"
+
+def _message_arrow(link: Link) -> str:
+    dashed = link.dotted or link.line.count("-") > 1
+    head = link.right or link.left
+    if head in (">>", "<<"):
+        arrow = "-)"
+    elif head in ("x", ">x"):
+        arrow = "-x"
+    elif head:
+        arrow = "->>"
+    else:
+        arrow = "->"
+    return "-" + arrow if dashed else arrow
+
+def emit_sequence(doc: PlantUMLDocument) -> str:
+    """Sequence diagram"""
+    lines = ["sequenceDiagram"]
+    for decl in doc.declarations.values():
+        keyword = "actor" if decl.kind == "actor" else "participant"
+        alias = f" as {decl.label}" if decl.label != decl.id else ""
+        lines.append(f"    {keyword} {decl.id}{alias}")
+    depth = 1
+    for element in doc.statements:
+        indent = "    " * depth
+        if isinstance(element, Link):
+            source, target = element.source, element.target
+            if element.left and not element.right:
+                source, target = target, source
+            lines.append(f"{indent}{source}{_message_arrow(element)}{target}: {element.label}")
+        elif isinstance(element, Statement):
+            keyword = element.keyword
+            if keyword == "title":
+                lines.append(f"{indent}title {element.text}")
+            elif keyword in SEQUENCE_GROUP_OPENERS:
+                # Mermaid has no labelled group; a shaded rect is the closest
+                lines.append(indent + ("rect rgb(240, 240, 240)" if keyword == "group" else f"{keyword} {element.text}"))
+                depth += 1
+            elif keyword == "else":
+                lines.append("    " * (depth - 1) + f"else {element.text}")
+            elif keyword == "end":
+                depth = max(1, depth - 1)
+                lines.append("    " * depth + "end")
+            elif keyword in SEQUENCE_COMMANDS:
+                lines.append(f"{indent}{keyword} {element.text}".rstrip())
+            elif keyword.startswith("note") and element.target:
+                position = keyword.split()[1]
+                position = "over" if position in ("over", "top", "bottom") or "," in element.target else position + " of"
+                lines.append(f"{indent}Note {position} {element.target}: {element.text}")
+    return "\n".join(lines) + "\n"
+
+def emit_state(doc: PlantUMLDocument) -> str:
+    """State diagram"""
+    lines = ["stateDiagram-v2"]
+    depth = 1
+    for element in doc.statements:
+        indent = "    " * depth
+        if isinstance(element, Declaration):
+            if element.kind != "state":
+                continue
+            stereotype = f" <<{element.stereotype}>>" if element.stereotype in ("fork", "join", "choice") else ""
+            if element.label != element.id:
+                lines.append(f"{indent}state {_quote(element.label)} as {element.id}")
+            elif stereotype:
+                lines.append(f"{indent}state {element.id}{stereotype}")
+        elif isinstance(element, Link):
+            label = f" : {element.label}" if element.label else ""
+            lines.append(f"{indent}{element.source} --> {element.target}{label}")
+        elif element.keyword == "open":
+            lines.append(f"{indent}state {element.target} {{")
+            depth += 1
+        elif element.keyword == "close":
+            depth = max(1, depth - 1)
+            lines.append("    " * depth + "}")
+        elif element.keyword == "description":
+            lines.append(f"{indent}{element.target} : {element.text}")
+        elif element.keyword.startswith("note") and element.target and "," not in element.target:
+            position = "left" if element.keyword.endswith("left") else "right"
+            lines.append(f"{indent}note {position} of {element.target} : {element.text.replace('<br/>', ' ')}")
+    return "\n".join(lines) + "\n"
+
+EMITTERS: Dict[str, Callable[[PlantUMLDocument], str]] = {
+    "class": emit_class,
+    "usecase": emit_usecase,
+    "sequence": emit_sequence,
+    "component": emit_component,
+    "state": emit_state,
+    "flowchart": emit_flowchart,
+}
+
+def plantuml_to_mermaid(plantuml_code: str, diagram_type: Optional[str] = None) -> str:
+    """
+    Convert PlantUML source to Mermaid.
+
+    Args:
+        plantuml_code: PlantUML source, with or without @startuml/@enduml
+        diagram_type: One of DIAGRAM_TYPES; detected from the source by default
+
+    Returns:
+        Mermaid diagram code
+    """
+    doc = parse_plantuml(plantuml_code)
+    return EMITTERS[diagram_type or detect_diagram_type(doc)](doc)
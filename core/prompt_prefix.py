@@ -0,0 +1,138 @@
+"""
+Track how much of each prompt Ollama served from its KV cache.
+
+Ollama keeps the KV cache of the last prompt it evaluated for a loaded model
+and only evaluates the tokens after the longest common prefix with the next
+one. prompt_eval_count in a response therefore counts the new tokens only.
+The prompts are laid out so that every request for the same agent and diagram
+type starts with the same bytes (system prompt, then the static task
+instructions, then the product description; see prompts.py). For that to pay
+off, the model must stay loaded between requests (keep_alive) and num_ctx must
+not change, since a different context size reloads the model.
+
+Ollama doesn't report reused tokens directly, so they are estimated: the
+densest cold evaluation seen so far gives tokens per character, the prompt
+size tells how many tokens a cold evaluation would have taken, and whatever
+wasn't evaluated (capped at the stable prefix) was reused. The time saved is
+the reused tokens at this response's prompt_eval_duration per token.
+
+Usage:
+    from prompt_prefix import get_prefix_tracker
+    get_prefix_tracker().record(messages, model, response, call_span)
+    get_prefix_tracker().stats()
+"""
+
+import hashlib
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from prompts import PRODUCT_DESCRIPTION_HEADER
+from tracing import Span, current_span
+
+def split_prompt(messages: List[Dict[str, str]]) -> Tuple[str, str]:
+    """
+    Return (stable prefix, variable rest) of a chat as one string each.
+
+    The prefix is every message before the last one plus the last message up
+    to and including PRODUCT_DESCRIPTION_HEADER; without the header only the
+    earlier messages (usually the system prompt) count as stable.
+    """
+    if not messages:
+        return "", ""
+    head = "".join(message.get("content", "") for message in messages[:-1])
+    last = messages[-1].get("content", "")
+    cut = last.find(PRODUCT_DESCRIPTION_HEADER)
+    if cut < 0:
+        return head, last
+    cut += len(PRODUCT_DESCRIPTION_HEADER)
+    return head + last[:cut], last[cut:]
+
+def prefix_key(model: str, messages: List[Dict[str, str]]) -> str:
+    """Short hash identifying the stable prefix of a prompt for a model"""
+    prefix, _ = split_prompt(messages)
+    return hashlib.sha256(f"{model}\0{prefix}".encode("utf-8")).hexdigest()[:16]
+
+class PrefixTracker:
+    """Process-wide estimate of prompt tokens reused from Ollama's KV cache"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens_per_char = 0.0
+        self._prefixes: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self._totals = defaultdict(float)
+
+    def record(self, messages: List[Dict[str, str]], model: str, response: Dict[str, Any],
+               target: Optional[Span] = None) -> Dict[str, Any]:
+        """
+        Estimate reuse for one (final) Ollama response.
+
+        The estimate is attached to `target` (default: the current span) and
+        added to the totals.
+
+        Returns:
+            {'prefix': key, 'reused_tokens': ..., 'saved_seconds': ...}, or {}
+            if the response carries no prompt_eval_count
+        """
+        evaluated = response.get("prompt_eval_count")
+        if evaluated is None:
+            return {}
+        prefix, rest = split_prompt(messages)
+        prompt_chars = len(prefix) + len(rest)
+        key = prefix_key(model, messages)
+        duration = response.get("prompt_eval_duration", 0) / 1e9
+        seconds_per_token = duration / evaluated if evaluated else 0.0
+
+        with self._lock:
+            if prompt_chars:
+                self._tokens_per_char = max(self._tokens_per_char, evaluated / prompt_chars)
+            expected = prompt_chars * self._tokens_per_char
+            reused = int(max(0.0, min(expected - evaluated, len(prefix) * self._tokens_per_char)))
+            if reused and not seconds_per_token:
+                # Everything was cached; fall back to the average cold rate
+                seconds_per_token = (self._totals["eval_seconds"] / self._totals["evaluated_tokens"]
+                                     if self._totals["evaluated_tokens"] else 0.0)
+            saved = reused * seconds_per_token
+
+            entry = self._prefixes[key]
+            entry["requests"] += 1
+            entry["reused_tokens"] += reused
+            entry["saved_seconds"] += saved
+            self._totals["requests"] += 1
+            self._totals["hits"] += 1 if reused else 0
+            self._totals["evaluated_tokens"] += evaluated
+            self._totals["eval_seconds"] += duration
+            self._totals["reused_tokens"] += reused
+            self._totals["saved_seconds"] += saved
+
+        result = {"prefix": key, "reused_tokens": reused, "saved_seconds": round(saved, 6)}
+        target = target or current_span()
+        if target is not None:
+            target.set("prompt_prefix", key)
+            target.set("prompt_prefix_reused_tokens", reused)
+            target.set("prompt_eval_saved_seconds", result["saved_seconds"])
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Return reuse totals and the share of requests that hit a warm prefix"""
+        with self._lock:
+            stats = dict(self._totals)
+            stats["prefixes"] = len(self._prefixes)
+            stats["tokens_per_char"] = round(self._tokens_per_char, 4)
+        for field in ("requests", "hits", "evaluated_tokens", "eval_seconds", "reused_tokens", "saved_seconds"):
+            stats.setdefault(field, 0)
+        stats["hit_rate"] = stats["hits"] / stats["requests"] if stats["requests"] else 0.0
+        return stats
+
+    def reset(self):
+        """Forget all observations (mainly for tests)"""
+        with self._lock:
+            self._tokens_per_char = 0.0
+            self._prefixes.clear()
+            self._totals.clear()
+
+_tracker = PrefixTracker()
+
+def get_prefix_tracker() -> PrefixTracker:
+    """Return the process-wide tracker"""
+    return _tracker
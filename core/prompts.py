@@ -0,0 +1,299 @@
+"""
+Prompt text shared by the CrewAI agents and the direct (streaming) model calls.
+
+Kept free of heavy imports so it can be used without loading CrewAI.
+
+The Mermaid generator's guidance lives in a registry of PromptTemplates, one
+per diagram type, so a request only sends the guidance and example for the
+diagram type it asks for:
+
+    system_prompt = mermaid_system_prompt("Class")
+    template_token_counts()    # {'Class': ..., ..., 'all': ...}
+
+Task prompts put everything that only depends on the agent and diagram type
+first and the product description last, after PRODUCT_DESCRIPTION_HEADER.
+Together with a fixed system prompt per agent, two requests for the same
+diagram type share a byte-identical prefix, which Ollama can serve from the
+KV cache of the previous request instead of evaluating it again (see
+prompt_prefix).
+"""
+
+from typing import Dict, List, Optional
+
+# Bump whenever prompt text below changes; cached responses are keyed on it.
+PROMPT_TEMPLATE_VERSION = "4"
+
+# Everything in a task prompt before this line is the same for every product
+PRODUCT_DESCRIPTION_HEADER = "Product description:"
+
+SDLC_SYSTEM_PROMPT = """
+    You are an expert Software Development Lifecycle (SDLC) consultant.
+    Your job is to analyze software project descriptions and recommend the most appropriate SDLC model.
+    Consider project scale, complexity, requirements clarity, time constraints, and team expertise.
+    
+    Common SDLC models include:
+    1. Waterfall - Linear sequential approach, good for well-defined requirements
+    2. Agile - Iterative approach with frequent customer feedback
+    3. Scrum - Agile framework with sprints and specific roles
+    4. Kanban - Visual workflow management with continuous delivery
+    5. Spiral - Risk-driven approach with iterative prototyping
+    6. DevOps - Integration of development and operations throughout lifecycle
+    7. RAD (Rapid Application Development) - Emphasis on rapid prototyping
+    8. V-Model - Testing integrated with each development phase
+
+    KEY BENEFITS:
+        - [Benefit 1]
+        - [Benefit 2]
+        - [Benefit 3]
+        
+    POTENTIAL CHALLENGES:
+        - [Challenge 1]
+        - [Challenge 2]
+
+    Provide a clear recommendation with 3-5 bullet points justifying your choice.
+    """
+
+MERMAID_PROMPT_HEADER = """
+    You are an expert UML diagram designer who specializes in Mermaid syntax.
+    Your job is to create accurate, clean, and professional Mermaid code for different diagram types based on software requirements.
+    """
+
+MERMAID_PROMPT_FOOTER = """
+    Always ensure your output is valid Mermaid syntax. Keep the diagram focused and clean - include only the most important elements.
+    Use appropriate styling to improve readability. DO NOT include any explanatory text, just return the complete Mermaid code.
+    """
+
+class PromptTemplate:
+    """
+    Mermaid guidance for one diagram type.
+
+    Bump `version` whenever the text changes; it is part of the response cache
+    key for that diagram type only.
+    """
+
+    __slots__ = ("diagram_type", "title", "syntax", "guidelines", "example", "version")
+
+    def __init__(self, diagram_type: str, title: str, syntax: str, guidelines: List[str],
+                 example: str, version: int = 1):
+        self.diagram_type = diagram_type
+        self.title = title
+        self.syntax = syntax
+        self.guidelines = guidelines
+        self.example = example
+        self.version = version
+
+    def section(self) -> str:
+        """The guidelines and example as they appear in the system prompt"""
+        lines = [f"       - {guideline}" for guideline in self.guidelines]
+        lines.append("       - Example:")
+        lines += [f"         {line}" if line else "" for line in self.example.strip("\n").splitlines()]
+        return f"{self.title}:\n" + "\n".join(lines)
+
+# Diagram type -> template, in the order the full prompt lists them
+MERMAID_TEMPLATES: Dict[str, PromptTemplate] = {}
+
+def register_template(template: PromptTemplate):
+    """Add or replace the template for template.diagram_type"""
+    MERMAID_TEMPLATES[template.diagram_type] = template
+
+def get_template(diagram_type: str) -> Optional[PromptTemplate]:
+    """Return the template for a diagram type, or None if it has none"""
+    return MERMAID_TEMPLATES.get(diagram_type)
+
+register_template(PromptTemplate(
+    "Use Case", "Use Case Diagram (as flowchart in Mermaid)", "flowchart TD (for Use Case Diagram)",
+    ["Identify actors (users and external systems)",
+     "Define main use cases",
+     "Show relationships between actors and use cases",
+     "Use the flowchart TD syntax and represent actors with emoji 👤"],
+    """
+flowchart TD
+    User[👤 User]
+    Admin[👤 Administrator]
+    UC1[Login to System]
+    UC2[Manage Account]
+    User --> UC1
+    User --> UC2
+    Admin --> UC1
+"""))
+
+register_template(PromptTemplate(
+    "Class", "Class Diagram", "classDiagram",
+    ["Identify key classes with attributes and methods",
+     "Show relationships (inheritance, association, composition)",
+     "Include multiplicities where appropriate",
+     "Use the classDiagram syntax"],
+    """
+classDiagram
+    class User {
+       +String username
+       +String email
+       +login()
+       +logout()
+    }
+    class Product {
+       +String name
+       +Double price
+       +getDetails()
+    }
+    User -- Product : views >
+"""))
+
+register_template(PromptTemplate(
+    "Sequence", "Sequence Diagram", "sequenceDiagram",
+    ["Show object interactions in time sequence",
+     "Include proper activation",
+     "Show message passing between objects",
+     "Use the sequenceDiagram syntax"],
+    """
+sequenceDiagram
+    participant U as User
+    participant S as System
+    participant D as Database
+    U->>S: Login Request
+    S->>D: Validate Credentials
+    D-->>S: Authentication Result
+    S-->>U: Login Response
+"""))
+
+register_template(PromptTemplate(
+    "Component", "Component Diagram (as flowchart in Mermaid)", "flowchart LR (for Component Diagram)",
+    ["Identify the main components and the interfaces between them",
+     "Group components that are deployed together in subgraphs",
+     "Label dependencies with the protocol or interface used",
+     "Use the flowchart LR syntax"],
+    """
+flowchart LR
+    subgraph Frontend
+        UI[Web UI]
+    end
+    subgraph Backend
+        API[REST API]
+        Auth[Auth Service]
+    end
+    DB[(Database)]
+    UI -->|HTTPS| API
+    API --> Auth
+    API -->|SQL| DB
+"""))
+
+register_template(PromptTemplate(
+    "Communication", "Communication Diagram (as flowchart in Mermaid)", "flowchart TD (for Communication Diagram)",
+    ["Show object interactions with numbered messages",
+     "Focus on structural organization",
+     "Use the flowchart syntax"],
+    """
+flowchart TD
+    A[Object A]
+    B[Object B]
+    C[Object C]
+    A -->|1: request()| B
+    B -->|2: validate()| C
+    C -->|3: result()| B
+    B -->|4: response()| A
+"""))
+
+register_template(PromptTemplate(
+    "State Machine", "State Machine Diagram", "stateDiagram-v2",
+    ["Show states, transitions, events, and actions",
+     "Include initial and final states",
+     "Define guard conditions where needed",
+     "Use the stateDiagram-v2 syntax"],
+    """
+stateDiagram-v2
+    [*] --> Idle
+    Idle --> Processing: Submit
+    Processing --> Success: Valid
+    Processing --> Failed: Invalid
+    Success --> Idle: Reset
+    Failed --> Idle: Reset
+    Success --> [*]: Exit
+    Failed --> [*]: Exit
+"""))
+
+def mermaid_system_prompt(diagram_type: Optional[str] = None) -> str:
+    """
+    System prompt for the Mermaid generator.
+
+    With a registered diagram type only that type's guidance and example are
+    included; otherwise (or without a type) all of them are.
+    """
+    template = get_template(diagram_type) if diagram_type else None
+    if template is not None:
+        body = f"""
+    Follow these guidelines for the diagram:
+
+    {template.section()}
+    """
+    else:
+        sections = "\n\n    ".join(f"{number}. {template.section()}"
+                                   for number, template in enumerate(MERMAID_TEMPLATES.values(), 1))
+        body = f"""
+    For each diagram type, follow these specific guidelines:
+
+    {sections}
+    """
+    return MERMAID_PROMPT_HEADER + body + MERMAID_PROMPT_FOOTER
+
+def template_version(diagram_type: str) -> str:
+    """Prompt version for a diagram type, as used in response cache keys"""
+    template = get_template(diagram_type)
+    return f"{PROMPT_TEMPLATE_VERSION}.{template.version}" if template else PROMPT_TEMPLATE_VERSION
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: about 4 characters per token for English prose and code"""
+    return (len(text) + 3) // 4
+
+def template_token_counts() -> Dict[str, int]:
+    """Estimated system prompt tokens per diagram type, plus 'all' for the full prompt"""
+    counts = {diagram_type: estimate_tokens(mermaid_system_prompt(diagram_type)) for diagram_type in MERMAID_TEMPLATES}
+    counts["all"] = estimate_tokens(mermaid_system_prompt())
+    return counts
+
+# Every diagram type's guidance; used when the diagram type isn't known up front
+MERMAID_SYSTEM_PROMPT = mermaid_system_prompt()
+
+def build_sdlc_task_prompt(product_description: str) -> str:
+    """Build the task prompt asking for an SDLC recommendation"""
+    return f"""
+            Analyze the software product description below and recommend the most suitable SDLC model.
+            Provide a clear recommendation with 3-5 bullet points justifying your choice.
+
+            {PRODUCT_DESCRIPTION_HEADER}
+            {product_description}
+            """
+
+def build_uml_task_prompt(product_description: str, diagram_type: str) -> str:
+    """Build the task prompt asking for Mermaid code of the given diagram type"""
+    template = get_template(diagram_type)
+    mermaid_syntax = template.syntax if template else diagram_type
+    return f"""
+            Based on the software product description below, create a {diagram_type} diagram using Mermaid syntax.
+
+            Generate complete and valid Mermaid code for a {diagram_type} diagram that accurately represents the system.
+            Only return the Mermaid code without any additional explanation.
+            The Mermaid code must:
+            - Contain no comments (// or ''') and no unnecessary characters.
+            - Be clean and professional, with proper indentation, correct arrows, and no typos.
+            - Follow consistent naming conventions (PascalCase for classes/entities/states, camelCase for attributes/methods).
+            - Use the latest Mermaid syntax versions available (e.g., stateDiagram-v2 for State Diagrams).
+            Use the {mermaid_syntax} syntax for this diagram type.
+
+            {PRODUCT_DESCRIPTION_HEADER}
+            {product_description}
+            """
+
+def build_mermaid_repair_prompt(diagram_type: str, mermaid_code: str, error: str) -> str:
+    """Build the follow-up prompt asking the Mermaid generator to fix code that failed validation"""
+    numbered = "\n            ".join(f"{number:>3} | {line}" for number, line in enumerate(mermaid_code.splitlines(), 1))
+    return f"""
+            The Mermaid code below for a {diagram_type} diagram does not parse.
+            Fix the error and return the complete corrected Mermaid code, keeping the same
+            elements and relationships. Only return the Mermaid code in a ```mermaid block,
+            without line numbers or any explanation.
+
+            Error: {error}
+
+            Code (with line numbers for reference only):
+            {numbered}
+            """
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from model_api import normalize_model_name
+from prompts import template_version as prompt_template_version
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "SMARTSDLC_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "smartsdlc", "responses")
+)
+
+class ResponseCache:
+    """
+    Two-tier cache for generation results.
+
+    An in-memory LRU sits in front of a directory of JSON files. Entries are
+    addressed by a hash of everything that influences the output, expire after
+    `ttl_seconds`, and the disk tier is trimmed oldest-first when it grows past
+    `max_disk_entries` or `max_disk_bytes`. Trimming scans the whole cache
+    directory, so it runs on the first write and then every `trim_every`
+    writes; in between, the disk tier may overshoot by that many entries.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = DEFAULT_CACHE_DIR, max_memory_entries: int = 128,
+                 max_disk_entries: int = 2000, max_disk_bytes: int = 50 * 1024 * 1024,
+                 ttl_seconds: float = 7 * 24 * 3600, trim_every: int = 50):
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl_seconds = ttl_seconds
+        self.trim_every = max(1, trim_every)
+        self._writes_since_trim = self.trim_every
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(product_description: str, diagram_type: str, model: str = "qwen2.5:3b",
+                 temperature: float = 0.7, max_tokens: int = 2000,
+                 template_version: Optional[str] = None,
+                 model_options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Build the content address for a generation request.
+
+        The description is normalized (trimmed, whitespace collapsed) so trivial
+        edits like a trailing newline still hit the cache. Of the extra model
+        options only those that change the output (num_ctx, stop) are part of
+        the key; keep_alive is not. The model name is normalized, so
+        "ollama/qwen2.5:3b" and "qwen2.5:3b" share entries. template_version
+        defaults to the prompt template version of the diagram type, so editing
+        one type's template only invalidates that type's entries.
+        """
+        normalized = re.sub(r"\s+", " ", product_description).strip()
+        options = model_options or {}
+        stop = options.get("stop") or []
+        if template_version is None:
+            template_version = prompt_template_version(diagram_type)
+        material = json.dumps([
+            normalized, diagram_type, normalize_model_name(model), round(float(temperature), 3), int(max_tokens), template_version,
+            options.get("num_ctx"), [stop] if isinstance(stop, str) else list(stop)
+        ])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached value for `key`, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry["created"] <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return entry["value"]
+                del self._memory[key]
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None or now - entry["created"] > self.ttl_seconds:
+                if entry is not None:
+                    self._remove_disk(key)
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._remember(key, entry)
+        return entry["value"]
+
+    def put(self, key: str, value: Dict[str, Any]):
+        """Store a value in both tiers"""
+        entry = {"created": time.time(), "value": value}
+        with self._lock:
+            self._remember(key, entry)
+            self._stats["writes"] += 1
+            self._writes_since_trim += 1
+            trim = self._writes_since_trim >= self.trim_every
+            if trim:
+                self._writes_since_trim = 0
+        if self.cache_dir:
+            self._write_disk(key, entry)
+            if trim:
+                self._trim_disk()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current tier sizes"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+        for path in self._disk_files():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, entry: Dict[str, Any]):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error writing cache entry: {str(e)}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def _remove_disk(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _disk_files(self):
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return []
+        paths = []
+        for shard in os.listdir(self.cache_dir):
+            shard_dir = os.path.join(self.cache_dir, shard)
+            if os.path.isdir(shard_dir):
+                paths.extend(
+                    os.path.join(shard_dir, name) for name in os.listdir(shard_dir) if name.endswith(".json")
+                )
+        return paths
+
+    def _trim_disk(self):
+        files = []
+        total_bytes = 0
+        for path in self._disk_files():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+            total_bytes += st.st_size
+
+        files.sort()
+        while files and (len(files) > self.max_disk_entries or total_bytes > self.max_disk_bytes):
+            _, size, path = files.pop(0)
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_bytes -= size
+            with self._lock:
+                self._stats["evictions"] += 1
+
+_default_cache: Optional[ResponseCache] = None
+_default_cache_lock = threading.Lock()
+
+def get_default_cache() -> ResponseCache:
+    """Return the process-wide response cache"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
@@ -0,0 +1,393 @@
+"""
+Long-running HTTP/JSON service for programmatic clients.
+
+Endpoints:
+    GET    /health          Ollama reachability, model availability and whether the
+                            model is loaded (warm) or will be loaded by the next request
+    POST   /generate        SDLC recommendation and diagrams for one description;
+                            waits for the result unless the body sets "wait": false
+    POST   /batch           Queue one generation job per item, returns the job ids
+    GET    /jobs/{job_id}   Job status, progress and result
+    DELETE /jobs/{job_id}   Cancel a job
+    GET    /metrics         Prometheus metrics
+    GET    /static/<bundle> The pinned Mermaid JS bundle, cacheable for a year
+
+The process stays up, so imports, the model client's connection pool, the
+response cache and (with --engine crew) the CrewAI agents are all warm for
+every request after the first. The model itself is preloaded at start-up and
+kept resident (see warmup.py) unless --no-warmup is given.
+
+Usage:
+    python core/server.py --port 8080
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import logging
+import math
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+import async_model_api
+import mermaid_assets
+import tracing
+from async_model_api import get_async_session, close_async_session
+from batch import normalize_items
+from direct_engine import arun_multi_direct_task
+from generation import ENGINES, engine_functions, get_cached_multi, register_pipeline_gauges, store_multi
+from jobs import JobQueue, QueueFullError
+from model_api import MODEL_OPTION_KEYS, describe_ollama_status, normalize_model_name
+from prompts import MERMAID_TEMPLATES
+from response_cache import ResponseCache, get_default_cache
+from warmup import ModelWarmer, warmup_enabled
+
+logger = logging.getLogger(__name__)
+
+class RequestError(ValueError):
+    """A client request that can't be served as sent"""
+
+def _is_number(value: Any) -> bool:
+    # bool is an int subclass, but true/false is never a meaningful setting
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+def _is_positive_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+def _parse_model_options(model_options: Dict[str, Any]) -> Dict[str, Any]:
+    """Check the values of model_options and return them as build_chat_payload expects them"""
+    options = {key: value for key, value in model_options.items() if value is not None}
+    if "num_ctx" in options and not _is_positive_int(options["num_ctx"]):
+        raise RequestError("'model_options.num_ctx' must be a positive integer")
+    if "stop" in options:
+        stop = [options["stop"]] if isinstance(options["stop"], str) else options["stop"]
+        if not isinstance(stop, list) or not all(isinstance(s, str) and s for s in stop):
+            raise RequestError("'model_options.stop' must be a string or a list of non-empty strings")
+        options["stop"] = stop
+    if "keep_alive" in options and (isinstance(options["keep_alive"], bool)
+                                    or not isinstance(options["keep_alive"], (str, int))):
+        raise RequestError("'model_options.keep_alive' must be a duration string or a number of seconds")
+    return options
+
+def parse_generation_request(body: Dict[str, Any], default_diagram_types: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Validate a generation request body and return the keyword arguments for
+    GenerationService.generate().
+
+    Raises:
+        RequestError: If a field is missing or has the wrong type
+    """
+    if not isinstance(body, dict):
+        raise RequestError("Request body must be a JSON object")
+    description = body.get("description")
+    if not isinstance(description, str) or not description.strip():
+        raise RequestError("'description' is required")
+
+    diagram_types = body.get("diagram_types") or body.get("diagram_type") or default_diagram_types or ["Class"]
+    if isinstance(diagram_types, str):
+        diagram_types = [diagram_types]
+    if not isinstance(diagram_types, list) or not all(isinstance(t, str) for t in diagram_types):
+        raise RequestError("'diagram_types' must be a list of strings")
+    unknown = [t for t in diagram_types if t not in MERMAID_TEMPLATES]
+    if unknown:
+        raise RequestError(f"Unknown diagram type(s) {', '.join(unknown)}; "
+                           f"expected {', '.join(MERMAID_TEMPLATES)}")
+
+    temperature = body.get("temperature", 0.7)
+    if not _is_number(temperature) or not 0 <= temperature <= 2:
+        raise RequestError("'temperature' must be a number between 0 and 2")
+    max_tokens = body.get("max_tokens", 2000)
+    if not _is_positive_int(max_tokens):
+        raise RequestError("'max_tokens' must be a positive integer")
+
+    model_options = body.get("model_options") or {}
+    if not isinstance(model_options, dict) or set(model_options) - set(MODEL_OPTION_KEYS):
+        raise RequestError(f"'model_options' may only contain {', '.join(MODEL_OPTION_KEYS)}")
+    model_options = _parse_model_options(model_options)
+
+    return {
+        "description": description,
+        "diagram_types": list(dict.fromkeys(diagram_types)),
+        "temperature": float(temperature),
+        "max_tokens": max_tokens,
+        "model_options": model_options,
+        "use_cache": bool(body.get("use_cache", True)),
+    }
+
+class GenerationService:
+    """
+    Generation backend shared by all requests of one server process.
+
+    The "direct" engine runs direct_engine.arun_multi_direct_task, one model
+    call per output, all concurrently through the shared aiohttp client. The
+    "crew" engine runs its run_multi_diagram_task on warm, pooled CrewAI
+    agents in a thread.
+    """
+
+    def __init__(self, api_base: str = "http://localhost:11434", model: str = "qwen2.5:3b",
+                 engine: str = "direct", max_concurrency: int = 4, request_timeout: float = 300,
+                 job_queue: Optional[JobQueue] = None, cache: Optional[ResponseCache] = None,
+                 warmup: bool = True):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {', '.join(ENGINES)}")
+        self.api_base = api_base
+        self.model = normalize_model_name(model)
+        self.engine = engine
+        self.max_concurrency = max_concurrency
+        self.request_timeout = request_timeout
+        self.cache = cache or get_default_cache()
+        self.job_queue = job_queue or JobQueue(workers=max_concurrency)
+        self._active = 0
+        self._orchestrator = None
+        self.warmer = ModelWarmer(self.model, api_base) if warmup else None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self):
+        """Bind to the running loop, start loading the model and warm up the selected engine"""
+        self._loop = asyncio.get_running_loop()
+        async_model_api.set_max_concurrency(self.max_concurrency)
+        if self.warmer:
+            self.warmer.start()
+        if self.engine == "crew":
+            await self._loop.run_in_executor(None, self._warm_agents)
+
+    async def stop(self):
+        if self.warmer:
+            await asyncio.get_running_loop().run_in_executor(None, self.warmer.stop)
+        self.job_queue.shutdown(wait=False)
+        await close_async_session()
+
+    def _warm_agents(self):
+        from crew_orchestration import CrewOrchestrator
+        self._orchestrator = CrewOrchestrator(model_name=f"ollama/{self.model}", api_base=self.api_base)
+        lease = self._orchestrator.lease()
+        lease.get("sdlc_advisor")
+        # Mermaid generators are pooled per diagram type, so warm one of each
+        for diagram_type in MERMAID_TEMPLATES:
+            lease.get("mermaid_generator", diagram_type)
+        lease.release()
+
+    async def health(self) -> Dict[str, Any]:
+        """Same check as the Streamlit app's Ollama status banner"""
+        try:
+            session = await get_async_session()
+            async with session.get(f"{self.api_base}/api/tags") as response:
+                tags = await response.json(content_type=None) if response.status == 200 else None
+                ok, message = describe_ollama_status(response.status, tags, self.model)
+        except Exception as e:
+            logger.error(f"Error checking Ollama status: {str(e)}")
+            ok, message = describe_ollama_status(None, None, self.model)
+        status = {"ok": ok, "message": message, "engine": self.engine, "jobs": self.job_queue.stats()}
+        if self.warmer:
+            status["model"] = self.warmer.status()
+        return status
+
+    async def generate(self, description: str, diagram_types: List[str], temperature: float = 0.7,
+                       max_tokens: int = 2000, model_options: Optional[Dict[str, Any]] = None,
+                       use_cache: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Return one SDLC recommendation and a diagram per requested type.
+
+        Returns:
+            Dictionary with sdlc_recommendation, diagrams and cache_hit, or None if failed
+        """
+        with tracing.span("server.generate", engine=self.engine, diagram_types=len(diagram_types)):
+            if use_cache:
+                result = get_cached_multi(description, diagram_types, temperature, max_tokens,
+                                          self.cache, model_options, model=self.model)
+                if result:
+                    return dict(result, cache_hit=True)
+
+            if self.engine == "crew":
+                result = await self._generate_crew(description, diagram_types, temperature, max_tokens, model_options)
+            else:
+                result = await self._generate_direct(description, diagram_types, temperature, max_tokens, model_options)
+            if not result:
+                return None
+            store_multi(description, result, temperature, max_tokens, self.cache, model_options, model=self.model)
+            return dict(result, cache_hit=False)
+
+    async def _generate_direct(self, description: str, diagram_types: List[str], temperature: float,
+                               max_tokens: int, model_options: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        return await arun_multi_direct_task(description, diagram_types, temperature=temperature,
+                                            max_tokens=max_tokens, model_options=model_options,
+                                            model=self.model, api_base=self.api_base)
+
+    async def _generate_crew(self, description: str, diagram_types: List[str], temperature: float,
+                             max_tokens: int, model_options: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        _, run_multi_diagram_task = engine_functions(self.engine)
+        if self._orchestrator is None:
+            await asyncio.get_running_loop().run_in_executor(None, self._warm_agents)
+        return await asyncio.get_running_loop().run_in_executor(None, lambda: run_multi_diagram_task(
+            description, diagram_types, temperature=temperature, max_tokens=max_tokens,
+            orchestrator=self._orchestrator, model_options=model_options
+        ))
+
+    def submit(self, owner: str, request: Dict[str, Any]) -> str:
+        """Queue a generation as a background job and return its id"""
+        return self.job_queue.submit(owner, self._run_job, request)
+
+    def _run_job(self, job, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Job workers are threads; the generation itself runs on the server's loop
+        job.set_progress("Generating...")
+        future = asyncio.run_coroutine_threadsafe(
+            asyncio.wait_for(self.generate(**request), self.request_timeout), self._loop
+        )
+        while True:
+            try:
+                return future.result(timeout=0.2)
+            except concurrent.futures.TimeoutError:
+                # Also raised for the generation's own timeout on Python 3.11+
+                if future.done():
+                    raise RuntimeError(f"Generation timed out after {self.request_timeout:g}s")
+                if job.cancelled:
+                    future.cancel()
+                    return None
+            except asyncio.TimeoutError:
+                raise RuntimeError(f"Generation timed out after {self.request_timeout:g}s")
+
+def _owner(request: web.Request) -> str:
+    return request.headers.get("X-Client-Id") or request.remote or "anonymous"
+
+async def _read_json(request: web.Request) -> Any:
+    try:
+        return await request.json()
+    except ValueError:
+        raise RequestError("Request body must be valid JSON")
+
+def _error(status: int, message: str) -> web.Response:
+    return web.json_response({"error": message}, status=status)
+
+def create_app(service: Optional[GenerationService] = None, **service_options) -> web.Application:
+    """
+    Build the aiohttp application.
+
+    Args:
+        service: Generation backend; built from service_options when omitted
+        **service_options: Passed to GenerationService
+    """
+    service = service or GenerationService(**service_options)
+    app = web.Application()
+
+    async def health(request: web.Request) -> web.Response:
+        status = await service.health()
+        return web.json_response(status, status=200 if status["ok"] else 503)
+
+    async def generate(request: web.Request) -> web.Response:
+        try:
+            body = await _read_json(request)
+            params = parse_generation_request(body)
+        except RequestError as e:
+            return _error(400, str(e))
+
+        if body.get("wait") is False:
+            try:
+                job_id = service.submit(_owner(request), params)
+            except QueueFullError as e:
+                return _error(429, str(e))
+            return web.json_response({"job_id": job_id}, status=202)
+
+        if service._active >= service.max_concurrency:
+            return _error(429, f"Server is busy ({service.max_concurrency} generations in progress)")
+        service._active += 1
+        try:
+            result = await asyncio.wait_for(service.generate(**params), service.request_timeout)
+        except asyncio.TimeoutError:
+            return _error(504, f"Generation timed out after {service.request_timeout:g}s")
+        finally:
+            service._active -= 1
+        if not result:
+            return _error(502, "The model did not return the expected output")
+        return web.json_response(result)
+
+    async def batch(request: web.Request) -> web.Response:
+        try:
+            body = await _read_json(request)
+            if not isinstance(body, dict) or not isinstance(body.get("items"), list):
+                raise RequestError("Request body must be an object with an 'items' list")
+            defaults = {key: body[key] for key in ("temperature", "max_tokens", "model_options", "use_cache")
+                        if key in body}
+            items = normalize_items(body["items"], body.get("diagram_types") or ["Class"])
+            params = [(item["id"], parse_generation_request(dict(defaults, **item))) for item in items]
+        except RequestError as e:
+            return _error(400, str(e))
+
+        owner = _owner(request)
+        jobs = []
+        for item_id, item_params in params:
+            try:
+                jobs.append({"id": item_id, "job_id": service.submit(owner, item_params)})
+            except QueueFullError as e:
+                jobs.append({"id": item_id, "error": str(e)})
+        return web.json_response({"jobs": jobs}, status=202)
+
+    async def job_status(request: web.Request) -> web.Response:
+        status = service.job_queue.status(request.match_info["job_id"])
+        if status is None:
+            return _error(404, "Unknown job")
+        status.pop("owner", None)
+        return web.json_response(status)
+
+    async def cancel_job(request: web.Request) -> web.Response:
+        job_id = request.match_info["job_id"]
+        if service.job_queue.status(job_id) is None:
+            return _error(404, "Unknown job")
+        return web.json_response({"cancelled": service.job_queue.cancel(job_id)})
+
+    async def metrics(request: web.Request) -> web.Response:
+        return web.Response(text=tracing.render_prometheus(), content_type="text/plain")
+
+    async def static_asset(request: web.Request) -> web.StreamResponse:
+        # Only the pinned, versioned Mermaid bundle is served, so it can be cached for good
+        if request.match_info["name"] != mermaid_assets.BUNDLE_NAME or not mermaid_assets.bundle_available():
+            return _error(404, "Unknown asset")
+        return web.FileResponse(mermaid_assets.bundle_path(),
+                                headers={"Cache-Control": mermaid_assets.IMMUTABLE_CACHE_CONTROL})
+
+    async def on_startup(app: web.Application):
+        await service.start()
+
+    async def on_cleanup(app: web.Application):
+        await service.stop()
+
+    app.router.add_get("/health", health)
+    app.router.add_post("/generate", generate)
+    app.router.add_post("/batch", batch)
+    app.router.add_get("/jobs/{job_id}", job_status)
+    app.router.add_delete("/jobs/{job_id}", cancel_job)
+    app.router.add_get("/metrics", metrics)
+    app.router.add_get("/static/{name}", static_asset)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="SmartSDLC HTTP service")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    parser.add_argument("--api-base", default="http://localhost:11434", help="Ollama base URL")
+    parser.add_argument("--model", default="qwen2.5:3b", help="Ollama model name")
+    parser.add_argument("--engine", choices=ENGINES, default="direct",
+                        help="'direct' calls the model concurrently; 'crew' runs the CrewAI agents")
+    parser.add_argument("--max-concurrency", type=int, default=4,
+                        help="Generations (and background jobs) served at the same time")
+    parser.add_argument("--timeout", type=float, default=300, help="Per-request generation timeout in seconds")
+    parser.add_argument("--no-warmup", action="store_true",
+                        help="Don't preload the model at start-up or keep it resident")
+    parser.add_argument("--trace-file", help="Append a JSON line per timed pipeline stage to this file")
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+    logging.basicConfig(level=logging.INFO)
+    if args.trace_file:
+        tracing.configure_tracing(args.trace_file)
+    register_pipeline_gauges()
+    app = create_app(api_base=args.api_base, model=args.model, engine=args.engine,
+                     max_concurrency=args.max_concurrency, request_timeout=args.timeout,
+                     warmup=warmup_enabled() and not args.no_warmup)
+    web.run_app(app, host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
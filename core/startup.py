@@ -0,0 +1,122 @@
+"""
+Startup mode and import-time profiling for the CLI and the Streamlit app.
+
+Heavy dependencies (CrewAI, requests, Pillow, http.server) are imported where
+they are first used, so `main.py --help`, a CLI run answered from the cache
+and the app's first page don't pay for them. SMARTSDLC_STARTUP decides when
+they are loaded:
+
+    lazy   (default) by the first generation that needs them
+    eager  right at startup, for long-running processes that would rather
+           pay once before the first request than during it
+
+Profile what a module pulls in at import time:
+
+    python core/startup.py main generation     # slowest imports per module
+    python -X importtime core/main.py --help   # Python's raw per-module report
+"""
+
+import argparse
+import importlib
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from tracing import span
+
+# Loaded on first use in lazy mode; optional ones are skipped if missing
+DEFERRED_MODULES = ("requests", "PIL.Image", "crew_orchestration")
+
+STARTUP_MODES = ("lazy", "eager")
+
+CORE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def startup_mode() -> str:
+    """Return the configured startup mode (SMARTSDLC_STARTUP, default lazy)"""
+    mode = os.environ.get("SMARTSDLC_STARTUP", "lazy").strip().lower()
+    return mode if mode in STARTUP_MODES else "lazy"
+
+def preload(modules: Iterable[str] = DEFERRED_MODULES) -> Dict[str, float]:
+    """
+    Import the deferred modules now.
+
+    Returns:
+        Seconds spent per module; modules that can't be imported are left out
+    """
+    timings = {}
+    with span("startup.preload") as preload_span:
+        for name in modules:
+            if name in sys.modules:
+                continue
+            start = time.perf_counter()
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                continue
+            timings[name] = round(time.perf_counter() - start, 6)
+        preload_span.set("modules", len(timings))
+    return timings
+
+def profile_imports(module: str, top: int = 10) -> Tuple[float, List[Tuple[str, float, float]]]:
+    """
+    Import `module` in a fresh interpreter with -X importtime.
+
+    Args:
+        module: Module name, importable from core/
+        top: Number of imports to return
+
+    Returns:
+        (total seconds, [(imported module, self seconds, cumulative seconds)]),
+        the slowest imports by cumulative time first
+
+    Raises:
+        ImportError: If the module fails to import
+    """
+    code = f"import sys; sys.path.insert(0, {CORE_DIR!r}); import {module}"
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                               capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise ImportError(f"Importing {module} failed: {completed.stderr.strip().splitlines()[-1]}")
+
+    # Nested imports are listed (indented) before the module that triggered
+    # them; keep only the tree under `module`, not the interpreter's own startup
+    rows, group = [], []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        row = (name.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6)
+        if name.startswith("  "):
+            group.append(row)
+            continue
+        if row[0] == module:
+            rows = group + [row]
+        group = []
+    total = rows[-1][2] if rows else 0.0
+    rows = sorted(rows[:-1], key=lambda row: row[2], reverse=True)
+    return total, rows[:top]
+
+def parse_arguments():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Show what importing SmartSDLC modules costs")
+    parser.add_argument("modules", nargs="*", default=["main"], help="Modules in core/ to profile (default: main)")
+    parser.add_argument("--top", type=int, default=10, help="Number of imports to list per module")
+    return parser.parse_args()
+
+def main():
+    """Print the slowest imports of each module"""
+    args = parse_arguments()
+    for module in args.modules:
+        try:
+            total, rows = profile_imports(module, args.top)
+        except ImportError as e:
+            print(str(e))
+            continue
+        print(f"{module}: {total * 1000:.1f} ms")
+        for name, self_seconds, cumulative in rows:
+            print(f"  {cumulative * 1000:8.1f} ms  {self_seconds * 1000:7.1f} ms self  {name}")
+
+if __name__ == "__main__":
+    main()
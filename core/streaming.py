@@ -0,0 +1,57 @@
+import time
+from typing import Dict, Any, Iterable, Iterator, Optional
+
+from model_api import stream_model_with_system
+from prompts import (
+    SDLC_SYSTEM_PROMPT,
+    build_sdlc_task_prompt,
+    build_uml_task_prompt,
+    mermaid_system_prompt,
+)
+
+def stream_sdlc_recommendation(product_description: str, temperature: float = 0.7,
+                               max_tokens: int = 2000,
+                               model_options: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """
+    Stream the SDLC recommendation for a product description token by token.
+
+    Uses the same prompts as the CrewAI SDLC advisor, but calls the model
+    directly so partial output can be shown while it is generated.
+    """
+    return stream_model_with_system(
+        system_prompt=SDLC_SYSTEM_PROMPT,
+        user_message=build_sdlc_task_prompt(product_description),
+        max_tokens=max_tokens,
+        temperature=temperature,
+        **(model_options or {})
+    )
+
+def stream_mermaid_code(product_description: str, diagram_type: str, temperature: float = 0.7,
+                        max_tokens: int = 2000,
+                        model_options: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """
+    Stream raw Mermaid generator output for a product description.
+
+    The accumulated text still needs extract_mermaid_code() once complete.
+    """
+    return stream_model_with_system(
+        system_prompt=mermaid_system_prompt(diagram_type),
+        user_message=build_uml_task_prompt(product_description, diagram_type),
+        max_tokens=max_tokens,
+        temperature=temperature,
+        **(model_options or {})
+    )
+
+def stream_with_timing(chunks: Iterable[str], timing: Dict[str, float]) -> Iterator[str]:
+    """
+    Pass chunks through while recording latency into `timing`.
+
+    Sets 'time_to_first_token' when the first chunk arrives and 'total_time'
+    once the stream is exhausted, both in seconds.
+    """
+    start = time.perf_counter()
+    for chunk in chunks:
+        if "time_to_first_token" not in timing:
+            timing["time_to_first_token"] = time.perf_counter() - start
+        yield chunk
+    timing["total_time"] = time.perf_counter() - start
@@ -0,0 +1,329 @@
+"""
+Lightweight tracing and metrics for the generation pipeline.
+
+Wrap a stage in `with span("name", key=value) as s:` (or decorate a function
+with @traced("name")). Finished spans are aggregated in memory for a
+Prometheus-style /metrics endpoint and, when a JSONL file is configured,
+queued for a background writer that appends them in batches (flush_spans()
+waits for it; it is also flushed at interpreter exit).
+Ollama's own timing fields are recorded with record_ollama_stats().
+
+Configuration comes from configure_tracing() or the environment:
+    SMARTSDLC_TRACE_FILE    path of the JSONL span log (unset = no file)
+    SMARTSDLC_METRICS_PORT  port for the /metrics HTTP endpoint (unset = off)
+"""
+
+import atexit
+import contextvars
+import functools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Ollama reports these durations in nanoseconds
+OLLAMA_DURATION_FIELDS = ("total_duration", "load_duration", "prompt_eval_duration", "eval_duration")
+OLLAMA_COUNT_FIELDS = ("prompt_eval_count", "eval_count")
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("smartsdlc_current_span", default=None)
+
+_lock = threading.Lock()
+_trace_file: Optional[str] = os.environ.get("SMARTSDLC_TRACE_FILE") or None
+_span_totals: Dict[str, Dict[str, float]] = defaultdict(lambda: {"count": 0, "errors": 0, "seconds": 0.0})
+_ollama_totals: Dict[str, float] = defaultdict(float)
+_gauges: Dict[str, Dict[str, Any]] = {}
+_metrics_server: Optional["ThreadingHTTPServer"] = None
+_span_queue: "queue.Queue[Tuple[str, Dict[str, Any]]]" = queue.Queue()
+_span_writer: Optional[threading.Thread] = None
+
+class Span:
+    """One timed stage; attributes can be added while it is open"""
+
+    def __init__(self, name: str, attributes: Dict[str, Any], parent: Optional["Span"]):
+        self.name = name
+        self.attributes = dict(attributes)
+        self.span_id = uuid.uuid4().hex[:16]
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.parent_id = parent.span_id if parent else None
+        self.start_time = time.time()
+        self.duration = 0.0
+        self.status = "ok"
+
+    def set(self, key: str, value: Any):
+        """Attach an attribute to the span"""
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_seconds": round(self.duration, 6),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """
+    Time the enclosed block as a span named `name`.
+
+    Spans opened inside it (in the same thread or a copied context) become its
+    children. Exceptions mark the span as an error and are re-raised.
+    """
+    current = Span(name, attributes, _current_span.get())
+    token = _current_span.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "error"
+        current.set("error", str(e))
+        raise
+    finally:
+        current.duration = time.perf_counter() - start
+        _current_span.reset(token)
+        _finish(current)
+
+def start_detached_span(name: str, **attributes) -> Span:
+    """
+    Open a span without making it the current one.
+
+    For work that is suspended and resumed, like a streaming generator, where a
+    context-managed span would leak into the caller's context. Close it with
+    end_detached_span().
+    """
+    detached = Span(name, attributes, _current_span.get())
+    detached.set("_perf_start", time.perf_counter())
+    return detached
+
+def end_detached_span(detached: Span, error: Optional[str] = None):
+    """Finish a span opened with start_detached_span()"""
+    detached.duration = time.perf_counter() - detached.attributes.pop("_perf_start")
+    if error:
+        detached.status = "error"
+        detached.set("error", error)
+    _finish(detached)
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator form of span(); the span is named after the function by default"""
+    def decorator(fn: Callable) -> Callable:
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def current_span() -> Optional[Span]:
+    """Return the innermost open span, if any"""
+    return _current_span.get()
+
+def record_ollama_stats(response: Dict[str, Any], target: Optional[Span] = None):
+    """
+    Record Ollama's timing and token counts from a (final) response object.
+
+    Values are attached to `target` (default: the current span) in seconds and
+    tokens, and added to the process-wide totals exported as metrics.
+    """
+    target = target or current_span()
+    with _lock:
+        for field in OLLAMA_DURATION_FIELDS:
+            if field in response:
+                seconds = response[field] / 1e9
+                _ollama_totals[field] += seconds
+                if target is not None:
+                    target.set(field.replace("_duration", "_seconds"), round(seconds, 6))
+        for field in OLLAMA_COUNT_FIELDS:
+            if field in response:
+                _ollama_totals[field] += response[field]
+                if target is not None:
+                    target.set(field, response[field])
+        _ollama_totals["responses"] += 1
+
+def _finish(finished: Span):
+    with _lock:
+        totals = _span_totals[finished.name]
+        totals["count"] += 1
+        totals["seconds"] += finished.duration
+        if finished.status != "ok":
+            totals["errors"] += 1
+        path = _trace_file
+        if path:
+            _start_span_writer()
+            _span_queue.put((path, finished.to_dict()))
+
+def _start_span_writer():
+    # Called with _lock held
+    global _span_writer
+    if _span_writer is None:
+        _span_writer = threading.Thread(target=_write_spans, name="span-writer", daemon=True)
+        _span_writer.start()
+        atexit.register(flush_spans, 5.0)
+
+def _write_spans():
+    while True:
+        batch = [_span_queue.get()]
+        # Take whatever else is queued so a burst costs one open() per file
+        while True:
+            try:
+                batch.append(_span_queue.get_nowait())
+            except queue.Empty:
+                break
+        lines: Dict[str, List[str]] = defaultdict(list)
+        for path, record in batch:
+            lines[path].append(json.dumps(record, default=str) + "\n")
+        for path, path_lines in lines.items():
+            try:
+                with open(path, "a", encoding="utf-8") as f:
+                    f.writelines(path_lines)
+            except OSError as e:
+                logger.error(f"Failed to write {len(path_lines)} trace span(s): {str(e)}")
+        for _ in batch:
+            _span_queue.task_done()
+
+def flush_spans(timeout: Optional[float] = None) -> bool:
+    """Wait until finished spans are in the JSONL file; returns False on timeout"""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while _span_queue.unfinished_tasks:
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def configure_tracing(jsonl_path: Optional[str] = None, metrics_port: Optional[int] = None):
+    """
+    Set the JSONL span log and optionally start the /metrics endpoint.
+
+    Args:
+        jsonl_path: File to append finished spans to ("" disables the file,
+            None keeps the current setting)
+        metrics_port: Port for the Prometheus text endpoint (None leaves it off)
+    """
+    global _trace_file
+    if jsonl_path is not None:
+        with _lock:
+            _trace_file = jsonl_path or None
+    if metrics_port:
+        start_metrics_server(metrics_port)
+
+def configure_from_env():
+    """Start the metrics endpoint if SMARTSDLC_METRICS_PORT is set"""
+    port = os.environ.get("SMARTSDLC_METRICS_PORT")
+    if port:
+        start_metrics_server(int(port))
+
+def register_gauge(name: str, help_text: str, fn: Callable[[], float]):
+    """
+    Export a value computed on each scrape, e.g. cache size or model warm state.
+
+    Args:
+        name: Metric name (without the smartsdlc_ prefix)
+        help_text: HELP line for the metric
+        fn: Zero-argument callable returning the current value
+    """
+    with _lock:
+        _gauges[name] = {"help": help_text, "fn": fn}
+
+def snapshot() -> Dict[str, Any]:
+    """Return the aggregated span and Ollama totals"""
+    with _lock:
+        return {
+            "spans": {name: dict(totals) for name, totals in _span_totals.items()},
+            "ollama": dict(_ollama_totals),
+        }
+
+def reset():
+    """Clear all aggregated totals (mainly for tests)"""
+    with _lock:
+        _span_totals.clear()
+        _ollama_totals.clear()
+
+def render_prometheus() -> str:
+    """Render the current totals in the Prometheus text exposition format"""
+    data = snapshot()
+    lines = [
+        "# HELP smartsdlc_span_duration_seconds Time spent in each pipeline stage",
+        "# TYPE smartsdlc_span_duration_seconds summary",
+    ]
+    for name, totals in sorted(data["spans"].items()):
+        lines.append(f'smartsdlc_span_duration_seconds_count{{span="{name}"}} {int(totals["count"])}')
+        lines.append(f'smartsdlc_span_duration_seconds_sum{{span="{name}"}} {totals["seconds"]:.6f}')
+    lines += [
+        "# HELP smartsdlc_span_errors_total Pipeline stages that raised",
+        "# TYPE smartsdlc_span_errors_total counter",
+    ]
+    for name, totals in sorted(data["spans"].items()):
+        lines.append(f'smartsdlc_span_errors_total{{span="{name}"}} {int(totals["errors"])}')
+
+    ollama = data["ollama"]
+    for field in OLLAMA_DURATION_FIELDS:
+        metric = f"smartsdlc_ollama_{field.replace('_duration', '')}_seconds_total"
+        lines += [f"# HELP {metric} Sum of Ollama {field} across responses",
+                  f"# TYPE {metric} counter",
+                  f"{metric} {ollama.get(field, 0.0):.6f}"]
+    for field in OLLAMA_COUNT_FIELDS:
+        metric = f"smartsdlc_ollama_{field}_tokens_total"
+        lines += [f"# HELP {metric} Sum of Ollama {field} across responses",
+                  f"# TYPE {metric} counter",
+                  f"{metric} {int(ollama.get(field, 0))}"]
+
+    with _lock:
+        gauges = dict(_gauges)
+    for name, gauge in sorted(gauges.items()):
+        try:
+            value = float(gauge["fn"]())
+        except Exception as e:
+            logger.error(f"Gauge {name} failed: {str(e)}")
+            continue
+        lines += [f"# HELP smartsdlc_{name} {gauge['help']}",
+                  f"# TYPE smartsdlc_{name} gauge",
+                  f"smartsdlc_{name} {value}"]
+    return "\n".join(lines) + "\n"
+
+def _metrics_handler():
+    # http.server is only imported when the endpoint is actually started
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MetricsHandler
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> "ThreadingHTTPServer":
+    """Serve /metrics from a daemon thread; repeated calls reuse the running server"""
+    global _metrics_server
+    with _lock:
+        if _metrics_server is None:
+            from http.server import ThreadingHTTPServer
+            _metrics_server = ThreadingHTTPServer((host, port), _metrics_handler())
+            threading.Thread(target=_metrics_server.serve_forever, daemon=True).start()
+            logger.info(f"Metrics available at http://{host}:{_metrics_server.server_address[1]}/metrics")
+        return _metrics_server
@@ -0,0 +1,226 @@
+"""
+Model warm-up and keep-alive at process start.
+
+Ollama loads a model on its first request and unloads it again once its
+keep_alive runs out, so without help the first request after startup (or
+after an idle spell) pays the model load on top of the generation. A
+ModelWarmer preloads the model with a tiny priming generation when it
+starts, then checks Ollama's /api/ps on a background thread and primes the
+model again whenever it was unloaded.
+
+The priming request uses the SDLC advisor's system prompt and the same
+keep_alive and num_ctx as real requests. That leaves the model loaded with a
+matching context size (a different num_ctx would reload it) and puts a real
+prompt prefix in the KV cache.
+
+    from warmup import get_model_warmer
+    get_model_warmer().start()       # idempotent; runs until the process exits
+    get_model_warmer().status()      # {'state': 'warm', 'warm': True, ...}
+
+Settings:
+    SMARTSDLC_WARMUP            0 disables the warm-up (default 1)
+    SMARTSDLC_WARMUP_INTERVAL   seconds between residency checks (default 60)
+    SMARTSDLC_KEEP_ALIVE        how long Ollama keeps the model (see model_api)
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Optional, Union
+
+import http_session
+import tracing
+from model_api import build_chat_payload, default_keep_alive, normalize_model_name
+from prompts import SDLC_SYSTEM_PROMPT
+
+logger = logging.getLogger(__name__)
+
+MODEL_COLD = "cold"
+MODEL_WARMING = "warming"
+MODEL_WARM = "warm"
+MODEL_UNREACHABLE = "unreachable"
+
+PRIMING_MESSAGE = "Reply with OK."
+
+_DURATION_RE = re.compile(r"^(\d+(?:\.\d+)?)(ms|s|m|h)?$")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, None: 1}
+
+def keep_alive_seconds(keep_alive: Optional[Union[str, int]]) -> float:
+    """
+    How long Ollama keeps a model loaded for a keep_alive value.
+
+    Numbers are seconds, strings are durations like "30m" or "1h", negative
+    values mean forever, and None means Ollama's default of 5 minutes.
+    """
+    if keep_alive is None:
+        return 300.0
+    text = str(keep_alive).strip()
+    if text.startswith("-"):
+        return float("inf")
+    match = _DURATION_RE.match(text)
+    if not match:
+        return 300.0
+    return float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+
+class ModelWarmer:
+    """Keeps one Ollama model loaded and reports whether it currently is"""
+
+    def __init__(self, model: str = "qwen2.5:3b", api_base: str = "http://localhost:11434",
+                 keep_alive: Optional[Union[str, int]] = None, num_ctx: Optional[int] = None,
+                 interval: float = 60.0):
+        self.model = normalize_model_name(model)
+        self.api_base = api_base
+        self.keep_alive = keep_alive if keep_alive is not None else default_keep_alive()
+        self.num_ctx = num_ctx
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._status: Dict[str, Any] = {
+            "state": MODEL_COLD,
+            "warmups": 0,
+            "failures": 0,
+            "last_warmup_at": None,
+            "last_warmup_seconds": None,
+            "last_load_seconds": None,
+            "last_checked_at": None,
+            "error": None,
+        }
+
+    def is_loaded(self) -> Optional[bool]:
+        """Ask Ollama's /api/ps whether the model is loaded; None if it can't tell"""
+        try:
+            response = http_session.get(f"{self.api_base}/api/ps")
+            if response.status_code != 200:
+                return None
+            running = [entry.get("name") or entry.get("model") for entry in response.json().get("models", [])]
+        except Exception as e:
+            logger.debug(f"Model residency check failed: {str(e)}")
+            return None
+        return self.model in running
+
+    def warm(self) -> bool:
+        """
+        Load the model with a one-token priming generation.
+
+        Returns:
+            True if Ollama answered, i.e. the model is now loaded
+        """
+        self._update(state=MODEL_WARMING)
+        messages = [
+            {"role": "system", "content": SDLC_SYSTEM_PROMPT},
+            {"role": "user", "content": PRIMING_MESSAGE}
+        ]
+        payload = build_chat_payload(messages, self.model, max_tokens=1, temperature=0.0,
+                                     num_ctx=self.num_ctx, keep_alive=self.keep_alive)
+        start = time.perf_counter()
+        with tracing.span("model.warmup", model=self.model) as warmup_span:
+            try:
+                response = http_session.post(f"{self.api_base}/api/chat", json=payload)
+                if response.status_code != 200:
+                    raise RuntimeError(f"HTTP {response.status_code}")
+                result = response.json()
+            except Exception as e:
+                warmup_span.status = "error"
+                warmup_span.set("error", str(e))
+                with self._lock:
+                    self._status["failures"] += 1
+                self._update(state=MODEL_UNREACHABLE, error=str(e))
+                logger.warning(f"Model warm-up failed: {str(e)}")
+                return False
+            tracing.record_ollama_stats(result, warmup_span)
+
+        with self._lock:
+            self._status["warmups"] += 1
+        load_seconds = result.get("load_duration", 0) / 1e9
+        self._update(state=MODEL_WARM, error=None, last_warmup_at=time.time(),
+                     last_warmup_seconds=round(time.perf_counter() - start, 3),
+                     last_load_seconds=round(load_seconds, 3))
+        logger.info(f"Model {self.model} is warm (load {load_seconds:.2f}s)")
+        return True
+
+    def check(self) -> str:
+        """
+        Re-prime the model if Ollama unloaded it.
+
+        Without /api/ps (older Ollama), the model is assumed loaded until the
+        keep_alive of the last warm-up has run out.
+
+        Returns:
+            The state after the check
+        """
+        loaded = self.is_loaded()
+        if loaded is None:
+            last_warmup = self.status()["last_warmup_at"]
+            loaded = last_warmup is not None and time.time() - last_warmup < keep_alive_seconds(self.keep_alive)
+        self._update(last_checked_at=time.time())
+        if loaded:
+            self._update(state=MODEL_WARM)
+        else:
+            self._update(state=MODEL_COLD)
+            self.warm()
+        return self.status()["state"]
+
+    def start(self) -> "ModelWarmer":
+        """Warm the model now and keep it resident from a daemon thread; repeated calls are no-ops"""
+        with self._lock:
+            if self._thread is not None:
+                return self
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="model-warmer", daemon=True)
+        self._register_gauges()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the residency checks (the model stays loaded until its keep_alive runs out)"""
+        self._stop.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+
+    def status(self) -> Dict[str, Any]:
+        """Return the warm/cold state and warm-up counters"""
+        with self._lock:
+            status = dict(self._status)
+        status.update(model=self.model, warm=status["state"] == MODEL_WARM, keep_alive=self.keep_alive,
+                      running=self._thread is not None)
+        return status
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Model warm-up check failed: {str(e)}")
+            self._stop.wait(self.interval)
+
+    def _update(self, **fields):
+        with self._lock:
+            self._status.update(fields)
+
+    def _register_gauges(self):
+        tracing.register_gauge("model_warm", "1 while the model is loaded in Ollama, 0 otherwise",
+                               lambda: 1.0 if self.status()["warm"] else 0.0)
+        tracing.register_gauge("model_warmups_total", "Priming generations sent to load the model",
+                               lambda: self.status()["warmups"])
+        tracing.register_gauge("model_load_seconds", "Model load time reported by the last warm-up",
+                               lambda: self.status()["last_load_seconds"] or 0.0)
+
+def warmup_enabled() -> bool:
+    """False if SMARTSDLC_WARMUP is set to 0/false/no/off"""
+    return os.environ.get("SMARTSDLC_WARMUP", "1").strip().lower() not in ("0", "false", "no", "off")
+
+_warmer: Optional[ModelWarmer] = None
+_warmer_lock = threading.Lock()
+
+def get_model_warmer() -> ModelWarmer:
+    """Return the process-wide warmer for the default model"""
+    global _warmer
+    with _warmer_lock:
+        if _warmer is None:
+            _warmer = ModelWarmer(interval=float(os.environ.get("SMARTSDLC_WARMUP_INTERVAL", "60")))
+        return _warmer
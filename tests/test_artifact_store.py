@@ -0,0 +1,89 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+from artifact_store import CAPTURE_OUTPUTS, CAPTURE_RESULTS, ArtifactStore, capture_debug, request_scope
+
+DIAGRAM = "classDiagram\n    class User"
+
+class TestArtifactStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = ArtifactStore(self.tmp.name, capture_level=CAPTURE_RESULTS)
+
+    def tearDown(self):
+        self.store.flush(5)
+        self.tmp.cleanup()
+
+    def test_readable_before_and_after_flush(self):
+        digest = self.store.put("job1", "mermaid/Class Diagram", DIAGRAM, owner="alice")
+        self.assertEqual(self.store.get("job1", "mermaid/Class Diagram"), DIAGRAM)
+        self.assertTrue(self.store.flush(5))
+
+        reloaded = ArtifactStore(self.tmp.name)
+        self.assertEqual(reloaded.get("job1", "mermaid/Class Diagram"), DIAGRAM)
+        self.assertEqual(reloaded.manifest("job1")["artifacts"], {"mermaid/Class Diagram": digest})
+        self.assertEqual(reloaded.latest("alice", "mermaid/Class Diagram"), DIAGRAM)
+        leftovers = [name for _, _, names in os.walk(self.tmp.name) for name in names if name.endswith(".tmp")]
+        self.assertEqual(leftovers, [])
+
+    def test_blob_stays_in_memory_when_its_write_fails(self):
+        # A file where the blobs directory should be makes every blob write fail
+        with open(os.path.join(self.tmp.name, "blobs"), "w") as f:
+            f.write("")
+        with self.assertLogs("artifact_store", "ERROR"):
+            self.store.put("job1", "mermaid/A", DIAGRAM)
+            self.assertTrue(self.store.flush(5))
+        self.assertEqual(self.store.stats()["write_errors"], 1)
+        self.assertEqual(self.store.get("job1", "mermaid/A"), DIAGRAM)
+
+        os.remove(os.path.join(self.tmp.name, "blobs"))
+        self.store.put("job2", "mermaid/A", DIAGRAM)
+        self.assertTrue(self.store.flush(5))
+        self.assertEqual(ArtifactStore(self.tmp.name).get("job2", "mermaid/A"), DIAGRAM)
+
+    def test_identical_content_is_stored_once(self):
+        self.store.put("job1", "mermaid/A", DIAGRAM)
+        self.store.put("job2", "mermaid/B", DIAGRAM)
+        self.store.flush(5)
+        blobs = [name for _, _, names in os.walk(os.path.join(self.tmp.name, "blobs")) for name in names]
+        self.assertEqual(len(blobs), 1)
+        self.assertEqual(self.store.stats()["deduplicated"], 1)
+
+    def test_sessions_do_not_share_latest(self):
+        threads = [threading.Thread(target=self.store.put, args=(f"job-{owner}", "mermaid/A", f"pie\n    {owner}"),
+                                    kwargs={"owner": owner}) for owner in ("alice", "bob")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.store.latest("alice", "mermaid/A"), "pie\n    alice")
+        self.assertEqual(self.store.latest("bob", "mermaid/A"), "pie\n    bob")
+        self.assertIsNone(self.store.latest("carol", "mermaid/A"))
+
+    def test_retention_drops_oldest_requests(self):
+        store = ArtifactStore(self.tmp.name, max_requests=2)
+        for i in range(4):
+            store.put(f"job{i}", "sdlc_recommendation", f"Agile {i}")
+            store.flush(5)
+        store = ArtifactStore(self.tmp.name)
+        self.assertIsNone(store.get("job0", "sdlc_recommendation"))
+        self.assertEqual(store.get("job3", "sdlc_recommendation"), "Agile 3")
+        self.assertEqual(len(os.listdir(os.path.join(self.tmp.name, "requests"))), 2)
+
+    def test_debug_capture_is_opt_in(self):
+        with request_scope("job1"):
+            self.assertIsNone(capture_debug("crew_output", "raw", store=self.store))
+        debug_store = ArtifactStore(None, capture_level=CAPTURE_OUTPUTS)
+        self.assertIsNone(capture_debug("crew_output", "raw", store=debug_store))
+        with request_scope("job1"):
+            capture_debug("crew_output", "raw", store=debug_store)
+        self.assertEqual(debug_store.get("job1", "crew_output"), "raw")
+        self.assertEqual(debug_store.stats()["skipped"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import sys
+import unittest
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+import async_model_api
+import model_api
+
+class TestAsyncModelAPI(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.in_flight = 0
+        self.peak = 0
+        self.payloads = []
+
+        async def chat(request):
+            payload = await request.json()
+            self.payloads.append(payload)
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            try:
+                await asyncio.sleep(float(payload["messages"][-1]["content"]))
+            finally:
+                self.in_flight -= 1
+            return web.json_response({"message": {"role": "assistant", "content": "ok"}, "done": True})
+
+        app = web.Application()
+        app.router.add_post("/api/chat", chat)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.api_base = f"http://127.0.0.1:{port}"
+        async_model_api.set_max_concurrency(2)
+
+    async def asyncTearDown(self):
+        await async_model_api.close_async_session()
+        await self.runner.cleanup()
+        async_model_api.set_max_concurrency(async_model_api.DEFAULT_MAX_CONCURRENCY)
+
+    async def test_payload_matches_sync_client(self):
+        result = await async_model_api.acall_model_with_system(
+            "sys", "0", api_base=self.api_base, max_tokens=50, temperature=0.2
+        )
+        self.assertEqual(result, "ok")
+        self.assertEqual(self.payloads[0]["options"], {"temperature": 0.2, "num_predict": 50})
+        self.assertEqual(self.payloads[0]["messages"][0], {"role": "system", "content": "sys"})
+
+    async def test_generation_options_reach_payload(self):
+        await async_model_api.acall_model(
+            [{"role": "user", "content": "0"}], model="ollama/qwen2.5:3b", api_base=self.api_base,
+            max_tokens=64, num_ctx=4096, stop=["```"], keep_alive="10m"
+        )
+        payload = self.payloads[0]
+        self.assertEqual(payload["model"], "qwen2.5:3b")
+        self.assertEqual(payload["options"], {"temperature": 0.7, "num_predict": 64, "num_ctx": 4096, "stop": ["```"]})
+        self.assertEqual(payload["keep_alive"], "10m")
+        self.assertEqual(model_api.recent_request_options(1)[0]["options"]["num_ctx"], 4096)
+
+    async def test_concurrency_is_bounded(self):
+        conversations = [[{"role": "user", "content": "0.05"}] for _ in range(6)]
+        results = await async_model_api.acall_many(conversations, api_base=self.api_base)
+        self.assertEqual(results, ["ok"] * 6)
+        self.assertEqual(self.peak, 2)
+
+    async def test_cancellation_propagates(self):
+        task = asyncio.create_task(async_model_api.acall_model(
+            [{"role": "user", "content": "1"}], api_base=self.api_base
+        ))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+
+    async def test_unreachable_server_returns_none(self):
+        result = await async_model_api.acall_model(
+            [{"role": "user", "content": "0"}], api_base="http://127.0.0.1:9"
+        )
+        self.assertIsNone(result)
+
+class TestSessionPerLoop(unittest.TestCase):
+    def test_closed_loops_never_hand_out_their_session(self):
+        async def open_session():
+            await async_model_api.get_async_session()
+            async_model_api._get_semaphore()
+            return asyncio.get_running_loop()
+
+        # Leave the first loop's session open, as a caller that forgets to close it would
+        first_loop = asyncio.run(open_session())
+        second_loop = asyncio.run(open_session())
+        self.assertNotIn(first_loop, async_model_api._sessions)
+        self.assertIn(second_loop, async_model_api._sessions)
+
+        async def session_of_new_loop():
+            session = await async_model_api.get_async_session()
+            self.assertIs(session._loop, asyncio.get_running_loop())
+            await async_model_api.close_async_session()
+        asyncio.run(session_of_new_loop())
+        self.assertEqual(len(async_model_api._sessions), 0)
+        self.assertEqual(len(async_model_api._semaphores), 0)
+
+if __name__ == "__main__":
+    unittest.main()
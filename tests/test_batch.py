@@ -0,0 +1,85 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+import batch
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.calls = []
+        self.use_cache = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def fake_generate(self, description, diagram_types, **kwargs):
+        self.calls.append((description, diagram_types))
+        self.use_cache.append(kwargs["use_cache"])
+        if "fail" in description:
+            return None
+        return {"sdlc_recommendation": "Scrum", "diagrams": {t: f"%% {t}" for t in diagram_types}}
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_load_jsonl_and_csv(self):
+        jsonl = self.write("items.jsonl", '{"id": "a", "description": "Todo app", "diagram_types": ["Class", "Sequence"]}\n'
+                                          '\n{"description": "Chat app"}\nnot json\n')
+        items = batch.load_batch_items(jsonl, ["Class"])
+        self.assertEqual([i["diagram_types"] for i in items], [["Class", "Sequence"], ["Class"]])
+        self.assertEqual(items[0]["id"], "a")
+
+        csv_path = self.write("items.csv", "id,description,diagram_types\nb,Shop,Class;State Machine\n")
+        items = batch.load_batch_items(csv_path, ["Class"])
+        self.assertEqual(items[0]["diagram_types"], ["Class", "State Machine"])
+
+    def test_duplicate_descriptions_get_distinct_ids(self):
+        items = batch.normalize_items([{"description": "Todo app"}, {"description": "Chat app"},
+                                       {"description": "Todo app"}, {"id": "x", "description": "Todo app"}],
+                                      ["Class"])
+        ids = [i["id"] for i in items]
+        self.assertEqual(len(set(ids)), 4)
+        self.assertEqual(ids[2], f"{ids[0]}-2")
+        self.assertEqual(ids[3], "x")
+
+        out = os.path.join(self.tmp.name, "out")
+        summary = batch.run_batch(items[:3], out, generate_fn=self.fake_generate, use_cache=False)
+        self.assertEqual(summary["ok"], 3)
+        self.assertEqual(self.use_cache, [False] * 3)
+
+    def test_run_and_resume(self):
+        out = os.path.join(self.tmp.name, "out")
+        items = [
+            {"id": "a", "description": "Todo app", "diagram_types": ["Class", "State Machine"]},
+            {"id": "b", "description": "fail please", "diagram_types": ["Class"]},
+        ]
+        summary = batch.run_batch(items, out, workers=2, generate_fn=self.fake_generate)
+        self.assertEqual((summary["ok"], summary["failed"], summary["skipped"]), (2, 1, 0))
+        self.assertEqual(summary["count"], 2)
+        self.assertIn(("Todo app", ["Class", "State Machine"]), self.calls)
+        with open(os.path.join(out, "a", "state_machine", "mermaid_code.mmd")) as f:
+            self.assertEqual(f.read(), "%% State Machine")
+
+        # Only the failed pair is retried on restart
+        self.calls.clear()
+        summary = batch.run_batch(items, out, workers=2, generate_fn=self.fake_generate)
+        self.assertEqual(self.calls, [("fail please", ["Class"])])
+        self.assertEqual(summary["skipped"], 2)
+        with open(os.path.join(out, batch.RESULTS_FILE)) as f:
+            self.assertEqual(len([json.loads(line) for line in f]), 4)
+
+    def test_latency_summary(self):
+        summary = batch.summarize_latencies([float(i) for i in range(1, 101)])
+        self.assertEqual((summary["p50"], summary["p95"], summary["max"]), (50.0, 95.0, 100.0))
+        self.assertEqual(batch.summarize_latencies([]), {"count": 0})
+
+if __name__ == "__main__":
+    unittest.main()
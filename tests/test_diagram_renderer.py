@@ -0,0 +1,131 @@
+import glob
+import os
+import sys
+import tempfile
+import time
+import unittest
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+from diagram_renderer import (RenderCache, RenderError, diagram_fingerprint, normalize_source, parse_diagram,
+                              render_diagram, render_svg, save_diagram)
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "corpus", "mermaid")
+
+try:
+    import PIL  # noqa: F401
+    HAVE_PILLOW = True
+except ImportError:
+    HAVE_PILLOW = False
+
+class TestParseDiagram(unittest.TestCase):
+    def test_flowchart(self):
+        diagram = parse_diagram("flowchart LR\n    A[Start] -->|go| B{Ok?} & C\n    B -.-> D((End))\n    style A fill:#fff")
+        self.assertEqual(diagram.direction, "LR")
+        self.assertEqual([(n.id, n.label, n.shape) for n in diagram.nodes.values()],
+                         [("A", "Start", "rect"), ("B", "Ok?", "diamond"), ("C", "C", "rect"), ("D", "End", "circle")])
+        self.assertEqual([(e.source, e.target, e.label, e.dashed) for e in diagram.edges],
+                         [("A", "B", "go", False), ("A", "C", "go", False), ("B", "D", "", True)])
+
+    def test_sequence(self):
+        diagram = parse_diagram("sequenceDiagram\n    actor U as User\n    U->>API: login\n    loop retry\n"
+                                "    API-->>U: token\n    end")
+        self.assertEqual(diagram.nodes["U"].label, "User")
+        self.assertEqual([(e.source, e.target, e.dashed) for e in diagram.edges], [("U", "API", False), ("API", "U", True)])
+
+    def test_class(self):
+        diagram = parse_diagram('classDiagram\n    class Library {\n        +List~Book~ books\n    }\n'
+                                '    Library "1" o-- "many" Book : holds\n    Animal <|-- Dog')
+        self.assertEqual(diagram.nodes["Library"].members, ["+List<Book> books"])
+        holds, inherits = diagram.edges
+        self.assertEqual((holds.label, holds.tail, holds.head), ("holds", "odiamond", None))
+        self.assertEqual((inherits.source, inherits.tail), ("Animal", "triangle"))
+
+    def test_state(self):
+        diagram = parse_diagram("stateDiagram-v2\n    [*] --> Idle\n    state Busy {\n        [*] --> Working\n    }\n"
+                                "    Idle --> Busy : start\n    Busy --> [*]")
+        self.assertEqual(diagram.nodes["[*]start"].shape, "start")
+        self.assertIn("Busy[*]start", diagram.nodes)
+        self.assertEqual(diagram.nodes["[*]end"].shape, "end")
+
+    def test_unsupported(self):
+        with self.assertRaises(RenderError):
+            parse_diagram("pie\n    \"A\" : 1")
+        with self.assertRaises(RenderError):
+            parse_diagram("just text")
+        with self.assertRaises(RenderError):
+            render_diagram("flowchart TD\n    A --> B", "svg", theme="sepia")
+
+class TestFingerprint(unittest.TestCase):
+    def test_formatting_and_comments_keep_fingerprint(self):
+        code = "classDiagram\n    class Order\n    Order --> Item : has"
+        edited = "%% generated\nclassDiagram\n\n  class   Order\n\tOrder --> Item : has  \n"
+        self.assertEqual(normalize_source(edited), "classDiagram\nclass Order\nOrder --> Item : has")
+        self.assertEqual(diagram_fingerprint(edited), diagram_fingerprint(code))
+        self.assertNotEqual(diagram_fingerprint(code + "\n    Order --> Customer"), diagram_fingerprint(code))
+
+    def test_skipped_statements_keep_fingerprint(self):
+        code = "sequenceDiagram\n    A->>B: hi"
+        self.assertEqual(diagram_fingerprint(code + "\n    Note over A: ignored"), diagram_fingerprint(code))
+        self.assertNotEqual(diagram_fingerprint(code.replace("hi", "bye")), diagram_fingerprint(code))
+
+    def test_unsupported_falls_back_to_source(self):
+        self.assertEqual(diagram_fingerprint('pie\n  "A" : 1'), diagram_fingerprint('pie\n"A" : 1\n'))
+        self.assertNotEqual(diagram_fingerprint('pie\n"A" : 1'), diagram_fingerprint('pie\n"A" : 2'))
+
+class TestRender(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = RenderCache(cache_dir=self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_corpus_renders_to_valid_svg(self):
+        paths = sorted(glob.glob(os.path.join(CORPUS_DIR, "valid_*.mmd")))
+        self.assertTrue(paths)
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                svg = render_svg(f.read(), cache=self.cache)
+            root = ET.fromstring(svg)
+            self.assertTrue(root.tag.endswith("svg"), path)
+            self.assertGreater(len(root), 2, path)
+
+    def test_cache_hits_after_first_render(self):
+        code = "flowchart TD\n    A --> B"
+        first = render_diagram(code, "svg", "dark", cache=self.cache)
+        self.assertEqual(render_diagram(code, "svg", "dark", cache=self.cache), first)
+        self.assertEqual(RenderCache(cache_dir=self.tmp.name).get(RenderCache.make_key(code, "svg", "dark")), first)
+        stats = self.cache.stats()
+        self.assertEqual((stats["renders"], stats["memory_hits"]), (1, 1))
+        self.assertNotEqual(render_diagram(code, "svg", "default", cache=self.cache), first)
+
+    def test_disk_is_trimmed_every_n_writes(self):
+        cache = RenderCache(cache_dir=self.tmp.name, max_disk_entries=2, trim_every=3)
+
+        def on_disk():
+            return sum(len(files) for _, _, files in os.walk(self.tmp.name))
+
+        for i in range(4):
+            cache.put(RenderCache.make_key(f"flowchart TD\n    A --> B{i}", "svg"), b"<svg/>")
+            time.sleep(0.01)
+        # The first write trims (nothing to do), the next trim is due on the fourth
+        self.assertEqual(on_disk(), 2)
+        cache.put(RenderCache.make_key("flowchart TD\n    A --> B4", "svg"), b"<svg/>")
+        self.assertEqual(on_disk(), 3)
+
+    def test_save_diagram(self):
+        path = save_diagram("stateDiagram-v2\n    [*] --> Idle", os.path.join(self.tmp.name, "d.svg"), cache=self.cache)
+        with open(path, encoding="utf-8") as f:
+            self.assertIn("<svg", f.read())
+        with self.assertRaises(RenderError):
+            save_diagram("flowchart TD\n    A --> B", os.path.join(self.tmp.name, "d.gif"), cache=self.cache)
+
+    @unittest.skipUnless(HAVE_PILLOW, "Pillow is not installed")
+    def test_png(self):
+        data = render_diagram("sequenceDiagram\n    A->>B: hi", "png", cache=self.cache)
+        self.assertTrue(data.startswith(b"\x89PNG"))
+
+if __name__ == "__main__":
+    unittest.main()
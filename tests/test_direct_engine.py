@@ -0,0 +1,51 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+import direct_engine
+import generation
+from prompts import SDLC_SYSTEM_PROMPT, mermaid_system_prompt
+
+def fake_model(system_prompt, user_message, **options):
+    if system_prompt == SDLC_SYSTEM_PROMPT:
+        return "Use Scrum."
+    if system_prompt == mermaid_system_prompt("Sequence"):
+        return "```mermaid\nsequenceDiagram\n    A->>B: hi\n```"
+    return "Here you go:\n```mermaid\nclassDiagram\n    class Order\n```"
+
+class TestDirectEngine(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(direct_engine, "call_model_with_system", side_effect=fake_model)
+        self.model = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_single_task_keeps_the_crew_contract(self):
+        result = direct_engine.run_direct_task("An online shop", "Class", max_tokens=64, parallel=False)
+        self.assertEqual(result, {"sdlc_recommendation": "Use Scrum.", "mermaid_code": "classDiagram\n    class Order"})
+        self.assertEqual(self.model.call_args.kwargs["max_tokens"], 64)
+
+    def test_multi_task_uses_per_type_prompts(self):
+        result = direct_engine.run_multi_direct_task("An online shop", ["Class", "Sequence", "Class"],
+                                                     model_options={"num_ctx": 4096})
+        self.assertEqual(list(result["diagrams"]), ["Class", "Sequence"])
+        self.assertTrue(result["diagrams"]["Sequence"].startswith("sequenceDiagram"))
+        self.assertEqual(self.model.call_count, 3)
+        self.assertTrue(all(call.kwargs["num_ctx"] == 4096 for call in self.model.call_args_list))
+
+    def test_failed_call_returns_none(self):
+        self.model.side_effect = lambda system_prompt, *args, **kwargs: (
+            None if system_prompt == SDLC_SYSTEM_PROMPT else fake_model(system_prompt, *args))
+        self.assertIsNone(direct_engine.run_direct_task("An online shop", "Class"))
+
+    def test_engine_selection(self):
+        self.assertEqual(generation.engine_functions("direct"),
+                         (direct_engine.run_direct_task, direct_engine.run_multi_direct_task))
+        with self.assertRaises(ValueError):
+            generation.engine_functions("langchain")
+        self.assertNotIn("crewai", sys.modules)
+
+if __name__ == "__main__":
+    unittest.main()
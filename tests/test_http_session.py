@@ -0,0 +1,66 @@
+import json
+import os
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+import http_session
+import model_api
+
+class _StubOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length))
+        body = json.dumps({
+            "message": {"role": "assistant", "content": f"echo:{payload['model']}"},
+            "done": True,
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestHTTPSession(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubOllamaHandler)
+        cls.api_base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        http_session.close_session()
+
+    def setUp(self):
+        http_session.configure_session(**http_session.DEFAULT_POOL_CONFIG)
+
+    def test_connections_are_reused(self):
+        messages = [{"role": "user", "content": "hi"}]
+        for _ in range(5):
+            self.assertEqual(model_api.call_model(messages, api_base=self.api_base), "echo:qwen2.5:3b")
+
+        hosts = http_session.pool_stats()["hosts"]
+        self.assertEqual(len(hosts), 1)
+        self.assertEqual(hosts[0]["requests_served"], 5)
+        self.assertEqual(hosts[0]["connections_opened"], 1)
+
+    def test_configure_rejects_unknown_option(self):
+        with self.assertRaises(ValueError):
+            http_session.configure_session(pool_sizee=3)
+
+    def test_timeouts_are_configurable(self):
+        http_session.configure_session(connect_timeout=1.5, read_timeout=30.0)
+        self.assertEqual(http_session.get_timeout(), (1.5, 30.0))
+
+if __name__ == "__main__":
+    unittest.main()
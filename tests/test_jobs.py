@@ -0,0 +1,81 @@
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+from jobs import JobQueue, QueueFullError, JOB_DONE, JOB_FAILED, JOB_CANCELLED, JOB_QUEUED
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.gate = threading.Event()
+        self.order = []
+        self.queue = JobQueue(workers=1, max_depth=4, max_per_owner=3)
+
+    def tearDown(self):
+        self.gate.set()
+        self.queue.shutdown()
+
+    def blocking(self, job, name):
+        self.order.append(name)
+        job.report(f"partial {name}")
+        self.gate.wait(5)
+        if name == "boom":
+            raise ValueError("boom")
+        return name
+
+    def wait_for(self, job_id):
+        job = self.queue.get(job_id)
+        for _ in range(500):
+            if job.finished_at:
+                return self.queue.status(job_id)
+            threading.Event().wait(0.01)
+        self.fail("job did not finish")
+
+    def test_result_and_failure(self):
+        self.gate.set()
+        ok = self.queue.submit("alice", self.blocking, "ok")
+        failing = self.queue.submit("alice", self.blocking, "boom")
+        self.assertEqual(self.wait_for(ok)["result"], "ok")
+        status = self.wait_for(failing)
+        self.assertEqual((status["status"], status["error"]), (JOB_FAILED, "boom"))
+        self.assertEqual(status["partial"], {"sdlc_recommendation": "partial boom"})
+        self.assertEqual(self.queue.status(ok)["status"], JOB_DONE)
+
+    def wait_started(self, job_id):
+        for _ in range(500):
+            if self.queue.get(job_id).started_at:
+                return
+            threading.Event().wait(0.01)
+        self.fail("job did not start")
+
+    def test_owners_take_turns(self):
+        first = self.queue.submit("alice", self.blocking, "a1")
+        self.wait_started(first)
+        self.queue.submit("alice", self.blocking, "a2")
+        self.queue.submit("alice", self.blocking, "a3")
+        last = self.queue.submit("bob", self.blocking, "b1")
+        self.assertEqual(self.queue.status(last)["status"], JOB_QUEUED)
+        self.gate.set()
+        self.wait_for(first)
+        self.wait_for(last)
+        self.assertEqual(self.order[:2], ["a1", "b1"])
+
+    def test_limits_and_cancellation(self):
+        running = self.queue.submit("alice", self.blocking, "a1")
+        queued = self.queue.submit("alice", self.blocking, "a2")
+        self.queue.submit("alice", self.blocking, "a3")
+        with self.assertRaises(QueueFullError):
+            self.queue.submit("alice", self.blocking, "a4")
+
+        self.assertTrue(self.queue.cancel(queued))
+        self.assertEqual(self.queue.status(queued)["status"], JOB_CANCELLED)
+        self.assertTrue(self.queue.cancel(running))
+        self.gate.set()
+        self.assertEqual(self.wait_for(running)["status"], JOB_CANCELLED)
+        self.assertFalse(self.queue.cancel(running))
+        self.assertNotIn("a2", self.order)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+import mermaid_assets
+
+BUNDLE = b"window.mermaid = {initialize() {}, render() {}};"
+
+class _StubCDNHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/javascript")
+        self.send_header("Content-Length", str(len(BUNDLE)))
+        self.end_headers()
+        self.wfile.write(BUNDLE)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestMermaidAssets(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubCDNHandler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/mermaid.min.js"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        patcher = mock.patch.object(mermaid_assets, "COMPONENT_DIR", self.tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_script_url_fallbacks(self):
+        with mock.patch.dict(os.environ, {"SMARTSDLC_MERMAID_URL": ""}):
+            self.assertEqual(mermaid_assets.script_url(), mermaid_assets.DOWNLOAD_URL)
+            mermaid_assets.fetch_bundle(self.url)
+            self.assertTrue(mermaid_assets.script_url().startswith("file://"))
+            self.assertTrue(mermaid_assets.script_url().endswith(mermaid_assets.BUNDLE_NAME))
+        with mock.patch.dict(os.environ, {"SMARTSDLC_MERMAID_URL": "http://host/static/m.js"}):
+            self.assertEqual(mermaid_assets.script_url(), "http://host/static/m.js")
+
+    def test_fetch_records_and_enforces_digest(self):
+        path, digest = mermaid_assets.fetch_bundle(self.url)
+        self.assertEqual(digest, hashlib.sha256(BUNDLE).hexdigest())
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), BUNDLE)
+        self.assertEqual(mermaid_assets.read_lock()["sha256"], digest)
+
+        # Same version again must match the recorded digest
+        self.assertEqual(mermaid_assets.fetch_bundle(self.url)[1], digest)
+        with self.assertRaises(ValueError):
+            mermaid_assets.fetch_bundle(self.url, expected_sha256="0" * 64)
+        self.assertEqual(os.listdir(self.tmp.name).count(mermaid_assets.BUNDLE_NAME), 1)
+        self.assertFalse([name for name in os.listdir(self.tmp.name) if name.endswith(".tmp")])
+
+if __name__ == "__main__":
+    unittest.main()
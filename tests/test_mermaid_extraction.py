@@ -0,0 +1,76 @@
+import os
+import random
+import sys
+import time
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+from mermaid_extraction import NO_DIAGRAM_PLACEHOLDER, extract_mermaid_code, task_outputs
+
+FUZZ_TOKENS = ["```", "```mermaid", "~~~", "mermaid", "classDiagram", "flowchart", "stateDiagram-v2",
+               "SDLC", "recommend", ":", "\n", "\n\n", "-", "* ", "a ", "word ", "{", "}", "end", " "]
+
+class TestExtractMermaidCode(unittest.TestCase):
+    def test_prefers_mermaid_fence_over_other_blocks(self):
+        text = ("Setup:\n```bash\nnpm install\n```\nDiagram:\n```mermaid\nclassDiagram\n    class User\n```\n"
+                "```\nflowchart TD\n    A --> B\n```")
+        self.assertEqual(extract_mermaid_code(text), "classDiagram\n    class User")
+
+    def test_unlabelled_fence_with_header_wins_over_labelled_other(self):
+        text = "```text\nnotes\n```\n```js\nsequenceDiagram\n    A->>B: hi\n```"
+        self.assertEqual(extract_mermaid_code(text), "sequenceDiagram\n    A->>B: hi")
+
+    def test_unclosed_fence_runs_to_end(self):
+        text = "Here you go:\n```mermaid\nflowchart TD\n    A --> B"
+        self.assertEqual(extract_mermaid_code(text), "flowchart TD\n    A --> B")
+
+    def test_unfenced_header_line(self):
+        text = "Final Answer:\nstateDiagram-v2\n    [*] --> Idle\n"
+        self.assertEqual(extract_mermaid_code(text), "stateDiagram-v2\n    [*] --> Idle")
+
+    def test_header_mid_line(self):
+        text = "The diagram is classDiagram\n    class User"
+        self.assertEqual(extract_mermaid_code(text), "classDiagram\n    class User")
+
+    def test_no_diagram(self):
+        self.assertEqual(extract_mermaid_code("just prose"), "just prose")
+        self.assertEqual(extract_mermaid_code("   "), NO_DIAGRAM_PLACEHOLDER)
+
+    def test_fuzz_corpus_is_linear(self):
+        rng = random.Random(1234)
+        for _ in range(200):
+            text = "".join(rng.choice(FUZZ_TOKENS) for _ in range(rng.randint(0, 400)))
+            self.assertIsInstance(extract_mermaid_code(text), str)
+
+        # Inputs that made the old regex extraction quadratic or worse
+        pathological = [
+            "SDLC: " + "word " * 20000,
+            "recommend " + "a " * 20000,
+            "```mermaid\nflowchart TD\n" + "    A --> B\n" * 10000,
+            "```\n" * 20000,
+            "flowchart " * 20000,
+            "".join(rng.choice(FUZZ_TOKENS) for _ in range(30000)),
+        ]
+        for text in pathological:
+            start = time.perf_counter()
+            extract_mermaid_code(text)
+            self.assertLess(time.perf_counter() - start, 0.5, text[:40])
+
+class TestTaskOutputs(unittest.TestCase):
+    def test_tasks_output_list(self):
+        result = SimpleNamespace(tasks_output=[SimpleNamespace(raw="Final Answer: Agile"),
+                                               SimpleNamespace(raw="classDiagram")])
+        self.assertEqual(task_outputs(result, 2), ["Agile", "classDiagram"])
+
+    def test_tasks_attribute_fallback(self):
+        result = SimpleNamespace(tasks=[SimpleNamespace(output="Scrum"), SimpleNamespace(output=None)])
+        self.assertEqual(task_outputs(result, 2), ["Scrum", None])
+
+    def test_final_raw_goes_to_last_task(self):
+        self.assertEqual(task_outputs(SimpleNamespace(raw="flowchart TD"), 2), [None, "flowchart TD"])
+        self.assertEqual(task_outputs("pie", 2), [None, "pie"])
+
+if __name__ == "__main__":
+    unittest.main()
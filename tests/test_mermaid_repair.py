@@ -0,0 +1,69 @@
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+from mermaid_repair import apply_local_fixes, arepair_mermaid, repair_mermaid
+
+BROKEN = "classDiagram\n    class User\n    User ->> Order : places"
+
+class TestMermaidRepair(unittest.TestCase):
+    def setUp(self):
+        self.prompts = []
+
+    def regenerate_with(self, *replies):
+        replies = list(replies)
+
+        def regenerate(prompt):
+            self.prompts.append(prompt)
+            return replies.pop(0) if replies else None
+        return regenerate
+
+    def test_local_fixes_need_no_model_call(self):
+        raw = ("Here is your diagram:\n```mermaid\nstateDiagram\n    [*] --> Idle\n    state Idle {\n"
+               "        [*] --> Waiting\n```\nThis diagram shows the lifecycle.")
+        result = repair_mermaid(raw, "State Machine", self.regenerate_with())
+        self.assertTrue(result["valid"])
+        self.assertEqual(result["llm_attempts"], 0)
+        self.assertEqual(self.prompts, [])
+        self.assertTrue(result["code"].startswith("stateDiagram-v2\n"))
+        self.assertEqual(set(result["local_fixes"]), {"code_fences", "state_diagram_v2", "unclosed_blocks"})
+
+    def test_valid_sentences_are_not_stripped(self):
+        code = "sequenceDiagram\n    A->>B: hi\n    Note right of A: Done."
+        self.assertEqual(apply_local_fixes(code), (code, []))
+
+    def test_model_repair_gets_the_error_location(self):
+        result = repair_mermaid(BROKEN, "Class", self.regenerate_with(
+            "still broken ->> here", "```mermaid\nclassDiagram\n    User --> Order : places\n```"
+        ))
+        self.assertTrue(result["valid"])
+        self.assertEqual(result["llm_attempts"], 2)
+        self.assertIn("line 3, column 10: Unknown relationship arrow '->>'", self.prompts[0])
+        self.assertIn("User ->> Order", self.prompts[0])
+
+    def test_budget_and_deadline(self):
+        result = repair_mermaid(BROKEN, "Class", self.regenerate_with("nope", "nope", "nope"), max_attempts=2)
+        self.assertFalse(result["valid"])
+        self.assertEqual((result["llm_attempts"], len(self.prompts)), (2, 2))
+        self.assertEqual(result["code"], BROKEN)
+
+        self.prompts.clear()
+        result = repair_mermaid(BROKEN, "Class", self.regenerate_with("nope"), deadline_seconds=0)
+        self.assertEqual((result["llm_attempts"], self.prompts), (0, []))
+
+    def test_async_repair_awaits_regenerator(self):
+        regenerate = self.regenerate_with("```mermaid\nclassDiagram\n    User --> Order : places\n```")
+
+        async def aregenerate(prompt):
+            await asyncio.sleep(0)
+            return regenerate(prompt)
+
+        result = asyncio.run(arepair_mermaid(BROKEN, "Class", aregenerate))
+        self.assertTrue(result["valid"])
+        self.assertEqual((result["llm_attempts"], len(self.prompts)), (1, 1))
+
+if __name__ == "__main__":
+    unittest.main()
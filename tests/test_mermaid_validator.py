@@ -0,0 +1,70 @@
+import glob
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+from mermaid_extraction import is_valid_mermaid
+from mermaid_validator import MermaidValidator, validate_mermaid, first_error
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "corpus", "mermaid")
+
+class TestMermaidValidator(unittest.TestCase):
+    def test_corpus(self):
+        paths = glob.glob(os.path.join(CORPUS_DIR, "*.mmd"))
+        self.assertTrue(paths)
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                code = f.read()
+            expected_valid = os.path.basename(path).startswith("valid_")
+            self.assertEqual(is_valid_mermaid(code), expected_valid, msg=f"{path}: {validate_mermaid(code)}")
+
+    def test_error_locations(self):
+        cases = {
+            "flowchart TD\n    A[Start --> B": (2, 6, "Unclosed '['"),
+            "flowchart TD\n    A -->> B": (2, 7, "Malformed link"),
+            "classDiagram\n    class A {\n    +x\n": (2, 13, "never closed"),
+            "classDiagram\n    A ->> B": (2, 7, "Unknown relationship arrow"),
+            "sequenceDiagram\n    A->>B hello": (2, 16, "': text'"),
+            "sequenceDiagram\n    A->>B: x\n    end": (3, 5, "'end' without"),
+            "stateDiagram-v2\n    A -> B": (2, 7, "Transitions use '-->'"),
+            "Sure! classDiagram": (1, 1, "Unknown diagram type"),
+        }
+        for code, (line, column, message) in cases.items():
+            issue = first_error(code)
+            self.assertIsNotNone(issue, msg=code)
+            self.assertEqual((issue.line, issue.column), (line, column), msg=str(issue))
+            self.assertIn(message, issue.message)
+
+    def test_undeclared_participant_is_a_warning(self):
+        code = "sequenceDiagram\n    participant A\n    participant B\n    A->>C: typo?\n"
+        issues = validate_mermaid(code)
+        self.assertEqual([(i.severity, i.line) for i in issues], [("warning", 4)])
+        self.assertTrue(is_valid_mermaid(code))
+
+    def test_incremental_feed_matches_one_shot(self):
+        code = "flowchart LR\n    A --> B\n    B --> C[Open\n    C --> D\n"
+        validator = MermaidValidator()
+        for char in code[:28]:
+            validator.feed(char)
+        self.assertEqual(validator.errors, [])
+        validator.feed(code[28:])
+        self.assertEqual([str(i) for i in validator.close()], [str(i) for i in validate_mermaid(code)])
+        self.assertEqual(len(validator.errors), 1)
+
+    def test_header_only_types_and_empty_input(self):
+        self.assertTrue(is_valid_mermaid("pie title Pets\n    \"Dogs\" : 386"))
+        self.assertFalse(is_valid_mermaid(""))
+        self.assertFalse(is_valid_mermaid("classDiagram\n"))
+
+    def test_lone_semicolon_lines_are_skipped(self):
+        for code in ("sequenceDiagram\n    A->>B: hi\n  ;",
+                     "classDiagram\n;\n    class User",
+                     "stateDiagram-v2\n    [*] --> Idle\n    ;"):
+            with self.subTest(code=code):
+                self.assertEqual(validate_mermaid(code), [])
+        self.assertFalse(is_valid_mermaid("classDiagram\n;"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+from mermaid_renderer import convert_plantuml_to_mermaid, convert_sequence_diagram
+from mermaid_validator import first_error
+from plantuml import detect_diagram_type, parse_plantuml, plantuml_to_mermaid
+
+CLASS = """@startuml
+abstract class Animal<T> {
+  +name : String
+  {abstract} +speak() : void
+}
+interface Pet
+class "Order Line" as OL
+Animal <|-- Dog
+Dog ..|> Pet
+Order "1" *-- "many" OL : contains >
+package sales {
+  class Invoice
+}
+@enduml"""
+
+SEQUENCE = """@startuml
+actor User
+participant "Web App" as Web
+User -> Web : login
+Web <-- DB : rows
+Web ->x DB : lost
+alt ok
+  Web -> User : welcome
+else
+  Web -> User : denied
+end
+note over User, Web : shared
+@enduml"""
+
+USECASE = """left to right direction
+actor Customer
+usecase (Place Order) as UC1
+rectangle Shop {
+  Customer --> UC1
+  Customer -- (Browse)
+}
+(Browse) .> UC1 : include"""
+
+STATE = """[*] --> Idle
+state Idle : waiting
+state "Processing Order" as Proc {
+  [*] --> Validating
+  Validating --> [*]
+}
+Idle -down-> Proc : submit"""
+
+COMPONENT = """component [Web Server] as WS
+interface HTTP
+[Web Server] --> [Database] : SQL
+node "App Node" {
+  [Cache]
+}"""
+
+class TestPlantUML(unittest.TestCase):
+    def test_detects_type_and_emits_valid_mermaid(self):
+        for source, kind, header in ((CLASS, "class", "classDiagram"), (SEQUENCE, "sequence", "sequenceDiagram"),
+                                     (USECASE, "usecase", "flowchart LR"), (STATE, "state", "stateDiagram-v2"),
+                                     (COMPONENT, "component", "flowchart LR"),
+                                     ("Start here --> Check input", "flowchart", "flowchart TD")):
+            self.assertEqual(detect_diagram_type(parse_plantuml(source)), kind)
+            mermaid = plantuml_to_mermaid(source)
+            self.assertTrue(mermaid.startswith(header + "\n"), mermaid)
+            self.assertIsNone(first_error(mermaid), mermaid)
+
+    def test_class(self):
+        lines = convert_plantuml_to_mermaid(CLASS).splitlines()
+        for expected in ("    class Animal~T~", "    <<abstract>> Animal", "    Animal : +speak() : void",
+                         '    class OL["Order Line"]', "    Dog ..|> Pet", '    Order "1" *-- "many" OL : contains',
+                         "    namespace sales {", "        class Invoice"):
+            self.assertIn(expected, lines)
+
+    def test_sequence(self):
+        lines = convert_sequence_diagram(SEQUENCE).splitlines()
+        self.assertEqual(lines[1:3], ["    actor User", "    participant Web as Web App"])
+        for expected in ("    User->>Web: login", "    DB-->>Web: rows", "    Web-xDB: lost",
+                         "        Web->>User: welcome", "    Note over User,Web: shared"):
+            self.assertIn(expected, lines)
+
+    def test_nodes_are_defined_inside_their_block(self):
+        lines = plantuml_to_mermaid(COMPONENT).splitlines()
+        self.assertEqual(lines[lines.index('    subgraph App_Node ["App Node"]') + 1], '        Cache["Cache"]')
+        self.assertIn('    WS -->|"SQL"| Database', lines)
+
+    def test_scales_linearly(self):
+        # Truncated class bodies used to be rescanned to the end of the input for every class
+        text = "\n".join(f"class C{i} {{\n  +name : String" for i in range(5000))
+        start = time.perf_counter()
+        mermaid = plantuml_to_mermaid(text)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertIn("    C4999 : +name : String", mermaid)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+import tracing
+from model_api import build_chat_payload
+from prompt_prefix import PrefixTracker, prefix_key, split_prompt
+from prompts import SDLC_SYSTEM_PROMPT, build_sdlc_task_prompt, build_uml_task_prompt, mermaid_system_prompt
+
+def chat(system, user):
+    return [{"role": "system", "content": system}, {"role": "user", "content": user}]
+
+def response(evaluated, seconds):
+    return {"prompt_eval_count": evaluated, "prompt_eval_duration": int(seconds * 1e9)}
+
+class TestPromptLayout(unittest.TestCase):
+    def test_description_comes_last(self):
+        for build, system in ((build_sdlc_task_prompt, SDLC_SYSTEM_PROMPT),
+                              (lambda d: build_uml_task_prompt(d, "Class"), mermaid_system_prompt("Class"))):
+            first = split_prompt(chat(system, build("A library app")))
+            second = split_prompt(chat(system, build("An online shop with payments")))
+            self.assertEqual(first[0], second[0])
+            self.assertEqual(first[1].strip(), "A library app")
+
+    def test_prefix_differs_per_diagram_type_and_model(self):
+        class_chat = chat(mermaid_system_prompt("Class"), build_uml_task_prompt("A shop", "Class"))
+        sequence_chat = chat(mermaid_system_prompt("Sequence"), build_uml_task_prompt("A shop", "Sequence"))
+        self.assertNotEqual(prefix_key("qwen2.5:3b", class_chat), prefix_key("qwen2.5:3b", sequence_chat))
+        self.assertNotEqual(prefix_key("qwen2.5:3b", class_chat), prefix_key("llama3", class_chat))
+
+class TestPrefixTracker(unittest.TestCase):
+    def test_estimates_reuse_from_prompt_eval_count(self):
+        tracker = PrefixTracker()
+        messages = chat("s" * 900, "Product description: " + "d" * 79)
+
+        # Cold: the whole 1000-char prompt is evaluated as 250 tokens
+        cold = tracker.record(messages, "m", response(250, 0.5))
+        self.assertEqual(cold["reused_tokens"], 0)
+
+        # Warm: only the description part is evaluated again
+        with tracing.span("model.call") as call_span:
+            warm = tracker.record(messages, "m", response(20, 0.04))
+        self.assertEqual(warm["reused_tokens"], 230)
+        self.assertAlmostEqual(warm["saved_seconds"], 0.46)
+        self.assertEqual(call_span.attributes["prompt_prefix_reused_tokens"], 230)
+
+        stats = tracker.stats()
+        self.assertEqual(stats["requests"], 2)
+        self.assertEqual(stats["prefixes"], 1)
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_reuse_is_capped_at_the_stable_prefix(self):
+        tracker = PrefixTracker()
+        tracker.record(chat("s" * 500, "Product description: " + "d" * 479), "m", response(250, 0.5))
+        result = tracker.record(chat("s" * 500, "Product description: " + "e" * 479), "m", response(1, 0.002))
+        self.assertEqual(result["reused_tokens"], int((500 + len("Product description:")) * 0.25))
+
+    def test_ignores_responses_without_counts(self):
+        tracker = PrefixTracker()
+        self.assertEqual(tracker.record(chat("s", "u"), "m", {}), {})
+        self.assertEqual(tracker.stats()["requests"], 0)
+
+class TestKeepAlive(unittest.TestCase):
+    def test_default_keep_alive(self):
+        messages = chat("s", "u")
+        with mock.patch.dict(os.environ, {"SMARTSDLC_KEEP_ALIVE": "30m"}):
+            self.assertEqual(build_chat_payload(messages, "m", 10, 0.1)["keep_alive"], "30m")
+            self.assertEqual(build_chat_payload(messages, "m", 10, 0.1, keep_alive=-1)["keep_alive"], -1)
+        with mock.patch.dict(os.environ, {"SMARTSDLC_KEEP_ALIVE": "-1"}):
+            self.assertEqual(build_chat_payload(messages, "m", 10, 0.1)["keep_alive"], -1)
+        with mock.patch.dict(os.environ, {"SMARTSDLC_KEEP_ALIVE": ""}):
+            self.assertNotIn("keep_alive", build_chat_payload(messages, "m", 10, 0.1))
+
+if __name__ == "__main__":
+    unittest.main()
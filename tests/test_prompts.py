@@ -0,0 +1,44 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+import prompts
+from mermaid_validator import validate_mermaid
+from response_cache import ResponseCache
+
+class TestPromptTemplates(unittest.TestCase):
+    def test_prompt_only_carries_the_requested_type(self):
+        class_prompt = prompts.mermaid_system_prompt("Class")
+        self.assertIn("classDiagram", class_prompt)
+        self.assertNotIn("sequenceDiagram", class_prompt)
+        self.assertNotIn("stateDiagram-v2", class_prompt)
+        self.assertTrue(class_prompt.startswith(prompts.MERMAID_PROMPT_HEADER))
+
+    def test_unknown_type_gets_every_template(self):
+        full = prompts.mermaid_system_prompt("Deployment")
+        self.assertEqual(full, prompts.MERMAID_SYSTEM_PROMPT)
+        for template in prompts.MERMAID_TEMPLATES.values():
+            self.assertIn(template.title, full)
+
+    def test_slim_prompts_are_smaller(self):
+        counts = prompts.template_token_counts()
+        for diagram_type in prompts.MERMAID_TEMPLATES:
+            self.assertLess(counts[diagram_type], counts["all"] / 2)
+
+    def test_examples_are_valid_mermaid(self):
+        for template in prompts.MERMAID_TEMPLATES.values():
+            errors = [issue for issue in validate_mermaid(template.example) if issue.severity == "error"]
+            self.assertEqual(errors, [], template.diagram_type)
+
+    def test_template_version_only_invalidates_its_type(self):
+        class_key = ResponseCache.make_key("A shop", "Class")
+        sequence_key = ResponseCache.make_key("A shop", "Sequence")
+        with mock.patch.object(prompts.get_template("Class"), "version", 99):
+            self.assertNotEqual(ResponseCache.make_key("A shop", "Class"), class_key)
+            self.assertEqual(ResponseCache.make_key("A shop", "Sequence"), sequence_key)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+from response_cache import ResponseCache
+
+RESULT = {"sdlc_recommendation": "Agile", "mermaid_code": "flowchart TD\n    A --> B"}
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(cache_dir=self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_key_normalizes_whitespace(self):
+        a = ResponseCache.make_key("A todo  app\n", "Class")
+        b = ResponseCache.make_key(" A todo app", "Class")
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, ResponseCache.make_key("A todo app", "Sequence"))
+        self.assertNotEqual(a, ResponseCache.make_key("A todo app", "Class", temperature=0.2))
+        self.assertNotEqual(a, ResponseCache.make_key("A todo app", "Class", template_version="other"))
+        self.assertNotEqual(a, ResponseCache.make_key("A todo app", "Class", model="llama3.2:3b"))
+        self.assertEqual(a, ResponseCache.make_key("A todo app", "Class", model="ollama/qwen2.5:3b"))
+
+    def test_memory_then_disk_hits(self):
+        key = ResponseCache.make_key("A todo app", "Class")
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, RESULT)
+        self.assertEqual(self.cache.get(key), RESULT)
+
+        # A fresh instance only has the disk tier
+        reloaded = ResponseCache(cache_dir=self.tmp.name)
+        self.assertEqual(reloaded.get(key), RESULT)
+        self.assertEqual(reloaded.get(key), RESULT)
+        stats = reloaded.stats()
+        self.assertEqual((stats["disk_hits"], stats["memory_hits"]), (1, 1))
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_expired_entries_are_misses(self):
+        cache = ResponseCache(cache_dir=self.tmp.name, ttl_seconds=0.05)
+        cache.put("k", RESULT)
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("k"))
+        self.assertIsNone(ResponseCache(cache_dir=self.tmp.name).get("k"))
+
+    def test_size_based_eviction(self):
+        cache = ResponseCache(cache_dir=self.tmp.name, max_memory_entries=2, max_disk_entries=3,
+                              trim_every=1)
+        for i in range(5):
+            cache.put(f"{i:02d}key", RESULT)
+            time.sleep(0.01)
+        self.assertEqual(cache.stats()["memory_entries"], 2)
+        self.assertEqual(cache.stats()["evictions"], 2)
+        self.assertIsNone(ResponseCache(cache_dir=self.tmp.name).get("00key"))
+        self.assertEqual(ResponseCache(cache_dir=self.tmp.name).get("04key"), RESULT)
+
+    def test_disk_is_trimmed_every_n_writes(self):
+        cache = ResponseCache(cache_dir=self.tmp.name, max_disk_entries=2, trim_every=3)
+        for i in range(4):
+            cache.put(f"{i:02d}key", RESULT)
+            time.sleep(0.01)
+        # The first write trims (nothing to do), the next trim is due on the fourth
+        self.assertEqual(cache.stats()["evictions"], 2)
+        cache.put("04key", RESULT)
+        self.assertEqual(cache.stats()["evictions"], 2)
+
+if __name__ == "__main__":
+    unittest.main()
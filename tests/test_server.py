@@ -0,0 +1,162 @@
+import asyncio
+import importlib.util
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from aiohttp import web
+from aiohttp import test_utils
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+import mermaid_assets
+from prompts import MERMAID_PROMPT_HEADER
+from response_cache import ResponseCache
+from model_api import build_chat_payload
+from server import GenerationService, RequestError, create_app, parse_generation_request
+
+def make_stub_ollama():
+    """Tiny stand-in for Ollama's /api/tags and /api/chat"""
+    async def tags(request):
+        return web.json_response({"models": [{"name": "qwen2.5:3b"}]})
+
+    async def chat(request):
+        payload = await request.json()
+        system, user = payload["messages"][0]["content"], payload["messages"][1]["content"]
+        if "slow" in user:
+            await asyncio.sleep(2)
+        if system.startswith(MERMAID_PROMPT_HEADER):
+            content = "Here it is:\n```mermaid\nclassDiagram\n    class Order\n```"
+        else:
+            content = "Use Scrum."
+        return web.json_response({"message": {"content": content}, "done": True, "eval_count": 5})
+
+    app = web.Application()
+    app.router.add_get("/api/tags", tags)
+    app.router.add_post("/api/chat", chat)
+    return app
+
+class TestServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.ollama = test_utils.TestServer(make_stub_ollama())
+        await self.ollama.start_server()
+        api_base = str(self.ollama.make_url("")).rstrip("/")
+        service = GenerationService(api_base=api_base, max_concurrency=2, request_timeout=1,
+                                    cache=ResponseCache(cache_dir=None))
+        self.client = test_utils.TestClient(test_utils.TestServer(create_app(service)))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.ollama.close()
+
+    async def test_health(self):
+        response = await self.client.get("/health")
+        self.assertEqual(response.status, 200)
+        status = await response.json()
+        self.assertEqual(status["message"], "Qwen 2.5:3B model is available")
+        self.assertEqual(status["model"]["model"], "qwen2.5:3b")
+
+    async def test_generate_then_cache_hit(self):
+        body = {"description": "An online shop", "diagram_types": ["Class", "Sequence"]}
+        response = await self.client.post("/generate", json=body)
+        self.assertEqual(response.status, 200)
+        result = await response.json()
+        self.assertEqual(result["sdlc_recommendation"], "Use Scrum.")
+        self.assertEqual(result["diagrams"]["Sequence"], "classDiagram\n    class Order")
+        self.assertFalse(result["cache_hit"])
+
+        result = await (await self.client.post("/generate", json=body)).json()
+        self.assertTrue(result["cache_hit"])
+
+    async def test_bad_request_and_timeout(self):
+        self.assertEqual((await self.client.post("/generate", json={"diagram_types": ["Class"]})).status, 400)
+        response = await self.client.post("/generate", json={"description": "slow app"})
+        self.assertEqual(response.status, 504)
+
+    async def test_batch_jobs(self):
+        response = await self.client.post("/batch", json={"items": [
+            {"id": "a", "description": "A chat app"},
+            {"id": "b", "description": "A todo app", "diagram_types": ["State Machine"]},
+        ]})
+        self.assertEqual(response.status, 202)
+        jobs = (await response.json())["jobs"]
+        self.assertEqual([job["id"] for job in jobs], ["a", "b"])
+
+        for job in jobs:
+            for _ in range(100):
+                status = await (await self.client.get(f"/jobs/{job['job_id']}")).json()
+                if status["status"] == "done":
+                    break
+                await asyncio.sleep(0.05)
+            self.assertEqual(status["status"], "done")
+        self.assertEqual(list(status["result"]["diagrams"]), ["State Machine"])
+        self.assertEqual((await self.client.get("/jobs/unknown")).status, 404)
+
+    async def test_static_bundle(self):
+        self.assertEqual((await self.client.get(f"/static/{mermaid_assets.BUNDLE_NAME}")).status, 404)
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(mermaid_assets, "COMPONENT_DIR", tmp):
+            with open(os.path.join(tmp, mermaid_assets.BUNDLE_NAME), "wb") as f:
+                f.write(b"window.mermaid = {};")
+            response = await self.client.get(f"/static/{mermaid_assets.BUNDLE_NAME}")
+            self.assertEqual(response.status, 200)
+            self.assertEqual(response.headers["Cache-Control"], mermaid_assets.IMMUTABLE_CACHE_CONTROL)
+            self.assertEqual(await response.read(), b"window.mermaid = {};")
+            self.assertEqual((await self.client.get("/static/index.html")).status, 404)
+
+@unittest.skipUnless(importlib.util.find_spec("crewai"), "CrewAI is not installed")
+class TestCrewEngineWarmup(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.ollama = test_utils.TestServer(make_stub_ollama())
+        await self.ollama.start_server()
+        api_base = str(self.ollama.make_url("")).rstrip("/")
+        self.service = GenerationService(api_base=api_base, engine="crew", warmup=False,
+                                         cache=ResponseCache(cache_dir=None))
+        self.client = test_utils.TestClient(test_utils.TestServer(create_app(self.service)))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.ollama.close()
+
+    async def test_first_request_reuses_warm_agents(self):
+        warm = self.service._orchestrator.stats()
+        body = {"description": "An online shop", "diagram_types": ["Sequence"], "use_cache": False}
+        self.assertEqual((await self.client.post("/generate", json=body)).status, 200)
+        stats = self.service._orchestrator.stats()
+        # The SDLC advisor and the Sequence generator both came from the warm pool
+        self.assertEqual(stats["agents_reused"] - warm["agents_reused"], 2)
+        self.assertEqual(stats["agents_built"], warm["agents_built"])
+
+class TestParseGenerationRequest(unittest.TestCase):
+    def test_normalizes_model_options(self):
+        request = parse_generation_request({"description": "A shop", "diagram_types": "Sequence",
+                                            "model_options": {"stop": "END", "num_ctx": 4096, "keep_alive": -1}})
+        self.assertEqual(request["diagram_types"], ["Sequence"])
+        self.assertEqual(request["model_options"], {"stop": ["END"], "num_ctx": 4096, "keep_alive": -1})
+
+    def test_rejects_bad_values(self):
+        bad_bodies = [
+            {"diagram_types": ["Flowchart"]},
+            {"temperature": "hot"},
+            {"temperature": True},
+            {"max_tokens": 0},
+            {"max_tokens": "800"},
+            {"model_options": {"num_ctx": "big"}},
+            {"model_options": {"num_ctx": -1}},
+            {"model_options": {"stop": ["END", 3]}},
+            {"model_options": {"keep_alive": [5]}},
+            {"model_options": {"seed": 1}},
+        ]
+        for body in bad_bodies:
+            with self.subTest(body=body), self.assertRaises(RequestError):
+                parse_generation_request(dict(body, description="A shop"))
+
+    def test_payload_keeps_single_stop_string_whole(self):
+        payload = build_chat_payload([], "qwen2.5:3b", 10, 0.5, stop="END")
+        self.assertEqual(payload["options"]["stop"], ["END"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+import unittest
+from unittest import mock
+
+CORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "core")
+sys.path.insert(0, CORE_DIR)
+
+import startup
+
+class TestStartup(unittest.TestCase):
+    def test_cli_import_defers_heavy_modules(self):
+        code = (f"import sys; sys.path.insert(0, {CORE_DIR!r}); import main; "
+                "print(','.join(m for m in ('requests', 'PIL', 'http.server', 'crewai', 'batch') if m in sys.modules))")
+        completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(completed.stdout.strip(), "")
+
+    def test_profile_imports_only_counts_the_module(self):
+        total, rows = startup.profile_imports("generation", top=50)
+        names = [name for name, _, _ in rows]
+        self.assertGreater(total, 0)
+        self.assertIn("tracing", names)
+        self.assertNotIn("site", names)
+        self.assertEqual(rows, sorted(rows, key=lambda row: row[2], reverse=True))
+        with self.assertRaises(ImportError):
+            startup.profile_imports("no_such_module")
+
+    def test_startup_mode(self):
+        with mock.patch.dict(os.environ, {"SMARTSDLC_STARTUP": "Eager"}):
+            self.assertEqual(startup.startup_mode(), "eager")
+        with mock.patch.dict(os.environ, {"SMARTSDLC_STARTUP": "bogus"}):
+            self.assertEqual(startup.startup_mode(), "lazy")
+        self.assertEqual(startup.preload(["no_such_module", "json"]), {})
+
+if __name__ == "__main__":
+    unittest.main()
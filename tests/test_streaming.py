@@ -0,0 +1,59 @@
+import json
+import os
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+import model_api
+from streaming import stream_with_timing
+
+CHUNKS = ["flow", "chart TD\n", "    A --> B"]
+
+class _StreamingHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length))
+        assert payload["stream"] is True
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        for text in CHUNKS:
+            self.wfile.write(json.dumps({"message": {"content": text}, "done": False}).encode() + b"\n")
+            self.wfile.flush()
+        self.wfile.write(b"not json\n")
+        self.wfile.write(json.dumps({"message": {"content": ""}, "done": True, "eval_count": 3}).encode() + b"\n")
+
+    def log_message(self, format, *args):
+        pass
+
+class TestStreaming(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _StreamingHandler)
+        cls.api_base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def test_chunks_are_yielded_in_order(self):
+        chunks = list(model_api.stream_model_with_system("sys", "user", api_base=self.api_base))
+        self.assertEqual(chunks, CHUNKS)
+
+    def test_timing_is_recorded(self):
+        timing = {}
+        text = "".join(stream_with_timing(
+            model_api.stream_model([{"role": "user", "content": "x"}], api_base=self.api_base), timing
+        ))
+        self.assertEqual(text, "".join(CHUNKS))
+        self.assertLessEqual(timing["time_to_first_token"], timing["total_time"])
+
+    def test_unreachable_server_yields_nothing(self):
+        self.assertEqual(list(model_api.stream_model([], api_base="http://127.0.0.1:9")), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import contextvars
+import json
+import os
+import sys
+import tempfile
+import unittest
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+import tracing
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.trace_file = os.path.join(self.tmp.name, "spans.jsonl")
+        tracing.reset()
+        tracing.configure_tracing(self.trace_file)
+
+    def tearDown(self):
+        tracing.configure_tracing("")
+        tracing.flush_spans(5)
+        self.tmp.cleanup()
+
+    def read_spans(self):
+        self.assertTrue(tracing.flush_spans(5))
+        with open(self.trace_file, encoding="utf-8") as f:
+            return {record["name"]: record for record in map(json.loads, f)}
+
+    def test_spans_nest_across_threads(self):
+        def child():
+            with tracing.span("child"):
+                pass
+
+        with tracing.span("parent", items=2):
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                executor.submit(contextvars.copy_context().run, child).result()
+
+        spans = self.read_spans()
+        self.assertEqual(spans["child"]["parent_id"], spans["parent"]["span_id"])
+        self.assertEqual(spans["child"]["trace_id"], spans["parent"]["trace_id"])
+        self.assertEqual(spans["parent"]["attributes"], {"items": 2})
+        self.assertIsNone(tracing.current_span())
+
+    def test_errors_are_recorded_and_reraised(self):
+        @tracing.traced("failing")
+        def fail():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            fail()
+        self.assertEqual(self.read_spans()["failing"]["status"], "error")
+        self.assertEqual(tracing.snapshot()["spans"]["failing"]["errors"], 1)
+
+    def test_ollama_stats_and_prometheus_output(self):
+        with tracing.span("model.call") as call_span:
+            tracing.record_ollama_stats({"eval_duration": 2_000_000_000, "eval_count": 40})
+        self.assertEqual(call_span.attributes, {"eval_seconds": 2.0, "eval_count": 40})
+
+        tracing.register_gauge("test_value", "A constant", lambda: 3)
+        text = tracing.render_prometheus()
+        self.assertIn('smartsdlc_span_duration_seconds_count{span="model.call"} 1', text)
+        self.assertIn("smartsdlc_ollama_eval_seconds_total 2.000000", text)
+        self.assertIn("smartsdlc_ollama_eval_count_tokens_total 40", text)
+        self.assertIn("smartsdlc_test_value 3.0", text)
+
+    def test_metrics_endpoint(self):
+        server = tracing.start_metrics_server(0)
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            self.assertIn("smartsdlc_span_duration_seconds", response.read().decode())
+
+if __name__ == "__main__":
+    unittest.main()
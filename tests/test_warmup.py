@@ -0,0 +1,132 @@
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "core"))
+
+import http_session
+import tracing
+from warmup import MODEL_COLD, MODEL_UNREACHABLE, MODEL_WARM, ModelWarmer, keep_alive_seconds
+
+class _StubOllamaHandler(BaseHTTPRequestHandler):
+    """Loads the model on /api/chat and lists it on /api/ps until it is unloaded"""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path != "/api/ps" or not self.server.has_ps:
+            self._reply(404, {"error": "not found"})
+            return
+        self._reply(200, {"models": [{"name": name} for name in self.server.loaded]})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length))
+        self.server.chats.append(payload)
+        load_duration = 0 if payload["model"] in self.server.loaded else 2_500_000_000
+        self.server.loaded.add(payload["model"])
+        self._reply(200, {"message": {"role": "assistant", "content": "OK"}, "done": True,
+                          "load_duration": load_duration, "eval_count": 1})
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestModelWarmer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubOllamaHandler)
+        cls.api_base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        http_session.close_session()
+
+    def setUp(self):
+        self.server.loaded = set()
+        self.server.chats = []
+        self.server.has_ps = True
+
+    def test_warm_loads_model_with_priming_request(self):
+        warmer = ModelWarmer("ollama/qwen2.5:3b", self.api_base, keep_alive="1h", num_ctx=4096)
+        self.assertFalse(warmer.is_loaded())
+        self.assertEqual(warmer.check(), MODEL_WARM)
+
+        payload = self.server.chats[0]
+        self.assertEqual(payload["model"], "qwen2.5:3b")
+        self.assertEqual(payload["keep_alive"], "1h")
+        self.assertEqual(payload["options"]["num_ctx"], 4096)
+        self.assertEqual(payload["options"]["num_predict"], 1)
+        status = warmer.status()
+        self.assertTrue(status["warm"])
+        self.assertEqual(status["warmups"], 1)
+        self.assertEqual(status["last_load_seconds"], 2.5)
+
+    def test_check_skips_loaded_model_and_reloads_unloaded_one(self):
+        warmer = ModelWarmer(api_base=self.api_base)
+        warmer.check()
+        warmer.check()
+        self.assertEqual(len(self.server.chats), 1)
+
+        self.server.loaded.clear()
+        warmer.check()
+        self.assertEqual(len(self.server.chats), 2)
+        self.assertEqual(warmer.status()["warmups"], 2)
+
+    def test_without_ps_trusts_keep_alive_of_last_warmup(self):
+        self.server.has_ps = False
+        warmer = ModelWarmer(api_base=self.api_base, keep_alive="30m")
+        self.assertIsNone(warmer.is_loaded())
+        warmer.check()
+        warmer.check()
+        self.assertEqual(len(self.server.chats), 1)
+
+        warmer.keep_alive = 0
+        warmer.check()
+        self.assertEqual(len(self.server.chats), 2)
+
+    def test_unreachable_server(self):
+        warmer = ModelWarmer(api_base="http://127.0.0.1:9")
+        self.assertEqual(warmer.check(), MODEL_UNREACHABLE)
+        status = warmer.status()
+        self.assertFalse(status["warm"])
+        self.assertEqual(status["failures"], 1)
+        self.assertTrue(status["error"])
+
+    def test_start_is_idempotent_and_exports_gauges(self):
+        warmer = ModelWarmer(api_base=self.api_base, interval=0.05)
+        self.assertEqual(warmer.status()["state"], MODEL_COLD)
+        warmer.start()
+        warmer.start()
+        try:
+            deadline = time.time() + 5
+            while not warmer.status()["warm"] and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertTrue(warmer.status()["running"])
+            self.assertIn("smartsdlc_model_warm 1", tracing.render_prometheus())
+        finally:
+            warmer.stop()
+        self.assertFalse(warmer.status()["running"])
+        self.assertEqual(len(self.server.chats), 1)
+
+    def test_keep_alive_seconds(self):
+        self.assertEqual(keep_alive_seconds("30m"), 1800)
+        self.assertEqual(keep_alive_seconds("1h"), 3600)
+        self.assertEqual(keep_alive_seconds(45), 45)
+        self.assertEqual(keep_alive_seconds(-1), float("inf"))
+        self.assertEqual(keep_alive_seconds(None), 300)
+
+if __name__ == "__main__":
+    unittest.main()